@@ -10,12 +10,17 @@ from rest_framework.settings import api_settings
 from rest_framework.decorators import action
 
 from django_filters.rest_framework import DjangoFilterBackend
-from chord_metadata_service.cleanup.run_all import run_all_cleanup
+from chord_metadata_service.cleanup import collect_cleanup_candidates, run_all_cleanup
+from chord_metadata_service.experiments.models import Experiment
+from chord_metadata_service.patients.search_vector import update_individual_search_vectors
+from chord_metadata_service.phenopackets.models import Phenopacket
 
 from chord_metadata_service.resources.serializers import ResourceSerializer
 from chord_metadata_service.restapi.api_renderers import PhenopacketsRenderer, JSONLDDatasetRenderer, RDFDatasetRenderer
 from chord_metadata_service.restapi.pagination import LargeResultsSetPagination
+from chord_metadata_service.restapi.public_cache import bump_public_cache_version
 
+from .jobs import submit_cleanup_job
 from .models import Project, Dataset, ProjectJsonSchema
 from .permissions import OverrideOrSuperUserOnly
 from .serializers import (
@@ -24,6 +29,7 @@ from .serializers import (
     DatasetSerializer
 )
 from .filters import AuthorizedDatasetFilter
+from .views_jobs import is_async_request, job_response
 
 logger = logging.getLogger(__name__)
 
@@ -100,10 +106,24 @@ class DatasetViewSet(CHORDPublicModelViewSet):
         get_obj_async = sync_to_async(self.get_object)
 
         dataset = await get_obj_async()
+
+        # Only objects reachable from the dataset can be orphaned by deleting it
+        candidates = await collect_cleanup_candidates(
+            phenopackets=Phenopacket.objects.filter(dataset=dataset),
+            experiments=Experiment.objects.filter(dataset=dataset),
+            datasets=Dataset.objects.filter(pk=dataset.pk),
+        )
         await dataset.adelete()
+        # Deleted objects were part of the search documents of the individuals they were related to
+        await sync_to_async(update_individual_search_vectors)(candidates["individuals"])
+
+        if is_async_request(request):
+            job = await sync_to_async(submit_cleanup_job)(candidates)
+            logger.info(f"Submitted cleanup {job} after deleting dataset {dataset.identifier} via DRF API")
+            return job_response(job, status.HTTP_202_ACCEPTED)
 
         logger.info(f"Running cleanup after deleting dataset {dataset.identifier} via DRF API")
-        n_removed = await run_all_cleanup()
+        n_removed = await run_all_cleanup(candidates)
         logger.info(f"Cleanup: removed {n_removed} objects in total")
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -134,6 +154,15 @@ class DatasetViewSet(CHORDPublicModelViewSet):
             return Response(error_msg, status.HTTP_400_BAD_REQUEST)
         return super().update(request, *args, **kwargs)
 
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        # Dataset metadata is listed by the public datasets endpoint
+        bump_public_cache_version()
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        bump_public_cache_version()
+
 
 class ProjectJsonSchemaViewSet(CHORDPublicModelViewSet):
     """
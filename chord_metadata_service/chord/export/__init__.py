@@ -0,0 +1,14 @@
+from .metadata import EXPORT_FORMAT_FUNCTION_MAP
+from .utils import ExportFileContext
+
+__all__ = [
+    "run_export",
+]
+
+
+def run_export(fmt: str, object_id: str, output_path: str) -> None:
+    """
+    Exports an object in the given format to output_path, which is under the responsibility of the caller.
+    """
+    with ExportFileContext(output_path, object_id) as file_export:
+        EXPORT_FORMAT_FUNCTION_MAP[fmt](file_export.get_path, object_id)
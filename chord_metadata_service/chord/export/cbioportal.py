@@ -1,11 +1,12 @@
 import logging
 import csv
+from functools import partial
 from typing import Callable, TextIO
 import re
 
-from django.db.models import F
+from django.db.models import F, QuerySet
 
-from .utils import ExportError
+from .utils import ExportError, ExportFiles
 
 from chord_metadata_service.chord.models import Dataset
 from chord_metadata_service.patients.models import Individual
@@ -29,6 +30,7 @@ __all__ = [
 
     "REGEXP_INVALID_FOR_ID",
 
+    "study_export_files",
     "study_export",
 ]
 
@@ -71,9 +73,16 @@ SAMPLE_DATATYPE = "SAMPLE"
 # ]     Closing list
 REGEXP_INVALID_FOR_ID = re.compile(r"[^a-zA-Z0-9_\.\-]")
 
+# Rows fetched from the database at a time while writing data files
+EXPORT_CHUNK_SIZE = 2000
 
-def study_export(get_path: Callable[[str], str], dataset_id: str):
-    """Export a given Project as a cBioPortal study"""
+
+def study_export_files(dataset_id: str) -> ExportFiles:
+    """
+    Lists the files of a given Dataset's cBioPortal study, with the functions writing them, in the order they are
+    written. Rows are read from the database while being written, so the files can be written to disk (see
+    study_export) or streamed.
+    """
     # TODO: a Dataset is a Study (associated with a publication), not a Project!
 
     try:
@@ -83,41 +92,33 @@ def study_export(get_path: Callable[[str], str], dataset_id: str):
 
     cbio_study_id = str(dataset.identifier)
 
-    # Export study file
-    with open(get_path(STUDY_FILENAME), "w", newline="\n") as file_study:
-        study_export_meta(dataset, file_study)
-
-    # Export patients.
-    with open(get_path(PATIENT_DATA_FILENAME), "w", newline="\n") as file_patient:
-        # Note: plural in `phenopackets` is intentional (related_name property in model)
-        indiv = Individual.objects.filter(phenopackets__dataset_id=dataset.identifier)
-        individual_export(indiv, file_patient)
-
-    with open(get_path(PATIENT_META_FILENAME), "w", newline="\n") as file_patient_meta:
-        clinical_meta_export(cbio_study_id, PATIENT_DATATYPE, file_patient_meta)
-
-    # Export samples
-    with open(get_path(SAMPLE_DATA_FILENAME), "w", newline="\n") as file_sample:
-        sampl = pm.Biosample.objects.filter(phenopacket__dataset_id=dataset.identifier)
-        sample_export(sampl, file_sample)
-
-    with open(get_path(SAMPLE_META_FILENAME), "w", newline="\n") as file_sample_meta:
-        clinical_meta_export(cbio_study_id, SAMPLE_DATATYPE, file_sample_meta)
-
+    # Note: plural in `phenopackets` is intentional (related_name property in model)
+    indiv = Individual.objects.filter(phenopackets__dataset_id=dataset.identifier)
+    sampl = pm.Biosample.objects.filter(phenopacket__dataset_id=dataset.identifier)
     # .maf files stored
-    with open(get_path(MAF_LIST_FILENAME), "w", newline="\n") as file_maf_list, \
-         open(get_path(CASE_LIST_SEQUENCED), "w", newline="\n") as file_case_list:
-        exp_res = (
-            ExperimentResult.objects
-            .filter(experiment__dataset_id=dataset.identifier, file_format="MAF")
-            .annotate(biosample_id=F("experiment__biosample"))
-        )
+    exp_res = (
+        ExperimentResult.objects
+        .filter(experiment__dataset_id=dataset.identifier, file_format="MAF")
+        .annotate(biosample_id=F("experiment__biosample"))
+    )
+
+    return (
+        (STUDY_FILENAME, partial(study_export_meta, dataset)),
+        (PATIENT_DATA_FILENAME, partial(individual_export, indiv)),
+        (PATIENT_META_FILENAME, partial(clinical_meta_export, cbio_study_id, PATIENT_DATATYPE)),
+        (SAMPLE_DATA_FILENAME, partial(sample_export, sampl)),
+        (SAMPLE_META_FILENAME, partial(clinical_meta_export, cbio_study_id, SAMPLE_DATATYPE)),
+        (MAF_LIST_FILENAME, partial(write_maf_list, exp_res)),
+        (CASE_LIST_SEQUENCED, partial(case_list_export, cbio_study_id, exp_res)),
+        (MUTATION_META_FILENAME, partial(mutation_meta_export, cbio_study_id)),
+    )
 
-        write_maf_list(exp_res, file_maf_list)
-        case_list_export(cbio_study_id, exp_res, file_case_list)
 
-    with open(get_path(MUTATION_META_FILENAME), 'w', newline='\n') as file_mutation_meta:
-        mutation_meta_export(cbio_study_id, file_mutation_meta)
+def study_export(get_path: Callable[[str], str], dataset_id: str):
+    """Export a given Project as a cBioPortal study"""
+    for filename, write in study_export_files(dataset_id):
+        with open(get_path(filename), "w", newline="\n") as file_handle:
+            write(file_handle)
 
 
 def write_dict_in_cbioportal_format(lines: dict, file_handle: TextIO) -> None:
@@ -171,7 +172,7 @@ def clinical_meta_export(study_id: str, datatype: str, file_handle: TextIO):
     write_dict_in_cbioportal_format(lines, file_handle)
 
 
-def individual_export(results, file_handle: TextIO):
+def individual_export(results: QuerySet, file_handle: TextIO):
     """
     Renders Individuals as a clinical_patient text file suitable for
     importing by cBioPortal.
@@ -189,20 +190,18 @@ def individual_export(results, file_handle: TextIO):
     - TUMOR_SITE
     """
 
-    individuals = [{
-        'id': sanitize_id(individual.id),
-        'sex': individual.sex,
-    } for individual in results]
-
-    columns = list(individuals[0].keys())
+    columns = ["id", "sex"]
     headers = individual_to_patient_header(columns)
 
     file_handle.writelines([f"{line}\n" for line in headers])
-    dict_writer = csv.DictWriter(file_handle, fieldnames=columns, delimiter="\t", lineterminator="\n")
-    dict_writer.writerows(individuals)
+    writer = csv.writer(file_handle, delimiter="\t", lineterminator="\n")
+    writer.writerows(
+        (sanitize_id(individual_id), sex)
+        for individual_id, sex in results.values_list("id", "sex").iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
 
 
-def sample_export(results, file_handle: TextIO):
+def sample_export(results: QuerySet, file_handle: TextIO):
     """
     Renders Biosamples as a clinical_sample text file suitable for
     importing by cBioPortal.
@@ -237,35 +236,33 @@ def sample_export(results, file_handle: TextIO):
     - DRIVER_MUTATIONS
     """
 
-    samples = []
-    for sample in results:
-        if sample.individual is None:
-            continue
-
-        subject_id = sample.individual
+    # Samples without an individual can't be imported
+    results = results.filter(individual__isnull=False)
 
-        sample_obj = {
-            "individual_id": sanitize_id(subject_id),
-            "id": sanitize_id(sample.id)
-        }
-        if sample.sampled_tissue:
-            sample_obj["tissue_label"] = sample.sampled_tissue.get("label", "")
-
-        samples.append(sample_obj)
-
-    columns = list(samples[0].keys())
+    # Only include the tissue label column if it has any values, since columns must be known before rows are written
+    with_tissue = results.exclude(sampled_tissue__isnull=True).exclude(sampled_tissue={}).exists()
+    columns = ["individual_id", "id", *(["tissue_label"] if with_tissue else [])]
     headers = biosample_to_sample_header(columns)
 
     file_handle.writelines([f"{line}\n" for line in headers])
-    dict_writer = csv.DictWriter(file_handle, fieldnames=columns, delimiter="\t", lineterminator="\n")
-    dict_writer.writerows(samples)
+    writer = csv.writer(file_handle, delimiter="\t", lineterminator="\n")
+    rows = results.values_list("individual_id", "id", "sampled_tissue").iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    writer.writerows(
+        (
+            sanitize_id(individual_id),
+            sanitize_id(sample_id),
+            *([(sampled_tissue or {}).get("label", "")] if with_tissue else []),
+        )
+        for individual_id, sample_id, sampled_tissue in rows
+    )
 
 
-def write_maf_list(results: list[ExperimentResult], file_handle: TextIO):
+def write_maf_list(results: QuerySet, file_handle: TextIO):
     """
     List of maf files associated with this dataset.
     """
-    file_handle.writelines(experiment.url + "\n" for experiment in results)
+    file_handle.writelines(
+        url + "\n" for url in results.values_list("url", flat=True).iterator(chunk_size=EXPORT_CHUNK_SIZE))
 
 
 def mutation_meta_export(study_id: str, file_handle: TextIO):
@@ -300,7 +297,7 @@ def mutation_meta_export(study_id: str, file_handle: TextIO):
     }, file_handle)
 
 
-def case_list_export(study_id: str, results, file_handle: TextIO):
+def case_list_export(study_id: str, results: QuerySet, file_handle: TextIO):
     """
     Case list. For now, sequenced data only.
 
@@ -326,9 +323,15 @@ def case_list_export(study_id: str, results, file_handle: TextIO):
         "stable_id": f"{study_id}_sequenced",
         "case_list_name": "All samples",
         "case_list_description": "All samples",
-        "case_list_ids": "\t".join(sanitize_id(exp_res.biosample_id) for exp_res in results),
     }, file_handle)
 
+    # The sample IDs are written one at a time rather than joined first, since there can be a lot of them
+    file_handle.write("case_list_ids: ")
+    for i, biosample_id in enumerate(
+            results.values_list("biosample_id", flat=True).iterator(chunk_size=EXPORT_CHUNK_SIZE)):
+        file_handle.write(("\t" if i else "") + sanitize_id(biosample_id))
+    file_handle.write("\n")
+
 
 class CbioportalClinicalHeaderGenerator:
     """
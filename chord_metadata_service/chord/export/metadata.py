@@ -1,7 +1,7 @@
 from chord_metadata_service.chord.models import Dataset, Project
 from chord_metadata_service.chord.workflows.metadata import WORKFLOW_CBIOPORTAL
 
-from .cbioportal import study_export as export_cbioportal_workflow
+from .cbioportal import study_export as export_cbioportal_workflow, study_export_files as cbioportal_workflow_files
 
 __all__ = [
     "OBJECT_TYPE_PROJECT",
@@ -10,6 +10,7 @@ __all__ = [
     "EXPORT_OBJECT_TYPE",
     "EXPORT_FORMATS",
     "EXPORT_FORMAT_FUNCTION_MAP",
+    "EXPORT_FORMAT_FILES_MAP",
     "EXPORT_FORMAT_OBJECT_TYPE_MAP",
 ]
 
@@ -32,6 +33,11 @@ EXPORT_FORMAT_FUNCTION_MAP = {
     WORKFLOW_CBIOPORTAL: export_cbioportal_workflow
 }
 
+# Functions listing the files of an export without writing them, to stream them as an archive
+EXPORT_FORMAT_FILES_MAP = {
+    WORKFLOW_CBIOPORTAL: cbioportal_workflow_files
+}
+
 EXPORT_FORMAT_OBJECT_TYPE_MAP = {
     WORKFLOW_CBIOPORTAL: {OBJECT_TYPE_DATASET}
 }
@@ -1,21 +1,35 @@
+import io
 import logging
 import os
 import shutil
 import tarfile
 import tempfile
+import time
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from typing import AsyncIterator, Callable, Iterable, Iterator, TextIO
+
+from ..job_progress import report_job_progress
 
 __all__ = [
     "ExportError",
+    "ExportFiles",
     "ExportFileContext",
     "EXPORT_DIR",
+    "stream_tar_gz",
 ]
 
 logger = logging.getLogger(__name__)
 
 EXPORT_DIR = "export"
 
+# Files of an export, as (path within the export directory, function writing the file's contents) pairs
+ExportFiles = Iterable[tuple[str, Callable[[TextIO], None]]]
+
+# Streamed export files are kept in memory up to this size, and spill over to a temporary file beyond it
+EXPORT_SPOOL_MAX_SIZE = 16 * 1024 * 1024
+
 
 class ExportError(Exception):
     pass
@@ -83,6 +97,10 @@ class ExportFileContext:
         """
         path = os.path.join(self.path, filename)
 
+        if filename:
+            # Each file is requested once, to be written by the export
+            report_job_progress("files_exported")
+
         # if filename contains a subdirectory, ensure it is created
         dirpath = os.path.dirname(path)
         if not os.path.exists(dirpath):
@@ -105,3 +123,82 @@ class ExportFileContext:
             # tar.gz will contain one `export/` output directory:
             tar.add(output_dir, arcname="export")
         return tar_path
+
+
+class _ChunkBuffer(io.RawIOBase):
+    """Write-only file object collecting the output of a tar stream, to be handed out in chunks"""
+
+    def __init__(self):
+        super().__init__()
+        self.data = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.data += b
+        return len(b)
+
+    def take(self) -> bytes:
+        chunk = bytes(self.data)
+        self.data.clear()
+        return chunk
+
+
+def _tar_info(name: str, size: int = 0, is_dir: bool = False) -> tarfile.TarInfo:
+    info = tarfile.TarInfo(name)
+    info.mtime = int(time.time())
+    if is_dir:
+        info.type = tarfile.DIRTYPE
+        info.mode = 0o755
+    else:
+        info.size = size
+        info.mode = 0o644
+    return info
+
+
+def _tar_gz_chunks(files: ExportFiles) -> Iterator[bytes]:
+    buffer = _ChunkBuffer()
+    dirs_added = set()
+
+    with tarfile.open(fileobj=buffer, mode="w|gz") as tar:
+        for filename, write in files:
+            # Like ExportFileContext.write_tar, the archive contains one `export/` directory
+            arcname = os.path.join(EXPORT_DIR, filename)
+            dirname = os.path.dirname(arcname)
+            parents = []
+            while dirname and dirname not in dirs_added:
+                parents.append(dirname)
+                dirname = os.path.dirname(dirname)
+            for parent in reversed(parents):
+                tar.addfile(_tar_info(parent, is_dir=True))
+                dirs_added.add(parent)
+
+            # Tar headers hold the size of each file, so files are written out in full before being added
+            with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_SIZE, dir=settings.SERVICE_TEMP) as spool:
+                text = io.TextIOWrapper(spool, encoding="utf-8", newline="\n")
+                write(text)
+                text.flush()
+                text.detach()
+
+                size = spool.tell()
+                spool.seek(0)
+                tar.addfile(_tar_info(arcname, size), spool)
+
+            yield buffer.take()
+
+    yield buffer.take()
+
+
+async def stream_tar_gz(files: ExportFiles) -> AsyncIterator[bytes]:
+    """
+    Streams the files of an export as a tar gzipped archive (laid out like the one created by
+    ExportFileContext.write_tar), without writing the export directory to disk first. Files are generated one after
+    another, as the archive is read.
+    """
+    chunks = _tar_gz_chunks(files)
+    done = object()
+    # Files are generated on the thread used for synchronous database access, like the rest of the sync code
+    while (chunk := await sync_to_async(next)(chunks, done)) is not done:
+        if chunk:
+            yield chunk
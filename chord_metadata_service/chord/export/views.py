@@ -2,9 +2,10 @@ import json
 import logging
 import traceback
 
-from django.http import FileResponse
+from django.http import StreamingHttpResponse
 
 from jsonschema import Draft7Validator
+from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
@@ -14,8 +15,17 @@ from rest_framework.request import Request
 from chord_metadata_service.chord.schemas import EXPORT_SCHEMA
 from bento_lib.responses import errors
 
-from .metadata import EXPORT_FORMAT_FUNCTION_MAP, EXPORT_FORMAT_OBJECT_TYPE_MAP, EXPORT_FORMATS, EXPORT_OBJECT_TYPE
-from .utils import ExportError, ExportFileContext
+from ..jobs import submit_job
+from ..models import Job
+from ..views_jobs import is_async_request, job_response
+from .metadata import (
+    EXPORT_FORMAT_FILES_MAP,
+    EXPORT_FORMAT_FUNCTION_MAP,
+    EXPORT_FORMAT_OBJECT_TYPE_MAP,
+    EXPORT_FORMATS,
+    EXPORT_OBJECT_TYPE,
+)
+from .utils import ExportError, ExportFileContext, stream_tar_gz
 
 
 BENTO_EXPORT_SCHEMA_VALIDATOR = Draft7Validator(EXPORT_SCHEMA)
@@ -33,7 +43,9 @@ def export(request: Request):
     Exports the requested data object (e.g. a Dataset or a Project) in the given
     format.
     Note that the generated files will be either written locally if a path is
-    provided, or downloaded as a tar gzipped attachment otherwise.
+    provided, or streamed as a tar gzipped attachment otherwise.
+    With async=true, the export is run as a background job instead, which requires
+    an output path: the job's files are written there.
 
     Args:
         request: Django Rest Framework request object. The data property contains
@@ -79,21 +91,32 @@ def export(request: Request):
 
     # TODO: secure the output_path value
 
+    if is_async_request(request):
+        # Exports can only be streamed back in the response to the request, so background jobs need somewhere to
+        # write their files.
+        if not output_path:
+            return Response(errors.bad_request_error(
+                "Asynchronous exports require an output_path"),
+                status=400
+            )
+        job = submit_job(Job.TYPE_EXPORT, {
+            "object_id": object_id, "object_type": object_type, "format": fmt, "output_path": output_path})
+        return job_response(job, status.HTTP_202_ACCEPTED)
+
     try:
+        # If no output path parameter has been provided, the generated export is streamed back as a tar gzipped
+        # attachment, with files generated as the response is sent rather than written to a temporary directory.
+        if not output_path:
+            response = StreamingHttpResponse(
+                stream_tar_gz(EXPORT_FORMAT_FILES_MAP[fmt](object_id)), content_type="application/gzip")
+            response["Content-Disposition"] = f"attachment; filename=\"{object_id}.tar.gz\""
+            return response
+
+        # Otherwise, the provided local path is under the responsibility of the caller
         with ExportFileContext(output_path, object_id) as file_export:
             # Pass a callable to generate the proper file paths within the export context.
             EXPORT_FORMAT_FUNCTION_MAP[fmt](file_export.get_path, object_id)
 
-            # If no output path parameter has been provided, the generated export
-            # is returned as an attachment to the Response and everything will
-            # be cleaned afterward.
-            # Otherwise, the provided local path is under the responsibility of
-            # the caller
-            if not output_path:
-                tarfile = file_export.write_tar()
-                # No context manager needed; Django will close it automatically.
-                return FileResponse(open(tarfile, "rb"), as_attachment=True)
-
     except ExportError as e:
         return Response(errors.bad_request_error(f"Encountered export error: {e}"), status=400)
 
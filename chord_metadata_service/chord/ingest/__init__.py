@@ -1,16 +1,26 @@
+from django.db import transaction
+
+from chord_metadata_service.chord.precomputed_statistics import invalidate_precomputed_statistics
 from chord_metadata_service.chord.workflows import metadata as wm
+from chord_metadata_service.restapi.public_cache import bump_public_cache_version
 
 from .experiments import ingest_experiments_workflow, ingest_maf_derived_from_vcf_workflow
 from .fhir import ingest_fhir_workflow
 from .phenopackets import ingest_phenopacket_workflow
 from .readsets import ingest_readset_workflow
+from .streaming import ingest_file_stream
+from .utils import get_output_or_raise
 
 from typing import Callable
 
 __all__ = [
+    "FROM_DERIVED_DATA",
     "WORKFLOW_INGEST_FUNCTION_MAP",
+    "run_ingest",
 ]
 
+FROM_DERIVED_DATA = "FROM_DERIVED_DATA"
+
 WORKFLOW_INGEST_FUNCTION_MAP: dict[str, Callable] = {
     wm.WORKFLOW_EXPERIMENTS_JSON: ingest_experiments_workflow,
     wm.WORKFLOW_PHENOPACKETS_JSON: ingest_phenopacket_workflow,
@@ -18,3 +28,24 @@ WORKFLOW_INGEST_FUNCTION_MAP: dict[str, Callable] = {
     wm.WORKFLOW_READSET: ingest_readset_workflow,
     wm.WORKFLOW_MAF_DERIVED_FROM_VCF_JSON: ingest_maf_derived_from_vcf_workflow,
 }
+
+
+def run_ingest(workflow_id: str, json_data, dataset_id: str, stream: bool = False) -> None:
+    """
+    Ingests the outputs of a workflow into a dataset (or, for FROM_DERIVED_DATA, into the datasets of the objects the
+    data is derived from.)
+    """
+    if stream:
+        # Streaming ingests take the URI of a JSON document to ingest, which is read and committed chunk by chunk
+        # (so there is no wrapping transaction.) A failed streaming ingest resumes after its last committed chunk
+        # when it is re-submitted with the same URI.
+        ingest_file_stream(workflow_id, get_output_or_raise(json_data, "json_document"), dataset_id)
+        return
+
+    with transaction.atomic():
+        # Wrap ingestion in a transaction, so if it fails we don't end up in a partial state in the database.
+        WORKFLOW_INGEST_FUNCTION_MAP[workflow_id](json_data, dataset_id)
+        # Derived data may be attached to objects in any dataset
+        invalidate_precomputed_statistics(None if dataset_id == FROM_DERIVED_DATA else [dataset_id])
+        # Only once committed, so that public responses are not re-cached from the data before the ingest
+        transaction.on_commit(bump_public_cache_version)
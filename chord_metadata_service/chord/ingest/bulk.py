@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import json
+
+from django.db.models import Model, Q
+from django.db.models.fields.related_descriptors import ManyToManyDescriptor
+from typing import Any, Iterable, Sequence, TypeVar
+
+__all__ = [
+    "bulk_get_or_create",
+    "bulk_add_m2m",
+]
+
+# Generic TypeVar for django db models
+T = TypeVar("T", bound=Model)
+
+# Maximum number of OR-ed lookups sent in a single existence query
+LOOKUP_BATCH_SIZE = 500
+
+
+def _lookup_field(key: str) -> str:
+    return key.removesuffix("__isnull")
+
+
+def _canonical_lookup(model: type[Model], lookup: dict[str, Any]) -> str:
+    values = {}
+    for k, v in lookup.items():
+        if k.endswith("__isnull"):
+            values[_lookup_field(k)] = None
+        else:
+            values[k] = model._meta.get_field(k).to_python(v)
+    return json.dumps(values, sort_keys=True, default=str)
+
+
+def _canonical_row(model: type[Model], row: Model, fields: Iterable[str]) -> str:
+    return json.dumps(
+        {f: getattr(row, model._meta.get_field(f).attname) for f in fields},
+        sort_keys=True,
+        default=str)
+
+
+def bulk_get_or_create(
+    model: type[T],
+    lookups: Sequence[dict[str, Any]],
+    defaults: Sequence[dict[str, Any]] | None = None,
+) -> list[tuple[T, bool]]:
+    """
+    Bulk equivalent of calling model.objects.get_or_create(**lookup) for each lookup, in order.
+    Existing rows are fetched with a few OR-ed queries and all missing rows are written with a single bulk_create.
+    Returns one (object, created) pair per lookup; identical lookups resolve to the same object, which is only
+    reported as created the first time it appears.
+    Lookups may use foreign key attnames (e.g. individual_id) and "<field>__isnull" keys, like get_or_create.
+    """
+
+    if not lookups:
+        return []
+
+    keys = [_canonical_lookup(model, lookup) for lookup in lookups]
+    first_index: dict[str, int] = {}
+    for i, key in enumerate(keys):
+        first_index.setdefault(key, i)
+
+    fields = [_lookup_field(k) for k in lookups[0]]
+    pk_name = model._meta.pk.name
+    # Rows whose values do not canonicalize exactly like the lookup (e.g. 1 vs 1.0 in JSON) can still be matched
+    # back by primary key, when the lookups include it.
+    has_pk = pk_name in fields
+
+    found: dict[str, T] = {}
+    unique_keys = list(first_index.items())
+    for b in range(0, len(unique_keys), LOOKUP_BATCH_SIZE):
+        batch = unique_keys[b:b + LOOKUP_BATCH_SIZE]
+
+        q = Q()
+        for _, i in batch:
+            q |= Q(**lookups[i])
+        keys_by_pk = {lookups[i][pk_name]: key for key, i in batch} if has_pk else {}
+
+        for row in model.objects.filter(q):
+            row_key = _canonical_row(model, row, fields)
+            if row_key not in first_index:
+                row_key = keys_by_pk.get(row.pk)
+            if row_key is not None:
+                found.setdefault(row_key, row)
+
+    to_create: list[T] = []
+    for key, i in first_index.items():
+        if key in found:
+            continue
+        obj = model(
+            **{k: v for k, v in lookups[i].items() if not k.endswith("__isnull")},
+            **(defaults[i] if defaults else {}),
+        )
+        found[key] = obj
+        to_create.append(obj)
+
+    model.objects.bulk_create(to_create)
+    created_keys = {id(obj) for obj in to_create}
+
+    return [
+        (found[key], id(found[key]) in created_keys and first_index[key] == i)
+        for i, key in enumerate(keys)
+    ]
+
+
+def bulk_add_m2m(descriptor: ManyToManyDescriptor, pairs: Iterable[tuple[Any, Any]]) -> None:
+    """
+    Bulk equivalent of calling source.<field>.add(target) for each (source PK, target PK) pair, writing the rows of
+    the many-to-many through table directly. Pairs which are already linked are skipped.
+    """
+
+    field = descriptor.field
+    through = descriptor.through
+    source_attname = f"{field.m2m_field_name()}_id"
+    target_attname = f"{field.m2m_reverse_field_name()}_id"
+
+    through.objects.bulk_create(
+        [through(**{source_attname: s, target_attname: t}) for s, t in dict.fromkeys(pairs)],
+        ignore_conflicts=True,
+    )
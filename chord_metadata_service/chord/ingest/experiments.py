@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import uuid
 
+from chord_metadata_service.chord.job_progress import report_job_progress
 from chord_metadata_service.chord.models import Dataset
 from chord_metadata_service.experiments import models as em
 from chord_metadata_service.experiments.schemas import EXPERIMENT_SCHEMA, EXPERIMENT_RESULT_SCHEMA
@@ -62,6 +63,7 @@ def validate_experiment(experiment_data, idx: int | None = None) -> None:
         raise IngestError(
             f"Failed schema validation for experiment{(' ' + str(idx)) if idx is not None else ''} "
             f"(check Katsu logs for more information)")
+    report_job_progress("records_validated")
 
 
 def ingest_experiment(
@@ -135,6 +137,7 @@ def ingest_experiment(
     # create m2m relationships
     new_experiment.experiment_results.set(experiment_results_db)
 
+    report_job_progress("rows_written")
     return new_experiment
 
 
@@ -1,20 +1,32 @@
 from __future__ import annotations
 
+import django
+import multiprocessing
+import threading
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from humps import decamelize
 
 from dateutil.parser import isoparse
 from decimal import Decimal
+from django.conf import settings
+from chord_metadata_service.chord.job_progress import report_job_progress
 from chord_metadata_service.chord.models import Project, ProjectJsonSchema, Dataset
 from chord_metadata_service.phenopackets import models as pm
+from chord_metadata_service.phenopackets.autocomplete_terms import record_autocomplete_terms
 from chord_metadata_service.phenopackets.schemas import PHENOPACKET_SCHEMA, VRS_REF_REGISTRY
+from chord_metadata_service.patients.search_vector import record_search_vector_update
 from chord_metadata_service.patients.values import KaryotypicSex
+from chord_metadata_service.resources import models as rm
 from chord_metadata_service.restapi.schema_utils import patch_project_schemas
 from chord_metadata_service.restapi.types import ExtensionSchemaDict
 from chord_metadata_service.restapi.utils import COMPUTED_PROPERTY_PREFIX, time_element_to_years
 
+from .bulk import bulk_add_m2m, bulk_get_or_create
 from .exceptions import IngestError
-from .resources import ingest_resource
-from .schema import schema_validation
+from .resources import ingest_resource, resource_query
+from .schema import schema_validation, schema_validation_errors
 from .utils import map_if_list, query_and_check_nulls
 from .logger import logger
 from typing import Any, Callable, Iterable, TypeVar
@@ -44,6 +56,19 @@ def _clean_extra_properties(extra_properties: dict[str, Any]) -> dict[str, Any]:
     return extra_properties
 
 
+def _phenotypic_feature_fields(pf: dict) -> dict[str, Any]:
+    return dict(
+        description=pf.get("description", ""),
+        pftype=pf["type"],
+        excluded=pf.get("excluded", False),
+        modifiers=pf.get("modifiers", []),  # TODO: Validate ontology term in schema...
+        severity=pf.get("severity"),
+        onset=pf.get("onset"),
+        evidence=pf.get("evidence"),  # TODO: Separate class for evidence?
+        extra_properties=_clean_extra_properties(pf.get("extra_properties", {})),
+    )
+
+
 def get_or_create_phenotypic_feature(pf: dict) -> pm.PhenotypicFeature:
     # Below is code for if we want to re-use phenotypic features in the future
     # For now, the lack of a many-to-many relationship doesn't let us do that.
@@ -66,16 +91,7 @@ def get_or_create_phenotypic_feature(pf: dict) -> pm.PhenotypicFeature:
     # except MultipleObjectsReturned:
     #     pf_obj = pm.PhenotypicFeature.objects.filter(**get_q).first()
 
-    pf_obj = pm.PhenotypicFeature(
-        description=pf.get("description", ""),
-        pftype=pf["type"],
-        excluded=pf.get("excluded", False),
-        modifiers=pf.get("modifiers", []),  # TODO: Validate ontology term in schema...
-        severity=pf.get("severity"),
-        onset=pf.get("onset"),
-        evidence=pf.get("evidence"),  # TODO: Separate class for evidence?
-        extra_properties=_clean_extra_properties(pf.get("extra_properties", {})),
-    )
+    pf_obj = pm.PhenotypicFeature(**_phenotypic_feature_fields(pf))
     pf_obj.save()
     return pf_obj
 
@@ -93,8 +109,100 @@ def validate_phenopacket(phenopacket_data: dict[str, Any],
             f"(check Katsu logs for more information)")
 
 
-def update_or_create_subject(subject: dict) -> pm.Individual:
-    extra_properties: dict[str, Any] = _clean_extra_properties(subject.get("extra_properties", {}))
+# Validation worker pools, by number of workers. Pools are created the first time they are needed and then kept for the
+# life of the process, rather than started for each list of phenopackets (e.g. for each chunk of a streamed ingest.)
+_validation_pools: dict[int, ProcessPoolExecutor] = {}
+_validation_pools_lock = threading.Lock()
+
+
+def _get_validation_pool(workers: int) -> ProcessPoolExecutor:
+    with _validation_pools_lock:
+        pool = _validation_pools.get(workers)
+        if pool is None:
+            # Workers are started from a fresh interpreter rather than forked, since forking a process running other
+            # threads (request threads, background jobs, ...) can copy locks held by those threads into the children.
+            # Django is set up again in each of them (this module can only be imported afterwards.)
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context(
+                    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"),
+                initializer=django.setup)
+            _validation_pools[workers] = pool
+        return pool
+
+
+def _discard_validation_pool(workers: int, pool: ProcessPoolExecutor) -> None:
+    with _validation_pools_lock:
+        if _validation_pools.get(workers) is pool:
+            del _validation_pools[workers]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _validate_phenopackets_chunk(chunk: list[tuple[int, dict[str, Any]]],
+                                 schema: dict | None = None) -> list[tuple[int, list[str]]]:
+    # The default schema is not sent to worker processes, which already have it
+    schema = PHENOPACKET_SCHEMA if schema is None else schema
+    return [(idx, schema_validation_errors(p, schema, registry=VRS_REF_REGISTRY)) for idx, p in chunk]
+
+
+def validate_phenopackets(phenopackets_data: list[dict[str, Any]],
+                          schema: dict = PHENOPACKET_SCHEMA,
+                          workers: int | None = None) -> list[tuple[int, list[str]]]:
+    """
+    Validates a list of phenopackets, fanning chunks of them out to a pool of worker processes if there are enough
+    phenopackets to make it worthwhile. Returns a (phenopacket index, error messages) report for each phenopacket, in
+    input order.
+    """
+
+    workers = workers or settings.INGEST_VALIDATION_WORKERS
+    indexed = list(enumerate(phenopackets_data))
+
+    if workers <= 1 or len(phenopackets_data) < settings.INGEST_PARALLEL_VALIDATION_MIN_RECORDS:
+        return _validate_phenopackets_chunk(indexed, schema)
+
+    # A few chunks per worker, so that a slow chunk does not hold up the others for too long
+    chunk_size = -(-len(indexed) // (workers * 4))
+    chunks = [indexed[i:i + chunk_size] for i in range(0, len(indexed), chunk_size)]
+    chunk_schema = None if schema is PHENOPACKET_SCHEMA else schema
+
+    pool = _get_validation_pool(workers)
+    try:
+        futures = [pool.submit(_validate_phenopackets_chunk, chunk, chunk_schema) for chunk in chunks]
+        return [report for future in futures for report in future.result()]
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for using too much memory); start a new pool next time
+        _discard_validation_pool(workers, pool)
+        raise
+
+
+def validate_phenopackets_or_raise(phenopackets_data: list[dict[str, Any]],
+                                   schema: dict = PHENOPACKET_SCHEMA,
+                                   idx_offset: int = 0) -> None:
+    """
+    Validates a list of phenopackets (see validate_phenopackets), logging any errors and raising an IngestError
+    which lists the indices of all invalid phenopackets.
+    """
+
+    invalid_indices = []
+    for idx, errors in validate_phenopackets(phenopackets_data, schema):
+        if errors:
+            for error in errors:
+                logger.error(f"Phenopacket {idx + idx_offset}: {error}")
+            invalid_indices.append(str(idx + idx_offset))
+
+    report_job_progress("records_validated", len(phenopackets_data))
+
+    if invalid_indices:
+        raise IngestError(
+            f"Failed schema validation for phenopacket{'s' if len(invalid_indices) > 1 else ''} "
+            f"{', '.join(invalid_indices)} (check Katsu logs for more information)")
+
+
+def _subject_query(subject: dict) -> dict[str, Any]:
+    """
+    Builds the lookup used to find an existing Individual matching the subject data (everything but the extra
+    properties, which are updated rather than matched on.)
+    """
 
     # Pre-process subject data:    ---------------------------------------------------------------------------------
 
@@ -111,6 +219,20 @@ def update_or_create_subject(subject: dict) -> pm.Individual:
     if "time_at_last_encounter" in subject:
         age_numeric_value, age_unit_value = time_element_to_years(subject["time_at_last_encounter"])
 
+    return dict(
+        id=subject["id"],
+        # if left out/null, karyotypic_sex defaults to UNKNOWN_KARYOTYPE
+        karyotypic_sex=subject.get("karyotypic_sex") or KaryotypicSex.UNKNOWN_KARYOTYPE,
+        age_numeric=age_numeric_value,
+        age_unit=age_unit_value if age_unit_value else "",
+        **subject_query
+    )
+
+
+def update_or_create_subject(subject: dict) -> pm.Individual:
+    extra_properties: dict[str, Any] = _clean_extra_properties(subject.get("extra_properties", {}))
+    subject_query = _subject_query(subject)
+
     # Check if subject already exists
     existing_extra_properties: dict[str, Any]
     try:
@@ -123,11 +245,6 @@ def update_or_create_subject(subject: dict) -> pm.Individual:
     # --------------------------------------------------------------------------------------------------------------
 
     subject_obj, subject_obj_created = pm.Individual.objects.get_or_create(
-        id=subject["id"],
-        # if left out/null, karyotypic_sex defaults to UNKNOWN_KARYOTYPE
-        karyotypic_sex=subject.get("karyotypic_sex") or KaryotypicSex.UNKNOWN_KARYOTYPE,
-        age_numeric=age_numeric_value,
-        age_unit=age_unit_value if age_unit_value else "",
         extra_properties=existing_extra_properties,
         **subject_query
     )
@@ -140,13 +257,18 @@ def update_or_create_subject(subject: dict) -> pm.Individual:
     return subject_obj
 
 
-def get_or_create_biosample(bs: dict) -> pm.Biosample:
-    bs_query = query_and_check_nulls(bs, "individual_id", lambda i: pm.Individual.objects.get(id=i))
+def _biosample_query(bs: dict) -> dict[str, Any]:
+    """
+    Builds the lookup for a biosample, minus its individual (which is resolved differently by the single-object and
+    the bulk ingest paths.)
+    """
+
+    bs_query = {}
     for k in ("sampled_tissue", "taxonomy", "time_of_collection", "histological_diagnosis",
               "tumor_progression", "tumor_grade"):
         bs_query.update(query_and_check_nulls(bs, k))
 
-    bs_obj, bs_created = pm.Biosample.objects.get_or_create(
+    return dict(
         id=bs["id"],
         description=bs.get("description", ""),
         procedure=bs.get("procedure", {}),
@@ -159,6 +281,13 @@ def get_or_create_biosample(bs: dict) -> pm.Biosample:
         **bs_query
     )
 
+
+def get_or_create_biosample(bs: dict) -> pm.Biosample:
+    bs_obj, bs_created = pm.Biosample.objects.get_or_create(
+        **query_and_check_nulls(bs, "individual_id", lambda i: pm.Individual.objects.get(id=i)),
+        **_biosample_query(bs),
+    )
+
     if derived_from_id := bs.get("derived_from_id"):
         try:
             parent_biosample = pm.Biosample.objects.get(id=derived_from_id)
@@ -177,8 +306,8 @@ def get_or_create_biosample(bs: dict) -> pm.Biosample:
     return bs_obj
 
 
-def get_or_create_gene_descriptor(gene_desc) -> pm.GeneDescriptor:
-    gene_descriptor, _ = pm.GeneDescriptor.objects.get_or_create(
+def _gene_descriptor_query(gene_desc: dict) -> dict[str, Any]:
+    return dict(
         value_id=gene_desc["value_id"],
         symbol=gene_desc["symbol"],
         description=gene_desc.get("description", ""),
@@ -186,17 +315,20 @@ def get_or_create_gene_descriptor(gene_desc) -> pm.GeneDescriptor:
         xrefs=gene_desc.get("xrefs", []),
         alternate_symbols=gene_desc.get("alternate_symbols", [])
     )
+
+
+def get_or_create_gene_descriptor(gene_desc) -> pm.GeneDescriptor:
+    gene_descriptor, _ = pm.GeneDescriptor.objects.get_or_create(**_gene_descriptor_query(gene_desc))
     return gene_descriptor
 
 
-def get_or_create_variant_descriptor(var_desc: dict) -> pm.VariationDescriptor:
-    gene_descriptor = _get_or_create_opt("gene_context", var_desc, get_or_create_gene_descriptor)
-    variant_descriptor, _ = pm.VariationDescriptor.objects.get_or_create(
+def _variant_descriptor_query(var_desc: dict) -> dict[str, Any]:
+    # Excludes gene_context, which must be created first and is passed in separately.
+    return dict(
         id=var_desc["id"],
         variation=var_desc.get("variation", {}),
         label=var_desc.get("label", ""),
         description=var_desc.get("description", ""),
-        gene_context=gene_descriptor,
         expressions=var_desc.get("expressions", []),
         vcf_record=var_desc.get("vcf_record", {}),
         xrefs=var_desc.get("xrefs", []),
@@ -207,19 +339,54 @@ def get_or_create_variant_descriptor(var_desc: dict) -> pm.VariationDescriptor:
         vrs_ref_allele_seq=var_desc.get("vrs_ref_allele_seq", ""),
         allelic_state=var_desc.get("allelic_state", {})
     )
+
+
+def get_or_create_variant_descriptor(var_desc: dict) -> pm.VariationDescriptor:
+    gene_descriptor = _get_or_create_opt("gene_context", var_desc, get_or_create_gene_descriptor)
+    variant_descriptor, _ = pm.VariationDescriptor.objects.get_or_create(
+        gene_context=gene_descriptor,
+        **_variant_descriptor_query(var_desc),
+    )
     return variant_descriptor
 
 
+def _variant_interp_query(variant_interp_data: dict) -> dict[str, Any]:
+    # Excludes variation_descriptor, which must be created first and is passed in separately.
+    return dict(
+        acmg_pathogenicity_classification=variant_interp_data["acmg_pathogenicity_classification"],
+        therapeutic_actionability=variant_interp_data["therapeutic_actionability"],
+    )
+
+
 def get_or_create_variant_interp(variant_interp_data: dict) -> pm.VariantInterpretation:
     variant_descriptor = get_or_create_variant_descriptor(variant_interp_data["variation_descriptor"])
     variant_interpretation, _ = pm.VariantInterpretation.objects.get_or_create(
-        acmg_pathogenicity_classification=variant_interp_data["acmg_pathogenicity_classification"],
-        therapeutic_actionability=variant_interp_data["therapeutic_actionability"],
-        variation_descriptor=variant_descriptor
+        variation_descriptor=variant_descriptor,
+        **_variant_interp_query(variant_interp_data),
     )
     return variant_interpretation
 
 
+def _genomic_interpretation_query(gen_interp: dict) -> dict[str, Any]:
+    # Excludes the gene descriptor/variant interpretation 'call', which must be created first.
+    return dict(
+        interpretation_status=gen_interp["interpretation_status"],
+        extra_properties=_clean_extra_properties(gen_interp.get("extra_properties", {})),
+    )
+
+
+def _ambiguous_subject_or_biosample_error(subject_or_biosample_id: str) -> IngestError:
+    return IngestError(
+        f"Ambiguous GenomicInterpretation.subject_or_biosample_id {subject_or_biosample_id} "
+        "points to a Biosample AND a Subject. Must point to a Biosample or a Subject, not both.")
+
+
+def _missing_subject_or_biosample_error(subject_or_biosample_id: str) -> IngestError:
+    return IngestError(
+        f"GenomicInterpretation.subject_or_biosample_id {subject_or_biosample_id} "
+        "has no matching Biosample or Individual.")
+
+
 def get_or_create_genomic_interpretation(gen_interp: dict) -> pm.GenomicInterpretation:
     # Check if a Biosample or Individual with subject_or_biosample_id exists
     subject_or_biosample_id = gen_interp["subject_or_biosample_id"]
@@ -228,9 +395,7 @@ def get_or_create_genomic_interpretation(gen_interp: dict) -> pm.GenomicInterpre
 
     if is_biosample and is_subject:
         # Cannot be both
-        raise IngestError(
-            f"Ambiguous GenomicInterpretation.subject_or_biosample_id {subject_or_biosample_id} "
-            "points to a Biosample AND a Subject. Must point to a Biosample or a Subject, not both.")
+        raise _ambiguous_subject_or_biosample_error(subject_or_biosample_id)
     elif is_biosample:
         # Get related Biosample
         related_obj = pm.Biosample.objects.get(id=subject_or_biosample_id)
@@ -239,18 +404,15 @@ def get_or_create_genomic_interpretation(gen_interp: dict) -> pm.GenomicInterpre
         related_obj = pm.Individual.objects.get(id=subject_or_biosample_id)
     else:
         # Cannot be neither
-        raise IngestError(
-            f"GenomicInterpretation.subject_or_biosample_id {subject_or_biosample_id} "
-            "has no matching Biosample or Individual.")
+        raise _missing_subject_or_biosample_error(subject_or_biosample_id)
 
     gene_descriptor = _get_or_create_opt("gene_descriptor", gen_interp, get_or_create_gene_descriptor)
     variant_interpretation = _get_or_create_opt("variant_interpretation", gen_interp, get_or_create_variant_interp)
 
     gen_obj, _ = pm.GenomicInterpretation.objects.get_or_create(
-        interpretation_status=gen_interp["interpretation_status"],
         gene_descriptor=gene_descriptor,
         variant_interpretation=variant_interpretation,
-        extra_properties=_clean_extra_properties(gen_interp.get("extra_properties", {})),
+        **_genomic_interpretation_query(gen_interp),
     )
 
     if related_obj:
@@ -261,34 +423,42 @@ def get_or_create_genomic_interpretation(gen_interp: dict) -> pm.GenomicInterpre
     return gen_obj
 
 
-def get_or_create_disease(disease) -> pm.Disease:
-    d_obj, _ = pm.Disease.objects.get_or_create(
+def _disease_query(disease: dict) -> dict[str, Any]:
+    return dict(
         term=disease["term"],
         disease_stage=disease.get("disease_stage", []),
         clinical_tnm_finding=disease.get("clinical_tnm_finding", []),
         extra_properties=_clean_extra_properties(disease.get("extra_properties", {})),
         **query_and_check_nulls(disease, "onset")
     )
-    return d_obj
 
 
-def get_or_create_interpretation_diagnosis(interpretation: dict) -> pm.Diagnosis | None:
-    diagnosis = interpretation.get("diagnosis")
+def get_or_create_disease(disease) -> pm.Disease:
+    d_obj, _ = pm.Disease.objects.get_or_create(**_disease_query(disease))
+    return d_obj
 
-    if not diagnosis:
-        # No diagnosis to create
-        return
 
+def _diagnosis_query(interpretation: dict) -> dict[str, Any]:
     # One-to-one relation between Interpretation and Diagnosis.
     # If an Interpretation has a Diagnosis, the created Diagnosis row uses the interpretation's ID as its PK
     # This ensures unique diagnoses if more than one share the same disease/extra_properties
-    id = interpretation.get("id")
-    diag_obj, created = pm.Diagnosis.objects.get_or_create(
-        id=id,
+    diagnosis = interpretation["diagnosis"]
+    return dict(
+        id=interpretation.get("id"),
         disease=diagnosis.get("disease", {}),
         extra_properties=_clean_extra_properties(diagnosis.get("extra_properties", {})),
     )
 
+
+def get_or_create_interpretation_diagnosis(interpretation: dict) -> pm.Diagnosis | None:
+    diagnosis = interpretation.get("diagnosis")
+
+    if not diagnosis:
+        # No diagnosis to create
+        return
+
+    diag_obj, created = pm.Diagnosis.objects.get_or_create(**_diagnosis_query(interpretation))
+
     if created:
         # Create GenomicInterpretation
         genomic_interpretations_data = diagnosis.get("genomic_interpretations", [])
@@ -301,19 +471,55 @@ def get_or_create_interpretation_diagnosis(interpretation: dict) -> pm.Diagnosis
     return diag_obj
 
 
-def get_or_create_interpretation(interpretation: dict) -> pm.Interpretation:
-    diagnosis = get_or_create_interpretation_diagnosis(interpretation)
-    interp_obj, _ = pm.Interpretation.objects.get_or_create(
+def _interpretation_query(interpretation: dict) -> dict[str, Any]:
+    # Excludes the diagnosis, which must be created first and is passed in separately.
+    return dict(
         id=interpretation["id"],
-        diagnosis=diagnosis,
         progress_status=interpretation["progress_status"],
         summary=interpretation.get("summary", ""),
         extra_properties=_clean_extra_properties(interpretation.get("extra_properties", {}))
     )
 
+
+def get_or_create_interpretation(interpretation: dict) -> pm.Interpretation:
+    diagnosis = get_or_create_interpretation_diagnosis(interpretation)
+    interp_obj, _ = pm.Interpretation.objects.get_or_create(
+        diagnosis=diagnosis,
+        **_interpretation_query(interpretation),
+    )
+
     return interp_obj
 
 
+def _meta_data_fields(meta_data: dict) -> dict[str, Any]:
+    return dict(
+        created_by=meta_data["created_by"],
+        submitted_by=meta_data.get("submitted_by"),
+        phenopacket_schema_version=meta_data.get("phenopacket_schema_version"),
+        external_references=meta_data.get("external_references", []),
+        extra_properties=_clean_extra_properties(meta_data.get("extra_properties", {})),
+    )
+
+
+def _phenopacket_exists_error(phenopacket_id: str) -> IngestError:
+    error_msg = f"Cannot ingest Phenopacket with ID {phenopacket_id}, ID already exists in the database."
+    logger.error(error_msg)
+    return IngestError(error_msg)
+
+
+def _biosamples_with_subject(phenopacket_data: dict[str, Any]) -> list[dict[str, Any]]:
+    # Pre-process biosamples; historically (<2.17.3) we were running into issues because a missing individual_id in
+    # the biosample meant it would be left as None rather than properly associated with a specified subject.
+    #   - Here, we tag the biosample with the subject's ID if a subject is specified, since the Phenopacket spec
+    #     explicitly says of the biosamples field:
+    #       "This field describes samples that have been derived from the patient who is the object of the Phenopacket"
+    subject = phenopacket_data.get("subject")
+    return [
+        {**bs, "individual_id": subject["id"]} if "individual_id" not in bs and subject else bs
+        for bs in phenopacket_data.get("biosamples", [])
+    ]
+
+
 def ingest_phenopacket(phenopacket_data: dict[str, Any],
                        dataset_id: str,
                        json_schema: dict = PHENOPACKET_SCHEMA,
@@ -343,23 +549,13 @@ def ingest_phenopacket(phenopacket_data: dict[str, Any],
     # Abort the ingestion if the phenopacket's ID exists in the DB
     phenopacket_id = phenopacket_data.get("id")
     if pm.Phenopacket.objects.filter(id=phenopacket_id).exists():
-        error_msg = f"Cannot ingest Phenopacket with ID {phenopacket_id}, ID already exists in the database."
-        logger.error(error_msg)
-        raise IngestError(error_msg)
+        raise _phenopacket_exists_error(phenopacket_id)
 
     subject = phenopacket_data.get("subject")
 
     phenotypic_features = phenopacket_data.get("phenotypic_features", [])
 
-    # Pre-process biosamples; historically (<2.17.3) we were running into issues because a missing individual_id in
-    # the biosample meant it would be left as None rather than properly associated with a specified subject.
-    #   - Here, we tag the biosample with the subject's ID if a subject is specified, since the Phenopacket spec
-    #     explicitly says of the biosamples field:
-    #       "This field describes samples that have been derived from the patient who is the object of the Phenopacket"
-    biosamples = [
-        {**bs, "individual_id": subject["id"]} if "individual_id" not in bs and subject else bs
-        for bs in phenopacket_data.get("biosamples", [])
-    ]
+    biosamples = _biosamples_with_subject(phenopacket_data)
 
     # Pull other fields out of the phenopacket input
     diseases = phenopacket_data.get("diseases", [])
@@ -389,13 +585,7 @@ def ingest_phenopacket(phenopacket_data: dict[str, Any],
     diseases_db = [get_or_create_disease(disease) for disease in diseases]
 
     # Create phenopacket metadata object
-    meta_data_obj = pm.MetaData(
-        created_by=meta_data["created_by"],
-        submitted_by=meta_data.get("submitted_by"),
-        phenopacket_schema_version=meta_data.get("phenopacket_schema_version"),
-        external_references=meta_data.get("external_references", []),
-        extra_properties=_clean_extra_properties(meta_data.get("extra_properties", {})),
-    )
+    meta_data_obj = pm.MetaData(**_meta_data_fields(meta_data))
     meta_data_obj.save()
 
     # Attach resources to the metadata object
@@ -423,7 +613,281 @@ def ingest_phenopacket(phenopacket_data: dict[str, Any],
     return phenopacket
 
 
-def ingest_phenopacket_workflow(json_data, dataset_id) -> list[pm.Phenopacket] | pm.Phenopacket:
+def _regroup(items: list, groups: list[list]) -> list[list]:
+    """
+    Splits a flat list of results back into lists shaped like the groups of inputs they were computed from.
+    """
+    it = iter(items)
+    return [[next(it) for _ in group] for group in groups]
+
+
+def _bulk_create_genomic_interpretations(diagnoses: list[tuple[pm.Diagnosis, list[dict]]]) -> None:
+    """
+    Bulk equivalent of get_or_create_genomic_interpretation, for the genomic interpretations of newly-created diagnoses.
+    """
+
+    gen_interps = [(diag_obj, gen_interp) for diag_obj, gen_interps in diagnoses for gen_interp in gen_interps]
+    if not gen_interps:
+        return
+
+    # Check that each subject_or_biosample_id points to exactly one of a Biosample or an Individual
+    related_ids = {gen_interp["subject_or_biosample_id"] for _, gen_interp in gen_interps}
+    biosample_ids = set(pm.Biosample.objects.filter(id__in=related_ids).values_list("id", flat=True))
+    subject_ids = set(pm.Individual.objects.filter(id__in=related_ids).values_list("id", flat=True))
+    for _, gen_interp in gen_interps:
+        subject_or_biosample_id = gen_interp["subject_or_biosample_id"]
+        if subject_or_biosample_id in biosample_ids and subject_or_biosample_id in subject_ids:
+            raise _ambiguous_subject_or_biosample_error(subject_or_biosample_id)
+        if subject_or_biosample_id not in biosample_ids and subject_or_biosample_id not in subject_ids:
+            raise _missing_subject_or_biosample_error(subject_or_biosample_id)
+
+    # Create the genomic interpretation 'calls', from the innermost objects outwards
+    variant_interps = [gen_interp["variant_interpretation"] for _, gen_interp in gen_interps
+                       if "variant_interpretation" in gen_interp]
+    variant_descs = [variant_interp["variation_descriptor"] for variant_interp in variant_interps]
+    gene_descs = [
+        *(gen_interp["gene_descriptor"] for _, gen_interp in gen_interps if "gene_descriptor" in gen_interp),
+        *(var_desc["gene_context"] for var_desc in variant_descs if "gene_context" in var_desc),
+    ]
+
+    bulk_get_or_create(pm.GeneDescriptor, [_gene_descriptor_query(gene_desc) for gene_desc in gene_descs])
+    bulk_get_or_create(pm.VariationDescriptor, [
+        {
+            "gene_context_id": var_desc["gene_context"]["value_id"] if "gene_context" in var_desc else None,
+            **_variant_descriptor_query(var_desc),
+        }
+        for var_desc in variant_descs
+    ])
+    variant_interp_objs = iter(bulk_get_or_create(pm.VariantInterpretation, [
+        {
+            "variation_descriptor_id": variant_interp["variation_descriptor"]["id"],
+            **_variant_interp_query(variant_interp),
+        }
+        for variant_interp in variant_interps
+    ]))
+
+    gen_interp_objs = bulk_get_or_create(pm.GenomicInterpretation, [
+        {
+            "gene_descriptor_id": (
+                gen_interp["gene_descriptor"]["value_id"] if "gene_descriptor" in gen_interp else None),
+            "variant_interpretation_id": (
+                next(variant_interp_objs)[0].id if "variant_interpretation" in gen_interp else None),
+            **_genomic_interpretation_query(gen_interp),
+        }
+        for _, gen_interp in gen_interps
+    ])
+
+    # Set the link with Biosample/Individual; as when adding them one by one, the last link for an object wins.
+    linked_to_biosample: dict[int, pm.GenomicInterpretation] = {}
+    linked_to_subject: dict[int, pm.GenomicInterpretation] = {}
+    for (_, gen_interp), (gen_obj, _) in zip(gen_interps, gen_interp_objs):
+        subject_or_biosample_id = gen_interp["subject_or_biosample_id"]
+        if subject_or_biosample_id in biosample_ids:
+            gen_obj.biosample_id = subject_or_biosample_id
+            linked_to_biosample[gen_obj.pk] = gen_obj
+        else:
+            gen_obj.subject_id = subject_or_biosample_id
+            linked_to_subject[gen_obj.pk] = gen_obj
+    pm.GenomicInterpretation.objects.bulk_update(linked_to_biosample.values(), ["biosample"])
+    pm.GenomicInterpretation.objects.bulk_update(linked_to_subject.values(), ["subject"])
+
+    bulk_add_m2m(pm.Diagnosis.genomic_interpretations, (
+        (diag_obj.id, gen_obj.id) for (diag_obj, _), (gen_obj, _) in zip(gen_interps, gen_interp_objs)))
+
+
+def _ingest_phenopackets_chunk(phenopackets_data: list[dict[str, Any]], dataset: Dataset) -> list[pm.Phenopacket]:
+    """
+    Ingests a chunk of (already-validated) phenopackets by collecting the rows of each model for the whole chunk and
+    writing them with bulk_create, in dependency order.
+    """
+
+    # Abort the ingestion if any phenopacket's ID exists in the DB, or is repeated in the chunk
+    phenopacket_ids = [phenopacket_data.get("id") for phenopacket_data in phenopackets_data]
+    seen_ids = set(pm.Phenopacket.objects.filter(id__in=phenopacket_ids).values_list("id", flat=True))
+    for phenopacket_id in phenopacket_ids:
+        if phenopacket_id in seen_ids:
+            raise _phenopacket_exists_error(phenopacket_id)
+        seen_ids.add(phenopacket_id)
+
+    for phenopacket_data in phenopackets_data:
+        if phenopacket_data.get("files", []):
+            logger.warning("Found files in phenopacket.files are not ingested by Katsu.")
+
+    # Subjects: -------------------------------------------------------------------------------------------------------
+    #  - new subjects are created, existing ones get their extra properties replaced by the last ones ingested.
+
+    subjects = [s for phenopacket_data in phenopackets_data if (s := phenopacket_data.get("subject"))]
+    subject_extra_properties = {s["id"]: _clean_extra_properties(s.get("extra_properties", {})) for s in subjects}
+    subject_objs: dict[str, pm.Individual] = {}
+    created_subject_ids: set[str] = set()
+    for subject_obj, created in bulk_get_or_create(
+        pm.Individual,
+        [_subject_query(s) for s in subjects],
+        defaults=[{"extra_properties": subject_extra_properties[s["id"]]} for s in subjects],
+    ):
+        subject_objs[subject_obj.id] = subject_obj
+        if created:
+            created_subject_ids.add(subject_obj.id)
+
+    updated_subjects = [s for s in subject_objs.values() if s.id not in created_subject_ids]
+    for subject_obj in updated_subjects:
+        subject_obj.extra_properties = subject_extra_properties[subject_obj.id]
+        subject_obj.clean()
+    pm.Individual.objects.bulk_update(updated_subjects, ["extra_properties"])
+
+    # Biosamples and their phenotypic features: -----------------------------------------------------------------------
+
+    biosamples = [_biosamples_with_subject(phenopacket_data) for phenopacket_data in phenopackets_data]
+    all_biosamples = [bs for pbs in biosamples for bs in pbs]
+
+    individual_ids = {i for bs in all_biosamples if (i := bs.get("individual_id")) is not None}
+    if missing := individual_ids - set(
+            pm.Individual.objects.filter(id__in=individual_ids).values_list("id", flat=True)):
+        raise pm.Individual.DoesNotExist(f"Individual matching query does not exist: {sorted(missing)[0]}")
+
+    # A derived_from_id is only linked if the parent biosample was ingested before the child (see
+    # get_or_create_biosample), so we need to know which biosamples exist before creating the chunk's.
+    known_biosample_ids = set(pm.Biosample.objects.filter(
+        id__in={p for bs in all_biosamples if (p := bs.get("derived_from_id"))}).values_list("id", flat=True))
+
+    biosample_objs = bulk_get_or_create(pm.Biosample, [
+        {**query_and_check_nulls(bs, "individual_id"), **_biosample_query(bs)} for bs in all_biosamples])
+
+    phenotypic_feature_objs: list[pm.PhenotypicFeature] = []
+    derived_biosample_objs: dict[str, pm.Biosample] = {}
+    for bs, (bs_obj, bs_created) in zip(all_biosamples, biosample_objs):
+        known_biosample_ids.add(bs_obj.id)
+
+        if derived_from_id := bs.get("derived_from_id"):
+            if derived_from_id in known_biosample_ids:
+                bs_obj.derived_from_id_id = derived_from_id
+                derived_biosample_objs[bs_obj.id] = bs_obj
+            else:
+                logger.warning(
+                    f"Biosample {bs['id']} refers to a non-existing 'derived_from_id' Biosample {derived_from_id}.")
+
+        if bs_created:
+            phenotypic_feature_objs.extend(
+                pm.PhenotypicFeature(biosample=bs_obj, **_phenotypic_feature_fields(pf))
+                for pf in bs.get("phenotypic_features", []))
+
+    pm.Biosample.objects.bulk_update(derived_biosample_objs.values(), ["derived_from_id"])
+
+    # Resources (ontologies, etc.): -----------------------------------------------------------------------------------
+
+    resources = [phenopacket_data["meta_data"].get("resources", []) for phenopacket_data in phenopackets_data]
+    resource_objs = bulk_get_or_create(rm.Resource, [resource_query(rs) for prs in resources for rs in prs])
+
+    # Interpretations, their diagnoses and genomic interpretations: ---------------------------------------------------
+
+    interpretations = [phenopacket_data.get("interpretations", []) for phenopacket_data in phenopackets_data]
+    all_interpretations = [interp for pis in interpretations for interp in pis]
+
+    diagnosed_interpretations = [interp for interp in all_interpretations if interp.get("diagnosis")]
+    diagnosis_objs = bulk_get_or_create(
+        pm.Diagnosis, [_diagnosis_query(interp) for interp in diagnosed_interpretations])
+    _bulk_create_genomic_interpretations([
+        (diag_obj, interp["diagnosis"].get("genomic_interpretations", []))
+        for interp, (diag_obj, created) in zip(diagnosed_interpretations, diagnosis_objs)
+        if created
+    ])
+
+    # Diagnoses use their interpretation's ID as their primary key (see _diagnosis_query)
+    interpretation_objs = bulk_get_or_create(pm.Interpretation, [
+        {"diagnosis_id": interp.get("id") if interp.get("diagnosis") else None, **_interpretation_query(interp)}
+        for interp in all_interpretations
+    ])
+
+    # Diseases: -------------------------------------------------------------------------------------------------------
+
+    diseases = [phenopacket_data.get("diseases", []) for phenopacket_data in phenopackets_data]
+    disease_objs = bulk_get_or_create(pm.Disease, [_disease_query(disease) for pds in diseases for disease in pds])
+
+    # Phenopackets and their metadata: --------------------------------------------------------------------------------
+
+    meta_data_objs = pm.MetaData.objects.bulk_create([
+        pm.MetaData(**_meta_data_fields(phenopacket_data["meta_data"])) for phenopacket_data in phenopackets_data])
+
+    phenopackets = pm.Phenopacket.objects.bulk_create([
+        pm.Phenopacket(
+            id=phenopacket_data.get("id"),
+            subject=subject_objs[subject["id"]] if (subject := phenopacket_data.get("subject")) else None,
+            measurements=phenopacket_data.get("measurements", []),
+            medical_actions=phenopacket_data.get("medical_actions", []),
+            meta_data=meta_data_obj,
+            dataset=dataset,
+        )
+        for phenopacket_data, meta_data_obj in zip(phenopackets_data, meta_data_objs)
+    ])
+
+    # ... and attach all the other objects to them.
+
+    phenotypic_feature_objs.extend(
+        pm.PhenotypicFeature(phenopacket=phenopacket, **_phenotypic_feature_fields(pf))
+        for phenopacket_data, phenopacket in zip(phenopackets_data, phenopackets)
+        for pf in phenopacket_data.get("phenotypic_features", []))
+    pm.PhenotypicFeature.objects.bulk_create(phenotypic_feature_objs)
+
+    bulk_add_m2m(pm.MetaData.resources, (
+        (meta_data_obj.id, rs_obj.id)
+        for meta_data_obj, prs in zip(meta_data_objs, _regroup(resource_objs, resources))
+        for rs_obj, _ in prs))
+
+    for field, objs, groups in (
+        (pm.Phenopacket.biosamples, biosample_objs, biosamples),
+        (pm.Phenopacket.interpretations, interpretation_objs, interpretations),
+        (pm.Phenopacket.diseases, disease_objs, diseases),
+    ):
+        bulk_add_m2m(field, (
+            (phenopacket.id, obj.pk)
+            for phenopacket, pobjs in zip(phenopackets, _regroup(objs, groups))
+            for obj, _ in pobjs))
+
+    # No post_save signals are sent for the rows created above, so the subjects' search documents are marked as out of
+    # date here, to be recomputed once the ingest transaction commits.
+    record_search_vector_update(pm.Individual, subject_objs.keys())
+
+    # ... and the terms of the created objects are added to the autocomplete dictionary here.
+    for model, objs in (
+        (pm.Disease, [obj for obj, created in disease_objs if created]),
+        (pm.PhenotypicFeature, phenotypic_feature_objs),
+        (pm.Biosample, [obj for obj, created in biosample_objs if created]),
+    ):
+        record_autocomplete_terms(model, objs)
+
+    return phenopackets
+
+
+def ingest_phenopackets_bulk(phenopackets_data: list[dict[str, Any]],
+                             dataset_id: str,
+                             json_schema: dict = PHENOPACKET_SCHEMA,
+                             validate: bool = True,
+                             chunk_size: int | None = None) -> list[pm.Phenopacket]:
+    """
+    Ingests a list of phenopackets, writing each model's rows for a chunk of phenopackets at a time with bulk_create
+    rather than one get_or_create/save() call per object. The resulting database state is the same as calling
+    ingest_phenopacket on each phenopacket, in order.
+    Since bulk_create bypasses Model.save(), no post_save signals are sent for the created objects.
+    """
+
+    if validate:
+        validate_phenopackets_or_raise(phenopackets_data, json_schema)
+
+    dataset = Dataset.objects.get(identifier=dataset_id)
+    chunk_size = chunk_size or settings.INGEST_BULK_CHUNK_SIZE
+
+    phenopackets: list[pm.Phenopacket] = []
+    for i in range(0, len(phenopackets_data), chunk_size):
+        phenopackets.extend(_ingest_phenopackets_chunk(phenopackets_data[i:i + chunk_size], dataset))
+    return phenopackets
+
+
+def get_phenopacket_json_schema(dataset_id: str) -> dict:
+    """
+    Returns the phenopacket schema to validate phenopackets ingested into a dataset against, patched with the
+    extension schemas of the dataset's project.
+    """
+
     project_id = Project.objects.get(datasets=dataset_id)
     project_schemas: Iterable[ExtensionSchemaDict] = ProjectJsonSchema.objects.filter(project_id=project_id).values(
         "json_schema",
@@ -436,14 +900,40 @@ def ingest_phenopacket_workflow(json_data, dataset_id) -> list[pm.Phenopacket] |
         proj_schema["schema_type"].lower(): proj_schema
         for proj_schema in project_schemas
     }
-    json_schema = patch_project_schemas(PHENOPACKET_SCHEMA, extension_schemas)
+    return patch_project_schemas(PHENOPACKET_SCHEMA, extension_schemas)
+
+
+def ingest_phenopackets_list(phenopackets_data: list[dict[str, Any]],
+                             dataset_id: str,
+                             json_schema: dict = PHENOPACKET_SCHEMA) -> list[pm.Phenopacket]:
+    """
+    Ingests a list of already-validated phenopackets. Lists are written in bulk, unless Elasticsearch indexing (which
+    relies on post_save signals) is turned on.
+    """
+    if settings.ELASTICSEARCH:
+        phenopackets = map_if_list(ingest_phenopacket, phenopackets_data, dataset_id, json_schema=json_schema,
+                                   validate=False)
+    else:
+        phenopackets = ingest_phenopackets_bulk(phenopackets_data, dataset_id, json_schema=json_schema, validate=False)
+    report_job_progress("rows_written", len(phenopackets_data))
+    return phenopackets
+
+
+def ingest_phenopacket_workflow(json_data, dataset_id) -> list[pm.Phenopacket] | pm.Phenopacket:
+    json_schema = get_phenopacket_json_schema(dataset_id)
 
     # Converts camelCase keys to snake_case for workflow ingests.
     # Ingests made with HTTP through /pivate/ingest are converted to snake_case by a django middleware
     json_data = decamelize(json_data)
 
-    # First, validate all phenopackets
-    map_if_list(validate_phenopacket, json_data, json_schema)
+    # First, validate all phenopackets, then actually try to ingest them (if the validation passes); we don't need to
+    # re-do validation here.
+    if isinstance(json_data, list):
+        validate_phenopackets_or_raise(json_data, json_schema)
+        return ingest_phenopackets_list(json_data, dataset_id, json_schema)
 
-    # Then, actually try to ingest them (if the validation passes); we don't need to re-do validation here.
-    return map_if_list(ingest_phenopacket, json_data, dataset_id, json_schema=json_schema, validate=False)
+    validate_phenopacket(json_data, json_schema)
+    report_job_progress("records_validated")
+    phenopacket = ingest_phenopacket(json_data, dataset_id, json_schema=json_schema, validate=False)
+    report_job_progress("rows_written")
+    return phenopacket
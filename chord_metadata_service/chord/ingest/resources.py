@@ -1,14 +1,16 @@
+from typing import Any
+
 from chord_metadata_service.resources import models as rm, utils as ru
 
-__all__ = ["ingest_resource"]
+__all__ = ["resource_query", "ingest_resource"]
 
 
-def ingest_resource(resource: dict) -> rm.Resource:
+def resource_query(resource: dict) -> dict[str, Any]:
     namespace_prefix = resource["namespace_prefix"].strip()
     version = resource.get("version", "").strip()
     assigned_resource_id = ru.make_resource_id(namespace_prefix, version)
 
-    rs_obj, _ = rm.Resource.objects.get_or_create(
+    return dict(
         id=assigned_resource_id,
         name=resource["name"],
         namespace_prefix=namespace_prefix,
@@ -19,4 +21,7 @@ def ingest_resource(resource: dict) -> rm.Resource:
         # TODO extra_properties
     )
 
+
+def ingest_resource(resource: dict) -> rm.Resource:
+    rs_obj, _ = rm.Resource.objects.get_or_create(**resource_query(resource))
     return rs_obj
@@ -1,9 +1,96 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+
+from collections import OrderedDict
 from jsonschema import Draft7Validator
-from jsonschema.exceptions import ValidationError
+from referencing import Registry
 
 from .logger import logger
 
-__all__ = ["schema_validation"]
+__all__ = [
+    "VALIDATOR_CACHE_SIZE",
+    "get_schema_validator",
+    "clear_schema_validator_cache",
+    "schema_validation_errors",
+    "schema_validation",
+]
+
+# Maximum number of compiled validators kept around; project extension schemas produce a new patched phenopacket
+# schema whenever they change, so stale validators eventually get evicted.
+VALIDATOR_CACHE_SIZE = 32
+
+# Compiled validators, keyed by (schema hash, registry ID, whether formats are checked). The registry is kept in the
+# value to make sure a registry ID is not re-used by another object while its validators are cached.
+_validators: OrderedDict[tuple[str, int, bool], tuple[Registry | None, Draft7Validator]] = OrderedDict()
+# Same validators, keyed by schema object identity to avoid re-hashing a schema for every record. Schemas are kept
+# in the value for the same reason as registries above; schemas are not expected to be mutated once used.
+_validators_by_identity: OrderedDict[tuple[int, int, bool], tuple[dict, Registry | None, Draft7Validator]] = \
+    OrderedDict()
+_validators_lock = threading.Lock()
+
+
+def _schema_hash(schema: dict) -> str:
+    return hashlib.sha256(json.dumps(schema, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _cache_put(cache: OrderedDict, key, value) -> None:
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > VALIDATOR_CACHE_SIZE:
+        cache.popitem(last=False)
+
+
+def get_schema_validator(schema: dict, registry: Registry | None = None, check_formats: bool = True) -> Draft7Validator:
+    """
+    Returns a Draft 7 validator for a schema, re-using a cached one for the same (or an identical) schema if possible.
+    Re-using validators saves re-compiling the schema and re-resolving its $refs for every validated object.
+    """
+
+    identity_key = (id(schema), id(registry), check_formats)
+
+    with _validators_lock:
+        if (entry := _validators_by_identity.get(identity_key)) and entry[0] is schema and entry[1] is registry:
+            _validators_by_identity.move_to_end(identity_key)
+            return entry[2]
+
+    key = (_schema_hash(schema), id(registry), check_formats)
+
+    with _validators_lock:
+        if (entry := _validators.get(key)) and entry[0] is registry:
+            validator = entry[1]
+            _validators.move_to_end(key)
+        else:
+            validator_args = {"schema": schema}
+            if check_formats:
+                validator_args["format_checker"] = Draft7Validator.FORMAT_CHECKER
+            if registry:
+                validator_args["registry"] = registry
+            validator = Draft7Validator(**validator_args)
+            _cache_put(_validators, key, (registry, validator))
+
+        _cache_put(_validators_by_identity, identity_key, (schema, registry, validator))
+
+    return validator
+
+
+def clear_schema_validator_cache() -> None:
+    with _validators_lock:
+        _validators.clear()
+        _validators_by_identity.clear()
+
+
+def schema_validation_errors(obj, schema, registry=None) -> list[str]:
+    """
+    Validates an object (obj) against a json-schema (schema) in a single pass, returning a message for each error.
+    May use a referencing.Registry object to resolve schema definitions (e.g. VRS variation schemas)
+    """
+    return [
+        f"Validation error in {'.'.join(str(v) for v in error.path)}: {error.message}"
+        for error in get_schema_validator(schema, registry).iter_errors(obj)
+    ]
 
 
 def schema_validation(obj, schema, registry=None):
@@ -12,22 +99,13 @@ def schema_validation(obj, schema, registry=None):
     May use a referencing.Registry object to resolve schema definitions (e.g. VRS variation schemas)
     """
 
-    validator_args = {
-        'schema': schema,
-        'format_checker': Draft7Validator.FORMAT_CHECKER,
-    }
-
-    if registry:
-        validator_args['registry'] = registry
+    errors = schema_validation_errors(obj, schema, registry)
 
-    validator = Draft7Validator(**validator_args)
-    try:
-        validator.validate(obj, schema)
+    if not errors:
         logger.info("JSON schema validation passed.")
         return True
-    except ValidationError:
-        errors = [e for e in validator.iter_errors(obj)]
-        logger.info("JSON schema validation failed.")
-        for i, error in enumerate(errors, 1):
-            logger.error(f"{i} Validation error in {'.'.join(str(v) for v in error.path)}: {error.message}")
-        return False
+
+    logger.info("JSON schema validation failed.")
+    for i, error in enumerate(errors, 1):
+        logger.error(f"{i} {error}")
+    return False
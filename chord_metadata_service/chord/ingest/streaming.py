@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import json
+
+from django.conf import settings
+from django.db import transaction
+from humps import decamelize
+from itertools import islice
+from typing import Any, Callable, IO, Iterable, Iterator
+
+from chord_metadata_service.chord.models import Dataset, IngestCheckpoint
+from chord_metadata_service.chord.precomputed_statistics import invalidate_precomputed_statistics
+from chord_metadata_service.chord.workflows import metadata as wm
+from chord_metadata_service.restapi.public_cache import bump_public_cache_version
+
+from .exceptions import IngestError
+from .experiments import ingest_experiment, validate_experiment
+from .logger import logger
+from .phenopackets import get_phenopacket_json_schema, ingest_phenopackets_list, validate_phenopackets_or_raise
+from .resources import ingest_resource
+from .utils import workflow_file_output_to_path
+
+__all__ = [
+    "iter_json_records",
+    "iter_experiments_document",
+    "ingest_phenopackets_stream",
+    "ingest_experiments_stream",
+    "STREAMING_INGEST_FUNCTION_MAP",
+    "ingest_file_stream",
+]
+
+# Number of characters read from the file at a time; grown for records which do not fit in a single read.
+READ_SIZE = 64 * 1024
+
+JSON_WHITESPACE = " \t\n\r"
+JSON_NUMBER_CHARS = "0123456789+-.eE"
+
+EXPERIMENTS_DOCUMENT_ARRAYS = ("resources", "experiments")
+
+
+class _JSONStreamReader:
+    """
+    Reads JSON values one at a time from a text file, keeping only the value being decoded (and what is left of the
+    current read) in memory.
+    """
+
+    def __init__(self, fp: IO[str], read_size: int = READ_SIZE):
+        self._fp = fp
+        self._read_size = read_size
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, size: int) -> bool:
+        if self._eof:
+            return False
+        data = self._fp.read(size)
+        if not data:
+            self._eof = True
+            return False
+        # Drop everything which has already been consumed
+        self._buf = self._buf[self._pos:] + data
+        self._pos = 0
+        return True
+
+    def _is_truncated(self, e: json.JSONDecodeError) -> bool:
+        # The decoder fails at (or a few characters before, in the case of escapes) the end of the buffer if the
+        # value is just cut off by the end of the current read, rather than malformed.
+        return e.pos >= len(self._buf) - 6 or e.msg.startswith("Unterminated string")
+
+    def peek(self) -> str:
+        """Returns the next non-whitespace character without consuming it, or "" at the end of the file."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in JSON_WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill(self._read_size):
+                return ""
+
+    def expect(self, char: str) -> None:
+        if (found := self.peek()) != char:
+            raise IngestError(f"Malformed JSON: expected '{char}', found {repr(found) if found else 'end of file'}")
+        self._pos += 1
+
+    def read_value(self) -> Any:
+        self.peek()
+        size = self._read_size
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError as e:
+                if not self._is_truncated(e) or not self._fill(size):
+                    raise IngestError(f"Malformed JSON: {e}")
+                size *= 2  # Grow reads geometrically, so large records do not take quadratic time to buffer
+                continue
+
+            if (self._buf[end - 1] not in "]}\"" and not self._buf[end:].strip(JSON_NUMBER_CHARS)
+                    and self._fill(size)):
+                # A number or literal which runs up to the end of the buffer may continue in the next read
+                continue
+
+            self._pos = end
+            return value
+
+    def _iter_container(self, open_char: str, close_char: str, read_item: Callable[[], Any]) -> Iterator[Any]:
+        self.expect(open_char)
+        if self.peek() == close_char:
+            self._pos += 1
+            return
+        while True:
+            yield read_item()
+            if self.peek() == close_char:
+                self._pos += 1
+                return
+            self.expect(",")
+
+    def iter_array(self) -> Iterator[Any]:
+        """Yields the items of the JSON array at the current position, one at a time."""
+        return self._iter_container("[", "]", self.read_value)
+
+    def _read_key(self) -> str:
+        key = self.read_value()
+        if not isinstance(key, str):
+            raise IngestError(f"Malformed JSON: expected an object key, found {repr(key)}")
+        self.expect(":")
+        return key
+
+    def iter_object_keys(self) -> Iterator[str]:
+        """
+        Yields the keys of the JSON object at the current position, one at a time. The caller must consume each key's
+        value (with read_value or iter_array) before asking for the next key.
+        """
+        return self._iter_container("{", "}", self._read_key)
+
+    def iter_values(self) -> Iterator[Any]:
+        """Yields each JSON value until the end of the file (i.e. a single document, or newline-delimited JSON.)"""
+        while self.peek():
+            yield self.read_value()
+
+
+def iter_json_records(fp: IO[str], read_size: int = READ_SIZE) -> Iterator[Any]:
+    """
+    Yields the items of a top-level JSON array or, if the file does not contain an array, each top-level JSON value
+    (a single record or newline-delimited JSON records.)
+    """
+
+    reader = _JSONStreamReader(fp, read_size)
+
+    if reader.peek() != "[":
+        yield from reader.iter_values()
+        return
+
+    yield from reader.iter_array()
+    if reader.peek():
+        raise IngestError("Malformed JSON: unexpected data after top-level array")
+
+
+def iter_experiments_document(fp: IO[str], read_size: int = READ_SIZE) -> Iterator[tuple[str, dict]]:
+    """
+    Yields ("resources", resource) and ("experiments", experiment) pairs from an experiments document, streaming its
+    resources and experiments arrays. Top-level values without either key (e.g. newline-delimited JSON experiments)
+    and the items of a top-level array are treated as experiments.
+    """
+
+    reader = _JSONStreamReader(fp, read_size)
+
+    if reader.peek() == "[":
+        for experiment in reader.iter_array():
+            yield "experiments", experiment
+        if reader.peek():
+            raise IngestError("Malformed JSON: unexpected data after top-level array")
+        return
+
+    while reader.peek():
+        if reader.peek() != "{":
+            raise IngestError(f"Malformed JSON: expected an experiments document, found {repr(reader.read_value())}")
+
+        other_fields = {}
+        is_document = False
+
+        for key in reader.iter_object_keys():
+            if key in EXPERIMENTS_DOCUMENT_ARRAYS and reader.peek() == "[":
+                is_document = True
+                for item in reader.iter_array():
+                    yield key, item
+            else:
+                other_fields[key] = reader.read_value()
+
+        if not is_document:
+            yield "experiments", other_fields
+
+
+def _iter_chunks(records: Iterable[Any], chunk_size: int) -> Iterator[list[Any]]:
+    it = iter(records)
+    while chunk := list(islice(it, chunk_size)):
+        yield chunk
+
+
+def _ingest_chunked(
+    records: Iterable[Any],
+    dataset_id: str,
+    workflow_id: str,
+    source: str,
+    ingest_chunk: Callable[[list[Any], int], None],
+    chunk_size: int | None = None,
+) -> int:
+    """
+    Ingests records in chunks, committing each chunk along with the number of records ingested so far. If a previous
+    ingest of the same source into the same dataset was interrupted, records it already committed are skipped.
+    Returns the total number of records ingested from the source.
+    """
+
+    chunk_size = chunk_size or settings.INGEST_BULK_CHUNK_SIZE
+
+    checkpoint, _ = IngestCheckpoint.objects.get_or_create(
+        dataset_id=dataset_id, workflow_id=workflow_id, source=source)
+    n_ingested = checkpoint.records_ingested
+
+    if n_ingested:
+        logger.info(f"Resuming {workflow_id} ingest of {source} into dataset {dataset_id} after {n_ingested} records")
+
+    for chunk in _iter_chunks(islice(records, n_ingested, None), chunk_size):
+        with transaction.atomic():
+            ingest_chunk(chunk, n_ingested)
+            n_ingested += len(chunk)
+            IngestCheckpoint.objects.filter(pk=checkpoint.pk).update(records_ingested=n_ingested)
+            invalidate_precomputed_statistics([dataset_id])
+            transaction.on_commit(bump_public_cache_version)
+
+        logger.info(f"{workflow_id} ingest of {source} into dataset {dataset_id}: {n_ingested} records committed")
+
+    checkpoint.delete()
+    return n_ingested
+
+
+def ingest_phenopackets_stream(
+    fp: IO[str],
+    dataset_id: str,
+    source: str,
+    chunk_size: int | None = None,
+) -> int:
+    """
+    Streams phenopackets from a JSON array, a single phenopacket or newline-delimited JSON, validating and ingesting
+    them in chunks. Returns the number of phenopackets ingested.
+    """
+
+    json_schema = get_phenopacket_json_schema(dataset_id)
+
+    def ingest_chunk(chunk: list[dict], offset: int) -> None:
+        # Converts camelCase keys to snake_case for workflow ingests, one chunk at a time
+        phenopackets = decamelize(chunk)
+        validate_phenopackets_or_raise(phenopackets, json_schema, idx_offset=offset)
+        ingest_phenopackets_list(phenopackets, dataset_id, json_schema)
+
+    return _ingest_chunked(
+        iter_json_records(fp), dataset_id, wm.WORKFLOW_PHENOPACKETS_JSON, source, ingest_chunk, chunk_size)
+
+
+def ingest_experiments_stream(
+    fp: IO[str],
+    dataset_id: str,
+    source: str,
+    chunk_size: int | None = None,
+) -> int:
+    """
+    Streams resources and experiments from an experiments document (or newline-delimited JSON experiments),
+    validating and ingesting them in chunks. Returns the number of resources and experiments ingested.
+    """
+
+    dataset = Dataset.objects.get(identifier=dataset_id)
+
+    def ingest_chunk(chunk: list[tuple[str, dict]], offset: int) -> None:
+        for idx, (key, item) in enumerate(chunk, start=offset):
+            if key == "experiments":
+                validate_experiment(item, idx)
+
+        for key, item in chunk:
+            if key == "resources":
+                dataset.additional_resources.add(ingest_resource(item))
+            else:
+                ingest_experiment(item, dataset_id, validate=False)
+
+    return _ingest_chunked(
+        iter_experiments_document(fp), dataset_id, wm.WORKFLOW_EXPERIMENTS_JSON, source, ingest_chunk, chunk_size)
+
+
+STREAMING_INGEST_FUNCTION_MAP: dict[str, Callable[..., int]] = {
+    wm.WORKFLOW_EXPERIMENTS_JSON: ingest_experiments_stream,
+    wm.WORKFLOW_PHENOPACKETS_JSON: ingest_phenopackets_stream,
+}
+
+
+def ingest_file_stream(workflow_id: str, file_uri_or_path: str, dataset_id: str, chunk_size: int | None = None) -> int:
+    """
+    Streams a (possibly downloaded) file into a dataset, committing it chunk by chunk. Re-running an interrupted
+    ingest with the same URI or path resumes it after the last committed chunk.
+    """
+
+    if workflow_id not in STREAMING_INGEST_FUNCTION_MAP:
+        raise IngestError(f"Ingestion workflow ID {workflow_id} does not support streaming")
+
+    with workflow_file_output_to_path(file_uri_or_path) as path, open(path, "r", encoding="utf-8") as fp:
+        return STREAMING_INGEST_FUNCTION_MAP[workflow_id](fp, dataset_id, source=file_uri_or_path,
+                                                          chunk_size=chunk_size)
@@ -30,6 +30,8 @@ HTTPS_URI_SCHEME = "https"
 
 WINDOWS_DRIVE_SCHEME = re.compile(r"^[a-zA-Z]$")
 
+HTTP_DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MB
+
 
 def map_if_list(fn: Callable, data: Any, *args, **kwargs) -> Any:
     # TODO: Any sequence?
@@ -56,17 +58,18 @@ def workflow_http_download(tmp_dir: str, http_uri: str) -> str:
     # TODO: Disable HTTPS cert check in debug mode
     # TODO: Handle response exceptions
 
-    r = requests.get(http_uri)
-
-    if not r.ok:
-        err = f"HTTP error encountered while downloading ingestion URI: {http_uri}"
-        logger.error(f"{err} (Status: {r.status_code}; Contents: {r.content.decode('utf-8')})")
-        raise IngestError(err)
+    # Stream the response body to disk, so that large files never have to fit in memory
+    with requests.get(http_uri, stream=True) as r:
+        if not r.ok:
+            err = f"HTTP error encountered while downloading ingestion URI: {http_uri}"
+            logger.error(f"{err} (Status: {r.status_code}; Contents: {r.content.decode('utf-8')})")
+            raise IngestError(err)
 
-    data_path = f"{tmp_dir}ingest_download_data"
+        data_path = f"{tmp_dir}ingest_download_data"
 
-    with open(data_path, "wb") as df:
-        df.write(r.content)
+        with open(data_path, "wb") as df:
+            for chunk in r.iter_content(chunk_size=HTTP_DOWNLOAD_CHUNK_SIZE):
+                df.write(chunk)
 
     return data_path
 
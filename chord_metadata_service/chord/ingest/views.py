@@ -5,19 +5,21 @@ import traceback
 import uuid
 
 from django.core.exceptions import ValidationError
-from django.db import transaction
+from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 
 from bento_lib.responses import errors
 
-from . import WORKFLOW_INGEST_FUNCTION_MAP
+from . import FROM_DERIVED_DATA, WORKFLOW_INGEST_FUNCTION_MAP, run_ingest
 from .exceptions import IngestError
-from ..models import Dataset
+from .streaming import STREAMING_INGEST_FUNCTION_MAP
+from ..jobs import submit_job
+from ..models import Dataset, Job
+from ..views_jobs import is_async_request, job_response
 
 
-FROM_DERIVED_DATA = "FROM_DERIVED_DATA"
 DATASET_ID_OVERRIDES = {FROM_DERIVED_DATA}    # These special values skip the checks on the table
 
 logger = logging.getLogger(__name__)
@@ -37,10 +39,20 @@ def ingest_into_dataset(request, dataset_id: str, workflow_id: str):
             return Response(errors.bad_request_error(f"Dataset with ID {dataset_id} does not exist"), status=400)
         dataset_id = str(uuid.UUID(dataset_id))  # Normalize dataset ID to UUID's str format.
 
+    stream = request.query_params.get("stream", "false").strip().lower() == "true"
+
+    if stream and workflow_id not in STREAMING_INGEST_FUNCTION_MAP:
+        return Response(errors.bad_request_error(f"Ingestion workflow ID {workflow_id} does not support streaming"),
+                        status=400)
+
+    if is_async_request(request):
+        # The job reports its own errors; the data to ingest is passed to it in memory
+        job = submit_job(
+            Job.TYPE_INGEST, {"workflow_id": workflow_id, "dataset_id": dataset_id, "stream": stream}, request.data)
+        return job_response(job, status.HTTP_202_ACCEPTED)
+
     try:
-        with transaction.atomic():
-            # Wrap ingestion in a transaction, so if it fails we don't end up in a partial state in the database.
-            WORKFLOW_INGEST_FUNCTION_MAP[workflow_id](request.data, dataset_id)
+        run_ingest(workflow_id, request.data, dataset_id, stream=stream)
 
     except IngestError as e:
         return Response(errors.bad_request_error(f"Encountered ingest error: {e}"), status=400)
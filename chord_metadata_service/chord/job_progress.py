@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import contextvars
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from .models import Job
+
+__all__ = [
+    "JobCancelled",
+    "JobProgress",
+    "current_job_progress",
+    "report_job_progress",
+    "live_job_progress",
+]
+
+
+class JobCancelled(Exception):
+    pass
+
+
+# Progress of the jobs running in this process, by job ID, so that their status is up to date even while their
+# counters can't be saved (see JobProgress.flush.)
+_running: dict[str, JobProgress] = {}
+_running_lock = threading.Lock()
+
+_current: contextvars.ContextVar[JobProgress | None] = contextvars.ContextVar("current_job_progress", default=None)
+
+
+class JobProgress:
+    """
+    Progress counters of a running job. Counters are saved to the job at most every JOB_PROGRESS_INTERVAL seconds,
+    which is also when cancellation requests are checked for.
+    """
+
+    def __init__(self, job_id):
+        self.job_id = str(job_id)
+        self.counters: dict[str, int] = {}
+        self.cancel_requested = False
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def __enter__(self):
+        with _running_lock:
+            _running[self.job_id] = self
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _current.reset(self._token)
+        with _running_lock:
+            _running.pop(self.job_id, None)
+
+    def add(self, counter: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + n
+            due = time.monotonic() - self._last_flush >= settings.JOB_PROGRESS_INTERVAL
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            counters = dict(self.counters)
+            self._last_flush = time.monotonic()
+
+        # Inside a transaction (e.g. a non-streaming ingest), the counters would only become visible on commit, so they
+        # are only served from memory (see live_job_progress) until the job is finished. Cancellation requests, which
+        # are committed by other connections, can be read either way.
+        if not connection.in_atomic_block:
+            Job.objects.filter(pk=self.job_id).update(progress=counters)
+        if self.cancel_requested or Job.objects.filter(pk=self.job_id, cancel_requested=True).exists():
+            self.cancel_requested = True
+            raise JobCancelled(f"Job {self.job_id} was cancelled")
+
+
+def current_job_progress() -> JobProgress | None:
+    return _current.get()
+
+
+def report_job_progress(counter: str, n: int = 1) -> None:
+    """
+    Adds to a progress counter of the job running in the current context, if any (e.g. when an ingest is run as a
+    job rather than in a request.) May raise JobCancelled if the job was cancelled.
+    """
+    if (progress := _current.get()) is not None:
+        progress.add(counter, n)
+
+
+def live_job_progress(job_id) -> JobProgress | None:
+    """
+    Returns the progress of a job, if it is running in this process.
+    """
+    with _running_lock:
+        return _running.get(str(job_id))
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import logging
+import threading
+import traceback
+
+from asgiref.sync import async_to_sync
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+from typing import Any, Callable
+
+from chord_metadata_service.cleanup import run_all_cleanup
+from chord_metadata_service.cleanup.scoped import CleanupCandidates
+
+from .export import run_export
+from .ingest import run_ingest
+from .job_progress import JobCancelled, JobProgress, live_job_progress
+from .models import Job
+
+__all__ = [
+    "JOB_FUNCTION_MAP",
+    "submit_job",
+    "submit_cleanup_job",
+    "cancel_job",
+    "job_progress",
+]
+
+logger = logging.getLogger(__name__)
+
+
+def _ingest_job(params: dict, payload: Any) -> None:
+    run_ingest(params["workflow_id"], payload, params["dataset_id"], stream=params.get("stream", False))
+
+
+def _export_job(params: dict, _payload: Any) -> dict:
+    run_export(params["format"], params["object_id"], params["output_path"])
+    return {"output_path": params["output_path"]}
+
+
+def _cleanup_job(params: dict, _payload: Any) -> dict:
+    # Candidates (see collect_cleanup_candidates) are stored as lists, since sets are not JSON-serializable
+    candidates = params.get("candidates")
+    if candidates is not None:
+        candidates = {stage: set(ids) for stage, ids in candidates.items()}
+    return {"n_removed": async_to_sync(run_all_cleanup)(candidates)}
+
+
+# Job functions take the parameters of the job and its payload (e.g. the data to ingest, which is not stored with the
+# job), and return the result of the job, if any.
+JOB_FUNCTION_MAP: dict[str, Callable[[dict, Any], dict | None]] = {
+    Job.TYPE_INGEST: _ingest_job,
+    Job.TYPE_EXPORT: _export_job,
+    Job.TYPE_CLEANUP: _cleanup_job,
+}
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.JOB_WORKERS, thread_name_prefix="katsu-job")
+        return _executor
+
+
+def _finish(job_id, status: str, progress: JobProgress, result: dict | None = None, error: str = "") -> None:
+    Job.objects.filter(pk=job_id).update(
+        status=status, progress=progress.counters, result=result, error=error, finished=timezone.now())
+
+
+def _run_job(job_id, payload: Any) -> None:
+    # Only start jobs which were not cancelled while queued
+    n_started = Job.objects.filter(pk=job_id, status=Job.STATUS_QUEUED).update(
+        status=Job.STATUS_RUNNING, started=timezone.now())
+    if not n_started:
+        return
+
+    job = Job.objects.get(pk=job_id)
+    logger.info(f"Running {job}")
+
+    with JobProgress(job_id) as progress:
+        try:
+            result = JOB_FUNCTION_MAP[job.job_type](job.params, payload)
+        except JobCancelled:
+            logger.info(f"Cancelled {job}")
+            _finish(job_id, Job.STATUS_CANCELLED, progress)
+        except Exception as e:
+            logger.error(f"Encountered an exception while running {job}:\n{traceback.format_exc()}")
+            _finish(job_id, Job.STATUS_FAILED, progress, error=repr(e))
+        else:
+            logger.info(f"Finished {job}")
+            _finish(job_id, Job.STATUS_SUCCEEDED, progress, result=result)
+
+
+def _run_job_in_worker(job_id, payload: Any) -> None:
+    try:
+        _run_job(job_id, payload)
+    finally:
+        # Worker threads are not request threads, so their connections are not closed by Django
+        connections.close_all()
+
+
+def submit_job(job_type: str, params: dict, payload: Any = None) -> Job:
+    """
+    Creates a job and queues it to run on the worker pool of this process once the current transaction (if any) is
+    committed; with JOB_WORKERS = 0, runs it right away instead. The payload is passed to the job function in memory.
+    Jobs run in the process they were submitted to; those interrupted by a restart are left queued or running.
+    """
+    job = Job.objects.create(job_type=job_type, params=params)
+
+    if settings.JOB_WORKERS <= 0:
+        _run_job(job.id, payload)
+        job.refresh_from_db()
+    else:
+        transaction.on_commit(lambda: _get_executor().submit(_run_job_in_worker, job.id, payload))
+
+    return job
+
+
+def submit_cleanup_job(candidates: CleanupCandidates | None = None) -> Job:
+    """
+    Submits a cleanup job, checking only the given candidates (see collect_cleanup_candidates) if any.
+    """
+    params = {} if candidates is None else {"candidates": {stage: list(ids) for stage, ids in candidates.items()}}
+    return submit_job(Job.TYPE_CLEANUP, params)
+
+
+def cancel_job(job: Job) -> Job:
+    """
+    Cancels a job: a queued job will not be started, and a running job stops the next time it reports progress (so
+    jobs which do not report progress run to completion.) Non-streaming ingests are rolled back.
+    """
+    if job.status not in Job.FINISHED_STATUSES:
+        Job.objects.filter(pk=job.pk).update(cancel_requested=True)
+        Job.objects.filter(pk=job.pk, status=Job.STATUS_QUEUED).update(
+            status=Job.STATUS_CANCELLED, finished=timezone.now())
+        if (progress := live_job_progress(job.pk)) is not None:
+            progress.cancel_requested = True
+        job.refresh_from_db()
+    return job
+
+
+def job_progress(job: Job) -> dict[str, int]:
+    """
+    Returns the progress counters of a job, up to date if it is running in this process.
+    """
+    if job.status == Job.STATUS_RUNNING and (progress := live_job_progress(job.pk)) is not None:
+        return dict(progress.counters)
+    return job.progress
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from tabulate import tabulate
+
+from chord_metadata_service.chord.search_indexes import INDEX_TRIGRAM, advise_search_indexes, get_existing_index_names
+
+
+class Command(BaseCommand):
+    help = """
+        Advises indexes for the queryable fields of the search schemas which compiled searches can use, and reports
+        which of them already exist in the database. Can print the statements to create the advised indexes; which of
+        them are worth creating depends on the search traffic (see the search_index_usage command.)
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sql", action="store_true", help="Print CREATE INDEX statements for the advised indexes")
+
+    def handle(self, *args, **options):
+        indexes, unindexable, skipped = advise_search_indexes()
+
+        if options["sql"]:
+            if any(index.kind == INDEX_TRIGRAM for index in indexes):
+                # Trigram indexes need the pg_trgm extension, which the database user may not be allowed to install
+                self.stdout.write("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+            for index in indexes:
+                self.stdout.write(f"{index.create_sql(concurrently=True)};")
+            return
+
+        existing = get_existing_index_names()
+
+        self.stdout.write(tabulate(
+            [(i.name, i.kind, i.table, i.expression, "yes" if i.name in existing else "no", "\n".join(i.fields))
+             for i in indexes],
+            headers=("index", "kind", "table", "expression", "exists", "serves")))
+
+        if unindexable:
+            self.stdout.write("\nFields queryable but not indexable (values read through functions no index serves):")
+            for field in unindexable:
+                self.stdout.write(
+                    f"    {field.data_type}: {field.path} ({field.read_via} on {field.table}.{field.column})")
+
+        if skipped:
+            self.stdout.write("\nFields left out (not searchable, or not matched to a model field):")
+            for field in skipped:
+                self.stdout.write(f"    {field.data_type}: {field.path}")
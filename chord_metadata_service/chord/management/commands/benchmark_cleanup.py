@@ -0,0 +1,127 @@
+import logging
+import time
+
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from psycopg2 import sql
+
+from chord_metadata_service.chord.models import Dataset
+from chord_metadata_service.cleanup.remove import not_referenced
+from chord_metadata_service.logger import logger
+from chord_metadata_service.patients.cleanup import clean_individuals
+from chord_metadata_service.patients.models import Individual
+from chord_metadata_service.phenopackets import models as pm
+from chord_metadata_service.resources.cleanup import clean_resources
+from chord_metadata_service.resources.models import Resource
+
+BATCH_SIZE = 10000
+
+
+def _analyze(*models) -> None:
+    # Autovacuum cannot see rows from an uncommitted transaction; without statistics, the planner assumes tables are
+    # (almost) empty and picks nested loop joins which are pathological at benchmark sizes.
+    with connection.cursor() as cursor:
+        for model in models:
+            cursor.execute(
+                sql.SQL("ANALYZE {}").format(sql.Identifier(model._meta.db_table)).as_string(cursor.connection))
+
+
+def _create_resources(n: int) -> None:
+    # Half of the resources are referenced by metadata, the other half are orphaned
+    Resource.objects.bulk_create([
+        Resource(id=f"benchmark_cleanup:{i}", name="benchmark_cleanup", namespace_prefix="benchmark_cleanup",
+                 version=str(i), url="https://example.org", iri_prefix="https://example.org/")
+        for i in range(n)
+    ], batch_size=BATCH_SIZE)
+    meta_data = pm.MetaData.objects.create(created_by="benchmark_cleanup")
+    pm.MetaData.resources.through.objects.bulk_create([
+        pm.MetaData.resources.through(metadata_id=meta_data.id, resource_id=f"benchmark_cleanup:{i}")
+        for i in range(0, n, 2)
+    ], batch_size=BATCH_SIZE)
+    _analyze(Resource, pm.MetaData.resources.through)
+
+
+def _create_individuals(n: int) -> None:
+    # Half of the individuals are referenced by biosamples, the other half are orphaned
+    Individual.objects.bulk_create(
+        [Individual(id=f"benchmark_cleanup_{i}") for i in range(n)], batch_size=BATCH_SIZE)
+    pm.Biosample.objects.bulk_create([
+        pm.Biosample(id=f"benchmark_cleanup_{i}", individual_id=f"benchmark_cleanup_{i}", extra_properties={})
+        for i in range(0, n, 2)
+    ], batch_size=BATCH_SIZE)
+    _analyze(Individual, pm.Biosample, pm.Phenopacket)
+
+
+def _remove_not_referenced_id_sets(model, references) -> int:
+    # Previous behaviour: collect referenced IDs into Python, send them back to the database to find the objects to
+    # remove, and send those back again to delete them
+    referenced = set()
+    for referencing_model, field in references:
+        referenced |= set(referencing_model.objects.values_list(field, flat=True))
+    referenced.discard(None)
+    to_remove = set(model.objects.exclude(id__in=referenced).values_list("id", flat=True))
+    model.objects.filter(id__in=to_remove).delete()
+    return len(to_remove)
+
+
+class Command(BaseCommand):
+    help = """
+        Benchmarks cleanup of orphaned objects, for a model removed with a single anti-join DELETE (resources) and one
+        removed through the deletion collector (individuals), against the previous approach of building ID sets in
+        Python. Synthetic objects, half of them orphaned, are created in a transaction which is rolled back at the end.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", action="store", type=int, default=1000000,
+                            help="Number of objects of each model to create")
+        parser.add_argument("--steps", action="store", type=str, default="resources,individuals",
+                            help="Comma-separated cleanup steps to benchmark")
+
+    def _time(self, fn) -> tuple[float, int]:
+        # Each run deletes objects, so is rolled back to leave the same data for the next one
+        with transaction.atomic():
+            start = time.perf_counter()
+            n_removed = fn()
+            elapsed = time.perf_counter() - start
+            transaction.set_rollback(True)
+        return elapsed, n_removed
+
+    def handle(self, *args, **options):
+        n = options["rows"]
+
+        # step: (data creation, cleanup function, model, references)
+        steps = {
+            "resources": (_create_resources, clean_resources, Resource, (
+                (Dataset, "additional_resources__id"),
+                (pm.MetaData, "resources__id"),
+            )),
+            "individuals": (_create_individuals, clean_individuals, Individual, (
+                (pm.Biosample, "individual_id"),
+                (pm.Phenopacket, "subject_id"),
+            )),
+        }
+
+        # Don't log hundreds of thousands of removed IDs
+        log_level = logger.level
+        logger.setLevel(logging.WARNING)
+
+        try:
+            for step in options["steps"].split(","):
+                create, clean, model, references = steps[step]
+                with transaction.atomic():
+                    create(n)
+                    n_orphaned = not_referenced(model, references).count()
+
+                    anti_join_time, n_removed = self._time(async_to_sync(clean))
+                    id_sets_time, n_removed_id_sets = self._time(
+                        lambda: _remove_not_referenced_id_sets(model, references))
+                    assert n_removed == n_removed_id_sets == n_orphaned
+
+                    self.stdout.write(
+                        f"{n:>8} rows  {step:<12} removed: {n_removed:>8}  anti-join: {anti_join_time * 1000:9.1f}ms  "
+                        f"ID sets: {id_sets_time * 1000:9.1f}ms")
+
+                    transaction.set_rollback(True)
+        finally:
+            logger.setLevel(log_level)
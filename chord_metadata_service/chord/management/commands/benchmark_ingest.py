@@ -0,0 +1,71 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from humps import decamelize
+
+from chord_metadata_service.chord.ingest.phenopackets import ingest_phenopacket, ingest_phenopackets_bulk
+from chord_metadata_service.chord.models import Project, Dataset
+from chord_metadata_service.phenopackets import models as pm
+from chord_metadata_service.resources.models import Resource
+
+# Tables written to by a phenopacket ingest, including the many-to-many through tables
+BENCHMARKED_MODELS = (
+    pm.Individual, pm.Biosample, pm.PhenotypicFeature, pm.Disease, pm.MetaData, Resource, pm.Interpretation,
+    pm.Diagnosis, pm.GenomicInterpretation, pm.GeneDescriptor, pm.VariationDescriptor, pm.VariantInterpretation,
+    pm.Phenopacket, pm.MetaData.resources.through, pm.Phenopacket.biosamples.through,
+    pm.Phenopacket.interpretations.through, pm.Phenopacket.diseases.through,
+    pm.Diagnosis.genomic_interpretations.through,
+)
+
+
+def _count_rows() -> int:
+    return sum(model.objects.count() for model in BENCHMARKED_MODELS)
+
+
+class Command(BaseCommand):
+    help = """
+        Benchmarks the one-by-one and bulk phenopacket ingest paths against a JSON file of phenopackets, reporting
+        rows written per second. Everything is done in a transaction which is rolled back at the end.
+        Arguments: ./path/to/phenopackets.json
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("data", action="store", type=str, help="JSON file containing a list of phenopackets")
+        parser.add_argument("--limit", action="store", type=int, default=None,
+                            help="Maximum number of phenopackets to ingest from the file")
+        parser.add_argument("--chunk-size", action="store", type=int, default=None,
+                            help="Chunk size for the bulk ingest path")
+
+    def _run(self, label: str, ingest_fn, phenopackets: list[dict]) -> None:
+        with transaction.atomic():
+            project = Project.objects.create(title="benchmark_ingest", description="")
+            dataset = Dataset.objects.create(title="benchmark_ingest", description="", project=project,
+                                             data_use={})
+
+            rows_before = _count_rows()
+            start = time.perf_counter()
+            ingest_fn(json.loads(json.dumps(phenopackets)), str(dataset.identifier))
+            elapsed = time.perf_counter() - start
+            rows = _count_rows() - rows_before
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            f"{label:<12} {len(phenopackets)} phenopackets, {rows} rows in {elapsed:.2f}s: "
+            f"{rows / elapsed:.0f} rows/s, {len(phenopackets) / elapsed:.1f} phenopackets/s")
+
+    def handle(self, *args, **options):
+        with open(options["data"], "r") as df:
+            phenopackets = decamelize(json.load(df))
+
+        if isinstance(phenopackets, dict):
+            phenopackets = [phenopackets]
+        phenopackets = phenopackets[:options["limit"]]
+
+        # Validation is the same for both paths, so leave it out of the timings
+        self._run("one-by-one", lambda data, dataset_id: [
+            ingest_phenopacket(p, dataset_id, validate=False) for p in data], phenopackets)
+        self._run("bulk", lambda data, dataset_id: ingest_phenopackets_bulk(
+            data, dataset_id, validate=False, chunk_size=options["chunk_size"]), phenopackets)
@@ -0,0 +1,120 @@
+import time
+
+from unittest.mock import patch
+from bento_lib.search import postgres
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from psycopg2 import sql
+
+from chord_metadata_service.chord.data_types import DATA_TYPE_PHENOPACKET, DATA_TYPES
+from chord_metadata_service.chord.models import Project, Dataset
+from chord_metadata_service.chord import views_search
+from chord_metadata_service.chord.views_search import (
+    OUTPUT_FORMAT_BENTO_SEARCH_RESULT,
+    OUTPUT_FORMAT_VALUES_LIST,
+    phenopacket_query_results,
+)
+from chord_metadata_service.patients.models import Individual
+from chord_metadata_service.phenopackets import models as pm
+from chord_metadata_service.phenopackets.serializers import PhenopacketSerializer
+
+BENCHMARK_QUERY = ["#eq", ["#resolve", "subject", "sex"], "MALE"]
+
+# Full serialization, i.e. no output option
+OUTPUT_SERIALIZER = "serializer"
+
+
+def _create_phenopackets(dataset: Dataset, n: int) -> None:
+    meta_data = pm.MetaData.objects.create(created_by="benchmark_search")
+    individuals = Individual.objects.bulk_create(
+        [Individual(id=f"benchmark_search_{i}", sex="MALE") for i in range(n)])
+    biosamples = pm.Biosample.objects.bulk_create([
+        pm.Biosample(id=f"benchmark_search_{i}", individual=ind, extra_properties={})
+        for i, ind in enumerate(individuals)
+    ])
+    phenopackets = pm.Phenopacket.objects.bulk_create([
+        pm.Phenopacket(id=f"benchmark_search_{i}", subject=ind, meta_data=meta_data, dataset=dataset,
+                       extra_properties={})
+        for i, ind in enumerate(individuals)
+    ])
+    pm.Phenopacket.biosamples.through.objects.bulk_create([
+        pm.Phenopacket.biosamples.through(phenopacket_id=p.id, biosample_id=b.id)
+        for p, b in zip(phenopackets, biosamples)
+    ])
+
+    # Autovacuum cannot see rows from an uncommitted transaction; without statistics, the planner assumes tables are
+    # (almost) empty and picks nested loop joins which are pathological at benchmark sizes.
+    with connection.cursor() as cursor:
+        for model in (Individual, pm.Biosample, pm.Phenopacket, pm.Phenopacket.biosamples.through):
+            cursor.execute(
+                sql.SQL("ANALYZE {}").format(sql.Identifier(model._meta.db_table)).as_string(cursor.connection))
+
+
+def _data_type_results_round_trip(query, params, key="id"):
+    # Previous behaviour: fetch matching IDs into Python, to send them back to the database in an IN list
+    with connection.cursor() as cursor:
+        cursor.execute(query.as_string(cursor.connection), params)
+        return set(dict(zip([col[0] for col in cursor.description], row))[key] for row in cursor.fetchall())
+
+
+class Command(BaseCommand):
+    help = """
+        Benchmarks private phenopacket search latency against the number of matches, for the values_list,
+        bento_search_result and full serializer outputs. Synthetic phenopackets are created in a transaction which is
+        rolled back at the end.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--matches", action="store", type=str, default="100,1000,10000",
+                            help="Comma-separated numbers of matching phenopackets to benchmark")
+        parser.add_argument("--outputs", action="store", type=str,
+                            default=",".join((OUTPUT_FORMAT_VALUES_LIST, OUTPUT_FORMAT_BENTO_SEARCH_RESULT,
+                                              OUTPUT_SERIALIZER)),
+                            help="Comma-separated search outputs to benchmark")
+        parser.add_argument("--repeat", action="store", type=int, default=3,
+                            help="Number of times to run each search; the best time is reported")
+
+    def _time(self, fn, repeat: int) -> float:
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    def handle(self, *args, **options):
+        compiled_query, params = postgres.search_query_to_psycopg2_sql(
+            BENCHMARK_QUERY, DATA_TYPES[DATA_TYPE_PHENOPACKET]["schema"])
+
+        for n in (int(m) for m in options["matches"].split(",")):
+            with transaction.atomic():
+                project = Project.objects.create(title="benchmark_search", description="")
+                dataset = Dataset.objects.create(title="benchmark_search", description="", project=project,
+                                                 data_use={})
+                _create_phenopackets(dataset, n)
+
+                # Restrict matches to the benchmark dataset, like a dataset search
+                query = sql.SQL("{} AND dataset_id = {}").format(compiled_query, sql.Placeholder())
+                query_params = params + (str(dataset.identifier),)
+
+                outputs = {
+                    OUTPUT_FORMAT_VALUES_LIST: lambda: list(phenopacket_query_results(query, query_params, {
+                        "output": OUTPUT_FORMAT_VALUES_LIST, "field": ["biosamples", "[item]", "id"],
+                        "add_field": "dataset_id"})),
+                    OUTPUT_FORMAT_BENTO_SEARCH_RESULT: lambda: list(phenopacket_query_results(query, query_params, {
+                        "output": OUTPUT_FORMAT_BENTO_SEARCH_RESULT, "add_field": "dataset_id"})),
+                    OUTPUT_SERIALIZER: lambda: PhenopacketSerializer(
+                        phenopacket_query_results(query, query_params, {}), many=True).data,
+                }
+
+                for output in options["outputs"].split(","):
+                    run = outputs[output]
+                    subquery_time = self._time(run, options["repeat"])
+                    with patch.object(views_search, "data_type_results", _data_type_results_round_trip):
+                        round_trip_time = self._time(run, options["repeat"])
+
+                    self.stdout.write(
+                        f"{n:>8} matches  {output:<20} subquery: {subquery_time * 1000:9.1f}ms  "
+                        f"ID round trip: {round_trip_time * 1000:9.1f}ms")
+
+                transaction.set_rollback(True)
@@ -0,0 +1,57 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from humps import decamelize
+from jsonschema import Draft7Validator
+
+from chord_metadata_service.chord.ingest.schema import clear_schema_validator_cache, schema_validation
+from chord_metadata_service.phenopackets.schemas import PHENOPACKET_SCHEMA, VRS_REF_REGISTRY
+from chord_metadata_service.restapi.schema_utils import patch_project_schemas
+
+
+def _validate_uncached(obj, schema, registry) -> bool:
+    # Previous behaviour: a new validator for every object, validated a second time to collect errors on failure
+    validator = Draft7Validator(schema, format_checker=Draft7Validator.FORMAT_CHECKER, registry=registry)
+    if validator.is_valid(obj):
+        return True
+    return not list(validator.iter_errors(obj))
+
+
+class Command(BaseCommand):
+    help = """
+        Micro-benchmarks phenopacket JSON schema validation against a JSON file of phenopackets, with and without
+        cached validators, reporting validations per second.
+        Arguments: ./path/to/phenopackets.json
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("data", action="store", type=str, help="JSON file containing a list of phenopackets")
+        parser.add_argument("--repeat", action="store", type=int, default=1,
+                            help="Number of times to validate each phenopacket")
+
+    def _run(self, label: str, validate_fn, phenopackets: list[dict], repeat: int) -> None:
+        start = time.perf_counter()
+        n_valid = sum(validate_fn(p) for _ in range(repeat) for p in phenopackets)
+        elapsed = time.perf_counter() - start
+        n = len(phenopackets) * repeat
+
+        self.stdout.write(
+            f"{label:<10} {n} validations ({n_valid} valid) in {elapsed:.2f}s: {n / elapsed:.1f} validations/s")
+
+    def handle(self, *args, **options):
+        with open(options["data"], "r") as df:
+            phenopackets = decamelize(json.load(df))
+
+        if isinstance(phenopackets, dict):
+            phenopackets = [phenopackets]
+
+        # Like an ingest, validate against a patched (i.e. newly built) copy of the phenopacket schema
+        schema = patch_project_schemas(PHENOPACKET_SCHEMA, {})
+
+        self._run("uncached", lambda p: _validate_uncached(p, schema, VRS_REF_REGISTRY), phenopackets,
+                  options["repeat"])
+
+        clear_schema_validator_cache()
+        self._run("cached", lambda p: schema_validation(p, schema, registry=VRS_REF_REGISTRY), phenopackets,
+                  options["repeat"])
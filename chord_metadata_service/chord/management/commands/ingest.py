@@ -1,11 +1,18 @@
 from django.core.management.base import BaseCommand
 from chord_metadata_service.chord.data_types import DATA_TYPE_EXPERIMENT, DATA_TYPE_PHENOPACKET
-from chord_metadata_service.chord.ingest.constants import DATA_TYPE_TO_INGESTION_FN
+from chord_metadata_service.chord.ingest.streaming import ingest_file_stream
+from chord_metadata_service.chord.workflows import metadata as wm
+
+DATA_TYPE_TO_WORKFLOW_ID = {
+    DATA_TYPE_EXPERIMENT: wm.WORKFLOW_EXPERIMENTS_JSON,
+    DATA_TYPE_PHENOPACKET: wm.WORKFLOW_PHENOPACKETS_JSON,
+}
 
 
 class Command(BaseCommand):
     help = """
-        Ingests a JSON file into a Katsu/Bento dataset.
+        Ingests a JSON (or newline-delimited JSON) file into a Katsu/Bento dataset. The file is streamed and committed
+        in chunks; re-running an interrupted ingest with the same file resumes it after the last committed chunk.
         Arguments: "dataset" "type" ./path/to/data.json
     """
 
@@ -14,8 +21,12 @@ class Command(BaseCommand):
         parser.add_argument("type", action="store", type=str, choices=[DATA_TYPE_EXPERIMENT, DATA_TYPE_PHENOPACKET],
                             help=f"The type of data to be ingested, {DATA_TYPE_PHENOPACKET} or {DATA_TYPE_EXPERIMENT}")
         parser.add_argument("data", action="store", type=str, help="JSON data file or DRS URI to ingest")
+        parser.add_argument("--chunk-size", action="store", type=int, default=None,
+                            help="Number of records to validate, ingest and commit at a time")
 
     def handle(self, *args, **options):
-        DATA_TYPE_TO_INGESTION_FN[options["type"]]({"json_document": options["data"]}, options["dataset"])
+        n_records = ingest_file_stream(
+            DATA_TYPE_TO_WORKFLOW_ID[options["type"]], options["data"], options["dataset"],
+            chunk_size=options["chunk_size"])
 
-        print("Ingested data successfully.")
+        print(f"Ingested data successfully ({n_records} records).")
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from tabulate import tabulate
+
+from chord_metadata_service.chord.search_indexes import advise_search_indexes, get_search_index_usage
+from chord_metadata_service.chord.search_traffic import flush_search_traffic
+
+
+def _format_size(size: int) -> str:
+    for unit in ("B", "kB", "MB"):
+        if size < 1024:
+            return f"{size}{unit}"
+        size //= 1024
+    return f"{size}GB"
+
+
+class Command(BaseCommand):
+    help = """
+        Reports how much the advised search indexes are used (index scans since Postgres statistics were last reset)
+        against the recorded search traffic on the fields they serve. Flags indexes which exist but are never used,
+        and indexes which are missing although their fields are searched.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true",
+                            help="List every advised index, rather than only those with scans, searches or flags")
+
+    def handle(self, *args, **options):
+        flush_search_traffic()  # Include traffic recorded by this process but not yet written
+
+        indexes, _, _ = advise_search_indexes()
+        rows = []
+
+        for usage in sorted(get_search_index_usage(indexes), key=lambda u: (-u.searches, -u.scans, u.index.name)):
+            if not usage.exists:
+                flag = "missing" if usage.searches else ""
+            elif usage.scans == 0:
+                flag = "unused"
+            else:
+                flag = ""
+
+            if not (options["all"] or usage.scans or usage.searches or flag):
+                continue
+
+            rows.append((
+                usage.index.name,
+                usage.index.kind,
+                "yes" if usage.exists else "no",
+                usage.scans,
+                usage.tuples_read,
+                _format_size(usage.size),
+                usage.searches,
+                flag,
+            ))
+
+        self.stdout.write(tabulate(rows, headers=("index", "kind", "exists", "scans", "rows read", "size", "searches",
+                                                  "flag")))
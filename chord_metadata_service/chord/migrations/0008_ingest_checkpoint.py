@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chord', '0007_v7_0_0'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('workflow_id', models.CharField(max_length=200)),
+                ('source', models.TextField(help_text='URI or path of the file being ingested.')),
+                ('records_ingested', models.PositiveBigIntegerField(default=0)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('dataset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ingest_checkpoints', to='chord.dataset')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='ingestcheckpoint',
+            constraint=models.UniqueConstraint(fields=('dataset', 'workflow_id', 'source'), name='unique_ingest_checkpoint'),
+        ),
+    ]
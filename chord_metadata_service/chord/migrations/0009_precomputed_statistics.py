@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-18 03:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+import rest_framework.utils.encoders
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chord', '0008_ingest_checkpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrecomputedStatistics',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=200, unique=True)),
+                ('data', models.JSONField(encoder=rest_framework.utils.encoders.JSONEncoder)),
+                ('computed', models.DateTimeField(auto_now=True)),
+                ('dataset', models.ForeignKey(blank=True, help_text='Dataset summarized by the statistics, if they are specific to a dataset.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='precomputed_statistics', to='chord.dataset')),
+            ],
+        ),
+    ]
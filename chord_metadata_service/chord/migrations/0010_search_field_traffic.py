@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-18 03:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chord', '0009_precomputed_statistics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchFieldTraffic',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data_type', models.CharField(max_length=200)),
+                ('field', models.CharField(help_text='Path to the field in the search schema, as used in #resolve, e.g. diseases.[item].term.label', max_length=500)),
+                ('searches', models.PositiveBigIntegerField(default=0)),
+                ('last_searched', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='searchfieldtraffic',
+            constraint=models.UniqueConstraint(fields=('data_type', 'field'), name='unique_search_field_traffic'),
+        ),
+    ]
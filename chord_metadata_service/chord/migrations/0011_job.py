@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:40
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chord', '0010_search_field_traffic'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('job_type', models.CharField(choices=[('ingest', 'Ingest'), ('export', 'Export'), ('cleanup', 'Cleanup')], max_length=50)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed'), ('cancelled', 'Cancelled')], default='queued', max_length=50)),
+                ('params', models.JSONField(blank=True, default=dict, help_text='Parameters the job was submitted with.')),
+                ('progress', models.JSONField(blank=True, default=dict, help_text='Progress counters, by name.')),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('cancel_requested', models.BooleanField(default=False)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('started', models.DateTimeField(blank=True, null=True)),
+                ('finished', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chord', '0011_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrecomputedStatisticsGeneration',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('generation', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -3,13 +3,23 @@ import uuid
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
 from chord_metadata_service.patients.models import Individual
 from chord_metadata_service.phenopackets.models import Biosample, Phenopacket
 from chord_metadata_service.resources.models import Resource
 from ..restapi.models import SchemaType
 
 
-__all__ = ["Project", "Dataset", "ProjectJsonSchema"]
+__all__ = [
+    "Project",
+    "Dataset",
+    "ProjectJsonSchema",
+    "IngestCheckpoint",
+    "PrecomputedStatistics",
+    "PrecomputedStatisticsGeneration",
+    "SearchFieldTraffic",
+    "Job",
+]
 
 
 def version_default():
@@ -212,3 +222,126 @@ class ProjectJsonSchema(models.Model):
         constraints = [
             models.UniqueConstraint(fields=["project", "schema_type"], name="unique_project_schema")
         ]
+
+
+class IngestCheckpoint(models.Model):
+    """
+    Class to record the progress of a streaming ingest, which commits its records in chunks, so that an interrupted
+    ingest of the same source into the same dataset can resume after the last committed chunk.
+    """
+
+    dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name="ingest_checkpoints")
+    workflow_id = models.CharField(max_length=200)
+    source = models.TextField(help_text="URI or path of the file being ingested.")
+    records_ingested = models.PositiveBigIntegerField(default=0)
+
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["dataset", "workflow_id", "source"], name="unique_ingest_checkpoint")
+        ]
+
+    def __str__(self):
+        return f"{self.workflow_id} ingest of {self.source} into {self.dataset_id}: {self.records_ingested} records"
+
+
+class PrecomputedStatistics(models.Model):
+    """
+    Class to store the result of an expensive statistics computation (e.g. the overview or a dataset summary), so that
+    it is not recomputed on every request. Rows are deleted when the data they summarize changes (after ingests and
+    cleanup) and recomputed on the next request.
+    """
+
+    key = models.CharField(max_length=200, unique=True)
+    dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, null=True, blank=True,
+                                related_name="precomputed_statistics",
+                                help_text="Dataset summarized by the statistics, if they are specific to a dataset.")
+    # Encoded like API responses, so that stored statistics are rendered the same as freshly computed ones
+    data = models.JSONField(encoder=JSONEncoder)
+
+    computed = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.key} (computed {self.computed})"
+
+
+class PrecomputedStatisticsGeneration(models.Model):
+    """
+    Single-row counter, incremented whenever precomputed statistics are invalidated. Statistics are only stored if it
+    did not change while they were being computed, since they may then summarize data from before the change.
+    """
+
+    generation = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"generation {self.generation}"
+
+
+class SearchFieldTraffic(models.Model):
+    """
+    Class to record how many searches used each field of a data type's search schema, so that the indexes serving
+    searches can be compared against the traffic they are meant to serve.
+    """
+
+    data_type = models.CharField(max_length=200)
+    field = models.CharField(max_length=500, help_text="Path to the field in the search schema, as used in #resolve, "
+                                                       "e.g. diseases.[item].term.label")
+    searches = models.PositiveBigIntegerField(default=0)
+
+    last_searched = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["data_type", "field"], name="unique_search_field_traffic")
+        ]
+
+    def __str__(self):
+        return f"{self.data_type}: {self.field} ({self.searches} searches)"
+
+
+class Job(models.Model):
+    """
+    Class to record a background job (an ingest, export or cleanup run outside of the request which submitted it), its
+    status and its progress counters (e.g. records validated, rows written, files exported.)
+    """
+
+    TYPE_INGEST = "ingest"
+    TYPE_EXPORT = "export"
+    TYPE_CLEANUP = "cleanup"
+    TYPE_CHOICES = (
+        (TYPE_INGEST, "Ingest"),
+        (TYPE_EXPORT, "Export"),
+        (TYPE_CLEANUP, "Cleanup"),
+    )
+
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+    STATUS_CANCELLED = "cancelled"
+    STATUS_CHOICES = (
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_SUCCEEDED, "Succeeded"),
+        (STATUS_FAILED, "Failed"),
+        (STATUS_CANCELLED, "Cancelled"),
+    )
+    FINISHED_STATUSES = frozenset({STATUS_SUCCEEDED, STATUS_FAILED, STATUS_CANCELLED})
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    job_type = models.CharField(max_length=50, choices=TYPE_CHOICES)
+    status = models.CharField(max_length=50, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    params = models.JSONField(default=dict, blank=True, help_text="Parameters the job was submitted with.")
+    progress = models.JSONField(default=dict, blank=True, help_text="Progress counters, by name.")
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+    cancel_requested = models.BooleanField(default=False)
+
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(null=True, blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.job_type} job {self.id} ({self.status})"
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+from asgiref.sync import sync_to_async
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from typing import Awaitable, Callable, Iterable
+
+from .models import Dataset, PrecomputedStatistics, PrecomputedStatisticsGeneration
+
+__all__ = [
+    "get_precomputed_statistics",
+    "aget_precomputed_statistics",
+    "invalidate_precomputed_statistics",
+]
+
+
+def _fresh_statistics(key: str):
+    return PrecomputedStatistics.objects.filter(
+        key=key,
+        computed__gte=timezone.now() - timedelta(seconds=settings.PRECOMPUTED_STATISTICS_MAX_AGE),
+    ).values_list("data", flat=True)
+
+
+# Primary key of the (single) generation counter row
+GENERATION_COUNTER_PK = 1
+
+
+def _current_generation() -> int:
+    return PrecomputedStatisticsGeneration.objects.get_or_create(pk=GENERATION_COUNTER_PK)[0].generation
+
+
+def _store_statistics(key: str, stats: dict, dataset_id: str | None, generation: int) -> None:
+    # Statistics are only stored if there was no invalidation since they started being computed. The counter row stays
+    # locked by an invalidating transaction (e.g. an ingest) until it is committed, so a locked row also means the data
+    # is changing; the row is not waited on, since that could take as long as the ingest.
+    try:
+        with transaction.atomic():
+            # The dataset may have been deleted while its statistics were being computed; it is locked until the
+            # statistics are stored, so that they are deleted with it by a later delete. It is locked first, and
+            # without a key lock: ingests hold key share locks on it (from foreign keys to it) while they invalidate
+            # statistics, so waiting for it while holding the counter row could deadlock.
+            if dataset_id is not None and not (
+                    Dataset.objects.select_for_update(no_key=True).filter(pk=dataset_id).exists()):
+                return
+            current = (
+                PrecomputedStatisticsGeneration.objects
+                .select_for_update(skip_locked=True)
+                .filter(pk=GENERATION_COUNTER_PK)
+                .values_list("generation", flat=True)
+                .first()
+            )
+            if current != generation:
+                return
+            PrecomputedStatistics.objects.update_or_create(key=key, defaults={"dataset_id": dataset_id, "data": stats})
+    except (IntegrityError, OperationalError):
+        # Foreign keys are only checked on commit, in case the dataset was deleted in a way the check above missed;
+        # lock failures (e.g. deadlocks) also mean the data is changing. Either way, the statistics are not stored.
+        pass
+
+
+def get_precomputed_statistics(key: str, compute: Callable[[], dict], dataset_id: str | None = None) -> dict:
+    """
+    Returns the statistics stored under a key, computing and storing them first if they are missing (i.e. were
+    invalidated by a data change) or older than PRECOMPUTED_STATISTICS_MAX_AGE. The maximum age bounds how stale
+    statistics can get after changes which do not invalidate them, such as edits through the REST API.
+    Statistics which summarize a single dataset should pass its ID, so that they are invalidated along with it.
+    """
+
+    stats = _fresh_statistics(key).first()
+
+    if stats is None:
+        generation = _current_generation()
+        stats = compute()
+        _store_statistics(key, stats, dataset_id, generation)
+
+    return stats
+
+
+async def aget_precomputed_statistics(key: str, compute: Callable[[], Awaitable[dict]],
+                                      dataset_id: str | None = None) -> dict:
+    """
+    Async version of get_precomputed_statistics, for statistics computed by a coroutine function.
+    """
+
+    stats = await _fresh_statistics(key).afirst()
+
+    if stats is None:
+        generation = await sync_to_async(_current_generation)()
+        stats = await compute()
+        await sync_to_async(_store_statistics)(key, stats, dataset_id, generation)
+
+    return stats
+
+
+def invalidate_precomputed_statistics(dataset_ids: Iterable[str] | None = ()) -> None:
+    """
+    Deletes stored statistics after the data they summarize has changed. Statistics over all data (e.g. the overview)
+    are always deleted, along with the statistics for the given datasets; if dataset_ids is None, the statistics for
+    every dataset are deleted too.
+    """
+
+    # Incremented first, so that statistics being computed at the same time are not stored (see _store_statistics)
+    PrecomputedStatisticsGeneration.objects.get_or_create(pk=GENERATION_COUNTER_PK)
+    PrecomputedStatisticsGeneration.objects.filter(pk=GENERATION_COUNTER_PK).update(generation=F("generation") + 1)
+
+    if dataset_ids is None:
+        PrecomputedStatistics.objects.all().delete()
+        return
+
+    PrecomputedStatistics.objects.filter(Q(dataset_id__isnull=True) | Q(dataset_id__in=list(dataset_ids))).delete()
@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+import hashlib
+
+from bento_lib.search import postgres, queries as q
+from django.apps import apps
+from django.db import connection, models
+from typing import Iterator, NamedTuple
+
+from .data_types import DATA_TYPES
+from .models import SearchFieldTraffic
+
+__all__ = [
+    "INDEX_BTREE",
+    "INDEX_TRIGRAM",
+    "STORAGE_COLUMN",
+    "STORAGE_ARRAY",
+    "STORAGE_JSONB",
+    "SearchField",
+    "SearchIndex",
+    "SearchIndexUsage",
+    "iter_search_fields",
+    "advise_search_indexes",
+    "get_existing_index_names",
+    "get_search_index_usage",
+]
+
+# Index kinds: a B-tree index on a column (equality, IN), and a pg_trgm GIN index on a column (ILIKE, which
+# case-insensitive substring, prefix and suffix searches compile to.)
+INDEX_BTREE = "btree"
+INDEX_TRIGRAM = "trgm"
+
+# How a search field is stored: as a column, as the items of a Postgres array column, or within a JSONB column
+STORAGE_COLUMN = "column"
+STORAGE_ARRAY = "array"
+STORAGE_JSONB = "jsonb"
+
+EQUALITY_OPERATIONS = frozenset({q.SEARCH_OP_EQ, q.SEARCH_OP_IN})
+TEXT_OPERATIONS = frozenset({q.SEARCH_OP_ICO, q.SEARCH_OP_ISW, q.SEARCH_OP_IEW, q.SEARCH_OP_ILIKE})
+
+# Postgres truncates longer identifiers
+MAX_INDEX_NAME_LENGTH = 63
+
+# Literals used to check that a field can be searched, by type
+_TEST_LITERALS = {"string": "", "integer": 0, "number": 0, "boolean": False}
+
+
+class SearchField(NamedTuple):
+    data_type: str
+    path: str  # Path to the field in the search schema, as used in #resolve, e.g. diseases.[item].term.label
+    table: str
+    column: str
+    storage: str
+    keys: tuple[str, ...]  # Keys leading to the field within a JSONB column
+    in_array: bool  # Whether the field is (within) an item of an array stored in the column
+    type: str
+    operations: frozenset[str]
+    queryable: str
+
+    @property
+    def read_via(self) -> str:
+        # How compiled searches read the values of the field (see _advise_field_indexes)
+        if self.storage == STORAGE_ARRAY:
+            return "unnest"
+        if self.storage == STORAGE_JSONB:
+            return "jsonb_array_elements" if self.in_array else "jsonb_to_record"
+        return "column"
+
+
+class SearchIndex(NamedTuple):
+    name: str
+    kind: str
+    table: str
+    column: str
+    fields: tuple[str, ...]  # Search fields (data type: path) the index serves
+
+    @property
+    def expression(self) -> str:
+        # The column itself, which is what compiled search queries compare (see _advise_field_indexes)
+        return f'"{self.column}"'
+
+    def create_sql(self, concurrently: bool = False) -> str:
+        if self.kind == INDEX_TRIGRAM:
+            using = f"gin ({self.expression} gin_trgm_ops)"
+        else:
+            using = f"btree ({self.expression})"
+        return (f'CREATE INDEX {"CONCURRENTLY " if concurrently else ""}IF NOT EXISTS "{self.name}" '
+                f'ON "{self.table}" USING {using}')
+
+    def drop_sql(self, concurrently: bool = False) -> str:
+        return f'DROP INDEX {"CONCURRENTLY " if concurrently else ""}IF EXISTS "{self.name}"'
+
+
+class SearchIndexUsage(NamedTuple):
+    index: SearchIndex
+    exists: bool
+    scans: int  # Index scans since statistics were last reset
+    tuples_read: int
+    size: int  # In bytes
+    searches: int  # Recorded searches on the fields the index serves
+
+
+def _index_name(kind: str, table: str, column: str) -> str:
+    base = f"{table}_{column}"
+    digest = hashlib.md5(f"{kind}:{base}".encode("utf-8")).hexdigest()[:8]
+    suffix = f"_{digest}_{kind}"
+    return f"{base[:MAX_INDEX_NAME_LENGTH - len(suffix)]}{suffix}"
+
+
+def _iter_schema_fields(
+    data_type: str,
+    schema: dict,
+    path: tuple[str, ...],
+    table: str | None,
+    column: str | None,
+    storage: str | None,
+    keys: tuple[str, ...],
+    in_array: bool,
+) -> Iterator[SearchField]:
+    search = schema.get("search", {})
+    database = search.get("database", {})
+
+    if "relation" in database:
+        # A new table; its properties are columns (or further relations)
+        table, column, storage, keys, in_array = database["relation"], None, None, (), False
+    elif column is None and path and table is not None:
+        # A property of a table row: one of its columns
+        column = database.get("field", path[-1])
+        structure_type = database.get("type")
+        storage = (STORAGE_JSONB if structure_type in ("json", "jsonb")
+                   else STORAGE_ARRAY if structure_type == "array" else STORAGE_COLUMN)
+    elif column is not None:
+        # Within a JSONB or array column
+        if path[-1] == "[item]":
+            in_array = True
+        else:
+            keys = (*keys, path[-1])
+
+    schema_type = schema.get("type")
+
+    if schema_type == "object":
+        for name, property_schema in schema.get("properties", {}).items():
+            yield from _iter_schema_fields(
+                data_type, property_schema, (*path, name), table, column, storage, keys, in_array)
+    elif schema_type == "array":
+        yield from _iter_schema_fields(
+            data_type, schema["items"], (*path, "[item]"), table, column, storage, keys, in_array)
+    elif "operations" in search and column is not None:
+        yield SearchField(
+            data_type=data_type,
+            path=".".join(path),
+            table=table,
+            column=column,
+            storage=storage,
+            keys=keys,
+            in_array=in_array,
+            type=schema_type,
+            operations=frozenset(search["operations"]),
+            queryable=search.get("queryable", "all"),
+        )
+
+
+def iter_search_fields(data_type: str) -> Iterator[SearchField]:
+    """
+    Walks the search schema of a data type, yielding each queryable field along with where it is stored in the
+    database (table, column and, for fields within JSONB columns, the path of keys to the field.)
+    """
+    yield from _iter_schema_fields(data_type, DATA_TYPES[data_type]["schema"], (), None, None, None, (), False)
+
+
+def _get_model_field(table: str, column: str) -> models.Field | None:
+    for model in apps.get_models(include_auto_created=True):
+        if model._meta.db_table != table:
+            continue
+        for field in model._meta.concrete_fields:
+            if field.column == column:
+                return field
+    return None
+
+
+def _is_searchable(field: SearchField) -> bool:
+    # Some fields are described as searchable in the schema, but do not compile into valid queries
+    query = [q.FUNCTION_EQ, [q.FUNCTION_RESOLVE, *field.path.split(".")], _TEST_LITERALS.get(field.type, "")]
+    try:
+        postgres.search_query_to_psycopg2_sql(query, DATA_TYPES[field.data_type]["schema"], internal=True)
+    except (SyntaxError, TypeError, ValueError, NotImplementedError):
+        return False
+    return True
+
+
+def _is_indexed(field: models.Field) -> bool:
+    return field.primary_key or field.unique or field.db_index or any(
+        list(index.fields) == [field.name] for index in field.model._meta.indexes)
+
+
+def _advise_field_indexes(field: SearchField, model_field: models.Field) -> Iterator[str]:
+    """
+    Yields the kinds of index which compiled searches on a field can use.
+    Searches compile conditions on columns to comparisons of the column itself ("column" = %s, "column" ILIKE %s),
+    which column indexes serve. Values within JSONB and array columns are read through jsonb_to_record,
+    jsonb_array_elements or unnest, whose output no index can serve; these fields get no advice (they are reported as
+    unindexable by advise_search_indexes), since an index on them would only add to the cost of writes.
+    """
+
+    if field.storage != STORAGE_COLUMN:
+        return
+
+    if field.type == "boolean":  # Too few distinct values for an index to be worth it
+        return
+    # Unbounded text may be too long for a B-tree index entry; it is matched by substring anyway
+    if field.operations & EQUALITY_OPERATIONS and not isinstance(model_field, models.TextField):
+        yield INDEX_BTREE
+    if field.operations & TEXT_OPERATIONS:
+        yield INDEX_TRIGRAM
+
+
+def advise_search_indexes(
+    data_types: tuple[str, ...] | None = None,
+) -> tuple[list[SearchIndex], list[SearchField], list[SearchField]]:
+    """
+    Works out the indexes which would serve searches on the queryable fields of the search schemas. Returns the
+    advised indexes, sorted by name; the search fields which are queryable but cannot be indexed, since they are
+    stored within JSONB or array columns (see SearchField.read_via); and the search fields which were left out of the
+    advice because they cannot be searched or matched to a model field. Columns which are already indexed (primary
+    keys, foreign keys, unique fields) do not get B-tree indexes. Indexes are only advised, not created: whether they
+    are worth their upkeep depends on the search traffic of each node (see get_search_index_usage.)
+    """
+
+    indexes: dict[str, SearchIndex] = {}
+    unindexable: list[SearchField] = []
+    skipped: list[SearchField] = []
+
+    for data_type in (data_types or tuple(DATA_TYPES)):
+        for field in iter_search_fields(data_type):
+            model_field = _get_model_field(field.table, field.column)
+            if model_field is None or not _is_searchable(field):
+                skipped.append(field)
+                continue
+
+            if field.storage != STORAGE_COLUMN:
+                unindexable.append(field)
+                continue
+
+            for kind in _advise_field_indexes(field, model_field):
+                if kind == INDEX_BTREE and _is_indexed(model_field):
+                    continue
+
+                name = _index_name(kind, field.table, field.column)
+                field_id = f"{data_type}: {field.path}"
+                if name in indexes:
+                    if field_id not in indexes[name].fields:
+                        indexes[name] = indexes[name]._replace(fields=(*indexes[name].fields, field_id))
+                    continue
+
+                indexes[name] = SearchIndex(
+                    name=name,
+                    kind=kind,
+                    table=field.table,
+                    column=field.column,
+                    fields=(field_id,),
+                )
+
+    return sorted(indexes.values()), unindexable, skipped
+
+
+def get_existing_index_names() -> set[str]:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT indexname FROM pg_indexes WHERE schemaname = current_schema()")
+        return {row[0] for row in cursor.fetchall()}
+
+
+def get_search_index_usage(indexes: list[SearchIndex]) -> list[SearchIndexUsage]:
+    """
+    Matches advised indexes up with their usage statistics (from pg_stat_user_indexes) and with the recorded search
+    traffic on the fields they serve, to tell indexes which are not worth their upkeep from ones which are missing.
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexrelname, idx_scan, idx_tup_read, pg_relation_size(indexrelid) FROM pg_stat_user_indexes "
+            "WHERE schemaname = current_schema()")
+        stats = {row[0]: row[1:] for row in cursor.fetchall()}
+
+    traffic = {
+        f"{t.data_type}: {t.field}": t.searches
+        for t in SearchFieldTraffic.objects.all()
+    }
+
+    return [
+        SearchIndexUsage(
+            index=index,
+            exists=index.name in stats,
+            scans=stats.get(index.name, (0, 0, 0))[0],
+            tuples_read=stats.get(index.name, (0, 0, 0))[1],
+            size=stats.get(index.name, (0, 0, 0))[2],
+            searches=sum(traffic.get(f, 0) for f in index.fields),
+        )
+        for index in indexes
+    ]
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import re
+import threading
+
+from bento_lib.search import postgres, queries as q
+from collections import OrderedDict
+from django.conf import settings
+from psycopg2 import sql
+from typing import Any, Hashable, NamedTuple
+
+from .data_types import DATA_TYPES
+
+__all__ = [
+    "SearchQueryCacheInfo",
+    "compile_search_query",
+    "search_query_cache_info",
+    "clear_search_query_cache",
+]
+
+# Parameter layout entry kinds: a literal as-is, a literal turned into a LIKE pattern, a tuple of literals (for #in),
+# or a value which does not come from the query's literals at all.
+PARAM_LITERAL = "literal"
+PARAM_WILDCARD = "wildcard"
+PARAM_LIST = "list"
+PARAM_CONSTANT = "constant"
+
+# Stands in for the ith literal when compiling a query's shape; cannot appear in a JSON-decoded query by accident, and
+# contains none of the characters escaped when building LIKE patterns.
+_SENTINEL_PATTERN = re.compile("\x00katsu([0-9]+)\x00")
+_WILDCARD_TEMPLATE_PATTERN = re.compile("%?{}%?")
+
+
+def _sentinel(i: int) -> str:
+    return f"\x00katsu{i}\x00"
+
+
+class SearchQueryCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+# Compiled query templates and their parameter layouts, keyed by (data type, internal, query shape)
+_compiled_queries: OrderedDict[tuple, tuple[sql.Composable, tuple]] = OrderedDict()
+_compiled_queries_lock = threading.Lock()
+_hits = 0
+_misses = 0
+
+
+def _lift_literals(query, literals: list) -> tuple[Hashable, Any]:
+    """
+    Returns the shape of a query, where each literal is replaced with its type, and the same query with each literal
+    replaced by a sentinel string. Field paths (#resolve arguments) and the #_wc location argument are part of the
+    query's structure, since they change the compiled SQL, so they are left as-is. The literals are collected, in order,
+    into the literals list.
+    """
+
+    if isinstance(query, list):
+        if not query or query[0] == q.FUNCTION_RESOLVE:
+            return tuple(query), query
+
+        # For #_wc, only the first argument is a literal to search for; the second is the wildcard location
+        n_args = 1 if query[0] == q.FUNCTION_HELPER_WC else len(query) - 1
+        lifted = [_lift_literals(a, literals) for a in query[1:n_args + 1]]
+        rest = query[n_args + 1:]
+
+        return (query[0], *(s for s, _ in lifted), *rest), [query[0], *(t for _, t in lifted), *rest]
+
+    if type(query) in q.literal_types:
+        literals.append(query)
+        return type(query), _sentinel(len(literals) - 1)
+
+    # Not a valid literal; left in the shape so that compiling the query fails with the usual error
+    return query, query
+
+
+def _param_layout(template_params: tuple, n_literals: int) -> tuple | None:
+    """
+    Maps the parameters of a query compiled with sentinel literals back to the positions of the literals they came from.
+    Returns None if the parameters cannot be rebuilt from the literals alone, in which case the query is not cached.
+    """
+
+    layout = []
+    used = set()
+
+    for param in template_params:
+        if isinstance(param, tuple):
+            if not all(isinstance(v, str) and _SENTINEL_PATTERN.fullmatch(v) for v in param):
+                return None
+            idxs = tuple(int(_SENTINEL_PATTERN.fullmatch(v).group(1)) for v in param)
+            layout.append((PARAM_LIST, idxs))
+            used.update(idxs)
+        elif isinstance(param, str) and (m := _SENTINEL_PATTERN.search(param)):
+            template = f"{param[:m.start()]}{{}}{param[m.end():]}"
+            idx = int(m.group(1))
+            if template == "{}":
+                layout.append((PARAM_LITERAL, idx))
+            elif _WILDCARD_TEMPLATE_PATTERN.fullmatch(template):
+                layout.append((PARAM_WILDCARD, idx, template))
+            else:
+                return None
+            used.add(idx)
+        elif isinstance(param, str) and "\x00" in param:
+            return None
+        else:
+            layout.append((PARAM_CONSTANT, param))
+
+    # Every literal must end up in a parameter; otherwise it may have changed the compiled SQL itself
+    return tuple(layout) if used == set(range(n_literals)) else None
+
+
+def _build_params(layout: tuple, literals: list) -> tuple:
+    params = []
+    for kind, *args in layout:
+        if kind == PARAM_LITERAL:
+            params.append(literals[args[0]])
+        elif kind == PARAM_WILDCARD:
+            value = literals[args[0]]
+            if not isinstance(value, str):
+                raise TypeError(f"Type-invalid use of function {q.FUNCTION_HELPER_WC}")
+            # Same escaping as bento_lib's #_wc implementation
+            params.append(args[1].format(value.replace("%", r"\%").replace("_", r"\_")))
+        elif kind == PARAM_LIST:
+            params.append(tuple(literals[i] for i in args[0]))
+        else:
+            params.append(args[0])
+    return tuple(params)
+
+
+def _cache_put(key, value) -> None:
+    _compiled_queries[key] = value
+    _compiled_queries.move_to_end(key)
+    while len(_compiled_queries) > settings.SEARCH_QUERY_CACHE_SIZE:
+        _compiled_queries.popitem(last=False)
+
+
+def compile_search_query(query, data_type: str, internal: bool = False) -> tuple[sql.Composable, tuple]:
+    """
+    Compiles a Bento search query for a data type into a psycopg2 SQL object and its parameters, like
+    postgres.search_query_to_psycopg2_sql. Queries which only differ in their literal values (e.g. the same search for
+    different diseases) share a compiled SQL template, so only the parameters need to be rebuilt for repeated searches.
+    Raises the same exceptions as postgres.search_query_to_psycopg2_sql for invalid queries.
+    """
+
+    global _hits, _misses
+
+    schema = DATA_TYPES[data_type]["schema"]
+
+    literals = []
+    shape, template_query = _lift_literals(query, literals)
+    key = (data_type, internal, shape)
+
+    try:
+        hash(key)
+    except TypeError:  # Unhashable shape, e.g. a malformed #resolve; compiling the query will raise the error
+        key = None
+
+    with _compiled_queries_lock:
+        entry = _compiled_queries.get(key) if key is not None else None
+        if entry is not None:
+            _compiled_queries.move_to_end(key)
+            _hits += 1
+        else:
+            _misses += 1
+
+    if entry is not None:
+        compiled_query, layout = entry
+        return compiled_query, _build_params(layout, literals)
+
+    # Compile the actual query first, so that invalid queries raise exactly as they would without the cache
+    compiled_query, params = postgres.search_query_to_psycopg2_sql(query, schema, internal)
+
+    if key is None:
+        return compiled_query, params
+
+    try:
+        template_sql, template_params = postgres.search_query_to_psycopg2_sql(template_query, schema, internal)
+    except (SyntaxError, TypeError, ValueError, NotImplementedError):
+        return compiled_query, params
+
+    layout = _param_layout(template_params, len(literals))
+    # Only cache the template if it is exactly what the query compiled to, and gives back the same parameters
+    if layout is not None and template_sql == compiled_query and _build_params(layout, literals) == params:
+        with _compiled_queries_lock:
+            _cache_put(key, (compiled_query, layout))
+
+    return compiled_query, params
+
+
+def search_query_cache_info() -> SearchQueryCacheInfo:
+    with _compiled_queries_lock:
+        return SearchQueryCacheInfo(_hits, _misses, settings.SEARCH_QUERY_CACHE_SIZE, len(_compiled_queries))
+
+
+def clear_search_query_cache() -> None:
+    global _hits, _misses
+    with _compiled_queries_lock:
+        _compiled_queries.clear()
+        _hits = 0
+        _misses = 0
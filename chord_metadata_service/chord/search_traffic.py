@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from bento_lib.search import queries as q
+from collections import Counter
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import SearchFieldTraffic
+
+__all__ = [
+    "search_query_fields",
+    "record_search_traffic",
+    "flush_search_traffic",
+]
+
+# Search counts by (data type, field) which have not been written to the database yet
+_pending: Counter[tuple[str, str]] = Counter()
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def search_query_fields(query) -> set[str]:
+    """
+    Returns the paths of the fields (#resolve arguments, joined with dots) a search query uses.
+    """
+
+    if not isinstance(query, list) or not query:
+        return set()
+
+    if query[0] == q.FUNCTION_RESOLVE:
+        return {".".join(str(a) for a in query[1:])}
+
+    return set().union(*(search_query_fields(a) for a in query[1:]))
+
+
+def record_search_traffic(data_type: str, query) -> None:
+    """
+    Counts a search towards the traffic of each field it uses. Counts are kept in memory and written to the database
+    at most once every SEARCH_TRAFFIC_FLUSH_INTERVAL seconds, so that recording traffic adds no writes to most searches.
+    """
+
+    global _last_flush
+
+    with _pending_lock:
+        _pending.update((data_type, f) for f in search_query_fields(query))
+        if time.monotonic() - _last_flush < settings.SEARCH_TRAFFIC_FLUSH_INTERVAL:
+            return
+        _last_flush = time.monotonic()
+
+    flush_search_traffic()
+
+
+def flush_search_traffic() -> None:
+    with _pending_lock:
+        pending = dict(_pending)
+        _pending.clear()
+
+    for (data_type, field), n in pending.items():
+        traffic, created = SearchFieldTraffic.objects.get_or_create(
+            data_type=data_type, field=field, defaults={"searches": n})
+        if not created:
+            # Incremented in the database, since other processes record traffic for the same fields
+            SearchFieldTraffic.objects.filter(pk=traffic.pk).update(
+                searches=F("searches") + n, last_searched=timezone.now())
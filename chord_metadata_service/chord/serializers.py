@@ -5,7 +5,7 @@ from rest_framework import serializers
 from chord_metadata_service.restapi.dats_schemas import get_dats_schema, CREATORS
 from chord_metadata_service.restapi.utils import transform_keys
 
-from .models import Project, Dataset, ProjectJsonSchema
+from .models import Project, Dataset, ProjectJsonSchema, Job
 from .schemas import LINKED_FIELD_SETS_SCHEMA
 
 
@@ -159,3 +159,10 @@ class ProjectSerializer(serializers.ModelSerializer):
     class Meta:
         model = Project
         fields = '__all__'
+
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = "__all__"
+        read_only_fields = [f.name for f in Job._meta.fields]
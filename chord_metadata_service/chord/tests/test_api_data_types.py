@@ -1,9 +1,18 @@
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 
+from chord_metadata_service.phenopackets.models import MetaData, Phenopacket
+from chord_metadata_service.patients.models import Individual
+
 from ..data_types import DATA_TYPE_EXPERIMENT, DATA_TYPE_PHENOPACKET, DATA_TYPES
-from ..views_data_types import get_count_for_data_type
+from ..models import Dataset, Project
+from ..views_data_types import get_count_for_data_type, get_stats_for_data_types
+from .constants import VALID_DATA_USE_1
 
 POST_GET = ("POST", "GET")
 
@@ -44,6 +53,13 @@ class DataTypeTest(APITestCase):
             "last_ingested": None,
         })
 
+    def test_data_type_detail_queries(self):
+        # Only the requested data type is counted
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.client.get(reverse("data-type-detail", kwargs={"data_type": DATA_TYPE_EXPERIMENT}))
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(sum("COUNT(" in q["sql"] for q in ctx.captured_queries), 1)
+
     def test_data_type_detail_non_uuid_project(self):
         # Non-UUID project
         r = self.client.get(reverse("data-type-detail", kwargs={"data_type": DATA_TYPE_PHENOPACKET}), {"project": "a"})
@@ -84,3 +100,18 @@ class DataTypeTest(APITestCase):
         r = self.client.get(reverse("data-type-metadata-schema", kwargs={"data_type": DATA_TYPE_NOT_REAL}))
         self.assertEqual(r.status_code, status.HTTP_404_NOT_FOUND)
         r.json()  # assert json response
+
+
+class DataTypeStatsTest(TransactionTestCase):
+    # Outside of a test transaction, so that data types are counted on connections of their own
+
+    def test_stats_for_data_types(self):
+        project = Project.objects.create(title="Project 1", description="")
+        dataset = Dataset.objects.create(title="Dataset 1", description="", data_use=VALID_DATA_USE_1, project=project)
+        Phenopacket.objects.create(id="phenopacket_id:1", subject=Individual.objects.create(id="patient:1"),
+                                   meta_data=MetaData.objects.create(), dataset=dataset)
+
+        stats = async_to_sync(get_stats_for_data_types)(dataset=str(dataset.identifier))
+        self.assertEqual(stats[DATA_TYPE_PHENOPACKET]["count"], 1)
+        self.assertIsNotNone(stats[DATA_TYPE_PHENOPACKET]["last_ingested"])
+        self.assertDictEqual(stats[DATA_TYPE_EXPERIMENT], {"count": 0, "last_ingested": None})
@@ -1,10 +1,16 @@
 import json
 import uuid
 import re
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 from chord_metadata_service.chord.models import Dataset
+from chord_metadata_service.chord.precomputed_statistics import invalidate_precomputed_statistics
+from chord_metadata_service.patients.models import Individual
+from chord_metadata_service.patients.search_vector import update_individual_search_vectors
 from chord_metadata_service.phenopackets.models import Phenopacket
 
 from chord_metadata_service.phenopackets.tests.helpers import PhenoTestCase
@@ -60,6 +66,37 @@ class DatasetsTest(APITestCase, PhenoTestCase):
             r = self.client.get(reverse("chord-dataset-data-type-summary", kwargs={"dataset_id": bad_dataset_id}))
             self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_dataset_datatype_summary_counts(self):
+        r = self.client.get(reverse("chord-dataset-data-type-summary", kwargs={"dataset_id": self.dataset.identifier}))
+        counts = {d["id"]: d["count"] for d in r.json()}
+        self.assertDictEqual(counts, {DATA_TYPE_EXPERIMENT: 1, DATA_TYPE_PHENOPACKET: 1})
+
+    @override_settings(DATA_TYPE_COUNTS_PRECOMPUTED=True)
+    def test_dataset_datatype_counts_precomputed(self):
+        def get_counts(url, params=None):
+            return {d["id"]: d["count"] for d in self.client.get(url, params).json()}
+
+        urls = (
+            (reverse("chord-dataset-data-type-summary", kwargs={"dataset_id": self.dataset.identifier}), None),
+            (reverse("data-type-list"), None),
+            (reverse("data-type-list"), {"project": str(self.project.identifier)}),
+        )
+        for url, params in urls:
+            self.assertEqual(get_counts(url, params)[DATA_TYPE_PHENOPACKET], 1)
+
+        # Not invalidated by edits through the REST API...
+        Phenopacket.objects.create(id="phenopacket_id:2", subject=self.individual, meta_data=self.meta_data,
+                                   dataset=self.dataset)
+        for url, params in urls:
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(get_counts(url, params)[DATA_TYPE_PHENOPACKET], 1)
+            self.assertFalse(any("COUNT(" in q["sql"] for q in ctx.captured_queries))
+
+        # ... but by ingests and cleanup
+        invalidate_precomputed_statistics([self.dataset.identifier])
+        for url, params in urls:
+            self.assertEqual(get_counts(url, params)[DATA_TYPE_PHENOPACKET], 2)
+
     def test_get_dataset_datatype(self):
         for dt in DATA_TYPES:
             if DATA_TYPES[dt]['queryable']:
@@ -98,6 +135,19 @@ class DatasetsTest(APITestCase, PhenoTestCase):
                 with self.assertRaises(self.entities_by_data_type[dt]['class'].DoesNotExist):
                     self.entities_by_data_type[dt]['entity'].refresh_from_db()
 
+    def test_del_dataset_datatype_search_vector(self):
+        # Experiments are deleted in bulk, without signals; the search documents of their individuals are updated
+        update_individual_search_vectors()
+        self.assertTrue(Individual.objects.filter(search_vector="Methylation").exists())
+
+        r = self.client.delete(reverse("chord-dataset-data-type", kwargs={
+            "dataset_id": self.dataset.identifier,
+            "data_type": DATA_TYPE_EXPERIMENT,
+        }))
+        self.assertEqual(r.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Individual.objects.filter(search_vector="Methylation").exists())
+        self.assertTrue(Individual.objects.filter(pk=self.individual.pk, search_vector="ataxia").exists())
+
     def test_dataset_update(self):
         # Updates a dataset by changing its dats file
         url = f"/api/datasets/{self.dataset.identifier}"
@@ -1,15 +1,19 @@
+import io
 import json
 import os
 import shutil
+import tarfile
 import tempfile
 
+from asgiref.sync import async_to_sync
+from django.test import override_settings
 from django.urls import reverse
-from chord_metadata_service.chord.export.cbioportal import CBIO_FILES_SET
+from chord_metadata_service.chord.export.cbioportal import CBIO_FILES_SET, MAF_LIST_FILENAME
 from chord_metadata_service.chord.export.utils import EXPORT_DIR
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from chord_metadata_service.chord.models import Project, Dataset
+from chord_metadata_service.chord.models import Project, Dataset, Job
 from chord_metadata_service.chord.ingest import WORKFLOW_INGEST_FUNCTION_MAP
 from chord_metadata_service.chord.workflows.metadata import WORKFLOW_PHENOPACKETS_JSON
 
@@ -28,6 +32,10 @@ class ExportTest(APITestCase):
 
         self.p = WORKFLOW_INGEST_FUNCTION_MAP[WORKFLOW_PHENOPACKETS_JSON](EXAMPLE_INGEST_PHENOPACKET, self.d.identifier)
 
+    @staticmethod
+    async def read_stream(response) -> bytes:
+        return b"".join([chunk async for chunk in response.streaming_content])
+
     def test_export_cbio(self):
         # Test with no export body
         r = self.client.post(reverse("export"), content_type="application/json")
@@ -45,6 +53,9 @@ class ExportTest(APITestCase):
             # Test with no output_path: expect a tar archive to be returned
             r = self.client.post(reverse("export"), data=json.dumps(export_payload), content_type="application/json")
             self.assertEqual(r.get('Content-Disposition'), f"attachment; filename=\"{self.study_id}.tar.gz\"")
+            with tarfile.open(fileobj=io.BytesIO(async_to_sync(self.read_stream)(r)), mode="r:gz") as tar:
+                tar_files = {m.name for m in tar.getmembers() if m.isfile()}
+            self.assertSetEqual(tar_files, {os.path.join(EXPORT_DIR, f) for f in CBIO_FILES_SET | {MAF_LIST_FILENAME}})
 
             # Test with output_path provided: expect files created in this directory
             export_payload["output_path"] = tmp_dir
@@ -61,3 +72,28 @@ class ExportTest(APITestCase):
             shutil.rmtree(tmp_dir)
 
         # TODO: More
+
+    @override_settings(JOB_WORKERS=0)
+    def test_export_cbio_async(self):
+        export_payload = {
+            "format": "cbioportal",
+            "object_type": "dataset",
+            "object_id": self.study_id,
+        }
+        url = f"{reverse('export')}?async=true"
+
+        # Without an output path, there would be nowhere to get the files from
+        r = self.client.post(url, data=json.dumps(export_payload), content_type="application/json")
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Job.objects.exists())
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            export_payload["output_path"] = tmp_dir
+            r = self.client.post(url, data=json.dumps(export_payload), content_type="application/json")
+            self.assertEqual(r.status_code, status.HTTP_202_ACCEPTED)
+            self.assertEqual(r.json()["status"], Job.STATUS_SUCCEEDED)
+            self.assertDictEqual(r.json()["result"], {"output_path": tmp_dir})
+
+            export_path = os.path.join(tmp_dir, EXPORT_DIR, self.study_id)
+            for export_file in CBIO_FILES_SET:
+                self.assertTrue(os.path.exists(os.path.join(export_path, export_file)))
@@ -1,4 +1,5 @@
 import json
+import tempfile
 
 from django.urls import reverse
 from rest_framework import status
@@ -94,3 +95,48 @@ class IngestTest(APITestCase):
             data=json.dumps(valid_phenopacket),
         )
         self.assertEqual(r.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_ingest_invalidates_statistics(self):
+        summary_url = reverse("chord-dataset-summary", kwargs={"dataset_id": self.dataset["identifier"]})
+        url = reverse("ingest-into-dataset", args=(self.dataset["identifier"], "phenopackets_json"))
+
+        self.assertEqual(self.client.get(summary_url).json()["phenopacket"]["count"], 0)
+        self.assertEqual(self.client.get("/api/overview").json()["phenopackets"], 0)
+
+        r = self.client.post(url, content_type="application/json",
+                             data=json.dumps(load_local_json("example_phenopacket_v2.json")))
+        self.assertEqual(r.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.get(summary_url).json()["phenopacket"]["count"], 1)
+        self.assertEqual(self.client.get("/api/overview").json()["phenopackets"], 1)
+
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as tf:
+            json.dump([load_local_json("example_phenopacket_2_v2.json")], tf)
+            tf.flush()
+            r = self.client.post(f"{url}?stream=true", content_type="application/json",
+                                 data=json.dumps({"json_document": f"file://{tf.name}"}))
+        self.assertEqual(r.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.get(summary_url).json()["phenopacket"]["count"], 2)
+        self.assertEqual(self.client.get("/api/overview").json()["phenopackets"], 2)
+
+    def test_phenopackets_streaming_ingest(self):
+        url = reverse("ingest-into-dataset", args=(self.dataset["identifier"], "phenopackets_json"))
+
+        # Missing JSON document URI
+        r = self.client.post(f"{url}?stream=true", content_type="application/json", data=json.dumps({}))
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Workflow without streaming support
+        r = self.client.post(
+            reverse("ingest-into-dataset", args=(self.dataset["identifier"], "fhir_json")) + "?stream=true",
+            content_type="application/json",
+            data=json.dumps({"json_document": "file:///tmp/does_not_matter.json"}),
+        )
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Success
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as tf:
+            json.dump([load_local_json("example_phenopacket_v2.json")], tf)
+            tf.flush()
+            r = self.client.post(f"{url}?stream=true", content_type="application/json",
+                                 data=json.dumps({"json_document": f"file://{tf.name}"}))
+        self.assertEqual(r.status_code, status.HTTP_204_NO_CONTENT)
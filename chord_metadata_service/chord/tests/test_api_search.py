@@ -37,6 +37,7 @@ from .constants import (
     TEST_FHIR_SEARCH_QUERY,
 )
 from ..models import Project, Dataset
+from ..search_query_cache import clear_search_query_cache
 from ..data_types import (
     DATA_TYPE_EXPERIMENT,
     DATA_TYPE_PHENOPACKET
@@ -500,6 +501,92 @@ class SearchTest(APITestCase):
             matches = c["results"][dataset_id]["matches"]
             self.assertEqual(len(matches), 2)   # 2 biosamples in list
 
+    @staticmethod
+    def _ndjson_lines(r) -> list[dict]:
+        return [json.loads(line) for line in b"".join(r.streaming_content).decode("utf-8").splitlines()]
+
+    def test_private_search_stream(self):
+        # Streamed matches are the same as the grouped (non-streamed) ones, one line per match
+
+        dataset_id = str(self.dataset.identifier)
+
+        for extra_params in (
+            {},
+            {"output": "values_list", "field": '["biosamples", "[item]", "id"]'},
+            {"output": "bento_search_result"},
+        ):
+            d = {"query": TEST_SEARCH_QUERY_10, "data_type": DATA_TYPE_PHENOPACKET, **extra_params}
+            for method in POST_GET:
+                expected = self._search_call("private-search", data=d, method=method).json()
+
+                for stream in ("true", True):
+                    if method == "GET" and stream is True:
+                        continue
+                    r = self._search_call("private-search", data={**d, "stream": stream}, method=method)
+                    self.assertEqual(r.status_code, status.HTTP_200_OK)
+                    self.assertEqual(r["Content-Type"], "application/x-ndjson")
+                    lines = self._ndjson_lines(r)
+
+                    self.assertEqual([line["match"] for line in lines], expected["results"][dataset_id]["matches"])
+                    for line in lines:
+                        self.assertEqual(line["dataset_id"], dataset_id)
+                        self.assertEqual(line["data_type"], DATA_TYPE_PHENOPACKET)
+
+                    r = self._search_call("private-dataset-search", args=[dataset_id], data={**d, "stream": stream},
+                                          method=method)
+                    self.assertEqual(r.status_code, status.HTTP_200_OK)
+                    self.assertEqual([line["match"] for line in self._ndjson_lines(r)],
+                                     expected["results"][dataset_id]["matches"])
+
+    def test_private_search_stream_chunks(self):
+        d = {"query": TEST_SEARCH_QUERY_10, "data_type": DATA_TYPE_PHENOPACKET, "stream": True}
+        with self.settings(SEARCH_STREAM_CHUNK_SIZE=1):
+            r = self._search_call("private-search", data={**d, "output": "bento_search_result"}, method="POST")
+            self.assertEqual(r.status_code, status.HTTP_200_OK)
+            parts = list(r.streaming_content)
+
+        self.assertEqual(len(parts), 1)  # 1 matching phenopacket, in 1 chunk
+        self.assertEqual(len(json.loads(parts[0])["match"]["experiments_with_biosamples"]), 2)
+
+        # Public search does not stream
+        r = self._search_call("search", data=d, method="POST")
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(r.json()["results"]), 1)
+
+    def test_search_single_query(self):
+        # Matching is embedded as a subquery, so matching IDs never make a round trip through Python
+
+        d = {"query": TEST_SEARCH_QUERY_10, "data_type": DATA_TYPE_PHENOPACKET}
+        with self.assertNumQueries(1):
+            r = self._search_call("search", data=d, method="POST")
+            self.assertEqual(r.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(r.json()["results"]), 1)
+
+        with self.assertNumQueries(1):
+            r = self._search_call("private-search", data={
+                **d, "output": "values_list", "field": '["biosamples", "[item]", "id"]'}, method="POST")
+            self.assertEqual(r.status_code, status.HTTP_200_OK)
+
+        # Matching phenopackets, then their subjects' biosamples and experiments
+        with self.assertNumQueries(2):
+            r = self._search_call("private-search", data={**d, "output": "bento_search_result"}, method="POST")
+            self.assertEqual(r.status_code, status.HTTP_200_OK)
+
+    def test_search_query_cache_stats(self):
+        clear_search_query_cache()
+
+        for query in (TEST_SEARCH_QUERY_1, TEST_SEARCH_QUERY_2):  # Same query shape, so the second search hits
+            r = self._search_call("private-search", data={"query": query, "data_type": DATA_TYPE_PHENOPACKET},
+                                  method="POST")
+            self.assertEqual(r.status_code, status.HTTP_200_OK)
+
+        r = self.client.get(reverse("private-search-query-cache"))
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        c = r.json()
+        self.assertEqual(c["hits"], 1)
+        self.assertEqual(c["misses"], 1)
+        self.assertEqual(c["currsize"], 1)
+
     @patch('chord_metadata_service.chord.views_search.es')
     def test_fhir_search(self, mocked_es):
         mocked_es.search.return_value = SEARCH_SUCCESS
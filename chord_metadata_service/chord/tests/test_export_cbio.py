@@ -1,7 +1,9 @@
 import io
+import tarfile
 from typing import TextIO
 from os import walk, path
 
+from asgiref.sync import async_to_sync
 from django.db.models import F
 from django.test import TestCase
 
@@ -15,7 +17,7 @@ from chord_metadata_service.chord.export.cbioportal import (
     SAMPLE_DATA_FILENAME,
     SAMPLE_DATATYPE,
 )
-from chord_metadata_service.chord.export.utils import ExportFileContext
+from chord_metadata_service.chord.export.utils import ExportFileContext, stream_tar_gz
 from chord_metadata_service.chord.models import Project, Dataset
 from chord_metadata_service.experiments.models import ExperimentResult
 from chord_metadata_service.chord.ingest import WORKFLOW_INGEST_FUNCTION_MAP
@@ -56,6 +58,10 @@ class ExportCBioTest(TestCase):
         )
         self.exp_res = ExperimentResult.objects.all()
 
+    @staticmethod
+    async def read_stream(stream) -> bytes:
+        return b"".join([chunk async for chunk in stream])
+
     @staticmethod
     def stream_to_dict(output: TextIO) -> dict[str, str]:
         """
@@ -87,6 +93,21 @@ class ExportCBioTest(TestCase):
 
             self.assertTrue(CBIO_FILES_SET.issubset(files_set))
 
+    def test_stream_tar_gz(self):
+        # The streamed archive contains the same files as the one written from the export directory
+        stream = async_to_sync(self.read_stream)(stream_tar_gz(exp.study_export_files(self.study_id)))
+
+        with ExportFileContext(None, self.study_id) as file_export:
+            exp.study_export(file_export.get_path, self.study_id)
+            with open(file_export.write_tar(), "rb") as fh:
+                written = fh.read()
+
+        def _tar_contents(data: bytes) -> dict[str, bytes | None]:
+            with tarfile.open(fileobj=io.BytesIO(data), mode="r:gz") as tar:
+                return {m.name: tar.extractfile(m).read() if m.isfile() else None for m in tar.getmembers()}
+
+        self.assertDictEqual(_tar_contents(stream), _tar_contents(written))
+
     def test_export_cbio_study_meta(self):
         with io.StringIO() as output:
             exp.study_export_meta(self.d, output)
@@ -155,7 +176,8 @@ class ExportCBioTest(TestCase):
                 break
 
     def test_export_cbio_sample_data(self):
-        samples = pm.Biosample.objects.filter(phenopacket=self.p)
+        # Ordered like the example phenopacket's biosamples, rather than in whichever order rows come back in
+        samples = pm.Biosample.objects.filter(phenopacket=self.p).order_by("id")
 
         with io.StringIO() as output:
             exp.sample_export(samples, output)
@@ -199,6 +221,12 @@ class ExportCBioTest(TestCase):
 
             self.assertEqual(sample_count, samples.count())
 
+    def test_export_cbio_sample_data_queries(self):
+        # Rows are fetched without a query per sample (for its individual)
+        samples = pm.Biosample.objects.filter(phenopacket=self.p)
+        with io.StringIO() as output, self.assertNumQueries(2):  # Tissue column check + rows
+            exp.sample_export(samples, output)
+
     def test_export_maf_list(self):
         exp_res = self.exp_res.filter(experiment__dataset_id=self.study_id)\
             .filter(file_format="MAF") \
@@ -1,26 +1,44 @@
+import copy
+import io
+import json
+
 from dateutil.parser import isoparse
-from django.test import TestCase
+from django.db import transaction
+from django.test import TestCase, override_settings
+from humps import decamelize
 
-from chord_metadata_service.chord.models import Project, Dataset
+from chord_metadata_service.chord.models import Project, Dataset, IngestCheckpoint
 from chord_metadata_service.chord.ingest import WORKFLOW_INGEST_FUNCTION_MAP
 from chord_metadata_service.chord.ingest.exceptions import IngestError
 from chord_metadata_service.chord.ingest.experiments import (
     validate_experiment,
     ingest_experiment,
 )
-from chord_metadata_service.chord.ingest.schema import schema_validation
+from chord_metadata_service.chord.ingest.schema import get_schema_validator, schema_validation
+from chord_metadata_service.chord.ingest.streaming import (
+    iter_experiments_document,
+    iter_json_records,
+    ingest_experiments_stream,
+    ingest_phenopackets_stream,
+)
 from chord_metadata_service.chord.ingest.phenopackets import (
+    _get_validation_pool,
     get_or_create_phenotypic_feature,
     validate_phenopacket,
+    validate_phenopackets,
+    validate_phenopackets_or_raise,
     ingest_phenopacket,
+    ingest_phenopackets_bulk,
 )
 from chord_metadata_service.chord.workflows.metadata import (
     WORKFLOW_EXPERIMENTS_JSON,
     WORKFLOW_MAF_DERIVED_FROM_VCF_JSON,
     WORKFLOW_PHENOPACKETS_JSON,
 )
+from chord_metadata_service.phenopackets import models as pm
 from chord_metadata_service.phenopackets.models import Biosample, PhenotypicFeature, Phenopacket
-from chord_metadata_service.phenopackets.schemas import PHENOPACKET_SCHEMA
+from chord_metadata_service.phenopackets.serializers import PhenopacketSerializer
+from chord_metadata_service.phenopackets.schemas import PHENOPACKET_SCHEMA, VRS_REF_REGISTRY
 from chord_metadata_service.resources.models import Resource
 from chord_metadata_service.experiments.models import Experiment, ExperimentResult, Instrument
 from chord_metadata_service.experiments.schemas import EXPERIMENT_SCHEMA
@@ -186,6 +204,37 @@ class IngestTest(TestCase):
             validation_3 = schema_validation(exp, EXPERIMENT_SCHEMA)
             self.assertEqual(validation_3, True)
 
+    def test_phenopackets_validation_parallel(self):
+        phenopackets = decamelize([
+            *EXAMPLE_INGEST_MULTIPLE_PHENOPACKETS, EXAMPLE_INGEST_INVALID_PHENOPACKET, EXAMPLE_INGEST_PHENOPACKET])
+
+        serial_reports = validate_phenopackets(phenopackets, workers=1)
+        self.assertListEqual([idx for idx, _ in serial_reports], list(range(len(phenopackets))))
+        self.assertListEqual([idx for idx, errors in serial_reports if errors], [7])
+
+        # Worker processes return the same reports, in input order
+        with override_settings(INGEST_PARALLEL_VALIDATION_MIN_RECORDS=2):
+            self.assertListEqual(validate_phenopackets(phenopackets, workers=2), serial_reports)
+            with self.assertRaisesMessage(IngestError, "phenopacket 7 "):
+                validate_phenopackets_or_raise(phenopackets)
+
+            # The same worker processes are used for later lists, e.g. the next chunk of a streaming ingest
+            pool = _get_validation_pool(2)
+            self.assertListEqual(validate_phenopackets(phenopackets, workers=2), serial_reports)
+            self.assertIs(_get_validation_pool(2), pool)
+
+    def test_schema_validator_cache(self):
+        # The same or an identical schema re-uses the same compiled validator
+        validator = get_schema_validator(PHENOPACKET_SCHEMA)
+        self.assertIs(get_schema_validator(PHENOPACKET_SCHEMA), validator)
+        self.assertIs(get_schema_validator(copy.deepcopy(PHENOPACKET_SCHEMA)), validator)
+
+        # A different schema (e.g. patched with a new project extension schema) or registry does not
+        patched_schema = {**PHENOPACKET_SCHEMA, "required": ["id", "meta_data", "extra_properties"]}
+        self.assertIsNot(get_schema_validator(patched_schema), validator)
+        self.assertIsNot(get_schema_validator(PHENOPACKET_SCHEMA, registry=VRS_REF_REGISTRY), validator)
+        self.assertIsNot(get_schema_validator(PHENOPACKET_SCHEMA, check_formats=False), validator)
+
     def test_ingesting_experiments_json(self):
         # ingest phenopackets data in order to match to biosample ids
         p = WORKFLOW_INGEST_FUNCTION_MAP[WORKFLOW_PHENOPACKETS_JSON](EXAMPLE_INGEST_PHENOPACKET, self.d.identifier)
@@ -273,3 +322,135 @@ class IngestISOAgeToNumberTest(TestCase):
         for phenopacket in ingested_phenopackets:
             self.assertIsNotNone(phenopacket.subject.extra_properties)
             self.assertIsNotNone(ind_1.subject.date_of_birth)
+
+
+def _strip_generated_fields(data):
+    # Auto-incremented IDs and timestamps differ between two ingests of the same data
+    if isinstance(data, dict):
+        return {
+            k: _strip_generated_fields(v) for k, v in data.items()
+            if k not in ("created", "updated") and not (k == "id" and isinstance(v, int))
+        }
+    if isinstance(data, list):
+        return [_strip_generated_fields(v) for v in data]
+    return data
+
+
+class BulkIngestTest(TestCase):
+    def setUp(self) -> None:
+        p = Project.objects.create(title="Project 1", description="")
+        self.d = Dataset.objects.create(title="Dataset 1", description="Some dataset", data_use=VALID_DATA_USE_1,
+                                        project=p)
+
+    @staticmethod
+    def _db_state():
+        phenopackets = PhenopacketSerializer(Phenopacket.objects.all().order_by("id"), many=True).data
+        return {
+            "phenopackets": _strip_generated_fields(json.loads(json.dumps(phenopackets, default=str))),
+            "counts": {
+                model.__name__: model.objects.count()
+                for model in (pm.Individual, pm.Biosample, pm.PhenotypicFeature, pm.Disease, pm.MetaData,
+                              Resource, pm.Interpretation, pm.Diagnosis, pm.GenomicInterpretation,
+                              pm.GeneDescriptor, pm.VariationDescriptor, pm.VariantInterpretation)
+            },
+            "individuals": list(pm.Individual.objects.order_by("id").values_list("id", "extra_properties")),
+        }
+
+    def _assert_same_state(self, phenopackets):
+        phenopackets = decamelize(phenopackets)
+
+        with transaction.atomic():
+            for p in copy.deepcopy(phenopackets):
+                ingest_phenopacket(p, self.d.identifier)
+            state = self._db_state()
+            transaction.set_rollback(True)
+
+        with transaction.atomic():
+            ingested = ingest_phenopackets_bulk(copy.deepcopy(phenopackets), self.d.identifier, chunk_size=2)
+            self.assertListEqual([p.id for p in ingested], [p["id"] for p in phenopackets])
+            self.assertDictEqual(self._db_state(), state)
+            transaction.set_rollback(True)
+
+    def test_bulk_ingest_same_state(self):
+        self._assert_same_state(EXAMPLE_INGEST_MULTIPLE_PHENOPACKETS)
+
+    def test_bulk_ingest_same_state_shared_objects(self):
+        # Second phenopacket shares its subject, biosamples and resources with the first (with new extra properties)
+        self._assert_same_state([EXAMPLE_INGEST_PHENOPACKET, EXAMPLE_INGEST_PHENOPACKET_UPDATE])
+
+    def test_bulk_ingest_existing_id(self):
+        ingest_phenopacket(decamelize(EXAMPLE_INGEST_PHENOPACKET), self.d.identifier)
+        with self.assertRaises(IngestError):
+            ingest_phenopackets_bulk([decamelize(EXAMPLE_INGEST_PHENOPACKET)], self.d.identifier)
+        with self.assertRaises(IngestError):
+            ingest_phenopackets_bulk([decamelize(EXAMPLE_INGEST_PHENOPACKET_UPDATE)] * 2, self.d.identifier)
+
+    def test_bulk_ingest_invalid(self):
+        with self.assertRaises(IngestError):
+            ingest_phenopackets_bulk([EXAMPLE_INGEST_INVALID_PHENOPACKET], self.d.identifier)
+
+
+class StreamingIngestTest(TestCase):
+    def setUp(self) -> None:
+        p = Project.objects.create(title="Project 1", description="")
+        self.d = Dataset.objects.create(title="Dataset 1", description="Some dataset", data_use=VALID_DATA_USE_1,
+                                        project=p)
+
+    def test_iter_json_records(self):
+        records = [*EXAMPLE_INGEST_MULTIPLE_PHENOPACKETS, 1, -2.5e-3, "a \\\" string", True, None, [], {}]
+        ndjson = "\n".join(json.dumps(r) for r in records)
+
+        # Tiny reads, to make sure values cut off at the end of a read are handled
+        for read_size in (1, 7, 64 * 1024):
+            self.assertListEqual(list(iter_json_records(io.StringIO(json.dumps(records)), read_size)), records)
+            self.assertListEqual(list(iter_json_records(io.StringIO(json.dumps(records, indent=2)), read_size)),
+                                 records)
+            self.assertListEqual(list(iter_json_records(io.StringIO(ndjson), read_size)), records)
+            self.assertListEqual(list(iter_json_records(io.StringIO(json.dumps(EXAMPLE_INGEST_PHENOPACKET)),
+                                                        read_size)), [EXAMPLE_INGEST_PHENOPACKET])
+
+        for malformed in ("[1, 2", "[1 2]", '[{"a": }]', "[1] 2", '"abc'):
+            with self.assertRaises(IngestError):
+                list(iter_json_records(io.StringIO(malformed), 2))
+
+    def test_iter_experiments_document(self):
+        expected = [
+            *(("experiments", e) for e in EXAMPLE_INGEST_EXPERIMENT["experiments"]),
+            *(("resources", r) for r in EXAMPLE_INGEST_EXPERIMENT["resources"]),
+        ]
+        self.assertListEqual(
+            list(iter_experiments_document(io.StringIO(json.dumps(EXAMPLE_INGEST_EXPERIMENT)), 5)), expected)
+
+        ndjson = "\n".join(json.dumps(e) for e in EXAMPLE_INGEST_EXPERIMENT["experiments"] * 2)
+        self.assertListEqual(
+            list(iter_experiments_document(io.StringIO(ndjson), 5)),
+            [("experiments", e) for e in EXAMPLE_INGEST_EXPERIMENT["experiments"] * 2])
+
+    def test_phenopackets_stream_resume(self):
+        source = "file:///phenopackets.json"
+        data = json.dumps([*EXAMPLE_INGEST_MULTIPLE_PHENOPACKETS, EXAMPLE_INGEST_INVALID_PHENOPACKET])
+
+        # The last chunk fails validation; everything before it stays committed, and the checkpoint records it
+        with self.assertRaises(IngestError):
+            ingest_phenopackets_stream(io.StringIO(data), self.d.identifier, source, chunk_size=2)
+        self.assertEqual(Phenopacket.objects.count(), 6)
+        checkpoint = IngestCheckpoint.objects.get(dataset=self.d, source=source)
+        self.assertEqual(checkpoint.records_ingested, 6)
+
+        # Re-running the ingest with a fixed file picks up after the last committed chunk
+        data = json.dumps(EXAMPLE_INGEST_MULTIPLE_PHENOPACKETS)
+        self.assertEqual(ingest_phenopackets_stream(io.StringIO(data), self.d.identifier, source, chunk_size=2), 7)
+        self.assertListEqual(sorted(Phenopacket.objects.values_list("id", flat=True)),
+                             sorted(p["id"] for p in EXAMPLE_INGEST_MULTIPLE_PHENOPACKETS))
+        self.assertFalse(IngestCheckpoint.objects.exists())
+
+    def test_experiments_stream(self):
+        WORKFLOW_INGEST_FUNCTION_MAP[WORKFLOW_PHENOPACKETS_JSON](EXAMPLE_INGEST_PHENOPACKET, self.d.identifier)
+
+        n = ingest_experiments_stream(
+            io.StringIO(json.dumps(EXAMPLE_INGEST_EXPERIMENT)), self.d.identifier, "experiments.json", chunk_size=1)
+        self.assertEqual(n, 2)
+        self.assertListEqual(list(Experiment.objects.values_list("id", flat=True)),
+                             [e["id"] for e in EXAMPLE_INGEST_EXPERIMENT["experiments"]])
+        self.assertListEqual(list(self.d.additional_resources.values_list("id", flat=True)),
+                             [r["id"] for r in EXAMPLE_INGEST_EXPERIMENT["resources"]])
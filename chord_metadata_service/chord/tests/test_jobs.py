@@ -0,0 +1,122 @@
+import json
+import uuid
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from chord_metadata_service.chord.job_progress import JobCancelled, JobProgress, report_job_progress
+from chord_metadata_service.chord.jobs import cancel_job, job_progress, submit_job
+from chord_metadata_service.chord.models import Dataset, Job
+from chord_metadata_service.phenopackets.models import Phenopacket
+from chord_metadata_service.phenopackets.tests.helpers import PhenoTestCase
+from chord_metadata_service.restapi.tests.utils import load_local_json
+from .constants import VALID_PROJECT_1, valid_dataset_1
+
+
+@override_settings(JOB_WORKERS=0)
+class JobsTest(APITestCase):
+    def setUp(self) -> None:
+        r = self.client.post(reverse("project-list"), data=json.dumps(VALID_PROJECT_1), content_type="application/json")
+        self.project = r.json()
+
+        r = self.client.post('/api/datasets', data=json.dumps(valid_dataset_1(self.project["identifier"])),
+                             content_type="application/json")
+        self.dataset = r.json()
+        self.ingest_url = reverse("ingest-into-dataset", args=(self.dataset["identifier"], "phenopackets_json"))
+
+    def test_async_ingest(self):
+        r = self.client.post(f"{self.ingest_url}?async=true", content_type="application/json",
+                             data=json.dumps(load_local_json("example_phenopacket_v2.json")))
+        self.assertEqual(r.status_code, status.HTTP_202_ACCEPTED)
+        job = r.json()
+        self.assertEqual(job["job_type"], Job.TYPE_INGEST)
+        self.assertEqual(job["params"]["dataset_id"], self.dataset["identifier"])
+        self.assertEqual(job["status"], Job.STATUS_SUCCEEDED)
+        self.assertDictEqual(job["progress"], {"records_validated": 1, "rows_written": 1})
+        self.assertEqual(Phenopacket.objects.count(), 1)
+
+        r = self.client.get(reverse("job-detail", args=(job["id"],)))
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(r.json()["status"], Job.STATUS_SUCCEEDED)
+        self.assertIsNotNone(r.json()["finished"])
+
+    def test_async_ingest_failed(self):
+        r = self.client.post(f"{self.ingest_url}?async=true", content_type="application/json",
+                             data=json.dumps(load_local_json("example_invalid_phenopacket.json")))
+        self.assertEqual(r.status_code, status.HTTP_202_ACCEPTED)
+        job = r.json()
+        self.assertEqual(job["status"], Job.STATUS_FAILED)
+        self.assertNotEqual(job["error"], "")
+        self.assertEqual(Phenopacket.objects.count(), 0)
+
+    def test_job_list(self):
+        self.client.post(f"{self.ingest_url}?async=true", content_type="application/json",
+                         data=json.dumps(load_local_json("example_phenopacket_v2.json")))
+        r = self.client.post(reverse("job-submit-cleanup"))
+        self.assertEqual(r.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(r.json()["status"], Job.STATUS_SUCCEEDED)
+        self.assertEqual(r.json()["result"], {"n_removed": 0})
+
+        r = self.client.get(reverse("job-list"))
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertListEqual([j["job_type"] for j in r.json()], [Job.TYPE_CLEANUP, Job.TYPE_INGEST])
+
+        r = self.client.get(reverse("job-list"), {"job_type": Job.TYPE_INGEST})
+        self.assertEqual(len(r.json()), 1)
+        r = self.client.get(reverse("job-list"), {"status": Job.STATUS_FAILED})
+        self.assertEqual(len(r.json()), 0)
+
+    def test_job_not_found(self):
+        for job_id in (str(uuid.uuid4()), "not-a-uuid"):
+            r = self.client.get(reverse("job-detail", args=(job_id,)))
+            self.assertEqual(r.status_code, status.HTTP_404_NOT_FOUND)
+            r = self.client.post(reverse("job-cancel", args=(job_id,)))
+            self.assertEqual(r.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(JOB_WORKERS=1)
+    def test_cancel_queued_job(self):
+        # Jobs are only queued once the transaction (here, the test's) is committed, so this one stays queued
+        job = submit_job(Job.TYPE_CLEANUP, {})
+        self.assertEqual(job.status, Job.STATUS_QUEUED)
+
+        r = self.client.post(reverse("job-cancel", args=(job.id,)))
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(r.json()["status"], Job.STATUS_CANCELLED)
+        self.assertTrue(r.json()["cancel_requested"])
+
+        # Cancelling a finished job does nothing
+        r = self.client.post(reverse("job-cancel", args=(job.id,)))
+        self.assertEqual(r.json()["status"], Job.STATUS_CANCELLED)
+
+    @override_settings(JOB_PROGRESS_INTERVAL=0)
+    def test_cancel_running_job(self):
+        job = Job.objects.create(job_type=Job.TYPE_CLEANUP, status=Job.STATUS_RUNNING)
+        with JobProgress(job.id):
+            report_job_progress("objects_removed", 2)
+            self.assertDictEqual(job_progress(job), {"objects_removed": 2})
+            cancel_job(job)
+            with self.assertRaises(JobCancelled):
+                report_job_progress("objects_removed")
+
+        # Running jobs are only marked as cancelled once they stop
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_RUNNING)
+        self.assertTrue(job.cancel_requested)
+
+
+@override_settings(JOB_WORKERS=0)
+class CleanupJobTest(APITestCase, PhenoTestCase):
+    def test_async_dataset_delete(self):
+        r = self.client.delete(
+            reverse("chord-dataset-detail", kwargs={"dataset_id": self.dataset.identifier}) + "?async=true")
+        self.assertEqual(r.status_code, status.HTTP_202_ACCEPTED)
+        self.assertFalse(Dataset.objects.filter(pk=self.dataset.identifier).exists())
+
+        job = Job.objects.get(pk=r.json()["id"])
+        self.assertEqual(job.job_type, Job.TYPE_CLEANUP)
+        self.assertEqual(job.status, Job.STATUS_SUCCEEDED)
+        self.assertGreater(job.result["n_removed"], 0)
+        # Progress also counts removed autocomplete terms, which are not included in the result
+        self.assertGreaterEqual(job.progress["objects_removed"], job.result["n_removed"])
@@ -1,5 +1,10 @@
-from django.db.utils import IntegrityError
-from django.test import TestCase
+import threading
+
+from asgiref.sync import sync_to_async
+from django.db import connection, connections, transaction
+from django.db.utils import IntegrityError, OperationalError
+from django.test import TestCase, TransactionTestCase
+from unittest.mock import patch
 from django.core.exceptions import ValidationError
 from uuid import uuid4
 from chord_metadata_service.chord.tests.helpers import ProjectTestCase
@@ -11,7 +16,14 @@ from chord_metadata_service.phenopackets.tests.constants import (
     VALID_INDIVIDUAL_1
 )
 from chord_metadata_service.restapi.models import SchemaType
-from ..models import Project, Dataset, ProjectJsonSchema
+from ..models import Project, Dataset, PrecomputedStatistics, ProjectJsonSchema
+from ..precomputed_statistics import (
+    _current_generation,
+    _store_statistics,
+    aget_precomputed_statistics,
+    get_precomputed_statistics,
+    invalidate_precomputed_statistics,
+)
 from .constants import VALID_DATA_USE_1
 
 
@@ -51,6 +63,90 @@ class DatasetTest(TestCase):
         self.assertIn(d.identifier, set(d2.identifier for d2 in p.datasets.all()))
 
 
+class PrecomputedStatisticsTest(TestCase):
+    def setUp(self) -> None:
+        p = Project.objects.create(title="Project 1", description="")
+        self.dataset = Dataset.objects.create(title="Dataset 1", description="Some dataset", data_use=VALID_DATA_USE_1,
+                                              project=p)
+
+    def test_stored(self):
+        self.assertDictEqual(get_precomputed_statistics("key", lambda: {"count": 1}), {"count": 1})
+        self.assertDictEqual(get_precomputed_statistics("key", lambda: {"count": 2}), {"count": 1})
+
+    def test_invalidated_while_computing(self):
+        def compute():
+            # E.g. an ingest committing while statistics are computed from the data before it
+            invalidate_precomputed_statistics()
+            return {"count": 1}
+
+        self.assertDictEqual(get_precomputed_statistics("key", compute), {"count": 1})
+        self.assertFalse(PrecomputedStatistics.objects.filter(key="key").exists())
+        self.assertDictEqual(get_precomputed_statistics("key", lambda: {"count": 2}), {"count": 2})
+
+    async def test_invalidated_while_computing_async(self):
+        async def compute():
+            await sync_to_async(invalidate_precomputed_statistics)()
+            return {"count": 1}
+
+        self.assertDictEqual(await aget_precomputed_statistics("key", compute), {"count": 1})
+        self.assertFalse(await PrecomputedStatistics.objects.filter(key="key").aexists())
+
+    def test_dataset_deleted_while_computing(self):
+        def compute():
+            Dataset.objects.filter(pk=self.dataset.identifier).delete()
+            return {"count": 1}
+
+        self.assertDictEqual(
+            get_precomputed_statistics("key", compute, dataset_id=self.dataset.identifier), {"count": 1})
+        self.assertFalse(PrecomputedStatistics.objects.filter(key="key").exists())
+
+    def test_lock_failure(self):
+        with patch.object(PrecomputedStatistics.objects, "update_or_create", side_effect=OperationalError):
+            self.assertDictEqual(get_precomputed_statistics("key", lambda: {"count": 1}), {"count": 1})
+        self.assertFalse(PrecomputedStatistics.objects.filter(key="key").exists())
+
+
+class PrecomputedStatisticsLockTest(TransactionTestCase):
+    # Outside of a test transaction, so that another connection can hold locks at the same time
+
+    def setUp(self) -> None:
+        p = Project.objects.create(title="Project 1", description="")
+        self.dataset = Dataset.objects.create(title="Dataset 1", description="Some dataset", data_use=VALID_DATA_USE_1,
+                                              project=p)
+
+    def test_store_during_ingest(self):
+        # Ingests hold key share locks on their dataset (from foreign keys to it) until they commit; storing statistics
+        # for the dataset must not wait on them, or it could deadlock with their invalidation of statistics.
+        locked = threading.Event()
+        stored = threading.Event()
+
+        def ingest():
+            try:
+                with transaction.atomic():
+                    with connection.cursor() as cursor:
+                        cursor.execute(f'SELECT 1 FROM "{Dataset._meta.db_table}" WHERE identifier = %s FOR KEY SHARE',
+                                       [self.dataset.identifier])
+                    locked.set()
+                    stored.wait(10)
+            finally:
+                connections.close_all()
+
+        thread = threading.Thread(target=ingest)
+        thread.start()
+        try:
+            self.assertTrue(locked.wait(10))
+            generation = _current_generation()
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL lock_timeout = '2s'")
+                _store_statistics("key", {"count": 1}, self.dataset.identifier, generation)
+        finally:
+            stored.set()
+            thread.join()
+
+        self.assertTrue(PrecomputedStatistics.objects.filter(key="key").exists())
+
+
 TABLE_ID = str(uuid4())
 SERVICE_ID = str(uuid4())
 
@@ -1,7 +1,35 @@
-from django.test import TestCase
+from bento_lib.search import postgres
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from io import StringIO
 from jsonschema import Draft7Validator
 
-from ..data_types import DATA_TYPES
+from .constants import (
+    TEST_SEARCH_QUERY_1,
+    TEST_SEARCH_QUERY_2,
+    TEST_SEARCH_QUERY_3,
+    TEST_SEARCH_QUERY_5,
+    TEST_SEARCH_QUERY_7,
+    TEST_SEARCH_QUERY_10,
+)
+from ..data_types import DATA_TYPE_EXPERIMENT, DATA_TYPE_PHENOPACKET, DATA_TYPES
+from ..models import SearchFieldTraffic
+from ..search_indexes import (
+    INDEX_BTREE,
+    INDEX_TRIGRAM,
+    advise_search_indexes,
+    get_existing_index_names,
+    get_search_index_usage,
+)
+from ..search_query_cache import (
+    SearchQueryCacheInfo,
+    clear_search_query_cache,
+    compile_search_query,
+    search_query_cache_info,
+)
+from ..search_traffic import flush_search_traffic, record_search_traffic, search_query_fields
 
 
 class SchemaTest(TestCase):
@@ -10,3 +38,181 @@ class SchemaTest(TestCase):
         for d in DATA_TYPES.values():
             Draft7Validator.check_schema(d["schema"])
             Draft7Validator.check_schema(d["metadata_schema"])
+
+
+class SearchQueryCacheTest(TestCase):
+    def setUp(self) -> None:
+        clear_search_query_cache()
+
+    def tearDown(self) -> None:
+        clear_search_query_cache()
+
+    def assert_compiles_like_uncached(self, query, data_type=DATA_TYPE_PHENOPACKET):
+        compiled_query, params = compile_search_query(query, data_type)
+        expected_query, expected_params = postgres.search_query_to_psycopg2_sql(query, DATA_TYPES[data_type]["schema"])
+        self.assertEqual(compiled_query, expected_query)
+        self.assertEqual(params, expected_params)
+
+    def test_same_shape_hits(self):
+        self.assert_compiles_like_uncached(TEST_SEARCH_QUERY_1)
+        self.assertEqual(search_query_cache_info(), SearchQueryCacheInfo(0, 1, settings.SEARCH_QUERY_CACHE_SIZE, 1))
+
+        # Only the literal differs
+        self.assert_compiles_like_uncached(TEST_SEARCH_QUERY_2)
+        self.assertEqual(search_query_cache_info(), SearchQueryCacheInfo(1, 1, settings.SEARCH_QUERY_CACHE_SIZE, 1))
+
+    def test_different_shape_misses(self):
+        self.assert_compiles_like_uncached(TEST_SEARCH_QUERY_1)
+        self.assert_compiles_like_uncached(TEST_SEARCH_QUERY_3)
+        self.assert_compiles_like_uncached(TEST_SEARCH_QUERY_7, DATA_TYPE_EXPERIMENT)
+        # Different literal type
+        self.assert_compiles_like_uncached(["#eq", ["#resolve", "subject", "sex"], 1])
+        self.assertEqual(search_query_cache_info().hits, 0)
+        self.assertEqual(search_query_cache_info().misses, 4)
+
+    def test_transformed_literals(self):
+        queries = (
+            (TEST_SEARCH_QUERY_5, ["#ico", TEST_SEARCH_QUERY_5[1], "50%_off"]),
+            (TEST_SEARCH_QUERY_10, ["#in", TEST_SEARCH_QUERY_10[1], ["#list", "a", "b"]]),
+            (["#iew", TEST_SEARCH_QUERY_5[1], "a"], ["#iew", TEST_SEARCH_QUERY_5[1], "b"]),
+            (["#and", TEST_SEARCH_QUERY_1, ["#isw", TEST_SEARCH_QUERY_5[1], "a"]],
+             ["#and", TEST_SEARCH_QUERY_2, ["#isw", TEST_SEARCH_QUERY_5[1], "b"]]),
+        )
+        for query, same_shape_query in queries:
+            self.assert_compiles_like_uncached(query)
+            self.assert_compiles_like_uncached(same_shape_query)
+        self.assertEqual(search_query_cache_info().hits, len(queries))
+
+        # Same literal and field, but another wildcard location
+        self.assert_compiles_like_uncached(["#isw", TEST_SEARCH_QUERY_5[1], "a"])
+        self.assertEqual(search_query_cache_info().hits, len(queries))
+
+    def test_invalid_queries(self):
+        for query in (
+            ["#eq", ["#resolve", "subject", "sex"]],
+            ["#eq", ["#resolve", "subject", "does_not_exist"], "a"],
+            ["#ico", TEST_SEARCH_QUERY_5[1], 5],
+            ["#eq", ["#resolve", ["subject"], "sex"], "a"],
+            ["#eq", ["#resolve", "subject", "sex"], {"a": "b"}],
+        ):
+            for _ in range(2):
+                with self.assertRaises((SyntaxError, TypeError, ValueError)):
+                    compile_search_query(query, DATA_TYPE_PHENOPACKET)
+
+        self.assertEqual(search_query_cache_info().currsize, 0)
+
+    @override_settings(SEARCH_QUERY_CACHE_SIZE=1)
+    def test_eviction(self):
+        self.assert_compiles_like_uncached(TEST_SEARCH_QUERY_1)
+        self.assert_compiles_like_uncached(TEST_SEARCH_QUERY_3)
+        self.assert_compiles_like_uncached(TEST_SEARCH_QUERY_2)
+        self.assertEqual(search_query_cache_info(), SearchQueryCacheInfo(0, 3, 1, 1))
+
+
+class SearchIndexTest(TestCase):
+    def setUp(self) -> None:
+        self.indexes, self.unindexable, self.skipped = advise_search_indexes()
+        self.by_field = {}
+        for index in self.indexes:
+            for field in index.fields:
+                self.by_field.setdefault(field, set()).add((index.kind, index.table, index.expression))
+
+    def test_advised_indexes(self):
+        self.assertEqual(
+            self.by_field[f"{DATA_TYPE_EXPERIMENT}: extraction_protocol"],
+            {(INDEX_BTREE, "experiments_experiment", "\"extraction_protocol\""),
+             (INDEX_TRIGRAM, "experiments_experiment", "\"extraction_protocol\"")})
+
+        # Values within JSONB and array columns are searched through jsonb_to_record/unnest, which no index serves
+        self.assertNotIn(f"{DATA_TYPE_PHENOPACKET}: diseases.[item].term.label", self.by_field)
+        self.assertNotIn(f"{DATA_TYPE_PHENOPACKET}: subject.taxonomy.id", self.by_field)
+        self.assertNotIn(f"{DATA_TYPE_EXPERIMENT}: qc_flags.[item]", self.by_field)
+        # ... but they are reported
+        unindexable = {f"{f.data_type}: {f.path}": f.read_via for f in self.unindexable}
+        self.assertEqual(unindexable[f"{DATA_TYPE_PHENOPACKET}: diseases.[item].term.label"], "jsonb_to_record")
+        self.assertEqual(unindexable[f"{DATA_TYPE_PHENOPACKET}: subject.taxonomy.id"], "jsonb_to_record")
+        self.assertEqual(unindexable[f"{DATA_TYPE_EXPERIMENT}: qc_flags.[item]"], "unnest")
+
+        # Primary keys are indexed already
+        self.assertNotIn(f"{DATA_TYPE_PHENOPACKET}: id", self.by_field)
+        # Booleans are not worth indexing
+        self.assertNotIn(f"{DATA_TYPE_PHENOPACKET}: phenotypic_features.[item].excluded", self.by_field)
+
+        self.assertEqual(len({i.name for i in self.indexes}), len(self.indexes))
+        self.assertTrue(all(len(i.name) <= 63 for i in self.indexes))
+
+    def test_indexes_match_compiled_queries(self):
+        # Every advised index is on an expression which compiled searches on its fields actually compare
+        for index in self.indexes:
+            for field_id in index.fields:
+                data_type, path = field_id.split(": ")
+                fn, condition = (
+                    ("#ico", f'."{index.column}" ILIKE') if index.kind == INDEX_TRIGRAM
+                    else ("#eq", f'."{index.column}") = ('))
+                sql, _params = postgres.search_query_to_psycopg2_sql(
+                    [fn, ["#resolve", *path.split(".")], ""], DATA_TYPES[data_type]["schema"], internal=True)
+                with connection.cursor() as cursor:
+                    self.assertIn(condition, sql.as_string(cursor.cursor), field_id)
+
+    def test_index_serves_search(self):
+        index = next(i for i in self.indexes if i.name.startswith("experiments_experiment_study_type_"))
+        query = ["#eq", ["#resolve", "study_type"], "Genomics"]
+        sql, params = postgres.search_query_to_psycopg2_sql(query, DATA_TYPES[DATA_TYPE_EXPERIMENT]["schema"])
+
+        with connection.cursor() as cursor:
+            cursor.execute(index.create_sql())
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute(sql.as_string(cursor.cursor).replace("SELECT", "EXPLAIN SELECT", 1), params)
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+        self.assertIn(index.name, plan)
+
+        self.assertIn(index.name, get_existing_index_names())
+
+    def test_commands(self):
+        out = StringIO()
+        call_command("advise_search_indexes", "--sql", stdout=out)
+        lines = out.getvalue().strip().split("\n")
+        self.assertEqual(lines[0], "CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+        self.assertEqual(len(lines), len(self.indexes) + 1)
+
+        out = StringIO()
+        call_command("advise_search_indexes", stdout=out)
+        self.assertIn(f"{DATA_TYPE_EXPERIMENT}: qc_flags.[item] (unnest on experiments_experiment.qc_flags)",
+                      out.getvalue())
+        call_command("search_index_usage", stdout=StringIO())
+
+
+class SearchTrafficTest(TestCase):
+    def setUp(self) -> None:
+        # Drop traffic left pending by searches in other tests
+        flush_search_traffic()
+        SearchFieldTraffic.objects.all().delete()
+
+    def test_search_query_fields(self):
+        self.assertEqual(search_query_fields(TEST_SEARCH_QUERY_1), {"subject.sex"})
+        self.assertEqual(
+            search_query_fields(["#and", TEST_SEARCH_QUERY_1, ["#not", TEST_SEARCH_QUERY_5]]),
+            {"subject.sex", ".".join(TEST_SEARCH_QUERY_5[1][1:])})
+        self.assertEqual(search_query_fields(True), set())
+
+    @override_settings(SEARCH_TRAFFIC_FLUSH_INTERVAL=0)
+    def test_record_search_traffic(self):
+        for _ in range(3):
+            record_search_traffic(DATA_TYPE_PHENOPACKET, TEST_SEARCH_QUERY_1)
+        record_search_traffic(DATA_TYPE_EXPERIMENT, ["#eq", ["#resolve", "molecule"], "total RNA"])
+
+        self.assertEqual(
+            SearchFieldTraffic.objects.get(data_type=DATA_TYPE_PHENOPACKET, field="subject.sex").searches, 3)
+        self.assertEqual(
+            SearchFieldTraffic.objects.get(data_type=DATA_TYPE_EXPERIMENT, field="molecule").searches, 1)
+
+        indexes, _, _ = advise_search_indexes((DATA_TYPE_EXPERIMENT,))
+        usage = {u.index.name: u for u in get_search_index_usage(indexes)}
+        self.assertEqual(sum(u.searches for u in usage.values()), 1)
+
+    @override_settings(SEARCH_TRAFFIC_FLUSH_INTERVAL=3600)
+    def test_buffered_search_traffic(self):
+        record_search_traffic(DATA_TYPE_PHENOPACKET, TEST_SEARCH_QUERY_1)
+        self.assertFalse(SearchFieldTraffic.objects.exists())
+        flush_search_traffic()
+        self.assertEqual(SearchFieldTraffic.objects.get(field="subject.sex").searches, 1)
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views_data_types, views_search
+from . import views_data_types, views_jobs, views_search
 from .export import views as views_export
 from .ingest import views as views_ingest
 from .workflows import views as views_workflow
@@ -15,6 +15,11 @@ urlpatterns = [
 
     path('ingest/<str:dataset_id>/<str:workflow_id>', views_ingest.ingest_into_dataset, name="ingest-into-dataset"),
 
+    path('private/jobs', views_jobs.job_list, name="job-list"),
+    path('private/jobs/cleanup', views_jobs.job_submit_cleanup, name="job-submit-cleanup"),
+    path('private/jobs/<str:job_id>', views_jobs.job_detail, name="job-detail"),
+    path('private/jobs/<str:job_id>/cancel', views_jobs.job_cancel, name="job-cancel"),
+
     path('data-types', views_data_types.data_type_list, name="data-type-list"),
     path('data-types/<str:data_type>', views_data_types.data_type_detail, name="data-type-detail"),
     path('data-types/<str:data_type>/schema', views_data_types.data_type_schema, name="data-type-schema"),
@@ -26,6 +31,7 @@ urlpatterns = [
     path('fhir-search', views_search.fhir_public_search, name="fhir-search"),
     path('private/fhir-search', views_search.fhir_private_search, name="fhir-private-search"),
     path('private/search', views_search.chord_private_search, name="private-search"),
+    path('private/search-query-cache', views_search.search_query_cache_stats, name="private-search-query-cache"),
 
     path('datasets', DatasetViewSet.as_view({'get': 'list'}), name="chord-dataset-list"),
     path('datasets/<str:dataset_id>', DatasetViewSet.as_view({'get': 'retrieve', 'delete': 'destroy'}),
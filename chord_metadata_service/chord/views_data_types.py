@@ -1,6 +1,11 @@
+import asyncio
+
+from asgiref.sync import async_to_sync, sync_to_async
 from bento_lib.responses import errors
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db.models import QuerySet
+from django.db import connection, connections
+from django.db.models import Count, Max, QuerySet
 from django.http import HttpRequest
 
 from adrf.decorators import api_view
@@ -13,12 +18,18 @@ from typing import Callable
 
 from chord_metadata_service.chord.models import Dataset, Project
 from chord_metadata_service.chord.permissions import OverrideOrSuperUserOnly, ReadOnly
-from chord_metadata_service.cleanup import run_all_cleanup
+from chord_metadata_service.cleanup import collect_cleanup_candidates, run_all_cleanup
 from chord_metadata_service.experiments.models import Experiment
 from chord_metadata_service.logger import logger
+from chord_metadata_service.patients.search_vector import update_individual_search_vectors
 from chord_metadata_service.phenopackets.models import Phenopacket
 
 from . import data_types as dt
+from .jobs import submit_cleanup_job
+from .precomputed_statistics import aget_precomputed_statistics
+from .views_jobs import is_async_request, job_response
+
+DATA_TYPE_COUNTS_STATISTICS_KEY = "data_type_counts"
 
 QUERYSET_FN: dict[str, Callable] = {
     dt.DATA_TYPE_EXPERIMENT: lambda dataset_id: Experiment.objects.filter(dataset_id=dataset_id),
@@ -75,17 +86,81 @@ async def get_last_ingested_for_data_type(data_type: str, project: str | None =
     return latest_obj.created
 
 
-async def make_data_type_response_object(
-    data_type_id: str,
-    data_type_details: dict,
-    project: str | None,
-    dataset: str | None,
-) -> dict:
+async def get_stats_for_data_type(data_type: str, project: str | None = None, dataset: str | None = None) -> dict:
+    """
+    Returns the count and the last ingestion time for a particular data type, in a single query. Like
+    get_count_for_data_type, if dataset is provided, project will be ignored.
+    """
+    q = await _filtered_query(data_type, project, dataset)
+    return await q.aaggregate(count=Count("pk"), last_ingested=Max("created"))
+
+
+def _in_transaction() -> bool:
+    return connection.in_atomic_block
+
+
+def _stats_in_thread(data_type: str, project: str | None, dataset: str | None) -> dict:
+    # Run from a worker thread of its own, like cleanup stages: the query (in a thread-sensitive sync_to_async call)
+    # comes back to this thread, and so uses a connection of its own, which is closed once the data type is counted.
+    try:
+        return async_to_sync(get_stats_for_data_type)(data_type, project, dataset)
+    finally:
+        connections.close_all()
+
+
+async def _compute_stats_for_data_types(project: str | None, dataset: str | None) -> dict[str, dict]:
+    # Database calls from async code all run on one thread (and connection), so data types are counted concurrently
+    # on connections of their own - unless called inside a transaction, since other connections would not see its
+    # changes; data types are then counted one after another.
+    if await sync_to_async(_in_transaction)():
+        return {dt_id: await get_stats_for_data_type(dt_id, project, dataset) for dt_id in dt.DATA_TYPES}
+
+    stats_in_thread = sync_to_async(_stats_in_thread, thread_sensitive=False)
+    stats = await asyncio.gather(*(stats_in_thread(dt_id, project, dataset) for dt_id in dt.DATA_TYPES))
+    return dict(zip(dt.DATA_TYPES, stats))
+
+
+async def get_stats_for_data_types(project: str | None = None, dataset: str | None = None) -> dict[str, dict]:
+    """
+    Returns the count and the last ingestion time of every data type, by data type ID, counting each data type in a
+    single query on a connection of its own (see _compute_stats_for_data_types). With DATA_TYPE_COUNTS_PRECOMPUTED,
+    these are stored as precomputed statistics, which ingests and cleanup invalidate, so that polling them does not
+    count every table on each request.
+    """
+
+    if not settings.DATA_TYPE_COUNTS_PRECOMPUTED:
+        return await _compute_stats_for_data_types(project, dataset)
+
+    if dataset:
+        key = f"{DATA_TYPE_COUNTS_STATISTICS_KEY}:dataset:{dataset}"
+    elif project:
+        key = f"{DATA_TYPE_COUNTS_STATISTICS_KEY}:project:{project}"
+    else:
+        key = DATA_TYPE_COUNTS_STATISTICS_KEY
+
+    # Stored as statistics over all data (no dataset ID), so that any ingest or cleanup invalidates them.
+    return await aget_precomputed_statistics(key, lambda: _compute_stats_for_data_types(project, dataset))
+
+
+async def get_stats_for_requested_data_type(data_type: str, project: str | None = None,
+                                            dataset: str | None = None) -> dict[str, dict]:
+    """
+    Returns the count and the last ingestion time of a single data type, in the form of get_stats_for_data_types.
+    Precomputed statistics cover every data type at once; otherwise, only the requested data type is counted.
+    """
+
+    if settings.DATA_TYPE_COUNTS_PRECOMPUTED:
+        return await get_stats_for_data_types(project, dataset)
+
+    return {data_type: await get_stats_for_data_type(data_type, project, dataset)}
+
+
+def make_data_type_response_object(data_type_id: str, data_type_details: dict, stats: dict[str, dict]) -> dict:
     return {
         **data_type_details,
         "id": data_type_id,
-        "count": await get_count_for_data_type(data_type_id, project, dataset),
-        "last_ingested": await get_last_ingested_for_data_type(data_type_id, project, dataset)
+        "count": stats[data_type_id]["count"],
+        "last_ingested": stats[data_type_id]["last_ingested"],
     }
 
 
@@ -97,13 +172,12 @@ async def data_type_list(request: HttpRequest):
     project = request.GET.get("project", "").strip() or None
     dataset = request.GET.get("dataset", "").strip() or None
 
-    dt_response = []
-    for dt_id, dt_d in dt.DATA_TYPES.items():
-        try:
-            dt_response.append(await make_data_type_response_object(dt_id, dt_d, project, dataset))
-        except ValueError as e:
-            return Response(errors.bad_request_error(str(e)), status=status.HTTP_400_BAD_REQUEST)
+    try:
+        stats = await get_stats_for_data_types(project, dataset)
+    except ValueError as e:
+        return Response(errors.bad_request_error(str(e)), status=status.HTTP_400_BAD_REQUEST)
 
+    dt_response = [make_data_type_response_object(dt_id, dt_d, stats) for dt_id, dt_d in dt.DATA_TYPES.items()]
     dt_response.sort(key=lambda d: d["id"])
     return Response(dt_response)
 
@@ -120,10 +194,12 @@ async def data_type_detail(request: HttpRequest, data_type: str):
     dataset = request.GET.get("dataset", "").strip() or None
 
     try:
-        return Response(await make_data_type_response_object(data_type, dt.DATA_TYPES[data_type], project, dataset))
+        stats = await get_stats_for_requested_data_type(data_type, project, dataset)
     except ValueError as e:
         return Response(errors.bad_request_error(str(e)), status=status.HTTP_400_BAD_REQUEST)
 
+    return Response(make_data_type_response_object(data_type, dt.DATA_TYPES[data_type], stats))
+
 
 @api_view(["GET"])
 @permission_classes([AllowAny])
@@ -154,23 +230,30 @@ async def dataset_data_type(request: HttpRequest, dataset_id: str, data_type: st
     qs = QUERYSET_FN[data_type](dataset_id)
 
     if request.method == "DELETE":
+        # Only objects reachable from the deleted ones can be orphaned by deleting them
+        candidates = await collect_cleanup_candidates(
+            phenopackets=qs if data_type == dt.DATA_TYPE_PHENOPACKET else Phenopacket.objects.none(),
+            experiments=qs if data_type == dt.DATA_TYPE_EXPERIMENT else Experiment.objects.none(),
+        )
         await qs.adelete()
+        # Deleted objects were part of the search documents of the individuals they were related to
+        await sync_to_async(update_individual_search_vectors)(candidates["individuals"])
+
+        if is_async_request(request):
+            job = await sync_to_async(submit_cleanup_job)(candidates)
+            logger.info(f"Submitted cleanup {job} after clearing data type {data_type} in dataset {dataset_id} via API")
+            return job_response(job, status.HTTP_202_ACCEPTED)
 
         logger.info(f"Running cleanup after clearing data type {data_type} in dataset {dataset_id} via API")
-        n_removed = await run_all_cleanup()
+        n_removed = await run_all_cleanup(candidates)
         logger.info(f"Cleanup: removed {n_removed} objects in total")
 
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     project = await Project.objects.aget(datasets=dataset_id)
-    response_object = await make_data_type_response_object(
-        data_type,
-        dt.DATA_TYPES[data_type],
-        project=str(project.identifier),
-        dataset=dataset_id,
-    )
+    stats = await get_stats_for_requested_data_type(data_type, project=str(project.identifier), dataset=dataset_id)
 
-    return Response(response_object)
+    return Response(make_data_type_response_object(data_type, dt.DATA_TYPES[data_type], stats))
 
 
 @api_view(["GET"])
@@ -179,14 +262,11 @@ async def dataset_datatype_summary(_request: HttpRequest, dataset_id: str):
     dataset = await Dataset.objects.aget(identifier=dataset_id)
     project = await Project.objects.aget(datasets=dataset)
 
-    dt_response = []
-    for dt_id, dt_d in dt.DATA_TYPES.items():
-        try:
-            dt_response.append(
-                await make_data_type_response_object(dt_id, dt_d, project.identifier, dataset.identifier)
-            )
-        except ValueError as e:
-            return Response(errors.bad_request_error(str(e)), status=status.HTTP_400_BAD_REQUEST)
+    try:
+        stats = await get_stats_for_data_types(str(project.identifier), str(dataset.identifier))
+    except ValueError as e:
+        return Response(errors.bad_request_error(str(e)), status=status.HTTP_400_BAD_REQUEST)
 
+    dt_response = [make_data_type_response_object(dt_id, dt_d, stats) for dt_id, dt_d in dt.DATA_TYPES.items()]
     dt_response.sort(key=lambda d: d["id"])
     return Response(dt_response)
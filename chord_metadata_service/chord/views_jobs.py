@@ -0,0 +1,82 @@
+from django.core.exceptions import ValidationError
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from bento_lib.responses import errors
+
+from .jobs import cancel_job, job_progress, submit_cleanup_job
+from .models import Job
+from .serializers import JobSerializer
+
+__all__ = [
+    "is_async_request",
+    "job_response",
+    "job_list",
+    "job_detail",
+    "job_cancel",
+    "job_submit_cleanup",
+]
+
+# Number of most recent jobs listed
+JOB_LIST_LIMIT = 100
+
+
+def is_async_request(request) -> bool:
+    """
+    Whether a request to an endpoint doing heavy work (ingest, export, delete + cleanup) asks for the work to be run
+    as a background job, rather than in the request.
+    """
+    return request.GET.get("async", "false").strip().lower() == "true"
+
+
+def job_response(job: Job, status_code: int = status.HTTP_200_OK) -> Response:
+    return Response({**JobSerializer(job).data, "progress": job_progress(job)}, status=status_code)
+
+
+def _get_job(job_id: str) -> Job | None:
+    try:
+        return Job.objects.get(pk=job_id)
+    except (Job.DoesNotExist, ValidationError):  # Also raised for malformed UUIDs
+        return None
+
+
+# Mounted on /private/, so will get protected anyway
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def job_list(request):
+    """
+    Lists the most recent jobs, optionally filtered by type and status.
+    """
+    jobs = Job.objects.order_by("-created")
+    if job_type := request.GET.get("job_type"):
+        jobs = jobs.filter(job_type=job_type)
+    if job_status := request.GET.get("status"):
+        jobs = jobs.filter(status=job_status)
+    return Response([{**JobSerializer(job).data, "progress": job_progress(job)} for job in jobs[:JOB_LIST_LIMIT]])
+
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def job_detail(_request, job_id: str):
+    if (job := _get_job(job_id)) is None:
+        return Response(errors.not_found_error(f"Job with ID {job_id} not found"), status=status.HTTP_404_NOT_FOUND)
+    return job_response(job)
+
+
+@api_view(["POST"])
+@permission_classes([AllowAny])
+def job_cancel(_request, job_id: str):
+    if (job := _get_job(job_id)) is None:
+        return Response(errors.not_found_error(f"Job with ID {job_id} not found"), status=status.HTTP_404_NOT_FOUND)
+    return job_response(cancel_job(job))
+
+
+@api_view(["POST"])
+@permission_classes([AllowAny])
+def job_submit_cleanup(_request):
+    """
+    Submits a job removing all orphaned objects in the node.
+    """
+    return job_response(submit_cleanup_job(), status.HTTP_202_ACCEPTED)
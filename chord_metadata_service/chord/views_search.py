@@ -3,11 +3,12 @@ import json
 import logging
 
 from bento_lib.responses import errors
-from bento_lib.search import build_search_response, postgres
+from bento_lib.search import build_search_response
 
 from datetime import datetime
 from django.db import connection
-from django.db.models import Count, F, Q
+from django.db.models import Count, F, Q, QuerySet
+from django.db.models.expressions import RawSQL
 from django.db.models.functions import Coalesce
 from django.contrib.postgres.aggregates import ArrayAgg
 from django.conf import settings
@@ -17,12 +18,15 @@ from rest_framework.permissions import AllowAny
 from rest_framework.request import Request as DrfRequest
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.utils.encoders import JSONEncoder
 
-from typing import Callable
+from typing import Callable, Iterator
 from chord_metadata_service.chord.permissions import OverrideOrSuperUserOnly, ReadOnly
 
 from chord_metadata_service.logger import logger
-from chord_metadata_service.restapi.utils import get_field_bins, queryset_stats_for_field
+from chord_metadata_service.restapi.compiled_serializers import compile_serializer
+from chord_metadata_service.restapi.streaming import NDJSON_CONTENT_TYPE, StreamingResponse
+from chord_metadata_service.restapi.utils import get_field_bins, queryset_stats_for_fields
 
 from chord_metadata_service.experiments.api_views import EXPERIMENT_SELECT_REL, EXPERIMENT_PREFETCH
 from chord_metadata_service.experiments.models import Experiment
@@ -39,6 +43,9 @@ from chord_metadata_service.phenopackets.serializers import PhenopacketSerialize
 
 from .data_types import DATA_TYPE_EXPERIMENT, DATA_TYPE_PHENOPACKET, DATA_TYPES
 from .models import Dataset
+from .precomputed_statistics import get_precomputed_statistics
+from .search_query_cache import compile_search_query, search_query_cache_info
+from .search_traffic import record_search_traffic
 
 from collections import defaultdict
 
@@ -46,6 +53,8 @@ from collections import defaultdict
 OUTPUT_FORMAT_VALUES_LIST = "values_list"
 OUTPUT_FORMAT_BENTO_SEARCH_RESULT = "bento_search_result"
 
+DATASET_SUMMARY_STATISTICS_KEY = "dataset_summary"
+
 
 def experiment_dataset_summary(dataset):
     experiments = Experiment.objects.filter(dataset=dataset)
@@ -61,26 +70,36 @@ def phenopacket_dataset_summary(dataset):
 
     # Sex related fields stats are precomputed here and post processed later
     # to include missing values inferred from the schema
-    individuals_sex = queryset_stats_for_field(phenopacket_qs, "subject__sex")
-    individuals_k_sex = queryset_stats_for_field(phenopacket_qs, "subject__karyotypic_sex")
+    phenopackets_count, stats = queryset_stats_for_fields(phenopacket_qs, [
+        "subject__sex",
+        "subject__karyotypic_sex",
+        "subject__taxonomy__label",
+        "biosamples__is_control_sample",
+        "biosamples__taxonomy__label",
+        "diseases__term__label",
+        "phenotypic_features__pftype__label",
+    ])
+    individuals_sex = stats["subject__sex"]
+    individuals_k_sex = stats["subject__karyotypic_sex"]
 
     return {
-        "count": phenopacket_qs.count(),
+        "count": phenopackets_count,
         "data_type_specific": {
             "biosamples": {
                 "count": phenopacket_qs.values("biosamples__id").count(),
-                "is_control_sample": queryset_stats_for_field(phenopacket_qs, "biosamples__is_control_sample"),
-                "taxonomy": queryset_stats_for_field(phenopacket_qs, "biosamples__taxonomy__label"),
+                "is_control_sample": stats["biosamples__is_control_sample"],
+                "taxonomy": stats["biosamples__taxonomy__label"],
             },
-            "diseases": queryset_stats_for_field(phenopacket_qs, "diseases__term__label"),
+            "diseases": stats["diseases__term__label"],
             "individuals": {
-                "count": phenopacket_qs.values("subject__id").count(),
+                # Each phenopacket has a single subject
+                "count": phenopackets_count,
                 "sex": {k: individuals_sex.get(k, 0) for k in (s[0] for s in Individual.SEX)},
                 "karyotypic_sex": {k: individuals_k_sex.get(k, 0) for k in (s[0] for s in Individual.KARYOTYPIC_SEX)},
-                "taxonomy": queryset_stats_for_field(phenopacket_qs, "subject__taxonomy__label"),
+                "taxonomy": stats["subject__taxonomy__label"],
                 "age": get_field_bins(phenopacket_qs, "subject__age_numeric", 10),
             },
-            "phenotypic_features": queryset_stats_for_field(phenopacket_qs, "phenotypic_features__pftype__label"),
+            "phenotypic_features": stats["phenotypic_features__pftype__label"],
         }
     }
 
@@ -116,15 +135,20 @@ def get_values_list(queryset, options):
     return queryset.values_list(field_lookup, flat=True)
 
 
-def data_type_results(query, params, key="id"):
+def data_type_results(query, params, key="id") -> RawSQL:
+    """
+    Returns the compiled search query as a subquery selecting the given column of its matches, to be embedded into an
+    ORM queryset (e.g. filter(id__in=...)) so that matching and fetching results happen in a single database query,
+    rather than sending every matching ID back to the database.
+    """
     with connection.cursor() as cursor:
-        debug_log(f"Executing SQL:\n    {query.as_string(cursor.connection)}")
-        cursor.execute(query.as_string(cursor.connection), params)
-        return set(dict(zip([col[0] for col in cursor.description], row))[key] for row in cursor.fetchall())
+        subquery = sql.SQL("SELECT {} FROM ({}) AS {}").format(
+            sql.Identifier("_matches", key), query, sql.Identifier("_matches")).as_string(cursor.connection)
+    debug_log(f"Embedding search subquery:\n    {subquery}")
+    return RawSQL(subquery, params)
 
 
 def experiment_query_results(query, params, options=None):
-    # TODO: possibly a quite inefficient way of doing things...
     # TODO: Prefetch related biosample or no?
     queryset = Experiment.objects\
         .filter(id__in=data_type_results(query, params, "id"))
@@ -142,6 +166,7 @@ def get_biosamples_with_experiment_details(subject_ids):
     The function returns a queryset where each entry represents a biosample obtained from a subject, along with
     details of any associated experiment. If a biosample does not have an associated experiment, the experiment
     details are returned as None.
+    subject_ids may be a list of IDs, or a queryset of IDs which is embedded as a subquery.
     """
     biosamples_exp_tissue_details = Biosample.objects.filter(phenopacket__subject_id__in=subject_ids)\
         .values(
@@ -156,6 +181,41 @@ def get_biosamples_with_experiment_details(subject_ids):
     return biosamples_exp_tissue_details
 
 
+def group_experiments_with_biosamples(biosamples_experiments_details) -> defaultdict[str, list[dict]]:
+    """
+    Groups the entries from get_biosamples_with_experiment_details by subject ID.
+    """
+    experiments_with_biosamples = defaultdict(list)
+    for b in biosamples_experiments_details:
+        experiments_with_biosamples[b["subject_id"]].append({
+            "biosample_id": b["biosample_id"],
+            "sampled_tissue": {
+                "id": b["tissue_id"],
+                "label": b["tissue_label"]
+            },
+            "experiment": {
+                "experiment_id": b["experiment_id"],
+                "experiment_type": b["experiment_type"],
+                "study_type": b["study_type"]
+            }
+        })
+    return experiments_with_biosamples
+
+
+def iter_bento_search_results(results, chunk_size: int) -> Iterator[dict]:
+    """
+    Yields bento_search_result output entries from a server-side cursor, fetching the biosamples with experiments
+    details for one chunk of results at a time rather than for every match up front.
+    """
+    results_iter = results.iterator(chunk_size=chunk_size)
+    while chunk := list(itertools.islice(results_iter, chunk_size)):
+        experiments_with_biosamples = group_experiments_with_biosamples(
+            get_biosamples_with_experiment_details([r["subject_id"] for r in chunk]))
+        for result in chunk:
+            result["experiments_with_biosamples"] = experiments_with_biosamples[result["subject_id"]]
+            yield result
+
+
 def phenopacket_query_results(query, params, options=None):
     queryset = Phenopacket.objects \
         .filter(id__in=data_type_results(query, params, "id"))
@@ -177,25 +237,12 @@ def phenopacket_query_results(query, params, options=None):
             biosamples=Coalesce(ArrayAgg("biosamples__id", distinct=True, filter=Q(biosamples__id__isnull=False)), []),
         )
 
-        # Get the biosamples with experiments data
-        phenopacket_ids = [result['subject_id'] for result in results]
-        biosamples_experiments_details = get_biosamples_with_experiment_details(phenopacket_ids)
-
-        # Group the experiments with biosamples by subject_id
-        experiments_with_biosamples = defaultdict(list)
-        for b in biosamples_experiments_details:
-            experiments_with_biosamples[b["subject_id"]].append({
-                "biosample_id": b["biosample_id"],
-                "sampled_tissue": {
-                    "id": b["tissue_id"],
-                    "label": b["tissue_label"]
-                },
-                "experiment": {
-                    "experiment_id": b["experiment_id"],
-                    "experiment_type": b["experiment_type"],
-                    "study_type": b["study_type"]
-                }
-            })
+        if options.get("stream"):
+            return iter_bento_search_results(results, settings.SEARCH_STREAM_CHUNK_SIZE)
+
+        # Get the biosamples with experiments data, for the subjects of the matching phenopackets
+        experiments_with_biosamples = group_experiments_with_biosamples(
+            get_biosamples_with_experiment_details(queryset.values("subject_id")))
 
         # Add the experiments_with_biosamples data to the results
         for result in results:
@@ -218,6 +265,36 @@ QUERY_RESULT_SERIALIZERS = {
 }
 
 
+def iter_search_results_ndjson(queryset, data_type: str, search_params: dict) -> Iterator[str]:
+    """
+    Yields private search matches as newline-delimited JSON, one {"dataset_id", "data_type", "match"} object per line.
+    Matches are read from a server-side cursor and serialized (along with their prefetched related objects) one chunk
+    at a time, so memory use is bounded by the chunk size rather than by the number of matches. Each yielded string
+    contains the lines for a chunk of matches. The queryset must include dataset IDs (i.e. add_field="dataset_id")
+    for the values_list and bento_search_result outputs.
+    """
+
+    chunk_size = settings.SEARCH_STREAM_CHUNK_SIZE
+    representation = compile_serializer(QUERY_RESULT_SERIALIZERS[data_type])
+    output = search_params["output"]
+    encoder = JSONEncoder()
+
+    # Query sets are iterated with a server-side cursor; with a chunk size, prefetches are also done per chunk
+    matches = queryset.iterator(chunk_size=chunk_size) if isinstance(queryset, QuerySet) else queryset
+
+    while chunk := list(itertools.islice(matches, chunk_size)):
+        lines = []
+        for m in chunk:
+            if isinstance(m, dict):  # values_list or bento_search_result output
+                dataset_id = m.pop("dataset_id")
+                match = m["value"] if output == OUTPUT_FORMAT_VALUES_LIST else m
+            else:
+                dataset_id = m.dataset_id
+                match = representation(m)
+            lines.append(encoder.encode({"dataset_id": str(dataset_id), "data_type": data_type, "match": match}))
+        yield "\n".join(lines) + "\n"
+
+
 def search(request, internal_data=False):
     """
     Generic function that takes a request object containing the following parameters:
@@ -251,10 +328,14 @@ def search(request, internal_data=False):
         ))
         return Response(build_search_response([{"id": d.identifier, "data_type": data_type} for d in datasets], start))
 
-    serializer_class = QUERY_RESULT_SERIALIZERS[data_type]
+    representation = compile_serializer(QUERY_RESULT_SERIALIZERS[data_type])
     query_function = QUERY_RESULTS_FN[data_type]
     queryset = query_function(compiled_query, query_params, search_params)
 
+    if search_params["stream"]:
+        return StreamingResponse(
+            iter_search_results_ndjson(queryset, data_type, search_params), content_type=NDJSON_CONTENT_TYPE)
+
     if search_params["output"] == OUTPUT_FORMAT_VALUES_LIST:
         result = {
             dataset_id: {
@@ -289,7 +370,7 @@ def search(request, internal_data=False):
     return Response(build_search_response({
         dataset_id: {
             "data_type": data_type,
-            "matches": list(serializer_class(p).data for p in dataset_objects)
+            "matches": [representation(p) for p in dataset_objects]
         } for dataset_id, dataset_objects in itertools.groupby(
             queryset if queryset is not None else [],
             key=lambda o: str(o.dataset_id)  # object here
@@ -336,11 +417,22 @@ def chord_private_search(request):
         }
         The optional `output` parameter can be used to define a more restrictive
         response.
+        If the optional `stream` parameter is true, matches are instead streamed
+        as newline-delimited JSON, one {dataset_id, data_type, match} object per line.
     """
     # Private search endpoints are protected by URL namespace, not by Django permissions.
     return search(request, internal_data=True)
 
 
+@api_view(["GET"])
+@permission_classes([OverrideOrSuperUserOnly])
+def search_query_cache_stats(_request):
+    """
+    Returns hit/miss counters and the size of the compiled search query cache, for monitoring.
+    """
+    return Response(search_query_cache_info()._asdict())
+
+
 def phenopacket_filter_results(subject_ids, disease_ids, biosample_ids,
                                phenotypicfeature_ids, phenopacket_ids):
     query = Phenopacket.objects.get_queryset()
@@ -415,7 +507,7 @@ def fhir_search(request, internal_data=False):
     ext_result = {
         dataset_id: {
             "data_type": DATA_TYPE_PHENOPACKET,
-            "matches": list(PhenopacketSerializer(p).data for p in dataset_phenopackets)
+            "matches": [compile_serializer(PhenopacketSerializer)(p) for p in dataset_phenopackets]
         } for dataset_id, dataset_phenopackets in itertools.groupby(phenopackets, key=lambda p: str(p.dataset_id))
     }
     return Response(build_search_response(ext_result, start))
@@ -455,6 +547,7 @@ def get_chord_search_parameters(request, data_type=None):
             - params: values used for interpolations in the compiled_query
             - output: optional parameter
             - field: optional parameter, set when output is "values_list"
+            - stream: whether private search results should be streamed as newline-delimited JSON
         }
     """
     query_params = request.query_params if request.method == "GET" else (request.data or {})
@@ -478,11 +571,13 @@ def get_chord_search_parameters(request, data_type=None):
             return None, f"Invalid query JSON: {query}"
 
     try:
-        compiled_query, params = postgres.search_query_to_psycopg2_sql(query, DATA_TYPES[data_type]["schema"])
+        compiled_query, params = compile_search_query(query, data_type)
     except (SyntaxError, TypeError, ValueError) as e:
         logger.exception(f"[CHORD Metadata] Error encountered compiling query {query}:\n    {str(e)}")
         return None, f"Error compiling query (message: {str(e)})"
 
+    record_search_traffic(data_type, query)
+
     field = query_params.get("field", None)
     if isinstance(field, str):
         try:
@@ -496,7 +591,8 @@ def get_chord_search_parameters(request, data_type=None):
         "params": params,
         "data_type": data_type,
         "output": query_params.get("output", None),
-        "field": field
+        "field": field,
+        "stream": str(query_params.get("stream", "")).lower() == "true",
     }, None
 
 
@@ -509,9 +605,13 @@ def chord_dataset_search(
     to a given table.
     """
     data_type = search_params["data_type"]
-    serializer_class = QUERY_RESULT_SERIALIZERS[data_type]
+    representation = compile_serializer(QUERY_RESULT_SERIALIZERS[data_type])
     query_function = QUERY_RESULTS_FN[data_type]
 
+    stream = internal and search_params.get("stream")
+    if stream and search_params["output"] in (OUTPUT_FORMAT_VALUES_LIST, OUTPUT_FORMAT_BENTO_SEARCH_RESULT):
+        search_params = {**search_params, "add_field": "dataset_id"}
+
     queryset = query_function(
         query=sql.SQL("{} AND dataset_id = {}").format(search_params["compiled_query"], sql.Placeholder()),
         params=search_params["params"] + (dataset_id,),
@@ -520,13 +620,16 @@ def chord_dataset_search(
     if not internal:
         return queryset.exists(), None    # True if at least one match
 
+    if stream:
+        return iter_search_results_ndjson(queryset, data_type, search_params), None
+
     if search_params["output"] == OUTPUT_FORMAT_VALUES_LIST:
         return list(queryset), None
     if search_params["output"] == OUTPUT_FORMAT_BENTO_SEARCH_RESULT:
         return list(queryset), None
 
     debug_log(f"Started fetching from queryset and serializing data at {datetime.now() - start}")
-    serialized_data = serializer_class(queryset, many=True).data
+    serialized_data = [representation(o) for o in queryset]
     debug_log(f"Finished running query and serializing in {datetime.now() - start}")
 
     return serialized_data, None
@@ -554,6 +657,8 @@ def dataset_search(request: DrfRequest, dataset_id: str, internal=False):
 
     if err:
         return Response(errors.bad_request_error(err), status=status.HTTP_400_BAD_REQUEST)
+    if internal and search_params["stream"]:
+        return StreamingResponse(data, content_type=NDJSON_CONTENT_TYPE)
     return Response(build_search_response(data, start) if internal else data)
 
 
@@ -573,7 +678,11 @@ def private_dataset_search(request: DrfRequest, dataset_id: str):
 @permission_classes([OverrideOrSuperUserOnly | ReadOnly])
 def dataset_summary(request: DrfRequest, dataset_id: str):
     dataset = Dataset.objects.get(identifier=dataset_id)
-    return Response({
-        DATA_TYPE_PHENOPACKET: phenopacket_dataset_summary(dataset=dataset),
-        DATA_TYPE_EXPERIMENT: experiment_dataset_summary(dataset=dataset),
-    })
+    return Response(get_precomputed_statistics(
+        f"{DATASET_SUMMARY_STATISTICS_KEY}:{dataset.identifier}",
+        lambda: {
+            DATA_TYPE_PHENOPACKET: phenopacket_dataset_summary(dataset=dataset),
+            DATA_TYPE_EXPERIMENT: experiment_dataset_summary(dataset=dataset),
+        },
+        dataset_id=dataset.identifier,
+    ))
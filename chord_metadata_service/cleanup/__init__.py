@@ -1,5 +1,7 @@
 from .run_all import run_all_cleanup
+from .scoped import collect_cleanup_candidates
 
 __all__ = [
     "run_all_cleanup",
+    "collect_cleanup_candidates",
 ]
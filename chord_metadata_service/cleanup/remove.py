@@ -1,33 +1,121 @@
-from django.db.models import Model
-from typing import Type
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.models import Exists, Model, OuterRef, QuerySet, signals
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.deletion import get_candidate_relations_to_delete
+from django.db.models.sql import DeleteQuery
+from typing import Any, Iterable, Type
 
+from ..chord.job_progress import current_job_progress, report_job_progress
 from ..logger import logger
-from ..utils import build_id_set
 
 __all__ = [
+    "not_referenced",
+    "restrict_to",
     "remove_items",
     "remove_not_referenced",
 ]
 
+# References to objects of a model: (referencing model, lookup giving the referenced primary key), e.g.
+# (Phenopacket, "biosamples__id") for biosamples
+References = Iterable[tuple[Type[Model], str]]
 
-async def remove_items(model: Type[Model], to_remove: set[int | str | None], name_plural: str) -> int:
-    n_to_remove = len(to_remove)
 
-    if n_to_remove:
-        logger.info(f"Automatically cleaning up {n_to_remove} {name_plural}: {str(to_remove)}")
-        await model.objects.filter(id__in=to_remove).adelete()
-    else:
-        logger.info(f"No {name_plural} set for auto-removal")
+def not_referenced(model: Type[Model], references: References) -> QuerySet:
+    """
+    Returns the objects of a model which none of the given references point to. Each reference is a NOT EXISTS
+    anti-join, so that referenced IDs are never collected in Python or sent back to the database.
+    """
+    qs = model.objects.all()
+    for referencing_model, field in references:
+        qs = qs.filter(~Exists(referencing_model.objects.filter(**{field: OuterRef("pk")})))
+    return qs
+
+
+def restrict_to(qs: QuerySet, ids: Iterable | None) -> QuerySet:
+    """
+    Restricts a queryset of objects to remove to candidate objects (by primary key), e.g. those which could have been
+    orphaned by deleting a dataset; None means all objects are candidates.
+    """
+    if ids is None:
+        return qs
+    ids = list(ids)
+    return qs.filter(pk__in=ids) if ids else qs.none()
+
+
+def _covered_relations(references: References) -> set:
+    # Foreign keys (including those of many-to-many through tables) followed by the references; objects not referenced
+    # have, by definition, nothing pointing to them through these.
+    covered = set()
+    for referencing_model, field in references:
+        f = referencing_model._meta.get_field(field.split(LOOKUP_SEP)[0])
+        if f.many_to_many:
+            covered.add(f.remote_field.through._meta.get_field(f.m2m_reverse_field_name()))
+        else:
+            covered.add(f)
+    return covered
+
+
+def _can_delete_directly(model: Type[Model], references: References) -> bool:
+    """
+    Whether unreferenced objects of a model can be removed with a single DELETE statement, i.e. without Django's
+    deletion collector: the model must have no delete signal receivers, and every relation which could cascade to (or
+    be blocked by) its objects must be one of the references.
+    """
+    if model._meta.parents or any(s.has_listeners(model) for s in (signals.pre_delete, signals.post_delete)):
+        return False
+    covered = _covered_relations(references)
+    return all(rel.field in covered for rel in get_candidate_relations_to_delete(model._meta))
+
 
-    return n_to_remove
+def _delete_returning(qs: QuerySet) -> list[Any]:
+    # A single DELETE ... WHERE <queryset filters> RETURNING <pk>, i.e. what QuerySet._raw_delete runs, but also
+    # returning the deleted primary keys for logging.
+    connection = connections[qs.db]
+    delete_sql, params = qs.query.chain(DeleteQuery).get_compiler(qs.db).as_sql()
+    with connection.cursor() as cursor:
+        cursor.execute(f"{delete_sql} RETURNING {connection.ops.quote_name(qs.model._meta.pk.column)}", params)
+        return [row[0] for row in cursor.fetchall()]
 
 
-async def remove_not_referenced(model: Type[Model], references: set[int | str | None], name_plural: str) -> int:
-    objs_referenced = references.copy()
+def _delete(qs: QuerySet, references: References) -> list[Any]:
+    if qs.query.is_empty():
+        return []
+
+    if _can_delete_directly(qs.model, references):
+        return _delete_returning(qs)
+
+    # Objects with cascades (including many-to-many links) or delete signals (e.g. index updates) must go through the
+    # collector, which loads them; this is done a batch at a time to bound memory use. Deleted objects no longer match
+    # the queryset, so each batch is taken from the start.
+    deleted = []
+    while batch := list(qs.values_list("pk", flat=True)[:settings.CLEANUP_BATCH_SIZE]):
+        qs.model.objects.filter(pk__in=batch).delete()
+        deleted.extend(batch)
+    return deleted
+
+
+async def remove_items(to_remove: QuerySet, name_plural: str, references: References = ()) -> int:
+    """
+    Removes the objects of a queryset, logging their IDs, and returns how many were removed. references lists
+    relations known not to point to any of the objects (see remove_not_referenced.)
+    """
+    removed = await sync_to_async(_delete)(to_remove, tuple(references))
+    n_removed = len(removed)
+    if current_job_progress() is not None:
+        await sync_to_async(report_job_progress)("objects_removed", n_removed)
+
+    if n_removed:
+        logger.info(f"Automatically cleaning up {n_removed} {name_plural}: {str(removed)}")
+    else:
+        logger.info(f"No {name_plural} set for auto-removal")
+
+    return n_removed
 
-    # Remove null from set
-    objs_referenced.discard(None)
 
-    # Remove objects NOT in reference set
-    objs_to_remove = await build_id_set(model.objects.exclude(id__in=objs_referenced), "id")
-    return await remove_items(model, objs_to_remove, name_plural)
+async def remove_not_referenced(
+    model: Type[Model], references: References, name_plural: str, ids: Iterable | None = None
+) -> int:
+    references = tuple(references)
+    return await remove_items(restrict_to(not_referenced(model, references), ids), name_plural, references)
@@ -1,37 +1,144 @@
+import asyncio
+import functools
+import time
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.db import connection, connections
+from typing import Awaitable, Callable, NamedTuple
+
+from chord_metadata_service.chord.precomputed_statistics import invalidate_precomputed_statistics
 from chord_metadata_service.experiments import cleanup as ec
+from chord_metadata_service.logger import logger
 from chord_metadata_service.patients.cleanup import clean_individuals
 from chord_metadata_service.phenopackets import cleanup as pc
 from chord_metadata_service.resources.cleanup import clean_resources
+from chord_metadata_service.restapi.public_cache import bump_public_cache_version
+from .scoped import CleanupCandidates
 
 __all__ = [
+    "CleanupStage",
+    "CleanupStageResult",
+    "CLEANUP_STAGES",
+    "run_cleanup_stages",
     "run_all_cleanup",
 ]
 
 
-async def run_all_cleanup() -> int:
-    # Specific order: biosamples, then experiment artifacts (results/instruments), then patients,
-    # then resources (where order is less important)
-    # TODO: figure out where order doesn't matter and use parallel asyncio.gather
+class CleanupStage(NamedTuple):
+    name: str
+    clean: Callable[..., Awaitable[int]]  # Takes candidate IDs (optionally); returns the number of objects removed
+    dependencies: tuple[str, ...] = ()  # Stages which must be finished first; they must be declared earlier
+
+
+class CleanupStageResult(NamedTuple):
+    n_removed: int
+    seconds: float
 
-    n_removed: int = 0
 
-    # Phenopacket artifacts - metadata objects + biosamples + phenotypic features + procedures (order matters!)
-    n_removed += await pc.clean_meta_data()
-    n_removed += await pc.clean_biosamples()
-    n_removed += await pc.clean_phenotypic_features()
-    n_removed += await pc.clean_interpretations()
-    n_removed += await pc.clean_diagnoses()
-    n_removed += await pc.clean_genomic_interpretations()
+# A stage depends on another if the other's deletes can orphan objects it removes, or can delete the same objects
+# (through cascades); stages without dependencies between them can run at the same time.
+CLEANUP_STAGES: tuple[CleanupStage, ...] = (
+    # Phenopacket artifacts
+    CleanupStage("metadata", pc.clean_meta_data),
+    CleanupStage("biosamples", pc.clean_biosamples),
+    # Phenotypic features of deleted biosamples are deleted with them (by cascade)
+    CleanupStage("phenotypic features", pc.clean_phenotypic_features, ("biosamples",)),
+    CleanupStage("interpretations", pc.clean_interpretations),
+    CleanupStage("diagnoses", pc.clean_diagnoses, ("interpretations",)),
+    # Genomic interpretations of deleted biosamples are deleted with them (by cascade)
+    CleanupStage("genomic interpretations", pc.clean_genomic_interpretations, ("diagnoses", "biosamples")),
 
     # Experiment artifacts
-    n_removed += await ec.clean_experiment_results()
-    n_removed += await ec.clean_instruments()
+    CleanupStage("experiment results", ec.clean_experiment_results),
+    CleanupStage("instruments", ec.clean_instruments),
+
+    # Patients - referenced by biosamples, and their genomic interpretations are deleted with them (by cascade)
+    CleanupStage("individuals", clean_individuals, ("biosamples", "genomic interpretations")),
+
+    # Resources - referenced by metadata
+    CleanupStage("resources", clean_resources, ("metadata",)),
+)
+
+
+def _in_transaction() -> bool:
+    return connection.in_atomic_block
+
+
+def _run_in_thread(clean: Callable[[], Awaitable[int]]) -> int:
+    # Run from a worker thread of its own: the stage's database work (in thread-sensitive sync_to_async calls) comes
+    # back to this thread, and so uses a connection of its own, which is closed once the stage is done.
+    try:
+        return async_to_sync(clean)()
+    finally:
+        connections.close_all()
+
+
+async def run_cleanup_stages(
+    stages: tuple[CleanupStage, ...] = CLEANUP_STAGES,
+    candidates: CleanupCandidates | None = None,
+) -> dict[str, CleanupStageResult]:
+    """
+    Runs cleanup stages once their dependencies are finished, and returns how many objects each stage removed and how
+    long it took, by stage name. Independent stages run concurrently, each on its own database connection - unless
+    called inside a transaction, since other connections would not see its changes; stages are then run one after
+    another, in declaration order.
+    If candidates are given, stages only check (and remove) their candidate objects.
+    """
+
+    results: dict[str, CleanupStageResult] = {}
+
+    def _stage_clean(stage: CleanupStage) -> Callable[[], Awaitable[int]]:
+        if candidates is None:
+            return stage.clean
+        return functools.partial(stage.clean, candidates.get(stage.name, set()))
+
+    async def _timed(stage: CleanupStage, clean: Callable[[], Awaitable[int]]) -> None:
+        start = time.perf_counter()
+        n_removed = await clean()
+        results[stage.name] = CleanupStageResult(n_removed, time.perf_counter() - start)
+
+    if await sync_to_async(_in_transaction)():
+        for stage in stages:
+            await _timed(stage, _stage_clean(stage))
+        return results
+
+    tasks: dict[str, asyncio.Task] = {}
+
+    async def _run(stage: CleanupStage) -> None:
+        await asyncio.gather(*(tasks[d] for d in stage.dependencies))
+        run_in_thread = sync_to_async(_run_in_thread, thread_sensitive=False)
+        await _timed(stage, functools.partial(run_in_thread, _stage_clean(stage)))
+
+    for stage in stages:
+        tasks[stage.name] = asyncio.create_task(_run(stage))
+
+    await asyncio.gather(*tasks.values())
+
+    # Return results in declaration order, not in order of completion
+    return {stage.name: results[stage.name] for stage in stages}
+
+
+async def run_all_cleanup(candidates: CleanupCandidates | None = None) -> int:
+    """
+    Removes objects orphaned by deletes, and returns how many were removed. By default, every object in the node is
+    checked; if candidates (see collect_cleanup_candidates) are given, only they are.
+    """
+
+    start = time.perf_counter()
+    results = await run_cleanup_stages(candidates=candidates)
+
+    for name, result in results.items():
+        logger.info(f"Cleanup stage {name}: removed {result.n_removed} objects in {result.seconds:.3f}s")
 
-    # Patients
-    n_removed += await clean_individuals()
+    # Overview statistics (over all data) are out of date after deletes; statistics for deleted datasets are deleted
+    # along with them.
+    await sync_to_async(invalidate_precomputed_statistics)()
+    # Likewise, terms of deleted objects are removed from the autocomplete dictionary (not counted as removed objects.)
+    await pc.clean_autocomplete_terms(None if candidates is None else candidates.get("autocomplete terms", set()))
+    await sync_to_async(bump_public_cache_version)()
 
-    # Resources
-    n_removed += await clean_resources()
+    n_removed = sum(result.n_removed for result in results.values())
+    logger.info(f"Cleanup finished in {time.perf_counter() - start:.3f}s")
 
     # Return final removed object count
     return n_removed
@@ -0,0 +1,64 @@
+from asgiref.sync import sync_to_async
+from django.db.models import Q, QuerySet
+
+from chord_metadata_service.phenopackets import models as pm
+from chord_metadata_service.phenopackets.autocomplete_terms import autocomplete_terms_used_by
+
+__all__ = [
+    "CleanupCandidates",
+    "collect_cleanup_candidates",
+]
+
+# IDs of the objects each cleanup stage should check for remaining references, by stage name (see CLEANUP_STAGES),
+# plus "autocomplete terms" for the autocomplete dictionary
+CleanupCandidates = dict[str, set]
+
+
+def _ids(qs: QuerySet, field: str = "pk") -> set:
+    return set(qs.exclude(**{f"{field}__isnull": True}).values_list(field, flat=True))
+
+
+def _collect_cleanup_candidates(
+    phenopackets: QuerySet, experiments: QuerySet, datasets: QuerySet | None = None
+) -> CleanupCandidates:
+    meta_data = _ids(phenopackets, "meta_data_id")
+    biosamples = _ids(phenopackets, "biosamples__id") | _ids(experiments, "biosample_id")
+    interpretations = _ids(phenopackets, "interpretations__id")
+    diagnoses = _ids(pm.Interpretation.objects.filter(pk__in=interpretations), "diagnosis_id")
+
+    resources = _ids(pm.MetaData.objects.filter(pk__in=meta_data), "resources__id")
+    if datasets is not None:
+        resources |= _ids(datasets, "additional_resources__id")
+
+    phenotypic_features_qs = pm.PhenotypicFeature.objects.filter(
+        Q(phenopacket__in=phenopackets) | Q(biosample_id__in=biosamples))
+    biosamples_qs = pm.Biosample.objects.filter(pk__in=biosamples)
+
+    return {
+        "metadata": meta_data,
+        "biosamples": biosamples,
+        "phenotypic features": _ids(phenotypic_features_qs),
+        "interpretations": interpretations,
+        "diagnoses": diagnoses,
+        "genomic interpretations": _ids(
+            pm.Diagnosis.objects.filter(pk__in=diagnoses), "genomic_interpretations__id"),
+        "experiment results": _ids(experiments, "experiment_results__id"),
+        "instruments": _ids(experiments, "instrument_id"),
+        "individuals": _ids(phenopackets, "subject_id") | _ids(biosamples_qs, "individual_id"),
+        "resources": resources,
+        # Diseases are not cleaned up, so their terms stay in use
+        "autocomplete terms": (
+            _ids(autocomplete_terms_used_by(phenotypic_features_qs)) | _ids(autocomplete_terms_used_by(biosamples_qs))),
+    }
+
+
+async def collect_cleanup_candidates(
+    phenopackets: QuerySet, experiments: QuerySet, datasets: QuerySet | None = None
+) -> CleanupCandidates:
+    """
+    Collects the IDs of the objects which could be orphaned by deleting the given phenopackets, experiments and
+    (optionally) datasets, i.e. those reachable from them. Must be called BEFORE deleting them; cleanup can then check
+    only these objects (see run_all_cleanup), at a cost scaling with the size of what was deleted rather than with the
+    size of the node.
+    """
+    return await sync_to_async(_collect_cleanup_candidates)(phenopackets, experiments, datasets)
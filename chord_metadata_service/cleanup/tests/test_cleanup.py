@@ -1,6 +1,14 @@
+import asyncio
+import threading
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APITestCase
 
-from chord_metadata_service.cleanup import run_all_cleanup
+from chord_metadata_service.cleanup import collect_cleanup_candidates, run_all_cleanup
+from chord_metadata_service.cleanup.run_all import CLEANUP_STAGES, CleanupStage, run_cleanup_stages
 from chord_metadata_service.experiments import cleanup as ec
 from chord_metadata_service.experiments.models import Experiment, ExperimentResult, Instrument
 from chord_metadata_service.patients.cleanup import clean_individuals
@@ -33,7 +41,7 @@ from chord_metadata_service.phenopackets.tests.constants import (
 )
 from chord_metadata_service.resources.cleanup import clean_resources
 from chord_metadata_service.resources.models import Resource
-from chord_metadata_service.resources.tests.constants import VALID_RESOURCE_1
+from chord_metadata_service.resources.tests.constants import VALID_RESOURCE_1, VALID_RESOURCE_2
 from chord_metadata_service.experiments.tests.constants import (
     valid_instrument,
     valid_experiment_result,
@@ -156,6 +164,32 @@ class CleanUpIndividualsAndPhenopacketsTestCase(APITestCase):
         # Check we can run all cleaning again with no change...
         self.assertEqual(await run_all_cleanup(), 0)
 
+    async def test_scoped_cleanup(self):
+        unrelated_resource = await Resource.objects.acreate(**VALID_RESOURCE_2)
+        unrelated_individual = await Individual.objects.acreate(id="patient:2")
+
+        candidates = await collect_cleanup_candidates(
+            phenopackets=Phenopacket.objects.filter(dataset=self.dataset),
+            experiments=Experiment.objects.filter(dataset=self.dataset),
+            datasets=Dataset.objects.filter(pk=self.dataset.pk),
+        )
+        self.assertSetEqual(candidates["biosamples"], {self.biosample_1.id, self.biosample_2.id})
+        self.assertSetEqual(candidates["individuals"], {self.individual.id})
+        self.assertSetEqual(candidates["genomic interpretations"], {self.genomic_interpretation.id})
+        self.assertSetEqual(candidates["resources"], {self.resource.id})
+
+        await self.dataset.adelete()
+
+        # Same as test_cleanup_basic, except for the unlinked phenotypic feature, which is not reachable from the
+        # dataset; unrelated orphans are not checked either
+        self.assertEqual(await run_all_cleanup(candidates), 8)
+
+        await self.unlinked_phenotypic_feature.arefresh_from_db()
+        await unrelated_resource.arefresh_from_db()
+        await unrelated_individual.arefresh_from_db()
+        with self.assertRaises(Individual.DoesNotExist):
+            await self.individual.arefresh_from_db()
+
     async def test_no_cleanup(self):
         await self.unlinked_phenotypic_feature.arefresh_from_db()
 
@@ -269,3 +303,96 @@ class CleanUpExperimentsTestCase(APITestCase):
         # 1 instrument +
         # = 4 objects total
         self.assertEqual(await run_all_cleanup(), 4)
+
+
+class CleanUpStatementsTestCase(APITestCase):
+
+    def setUp(self):
+        self.resource_1 = Resource.objects.create(**VALID_RESOURCE_1)
+        self.resource_2 = Resource.objects.create(**VALID_RESOURCE_2)
+        self.project = Project.objects.create(**VALID_PROJECT_1)
+        self.dataset = Dataset.objects.create(**valid_dataset_1(self.project))
+        self.dataset.additional_resources.set([self.resource_1])
+
+    def test_single_delete(self):
+        # Nothing references resources except through the checked relations, so the unreferenced resource is removed
+        # with a single anti-join DELETE
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(async_to_sync(clean_resources)(), 1)
+
+        deletes = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("DELETE")]
+        self.assertEqual(len(deletes), 1)
+        self.assertIn("NOT EXISTS", deletes[0])
+        self.assertIn("RETURNING", deletes[0])
+        self.assertFalse(any(q["sql"].startswith("SELECT") for q in ctx.captured_queries))
+
+        self.assertTrue(Resource.objects.filter(id=self.resource_1.id).exists())
+        self.assertFalse(Resource.objects.filter(id=self.resource_2.id).exists())
+
+    @override_settings(CLEANUP_BATCH_SIZE=2)
+    def test_batched_delete(self):
+        # Individuals have cascades and delete signals, so they are removed through the collector in batches
+        Individual.objects.bulk_create([Individual(id=f"patient:{i}") for i in range(5)])
+        self.assertEqual(async_to_sync(clean_individuals)(), 5)
+        self.assertFalse(Individual.objects.exists())
+
+
+class CleanUpStagesTestCase(TransactionTestCase):
+    # Outside of a test transaction, so that stages run concurrently on their own connections
+
+    def setUp(self):
+        self.project = Project.objects.create(**VALID_PROJECT_1)
+        self.dataset = Dataset.objects.create(**valid_dataset_1(self.project))
+        self.individual = Individual.objects.create(id="patient:1", sex="FEMALE")
+        self.biosample = Biosample.objects.create(**valid_biosample_1(self.individual))
+        self.meta_data = MetaData.objects.create(**VALID_META_DATA_1)
+        self.meta_data.resources.set([Resource.objects.create(**VALID_RESOURCE_1)])
+        Instrument.objects.create(**valid_instrument())
+        ExperimentResult.objects.create(**valid_experiment_result())
+        self.phenopacket = Phenopacket.objects.create(
+            id="phenopacket_id:1", subject=self.individual, meta_data=self.meta_data, dataset=self.dataset)
+        self.phenopacket.biosamples.set([self.biosample])
+
+    def test_concurrent_cleanup(self):
+        results = async_to_sync(run_cleanup_stages)()
+        self.assertListEqual(list(results), [stage.name for stage in CLEANUP_STAGES])
+        self.assertEqual(results["instruments"].n_removed, 1)
+        self.assertEqual(results["experiment results"].n_removed, 1)
+        self.assertEqual(sum(r.n_removed for r in results.values()), 2)
+
+        self.dataset.delete()
+
+        # 1 metadata object + 1 biosample + 1 individual + 1 resource
+        self.assertEqual(async_to_sync(run_all_cleanup)(), 4)
+        self.assertFalse(Individual.objects.exists())
+        self.assertFalse(Resource.objects.exists())
+
+    def test_stage_dependencies(self):
+        events = []
+
+        def _stage(name: str, delay: float):
+            async def _clean() -> int:
+                thread = await sync_to_async(threading.get_ident)()
+                events.append(("start", name, thread))
+                await asyncio.sleep(delay)
+                events.append(("end", name, thread))
+                return 1
+            return _clean
+
+        results = async_to_sync(run_cleanup_stages)((
+            CleanupStage("a", _stage("a", 0.2)),
+            CleanupStage("b", _stage("b", 0), ("a",)),
+            CleanupStage("c", _stage("c", 0)),
+        ))
+        self.assertListEqual(list(results), ["a", "b", "c"])
+        self.assertGreaterEqual(results["a"].seconds, 0.2)
+
+        order = [(e, name) for e, name, _ in events]
+        # c does not wait for a, but b does
+        self.assertLess(order.index(("end", "c")), order.index(("end", "a")))
+        self.assertLess(order.index(("end", "a")), order.index(("start", "b")))
+
+        # Concurrent stages run on threads (and so connections) of their own
+        threads = {name: thread for _, name, thread in events}
+        self.assertNotEqual(threads["a"], threads["c"])
+        self.assertNotIn(threading.get_ident(), threads.values())
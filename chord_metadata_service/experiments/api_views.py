@@ -10,11 +10,13 @@ from .serializers import ExperimentSerializer, ExperimentResultSerializer
 from .models import Experiment, ExperimentResult
 from .schemas import EXPERIMENT_SCHEMA
 from .filters import ExperimentFilter, ExperimentResultFilter
+from chord_metadata_service.restapi.compiled_serializers import get_prefetch_plan
 from chord_metadata_service.restapi.constants import MODEL_ID_PATTERN
 from chord_metadata_service.restapi.pagination import LargeResultsSetPagination, BatchResultsSetPagination
 
 
 from chord_metadata_service.restapi.api_renderers import (
+    CSVStreamingMixin,
     FHIRRenderer,
     PhenopacketsRenderer,
     ExperimentCSVRenderer,
@@ -33,10 +35,7 @@ EXPERIMENT_SELECT_REL = (
     "instrument",
 )
 
-EXPERIMENT_PREFETCH = (
-    "experiment_results",
-    "biosample__individual"
-)
+EXPERIMENT_PREFETCH = get_prefetch_plan(ExperimentSerializer)
 
 
 class ExperimentViewSet(viewsets.ModelViewSet):
@@ -71,7 +70,7 @@ class BatchViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
     pass
 
 
-class ExperimentBatchViewSet(BatchViewSet):
+class ExperimentBatchViewSet(CSVStreamingMixin, BatchViewSet):
     """
     get:
     Return a list of all existing experiments
@@ -102,6 +101,8 @@ class ExperimentBatchViewSet(BatchViewSet):
         ids_list = request.data.get('id', [])
         request.data["id"] = ids_list
         queryset = self.get_queryset()
+        if (response := self.csv_streaming_response(request, queryset)) is not None:
+            return response
 
         serializer = ExperimentSerializer(queryset, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
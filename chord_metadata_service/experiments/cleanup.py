@@ -1,7 +1,7 @@
 # TODO
 
 from chord_metadata_service.cleanup.remove import remove_not_referenced
-from chord_metadata_service.utils import build_id_set_from_model
+from typing import Iterable
 from .models import Experiment, ExperimentResult, Instrument
 
 __all__ = [
@@ -11,21 +11,12 @@ __all__ = [
 
 
 # TODO: Remove this when we have one-to-many ?
-async def clean_experiment_results() -> int:
-    results_referenced = set()
+async def clean_experiment_results(ids: Iterable | None = None) -> int:
+    # Remove experiment results NOT referenced by experiments
+    return await remove_not_referenced(
+        ExperimentResult, ((Experiment, "experiment_results__id"),), "experiment results", ids)
 
-    # Collect references to results from experiments
-    results_referenced |= await build_id_set_from_model(Experiment, "experiment_results__id")
 
-    # Remove experiment results NOT in set
-    return await remove_not_referenced(ExperimentResult, results_referenced, "experiment results")
-
-
-async def clean_instruments() -> int:
-    instruments_referenced = set()
-
-    # Collect references to instruments from experiments
-    instruments_referenced |= await build_id_set_from_model(Experiment, "instrument_id")
-
-    # Remove instruments NOT in set
-    return await remove_not_referenced(Instrument, instruments_referenced, "instruments")
+async def clean_instruments(ids: Iterable | None = None) -> int:
+    # Remove instruments NOT referenced by experiments
+    return await remove_not_referenced(Instrument, ((Experiment, "instrument_id"),), "instruments", ids)
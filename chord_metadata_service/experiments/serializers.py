@@ -33,7 +33,7 @@ class DynamicFieldsMixin:
 class IndividualSerializer(DynamicFieldsMixin, GenericSerializer):
     class Meta:
         model = Individual
-        fields = "__all__"
+        exclude = ("search_vector",)
 
 
 class ExperimentSerializer(GenericSerializer):
@@ -160,6 +160,16 @@ class GetExperimentsAppApisTest(APITestCase):
         self.assertEqual(len(response_data), 1)
         self.assertEqual(response_data[0]['id'], 'katsu.experiment:1')
 
+    def test_post_experiment_batch_csv_stream(self):
+        streamed = self.client.post('/api/batch/experiments', {'format': 'csv', 'stream': True}, format='json')
+        self.assertEqual(streamed.status_code, status.HTTP_200_OK)
+        self.assertTrue(streamed.streaming)
+        self.assertEqual(streamed['Content-Type'], 'text/csv')
+        content = b"".join(streamed.streaming_content).decode("utf-8")
+        response = self.client.post('/api/batch/experiments', {'format': 'csv'}, format='json')
+        self.assertEqual(content, response.content.decode("utf-8"))
+        self.assertEqual(len(list(csv.reader(io.StringIO(content)))), 3)  # Header and 2 experiments
+
 
 class TestExperimentCSVRenderer(TestCase):
     """
@@ -183,8 +193,7 @@ class TestExperimentCSVRenderer(TestCase):
         }]
 
     def test_csv_headers(self):
-        response = self.renderer.render(self.data)
-        csv_content = response.content.decode()
+        csv_content = self.renderer.render(self.data).decode()
         csv_file = io.StringIO(csv_content)
         reader = csv.DictReader(csv_file)
         expected_headers = ['Id', 'Study type', 'Experiment type', 'Molecule', 'Library strategy',
@@ -207,8 +216,7 @@ class TestExperimentCSVRenderer(TestCase):
             'biosample': 'biosample3',
             'biosample_individual': {'id': 'individual_id3'},
         }]
-        response = self.renderer.render(data_with_missing_fields)
-        csv_content = response.content.decode()
+        csv_content = self.renderer.render(data_with_missing_fields).decode()
         csv_file = io.StringIO(csv_content)
         reader = csv.DictReader(csv_file)
         row = next(reader)
@@ -216,8 +224,7 @@ class TestExperimentCSVRenderer(TestCase):
 
     def test_csv_render_with_empty_data(self):
         data_empty = [{}]
-        response = self.renderer.render(data_empty)
-        csv_content = response.content.decode()
+        csv_content = self.renderer.render(data_empty).decode()
         csv_file = io.StringIO(csv_content)
         reader = csv.DictReader(csv_file)
         row = next(reader)
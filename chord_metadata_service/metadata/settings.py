@@ -255,13 +255,34 @@ DATABASES = {
 }
 
 # Django default cache
+# Public endpoint responses are cached here. The default in-memory cache is separate for each worker process; set
+# KATSU_CACHE_BACKEND to "file" or "redis" (with KATSU_CACHE_LOCATION set to a directory or a Redis URL) to share it.
+CACHE_BACKENDS = {
+    "locmem": "django.core.cache.backends.locmem.LocMemCache",
+    "file": "django.core.cache.backends.filebased.FileBasedCache",
+    "redis": "django.core.cache.backends.redis.RedisCache",
+}
+CACHE_BACKEND = os.getenv("KATSU_CACHE_BACKEND", "locmem")
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': CACHE_BACKENDS.get(CACHE_BACKEND, CACHE_BACKEND),
+        'LOCATION': os.getenv("KATSU_CACHE_LOCATION", ""),
+        'KEY_PREFIX': "katsu",
     }
 }
 
+# Test data changes between tests without going through ingests or deletes, so cached responses would be stale
+if len(sys.argv) > 1 and sys.argv[1] == 'test':
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    }
+
 FHIR_INDEX_NAME = 'fhir_metadata'
+# Number of documents per bulk request when (re)building the FHIR index
+FHIR_INDEX_BATCH_SIZE = int(os.getenv("KATSU_FHIR_INDEX_BATCH_SIZE", 500))
+# Maximum delay (in seconds) between a write being committed and the FHIR index being updated; the index is also
+# updated as soon as FHIR_INDEX_BATCH_SIZE documents are pending.
+FHIR_INDEX_SYNC_INTERVAL = float(os.getenv("KATSU_FHIR_INDEX_SYNC_INTERVAL", 2))
 
 # Set to True to run ES for FHIR index
 ELASTICSEARCH = False
@@ -331,6 +352,63 @@ STATIC_URL = '/static/'
 # Cache time constant
 CACHE_TIME = int(os.getenv('CACHE_TIME', 60 * 60 * 2))
 
+# Ingest settings
+
+# Number of phenopackets whose rows are collected in memory and written together by the bulk ingest path
+INGEST_BULK_CHUNK_SIZE = int(os.getenv("KATSU_INGEST_BULK_CHUNK_SIZE", 500))
+
+# Number of processes phenopackets are validated in before being ingested (1 validates them serially); by default, half
+# of the CPUs, up to 4, so that validation does not starve request handling
+INGEST_VALIDATION_WORKERS = int(os.getenv(
+    "KATSU_INGEST_VALIDATION_WORKERS", max(1, min(4, (os.cpu_count() or 1) // 2))))
+# Below this many phenopackets, validation is done serially, since starting worker processes would cost more than
+# it saves
+INGEST_PARALLEL_VALIDATION_MIN_RECORDS = int(os.getenv("KATSU_INGEST_PARALLEL_VALIDATION_MIN_RECORDS", 200))
+
+# Search settings
+
+# Number of compiled search query templates (one per data type and query shape, i.e. the query without its literal
+# values) kept in memory
+SEARCH_QUERY_CACHE_SIZE = int(os.getenv("KATSU_SEARCH_QUERY_CACHE_SIZE", 256))
+
+# Number of matches fetched, serialized and sent at a time by streaming (stream=true) private searches
+SEARCH_STREAM_CHUNK_SIZE = int(os.getenv("KATSU_SEARCH_STREAM_CHUNK_SIZE", 500))
+
+# Number of rows fetched and sent at a time by streaming (stream=true) CSV exports
+CSV_STREAM_CHUNK_SIZE = int(os.getenv("KATSU_CSV_STREAM_CHUNK_SIZE", 500))
+
+# Minimum number of seconds between writes of the per-field search counts (see the search_index_usage command), which
+# are kept in memory in the meantime
+SEARCH_TRAFFIC_FLUSH_INTERVAL = int(os.getenv("KATSU_SEARCH_TRAFFIC_FLUSH_INTERVAL", 60))
+
+# Number of seconds autocomplete results for a given input are cached for; new terms show up after at most this long
+AUTOCOMPLETE_CACHE_TIME = int(os.getenv("KATSU_AUTOCOMPLETE_CACHE_TIME", 30))
+
+# Cleanup settings
+
+# Number of orphaned objects deleted at a time by cleanup, for models whose deletes cascade or send signals (and so
+# must be loaded); other orphaned objects are deleted with a single statement
+CLEANUP_BATCH_SIZE = int(os.getenv("KATSU_CLEANUP_BATCH_SIZE", 1000))
+
+# Job settings
+
+# Number of threads per process running background jobs (ingests, exports and cleanups submitted with async=true); 0
+# runs jobs in the request which submitted them instead, e.g. for local testing
+JOB_WORKERS = int(os.getenv("KATSU_JOB_WORKERS", 2))
+
+# Minimum number of seconds between saves of a running job's progress counters (and checks for its cancellation)
+JOB_PROGRESS_INTERVAL = float(os.getenv("KATSU_JOB_PROGRESS_INTERVAL", 1))
+
+# Statistics settings
+
+# Maximum age, in seconds, of stored overview/summary statistics before they are recomputed. Ingests and cleanup
+# invalidate them right away; this bounds how stale they get after other changes (e.g. through the REST API.)
+PRECOMPUTED_STATISTICS_MAX_AGE = int(os.getenv("KATSU_PRECOMPUTED_STATISTICS_MAX_AGE", 60 * 60))
+
+# Whether data type counts (/data-types) are served from precomputed statistics too, rather than counted on every
+# request. Counts then lag behind changes which do not invalidate statistics by up to PRECOMPUTED_STATISTICS_MAX_AGE.
+DATA_TYPE_COUNTS_PRECOMPUTED = os.getenv("KATSU_DATA_TYPE_COUNTS_PRECOMPUTED", "false").lower() == "true"
+
 # Settings related to the Public APIs
 
 # Read project specific config.json that contains custom search fields
@@ -21,18 +21,25 @@ from .serializers import IndividualSerializer
 from .models import Individual
 from .filters import IndividualFilter
 from chord_metadata_service.logger import logger
-from chord_metadata_service.phenopackets.api_views import BIOSAMPLE_PREFETCH, PHENOPACKET_PREFETCH
+from chord_metadata_service.phenopackets.api_views import PHENOPACKET_PREFETCH
 from chord_metadata_service.phenopackets.models import Phenopacket
 from chord_metadata_service.phenopackets.serializers import PhenopacketSerializer
 from chord_metadata_service.restapi.api_renderers import (
+    CSVStreamingMixin,
     FHIRRenderer,
     PhenopacketsRenderer,
     IndividualCSVRenderer,
     ARGORenderer,
     IndividualBentoSearchRenderer,
 )
+from chord_metadata_service.restapi.compiled_serializers import compile_serializer, get_prefetch_plan
 from chord_metadata_service.restapi.constants import MODEL_ID_PATTERN
-from chord_metadata_service.restapi.pagination import LargeResultsSetPagination, BatchResultsSetPagination
+from chord_metadata_service.restapi.pagination import (
+    BatchResultsSetPagination,
+    KeysetPaginationMixin,
+    LargeResultsSetPagination,
+)
+from chord_metadata_service.restapi.public_cache import get_public_cached
 from chord_metadata_service.restapi.utils import (
     get_field_options,
     filter_queryset_field_value,
@@ -44,8 +51,10 @@ from chord_metadata_service.restapi.negociation import FormatInPostContentNegoti
 
 OUTPUT_FORMAT_BENTO_SEARCH_RESULT = "bento_search_result"
 
+INDIVIDUAL_PREFETCH = get_prefetch_plan(IndividualSerializer)
+
 
-class IndividualViewSet(viewsets.ModelViewSet):
+class IndividualViewSet(CSVStreamingMixin, KeysetPaginationMixin, viewsets.ModelViewSet):
     """
     get:
     Return a list of all existing individuals
@@ -63,10 +72,7 @@ class IndividualViewSet(viewsets.ModelViewSet):
     filterset_class = IndividualFilter
     ordering_fields = ["id"]
     search_fields = ["sex"]
-    queryset = Individual.objects.all().prefetch_related(
-        *(f"biosamples__{p}" for p in BIOSAMPLE_PREFETCH),
-        *(f"phenopackets__{p}" for p in PHENOPACKET_PREFETCH if p != "subject"),
-    ).order_by("id")
+    queryset = Individual.objects.all().prefetch_related(*INDIVIDUAL_PREFETCH).order_by("id")
     lookup_value_regex = MODEL_ID_PATTERN
 
     def list(self, request, *args, **kwargs):
@@ -109,7 +115,7 @@ class IndividualViewSet(viewsets.ModelViewSet):
 
         filename_safe_id = re.sub(r"[\\/:*?\"<>|]", "_", individual.id)
         return Response(
-            PhenopacketSerializer(phenopackets, many=True).data,
+            [compile_serializer(PhenopacketSerializer)(p) for p in phenopackets],
             headers=(
                 {"Content-Disposition": f"attachment; filename=\"{filename_safe_id}_phenopackets.json\""}
                 if as_attachment else {}
@@ -125,7 +131,7 @@ class BatchViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
     pass
 
 
-class IndividualBatchViewSet(BatchViewSet):
+class IndividualBatchViewSet(CSVStreamingMixin, BatchViewSet):
 
     serializer_class = IndividualSerializer
     pagination_class = BatchResultsSetPagination
@@ -139,9 +145,8 @@ class IndividualBatchViewSet(BatchViewSet):
         individual_ids = self.request.data.get("id", None)
         filter_by_id = {"id__in": individual_ids} if individual_ids else {}
         queryset = Individual.objects.filter(**filter_by_id)\
-            .prefetch_related(
-                *(f"phenopackets__{p}" for p in PHENOPACKET_PREFETCH if p != "subject"),
-        ).order_by("id")
+            .prefetch_related(*INDIVIDUAL_PREFETCH)\
+            .order_by("id")
 
         return queryset
 
@@ -198,30 +203,27 @@ class PublicListIndividuals(APIView):
 
         return queryset
 
-    def get(self, request, *args, **kwargs):
-        if not settings.CONFIG_PUBLIC:
-            return Response(settings.NO_PUBLIC_DATA_AVAILABLE)
-
+    def get_response_data(self) -> dict:
         base_qs = Individual.objects.all()
         try:
             filtered_qs = self.filter_queryset(base_qs)
         except ValidationError as e:
-            return Response(errors.bad_request_error(
+            return errors.bad_request_error(
                 *(e.error_list if hasattr(e, "error_list") else e.error_dict.items()),
-            ))
+            )
 
         qct = filtered_qs.count()
 
         if qct <= (threshold := settings.CONFIG_PUBLIC["rules"]["count_threshold"]):
             logger.info(
-                f"Public individuals endpoint recieved query params {request.query_params} which resulted in "
+                f"Public individuals endpoint recieved query params {self.request.query_params} which resulted in "
                 f"sub-threshold count: {qct} <= {threshold}")
-            return Response(settings.INSUFFICIENT_DATA_AVAILABLE)
+            return settings.INSUFFICIENT_DATA_AVAILABLE
 
         tissues_count, sampled_tissues = biosample_tissue_stats(filtered_qs)
         experiments_count, experiment_types = experiment_type_stats(filtered_qs)
 
-        return Response({
+        return {
             "count": qct,
             "biosamples": {
                 "count": tissues_count,
@@ -231,7 +233,14 @@ class PublicListIndividuals(APIView):
                 "count": experiments_count,
                 "experiment_type": experiment_types
             }
-        })
+        }
+
+    def get(self, request, *args, **kwargs):
+        if not settings.CONFIG_PUBLIC:
+            return Response(settings.NO_PUBLIC_DATA_AVAILABLE)
+
+        # Responses (including errors) only depend on the query parameters, so they are cached by them
+        return Response(get_public_cached("individuals", self.get_response_data, sorted(request.query_params.lists())))
 
 
 class BeaconListIndividuals(APIView):
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from chord_metadata_service.patients.models import Individual
+from chord_metadata_service.patients.search_vector import update_individual_search_vectors
+
+
+class Command(BaseCommand):
+    help = """
+        Recomputes the stored full-text search document of every individual in the DB, a chunk of individuals at a
+        time. Documents are kept up to date on ingest and update; this is for existing data, or to pick up deletions.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", action="store", type=int, default=1000,
+                            help="Number of individuals to update per transaction")
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        individual_ids = list(Individual.objects.order_by("id").values_list("id", flat=True))
+
+        n_updated = 0
+        for i in range(0, len(individual_ids), chunk_size):
+            with transaction.atomic():
+                n_updated += update_individual_search_vectors(individual_ids[i:i + chunk_size])
+
+        self.stdout.write(f"Updated the search documents of {n_updated} individuals")
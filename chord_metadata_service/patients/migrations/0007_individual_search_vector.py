@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:07
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0006_v6_0_0'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='individual',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='individual',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='individual_search_vector_idx'),
+        ),
+    ]
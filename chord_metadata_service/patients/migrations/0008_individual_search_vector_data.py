@@ -0,0 +1,109 @@
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, transaction
+from django.db.models import Func, OuterRef, Subquery, TextField
+from django.db.models.functions import Cast
+
+# Number of individuals whose search documents are computed per transaction
+CHUNK_SIZE = 1000
+
+# Fields of the search document as of this migration, in groups of rows related to an individual in the same way. A
+# copy of patients.search_vector.SEARCH_DOCUMENT_FIELDS, so that this migration keeps working with the historical
+# models if the fields change later; patients_build_search_vectors rebuilds documents with the current fields.
+PHENOPACKETS = "phenopackets"
+PHENOTYPIC_FEATURES = f"{PHENOPACKETS}__phenotypic_features"
+BIOSAMPLES = f"{PHENOPACKETS}__biosamples"
+EXPERIMENTS = f"{BIOSAMPLES}__experiment"
+EXPERIMENT_RESULTS = f"{EXPERIMENTS}__experiment_results"
+INSTRUMENTS = f"{EXPERIMENTS}__instrument"
+INTERPRETATIONS = f"{PHENOPACKETS}__interpretations"
+DIAGNOSES = f"{INTERPRETATIONS}__diagnosis"
+GENOMIC_INTERPRETATIONS = f"{DIAGNOSES}__genomic_interpretations"
+VARIANT_INTERPRETATIONS = f"{GENOMIC_INTERPRETATIONS}__variant_interpretation"
+VARIATION_DESCRIPTORS = f"{VARIANT_INTERPRETATIONS}__variation_descriptor"
+GENE_DESCRIPTORS = f"{GENOMIC_INTERPRETATIONS}__gene_descriptor"
+DISEASES = f"{PHENOPACKETS}__diseases"
+
+SEARCH_DOCUMENT_FIELDS = (
+    (
+        "id", "alternate_ids", "date_of_birth", "time_at_last_encounter", "sex", "karyotypic_sex", "taxonomy",
+        "extra_properties",
+        "vital_status__status", "vital_status__time_of_death", "vital_status__cause_of_death",
+        "vital_status__survival_time_in_days",
+    ),
+    tuple(f"{PHENOTYPIC_FEATURES}__{f}" for f in (
+        "description", "pftype", "severity", "modifiers", "onset", "evidence", "extra_properties")),
+    tuple(f"{BIOSAMPLES}__{f}" for f in (
+        "id", "description", "sampled_tissue", "taxonomy", "time_of_collection", "histological_diagnosis",
+        "tumor_progression", "tumor_grade", "diagnostic_markers", "procedure", "extra_properties")),
+    (
+        *(f"{EXPERIMENTS}__{f}" for f in (
+            "study_type", "experiment_type", "experiment_ontology", "molecule", "molecule_ontology",
+            "library_strategy", "library_source", "library_selection", "library_layout", "extraction_protocol",
+            "reference_registry_id", "extra_properties")),
+        *(f"{INSTRUMENTS}__{f}" for f in ("platform", "description", "model", "extra_properties")),
+    ),
+    tuple(f"{EXPERIMENT_RESULTS}__{f}" for f in (
+        "description", "filename", "file_format", "genome_assembly_id", "data_output_type", "usage",
+        "creation_date", "created_by", "extra_properties")),
+    (
+        *(f"{INTERPRETATIONS}__{f}" for f in ("progress_status", "summary", "extra_properties")),
+        *(f"{DIAGNOSES}__{f}" for f in ("disease", "extra_properties")),
+    ),
+    (
+        *(f"{GENOMIC_INTERPRETATIONS}__{f}" for f in (
+            "subject__id", "biosample__id", "interpretation_status", "extra_properties")),
+        *(f"{VARIANT_INTERPRETATIONS}__{f}" for f in (
+            "acmg_pathogenicity_classification", "therapeutic_actionability")),
+        *(f"{VARIATION_DESCRIPTORS}__{f}" for f in (
+            "id", "label", "description", "molecule_context", "vrs_ref_allele_seq", "variation", "expressions",
+            "vcf_record", "xrefs", "alternate_labels", "extensions", "structural_type", "allelic_state")),
+        *(f"{GENE_DESCRIPTORS}__{f}" for f in (
+            "value_id", "symbol", "description", "alternate_ids", "xrefs", "alternate_symbols", "extra_properties")),
+    ),
+    tuple(f"{DISEASES}__{f}" for f in (
+        "term", "excluded", "onset", "resolution", "disease_stage", "clinical_tnm_finding", "primary_site",
+        "laterality", "extra_properties")),
+)
+
+
+class JoinText(Func):
+    template = "array_to_string(ARRAY[%(expressions)s], ' ')"
+    output_field = TextField()
+
+
+def build_search_vectors(apps, schema_editor):
+    Individual = apps.get_model("patients", "Individual")
+
+    def group_text(fields):
+        return Subquery(
+            Individual.objects.filter(pk=OuterRef("pk"))
+            .values("pk")
+            .annotate(text=StringAgg(JoinText(*(Cast(f, TextField()) for f in fields)), " ", distinct=True))
+            .values("text"),
+            output_field=TextField(),
+        )
+
+    document = SearchVector(*(group_text(fields) for fields in SEARCH_DOCUMENT_FIELDS))
+
+    individual_ids = list(Individual.objects.order_by("id").values_list("id", flat=True))
+    for i in range(0, len(individual_ids), CHUNK_SIZE):
+        with transaction.atomic(using=schema_editor.connection.alias):
+            Individual.objects.filter(pk__in=individual_ids[i:i + CHUNK_SIZE]).update(search_vector=document)
+
+
+class Migration(migrations.Migration):
+
+    # Each chunk of individuals is committed separately, rather than holding row locks on every individual at once
+    atomic = False
+
+    dependencies = [
+        ('patients', '0007_individual_search_vector'),
+        # Models the search document is made of
+        ('phenopackets', '0008_v6_0_0'),
+        ('experiments', '0009_v6_0_0'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_search_vectors, migrations.RunPython.noop),
+    ]
@@ -2,6 +2,8 @@ from django.apps import apps
 from django.db import models
 from django.db.models import JSONField
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from chord_metadata_service.restapi.models import BaseTimeStamp, IndexableMixin, SchemaType, BaseExtraProperties
 from chord_metadata_service.restapi.schemas import TIME_ELEMENT_SCHEMA
 from chord_metadata_service.restapi.validators import JsonSchemaValidator, ontology_validator
@@ -76,5 +78,14 @@ class Individual(BaseExtraProperties, BaseTimeStamp, IndexableMixin):
     extra_properties = JSONField(blank=True, null=True,
                                  help_text='Extra properties that are not supported by current schema')
 
+    # Full-text search document, made of the individual's fields and those of its phenopackets' related rows;
+    # maintained by patients.search_vector
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"], name="individual_search_vector_idx"),
+        ]
+
     def __str__(self):
         return str(self.id)
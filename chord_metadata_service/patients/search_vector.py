@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import functools
+import threading
+
+from collections import defaultdict
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import transaction
+from django.db.models import Func, OuterRef, Subquery, TextField
+from django.db.models.functions import Cast
+from typing import Iterable
+
+from .models import Individual
+
+__all__ = [
+    "INDIVIDUAL_RELATION_LOOKUPS",
+    "individual_search_document",
+    "update_individual_search_vectors",
+    "record_search_vector_update",
+]
+
+PHENOPACKETS = "phenopackets"
+PHENOTYPIC_FEATURES = f"{PHENOPACKETS}__phenotypic_features"
+BIOSAMPLES = f"{PHENOPACKETS}__biosamples"
+EXPERIMENTS = f"{BIOSAMPLES}__experiment"
+EXPERIMENT_RESULTS = f"{EXPERIMENTS}__experiment_results"
+INSTRUMENTS = f"{EXPERIMENTS}__instrument"
+INTERPRETATIONS = f"{PHENOPACKETS}__interpretations"
+DIAGNOSES = f"{INTERPRETATIONS}__diagnosis"
+GENOMIC_INTERPRETATIONS = f"{DIAGNOSES}__genomic_interpretations"
+VARIANT_INTERPRETATIONS = f"{GENOMIC_INTERPRETATIONS}__variant_interpretation"
+VARIATION_DESCRIPTORS = f"{VARIANT_INTERPRETATIONS}__variation_descriptor"
+GENE_DESCRIPTORS = f"{GENOMIC_INTERPRETATIONS}__gene_descriptor"
+DISEASES = f"{PHENOPACKETS}__diseases"
+
+# Lookups from an individual to the rows of each model which are part of its search document, by model label
+INDIVIDUAL_RELATION_LOOKUPS: dict[str, str] = {
+    "patients.VitalStatus": "vital_status",
+    "phenopackets.Phenopacket": PHENOPACKETS,
+    "phenopackets.PhenotypicFeature": PHENOTYPIC_FEATURES,
+    "phenopackets.Biosample": BIOSAMPLES,
+    "experiments.Experiment": EXPERIMENTS,
+    "experiments.ExperimentResult": EXPERIMENT_RESULTS,
+    "experiments.Instrument": INSTRUMENTS,
+    "phenopackets.Interpretation": INTERPRETATIONS,
+    "phenopackets.Diagnosis": DIAGNOSES,
+    "phenopackets.GenomicInterpretation": GENOMIC_INTERPRETATIONS,
+    "phenopackets.VariantInterpretation": VARIANT_INTERPRETATIONS,
+    "phenopackets.VariationDescriptor": VARIATION_DESCRIPTORS,
+    "phenopackets.GeneDescriptor": GENE_DESCRIPTORS,
+    "phenopackets.Disease": DISEASES,
+}
+
+# Fields of the search document, in groups of rows related to an individual in the same way (so that joining them
+# does not multiply rows of unrelated tables.)
+SEARCH_DOCUMENT_FIELDS: tuple[tuple[str, ...], ...] = (
+    # Individual fields
+    (
+        "id", "alternate_ids", "date_of_birth", "time_at_last_encounter", "sex", "karyotypic_sex", "taxonomy",
+        "extra_properties",
+        "vital_status__status", "vital_status__time_of_death", "vital_status__cause_of_death",
+        "vital_status__survival_time_in_days",
+    ),
+
+    # Phenotypic feature fields
+    tuple(f"{PHENOTYPIC_FEATURES}__{f}" for f in (
+        "description", "pftype", "severity", "modifiers", "onset", "evidence", "extra_properties")),
+
+    # Biosample fields, including the procedure
+    tuple(f"{BIOSAMPLES}__{f}" for f in (
+        "id", "description", "sampled_tissue", "taxonomy", "time_of_collection", "histological_diagnosis",
+        "tumor_progression", "tumor_grade", "diagnostic_markers", "procedure", "extra_properties")),
+
+    # Experiment fields, including the instrument
+    (
+        *(f"{EXPERIMENTS}__{f}" for f in (
+            "study_type", "experiment_type", "experiment_ontology", "molecule", "molecule_ontology",
+            "library_strategy", "library_source", "library_selection", "library_layout", "extraction_protocol",
+            "reference_registry_id", "extra_properties")),
+        *(f"{INSTRUMENTS}__{f}" for f in ("platform", "description", "model", "extra_properties")),
+    ),
+
+    # Experiment result fields
+    tuple(f"{EXPERIMENT_RESULTS}__{f}" for f in (
+        "description", "filename", "file_format", "genome_assembly_id", "data_output_type", "usage",
+        "creation_date", "created_by", "extra_properties")),
+
+    # Interpretation fields, including the diagnosis
+    (
+        *(f"{INTERPRETATIONS}__{f}" for f in ("progress_status", "summary", "extra_properties")),
+        *(f"{DIAGNOSES}__{f}" for f in ("disease", "extra_properties")),
+    ),
+
+    # Genomic interpretation fields, including the variant interpretation and the gene descriptor
+    (
+        *(f"{GENOMIC_INTERPRETATIONS}__{f}" for f in (
+            "subject__id", "biosample__id", "interpretation_status", "extra_properties")),
+        *(f"{VARIANT_INTERPRETATIONS}__{f}" for f in (
+            "acmg_pathogenicity_classification", "therapeutic_actionability")),
+        *(f"{VARIATION_DESCRIPTORS}__{f}" for f in (
+            "id", "label", "description", "molecule_context", "vrs_ref_allele_seq", "variation", "expressions",
+            "vcf_record", "xrefs", "alternate_labels", "extensions", "structural_type", "allelic_state")),
+        *(f"{GENE_DESCRIPTORS}__{f}" for f in (
+            "value_id", "symbol", "description", "alternate_ids", "xrefs", "alternate_symbols", "extra_properties")),
+    ),
+
+    # Disease fields
+    tuple(f"{DISEASES}__{f}" for f in (
+        "term", "excluded", "onset", "resolution", "disease_stage", "clinical_tnm_finding", "primary_site",
+        "laterality", "extra_properties")),
+)
+
+
+class _JoinText(Func):
+    # Unlike CONCAT_WS, takes any number of values (and, like it, skips NULLs)
+    template = "array_to_string(ARRAY[%(expressions)s], ' ')"
+    output_field = TextField()
+
+
+def _group_text(fields: tuple[str, ...]) -> Subquery:
+    """
+    Text of a group of fields, for all the rows related to the outer individual, with duplicates removed.
+    """
+    return Subquery(
+        Individual.objects.filter(pk=OuterRef("pk"))
+        .values("pk")
+        .annotate(text=StringAgg(_JoinText(*(Cast(f, TextField()) for f in fields)), " ", distinct=True))
+        .values("text"),
+        output_field=TextField(),
+    )
+
+
+def individual_search_document() -> SearchVector:
+    """
+    Full-text search document of an individual, made of its own fields and those of the rows related to it through
+    its phenopackets (phenotypic features, biosamples and their experiments, interpretations down to variation and
+    gene descriptors, and diseases.) Stored in Individual.search_vector.
+    """
+    return SearchVector(*(_group_text(fields) for fields in SEARCH_DOCUMENT_FIELDS))
+
+
+def update_individual_search_vectors(individual_ids: Iterable[str] | None = None) -> int:
+    """
+    Recomputes the stored search document of the given individuals (or of every individual) in a single UPDATE.
+    Returns the number of individuals updated.
+    """
+    qs = Individual.objects.all()
+    if individual_ids is not None:
+        qs = qs.filter(pk__in=list(individual_ids))
+    return qs.update(search_vector=individual_search_document())
+
+
+# Rows saved in the current thread whose individuals' search documents are out of date, by model label
+_pending: threading.local = threading.local()
+
+
+def _pending_rows() -> defaultdict[str, set]:
+    if not hasattr(_pending, "rows"):
+        _pending.rows = defaultdict(set)
+    return _pending.rows
+
+
+def _flush_pending() -> None:
+    rows = _pending_rows()
+    pending = dict(rows)
+    rows.clear()
+
+    individual_ids = set(pending.pop(Individual._meta.label, ()))
+    for label, pks in pending.items():
+        individual_ids.update(
+            Individual.objects.filter(**{f"{INDIVIDUAL_RELATION_LOOKUPS[label]}__in": pks})
+            .values_list("pk", flat=True))
+
+    if individual_ids:
+        update_individual_search_vectors(individual_ids)
+
+
+def _flush_queued() -> bool:
+    # Commit callbacks of a transaction are discarded when it (or the savepoint they were registered in) is rolled back
+    connection = transaction.get_connection()
+    flush = getattr(_pending, "flush", None)
+    return connection.in_atomic_block and any(func is flush for _, func, *_ in connection.run_on_commit)
+
+
+def record_search_vector_update(model, pks: Iterable) -> None:
+    """
+    Marks the search documents of the individuals related to the given rows (of Individual, or of a model in
+    INDIVIDUAL_RELATION_LOOKUPS) as out of date. They are recomputed together once the current transaction commits,
+    so that ingesting a phenopacket object by object only updates its subject's document once.
+    """
+
+    rows = _pending_rows()
+
+    if rows and not _flush_queued():
+        # Left over from a transaction which was rolled back: its rows were never saved
+        rows.clear()
+
+    register = not rows
+    rows[model._meta.label].update(pks)
+
+    if register:
+        # The documents are recomputed by a single callback per transaction, registered along with its first rows (and
+        # distinct from the callbacks of earlier transactions, so that it can be looked up by identity.)
+        _pending.flush = functools.partial(_flush_pending)
+        transaction.on_commit(_pending.flush)
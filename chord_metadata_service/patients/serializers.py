@@ -11,7 +11,7 @@ class IndividualSerializer(GenericSerializer):
 
     class Meta:
         model = Individual
-        fields = "__all__"
+        exclude = ("search_vector",)
         # meta info for converting to FHIR
         fhir_datatype_plural = 'patients'
         class_converter = fhir_patient
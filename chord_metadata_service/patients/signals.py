@@ -1,11 +1,11 @@
 import logging
-from django.db.models.signals import post_save, post_delete
+from django.apps import apps
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 from chord_metadata_service.patients.models import Individual
-from chord_metadata_service.patients.indices import (
-    build_individual_index,
-    remove_individual_index
-)
+from chord_metadata_service.patients.indices import INDIVIDUAL_INDEX_SOURCE
+from chord_metadata_service.patients.search_vector import INDIVIDUAL_RELATION_LOOKUPS, record_search_vector_update
+from chord_metadata_service.restapi.fhir_index_sync import record_index_upsert, record_index_delete
 
 
 logger = logging.getLogger(__name__)
@@ -14,11 +14,59 @@ logger.setLevel(logging.INFO)
 
 @receiver(post_save, sender=Individual)
 def index_individual(sender, instance, **kwargs):
-    build_individual_index(instance)
+    record_index_upsert(INDIVIDUAL_INDEX_SOURCE, instance)
+    record_search_vector_update(sender, [instance.pk])
     logging.info(f'index_individual_signal {instance.id}')
 
 
 @receiver(post_delete, sender=Individual)
 def remove_individual(sender, instance, **kwargs):
-    remove_individual_index(instance)
+    record_index_delete(instance)
     logging.info(f'remove_individual_signal {instance.id}')
+
+
+# Search documents of individuals: ------------------------------------------------------------------------------------
+#  - saving a row which is part of the search document of individuals marks their documents as out of date
+#  - so does linking or unlinking related rows, for many-to-many relations
+#  - deleting a phenopacket, biosample or phenotypic feature marks the document of its individual as out of date;
+#    bulk deletes of datasets and data types update the documents of the individuals related to what they delete
+#    (their cleanup candidates), and cleanup itself only removes rows no longer related to any individual
+
+def update_search_vector(sender, instance, **kwargs):
+    record_search_vector_update(sender, [instance.pk])
+
+
+def update_search_vector_m2m(sender, instance, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        record_search_vector_update(type(instance), [instance.pk])
+
+
+for _label in INDIVIDUAL_RELATION_LOOKUPS:
+    post_save.connect(update_search_vector, sender=_label)
+
+for _m2m_label, _m2m_field in (
+    ("phenopackets.Phenopacket", "biosamples"),
+    ("phenopackets.Phenopacket", "interpretations"),
+    ("phenopackets.Phenopacket", "diseases"),
+    ("phenopackets.Diagnosis", "genomic_interpretations"),
+    ("experiments.Experiment", "experiment_results"),
+):
+    m2m_changed.connect(
+        update_search_vector_m2m, sender=getattr(apps.get_model(_m2m_label), _m2m_field).through)
+
+
+@receiver(post_delete, sender="phenopackets.Phenopacket")
+def remove_phenopacket_search_vector(sender, instance, **kwargs):
+    record_search_vector_update(Individual, [instance.subject_id])
+
+
+@receiver(post_delete, sender="phenopackets.Biosample")
+def remove_biosample_search_vector(sender, instance, **kwargs):
+    if instance.individual_id is not None:
+        record_search_vector_update(Individual, [instance.individual_id])
+
+
+@receiver(post_delete, sender="phenopackets.PhenotypicFeature")
+def remove_phenotypic_feature_search_vector(sender, instance, **kwargs):
+    if instance.phenopacket_id is not None:
+        record_search_vector_update(apps.get_model("phenopackets.Phenopacket"), [instance.phenopacket_id])
@@ -154,16 +154,65 @@ class IndividualCSVRendererTest(APITestCase):
             self.assertIn(column, [column_name.lower() for column_name in headers])
 
 
-class IndividualWithPhenopacketSearchTest(APITestCase):
-    """ Test for api/individuals?search= """
+class IndividualCSVStreamingTest(APITestCase):
+    """ Test streamed csv export for Individuals. """
 
     def setUp(self):
         self.individual_one = Individual.objects.create(**c.VALID_INDIVIDUAL)
         self.individual_two = Individual.objects.create(**c.VALID_INDIVIDUAL_2)
-        self.metadata_1 = ph_m.MetaData.objects.create(**ph_c.VALID_META_DATA_1)
-        self.phenopacket_1 = ph_m.Phenopacket.objects.create(
-            **ph_c.valid_phenopacket(subject=self.individual_one, meta_data=self.metadata_1)
-        )
+        metadata = ph_m.MetaData.objects.create(**ph_c.VALID_META_DATA_1)
+        for i, individual in enumerate((self.individual_one, self.individual_one, self.individual_two)):
+            phenopacket = ph_m.Phenopacket.objects.create(
+                **{**ph_c.valid_phenopacket(subject=individual, meta_data=metadata), 'id': f'phenopacket:{i}'})
+            phenopacket.diseases.set([ph_m.Disease.objects.create(**ph_c.VALID_DISEASE_1)])
+        # Disease without an onset
+        phenopacket.diseases.add(ph_m.Disease.objects.create(**{**ph_c.VALID_DISEASE_1, 'onset': None}))
+
+    def assert_same_csv(self, request):
+        streamed = request(True)
+        self.assertEqual(streamed.status_code, status.HTTP_200_OK)
+        self.assertTrue(streamed.streaming)
+        content = b''.join(streamed.streaming_content)
+        response = request(False)
+        self.assertEqual(content, response.content)
+        self.assertEqual(streamed['Content-Disposition'], response['Content-Disposition'])
+        return content.decode('utf-8')
+
+    def test_csv_stream(self):
+        self.assert_same_csv(lambda stream: self.client.get('/api/individuals', {'format': 'csv', 'stream': stream}))
+
+    def test_csv_stream_filtered(self):
+        self.assert_same_csv(
+            lambda stream: self.client.get('/api/individuals', {'format': 'csv', 'sex': 'MALE', 'stream': stream}))
+
+    def test_batch_csv_stream(self):
+        content = self.assert_same_csv(lambda stream: self.client.post(
+            reverse('batch/individuals'), {'format': 'csv', 'id': [self.individual_two.id], 'stream': stream},
+            format='json'))
+        body = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(len(body), 2)
+        self.assertEqual(body[1][0], self.individual_two.id)
+        self.assertIn('Spinocerebellar ataxia 1', body[1][6])
+
+    def test_stream_json(self):
+        # Only csv exports are streamed
+        response = self.client.get('/api/individuals?stream=true')
+        self.assertFalse(response.streaming)
+        self.assertEqual(len(response.json()['results']), 2)
+
+
+class IndividualWithPhenopacketSearchTest(APITestCase):
+    """ Test for api/individuals?search= """
+
+    def setUp(self):
+        # Search documents are computed once the transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            self.individual_one = Individual.objects.create(**c.VALID_INDIVIDUAL)
+            self.individual_two = Individual.objects.create(**c.VALID_INDIVIDUAL_2)
+            self.metadata_1 = ph_m.MetaData.objects.create(**ph_c.VALID_META_DATA_1)
+            self.phenopacket_1 = ph_m.Phenopacket.objects.create(
+                **ph_c.valid_phenopacket(subject=self.individual_one, meta_data=self.metadata_1)
+            )
 
     def test_search(self):  # test full-text search
         get_resp_1 = self.client.get('/api/individuals?search=P49Y')
@@ -1,3 +1,10 @@
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from io import StringIO
+
+from chord_metadata_service.chord.ingest.phenopackets import ingest_phenopackets_bulk
+from chord_metadata_service.chord.tests.example_ingest import EXAMPLE_INGEST_PHENOPACKET
 from chord_metadata_service.chord.tests.helpers import ProjectTestCase
 from chord_metadata_service.phenopackets.tests import constants as c
 from chord_metadata_service.phenopackets import models as m
@@ -5,6 +12,7 @@ from chord_metadata_service.restapi.models import SchemaType
 
 from ..models import Individual
 from ..filters import IndividualFilter
+from ..search_vector import update_individual_search_vectors
 
 
 class IndividualTest(ProjectTestCase):
@@ -64,3 +72,112 @@ class IndividualTest(ProjectTestCase):
         self.assertEqual(len(result), 1)
         result = f.filter_disease(Individual.objects.all(), "phenopackets", c.VALID_DISEASE_1["term"]["label"])
         self.assertEqual(len(result), 1)
+
+
+class IndividualSearchVectorTest(ProjectTestCase):
+    """ Test module for the stored search documents of individuals """
+
+    def setUp(self):
+        # Search documents are computed once the transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            self.individual_one = Individual.objects.create(id='patient:1', sex='FEMALE')
+            self.individual_two = Individual.objects.create(id='patient:2', sex='MALE')
+            self.meta_data = m.MetaData.objects.create(**c.VALID_META_DATA_1)
+            self.phenopacket = m.Phenopacket.objects.create(
+                id="phenopacket_id:1",
+                subject=self.individual_one,
+                meta_data=self.meta_data,
+                dataset=self.dataset
+            )
+            self.disease = m.Disease.objects.create(**c.VALID_DISEASE_1)
+            self.phenopacket.diseases.add(self.disease)
+            self.biosample = m.Biosample.objects.create(**c.valid_biosample_1(self.individual_one))
+            self.phenopacket.biosamples.add(self.biosample)
+
+    @staticmethod
+    def search(value: str) -> list[str]:
+        return sorted(IndividualFilter().filter_search(Individual.objects.all(), "search", value)
+                      .values_list("id", flat=True))
+
+    def test_search_related_rows(self):
+        self.assertListEqual(self.search("FEMALE"), ["patient:1"])
+        self.assertListEqual(self.search("Spinocerebellar ataxia"), ["patient:1"])
+        self.assertListEqual(self.search("wall of urinary bladder"), ["patient:1"])
+        self.assertListEqual(self.search("katsu.biosample_id:1"), ["patient:1"])
+        self.assertListEqual(self.search("NCBITaxon:9606"), ["patient:1"])
+        self.assertListEqual(self.search("Spinocerebellar MALE"), [])
+
+    def test_search_query(self):
+        # Searching uses the stored document only
+        query = str(IndividualFilter().filter_search(Individual.objects.all(), "search", "ataxia").query)
+        self.assertNotIn("JOIN", query)
+        self.assertNotIn("to_tsvector", query)
+
+    def test_update_related_rows(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.disease.term = {"id": "OMIM:000001", "label": "Hereditary tremor"}
+            self.disease.save()
+        self.assertListEqual(self.search("tremor"), ["patient:1"])
+        self.assertListEqual(self.search("Spinocerebellar"), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            phenopacket_2 = m.Phenopacket.objects.create(
+                id="phenopacket_id:2", subject=self.individual_two, meta_data=self.meta_data, dataset=self.dataset)
+            phenopacket_2.diseases.add(self.disease)
+        self.assertListEqual(self.search("tremor"), ["patient:1", "patient:2"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            phenopacket_2.delete()
+        self.assertListEqual(self.search("tremor"), ["patient:1"])
+
+    def test_update_batched(self):
+        # Saving several related rows in a transaction updates the search document once, on commit
+        with self.captureOnCommitCallbacks() as callbacks:
+            m.PhenotypicFeature.objects.create(**c.valid_phenotypic_feature(phenopacket=self.phenopacket))
+            m.PhenotypicFeature.objects.create(**c.valid_phenotypic_feature(phenopacket=self.phenopacket))
+        self.assertListEqual(self.search("proptosis"), [])
+
+        self.assertEqual(len(callbacks), 1)
+
+        with CaptureQueriesContext(connection) as ctx:
+            for callback in callbacks:
+                callback()
+        self.assertEqual(sum(q["sql"].startswith("UPDATE") for q in ctx.captured_queries), 1)
+        self.assertListEqual(self.search("proptosis"), ["patient:1"])
+
+    def test_update_rolled_back(self):
+        # Rows saved in a transaction which is rolled back are not picked up by the next one
+        try:
+            with transaction.atomic():
+                self.disease.term = {"id": "OMIM:000001", "label": "Hereditary tremor"}
+                self.disease.save()
+                raise ValueError
+        except ValueError:
+            pass
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            Individual.objects.get(pk="patient:2").save()
+        self.assertEqual(len(callbacks), 1)
+
+        with CaptureQueriesContext(connection) as ctx:
+            callbacks[0]()
+        updates = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+        self.assertIn("patient:2", updates[0])
+        self.assertNotIn("patient:1", updates[0])
+
+    def test_ingest_bulk(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ingest_phenopackets_bulk([EXAMPLE_INGEST_PHENOPACKET], str(self.dataset.identifier))
+        self.assertListEqual(self.search("sample5"), ["patient1"])
+
+    def test_rebuild(self):
+        Individual.objects.update(search_vector=None)
+        self.assertListEqual(self.search("ataxia"), [])
+
+        out = StringIO()
+        call_command("patients_build_search_vectors", "--chunk-size", "1", stdout=out)
+        self.assertIn("2 individuals", out.getvalue())
+        self.assertListEqual(self.search("ataxia"), ["patient:1"])
+
+        self.assertEqual(update_individual_search_vectors(["patient:2"]), 1)
@@ -5,11 +5,16 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 
-from chord_metadata_service.restapi.api_renderers import (PhenopacketsRenderer, FHIRRenderer,
+from chord_metadata_service.restapi.api_renderers import (CSVStreamingMixin, PhenopacketsRenderer, FHIRRenderer,
                                                           BiosamplesCSVRenderer, ARGORenderer,
                                                           IndividualBentoSearchRenderer)
+from chord_metadata_service.restapi.compiled_serializers import CompiledRepresentationMixin, get_prefetch_plan
 from chord_metadata_service.restapi.constants import MODEL_ID_PATTERN
-from chord_metadata_service.restapi.pagination import LargeResultsSetPagination, BatchResultsSetPagination
+from chord_metadata_service.restapi.pagination import (
+    LargeResultsSetPagination,
+    BatchResultsSetPagination,
+    KeysetPaginationMixin,
+)
 from chord_metadata_service.restapi.negociation import FormatInPostContentNegotiation
 from chord_metadata_service.phenopackets.schemas import PHENOPACKET_SCHEMA
 from . import models as m, serializers as s, filters as f
@@ -56,9 +61,7 @@ class DiseaseViewSet(ExtendedPhenopacketsModelViewSet):
     queryset = m.Disease.objects.all().order_by("id")
 
 
-META_DATA_PREFETCH = (
-    "resources",
-)
+META_DATA_PREFETCH = get_prefetch_plan(s.MetaDataSerializer)
 
 
 class MetaDataViewSet(PhenopacketsModelViewSet):
@@ -76,13 +79,10 @@ class MetaDataViewSet(PhenopacketsModelViewSet):
     queryset = m.MetaData.objects.all().prefetch_related(*META_DATA_PREFETCH).order_by("id")
 
 
-BIOSAMPLE_PREFETCH = (
-    "phenotypic_features",
-    "experiment_set",
-)
+BIOSAMPLE_PREFETCH = get_prefetch_plan(s.BiosampleSerializer)
 
 
-class BiosampleViewSet(ExtendedPhenopacketsModelViewSet):
+class BiosampleViewSet(KeysetPaginationMixin, ExtendedPhenopacketsModelViewSet):
     """
     get:
     Return a list of all existing biosamples
@@ -97,7 +97,7 @@ class BiosampleViewSet(ExtendedPhenopacketsModelViewSet):
     lookup_value_regex = MODEL_ID_PATTERN
 
 
-class BiosampleBatchViewSet(ExtendedPhenopacketsModelViewSet):
+class BiosampleBatchViewSet(CSVStreamingMixin, ExtendedPhenopacketsModelViewSet):
     """
     get:
     Return a list of all existing biosamples
@@ -132,18 +132,14 @@ class BiosampleBatchViewSet(ExtendedPhenopacketsModelViewSet):
     def create(self, request, *args, **kwargs):
         ids_list = request.data.get('id', [])
         queryset = self._get_filtered_queryset(ids_list=ids_list)
+        if (response := self.csv_streaming_response(request, queryset)) is not None:
+            return response
 
         serializer = s.BiosampleSerializer(queryset, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-PHENOPACKET_PREFETCH = (
-    *(f"biosamples__{p}" for p in BIOSAMPLE_PREFETCH),
-    *(f"meta_data__{p}" for p in META_DATA_PREFETCH),
-    "phenotypic_features",
-    "subject",
-    "interpretations",
-)
+PHENOPACKET_PREFETCH = get_prefetch_plan(s.PhenopacketSerializer)
 
 PHENOPACKET_SELECT_REL = (
     "subject",
@@ -151,7 +147,7 @@ PHENOPACKET_SELECT_REL = (
 )
 
 
-class PhenopacketViewSet(ExtendedPhenopacketsModelViewSet):
+class PhenopacketViewSet(CompiledRepresentationMixin, KeysetPaginationMixin, ExtendedPhenopacketsModelViewSet):
     """
     get:
     Return a list of all existing phenopackets
@@ -176,7 +172,9 @@ class GenomicInterpretationViewSet(PhenopacketsModelViewSet):
     Create a new genomic interpretation
 
     """
-    queryset = m.GenomicInterpretation.objects.all().order_by("id")
+    queryset = m.GenomicInterpretation.objects.all() \
+        .prefetch_related(*get_prefetch_plan(s.GenomicInterpretationSerializer)) \
+        .order_by("id")
     serializer_class = s.GenomicInterpretationSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_class = f.GenomicInterpretationFilter
@@ -194,7 +192,7 @@ class DiagnosisViewSet(PhenopacketsModelViewSet):
     serializer_class = s.DiagnosisSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_class = f.DiagnosisFilter
-    queryset = m.Diagnosis.objects.all().order_by("id")
+    queryset = m.Diagnosis.objects.all().prefetch_related(*get_prefetch_plan(s.DiagnosisSerializer)).order_by("id")
 
 
 class InterpretationViewSet(PhenopacketsModelViewSet):
@@ -209,7 +207,9 @@ class InterpretationViewSet(PhenopacketsModelViewSet):
     serializer_class = s.InterpretationSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_class = f.InterpretationFilter
-    queryset = m.Interpretation.objects.all().order_by("id")
+    queryset = m.Interpretation.objects.all() \
+        .prefetch_related(*get_prefetch_plan(s.InterpretationSerializer)) \
+        .order_by("id")
 
 
 @extend_schema(
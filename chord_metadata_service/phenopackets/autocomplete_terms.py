@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from django.db.models import Exists, OuterRef, QuerySet
+from django.db.models.fields.json import KT
+from typing import Iterable
+
+from . import models as pm
+
+__all__ = [
+    "AUTOCOMPLETE_FIELDS",
+    "object_terms",
+    "record_autocomplete_terms",
+    "autocomplete_terms_used_by",
+    "unused_autocomplete_terms",
+]
+
+# Models and JSON fields holding the terms of each autocompleted field
+AUTOCOMPLETE_FIELDS: dict[str, tuple[type, str]] = {
+    pm.AutocompleteTerm.DISEASE_TERM: (pm.Disease, "term"),
+    pm.AutocompleteTerm.PHENOTYPIC_FEATURE_TYPE: (pm.PhenotypicFeature, "pftype"),
+    pm.AutocompleteTerm.BIOSAMPLE_SAMPLED_TISSUE: (pm.Biosample, "sampled_tissue"),
+}
+
+# Autocompleted field, by model
+_FIELDS_BY_MODEL: dict[type, str] = {model: field for field, (model, _) in AUTOCOMPLETE_FIELDS.items()}
+
+
+def object_terms(objs: Iterable) -> set[tuple[str, str]]:
+    """
+    Returns the (ID, label) pairs of the autocompleted terms of objects of one of the models in AUTOCOMPLETE_FIELDS.
+    """
+    terms = set()
+    for obj in objs:
+        term = getattr(obj, AUTOCOMPLETE_FIELDS[_FIELDS_BY_MODEL[type(obj)]][1])
+        if isinstance(term, dict) and term.get("id") is not None and term.get("label") is not None:
+            terms.add((str(term["id"]), str(term["label"])))
+    return terms
+
+
+def record_autocomplete_terms(model: type, objs: Iterable) -> None:
+    """
+    Adds the terms of saved (or ingested) objects to the autocomplete dictionary, if they are not in it yet.
+    """
+    field = _FIELDS_BY_MODEL[model]
+    pm.AutocompleteTerm.objects.bulk_create(
+        [pm.AutocompleteTerm(field=field, term_id=term_id, label=label) for term_id, label in object_terms(objs)],
+        ignore_conflicts=True)
+
+
+def _used_by(field: str, qs: QuerySet) -> Exists:
+    attr = AUTOCOMPLETE_FIELDS[field][1]
+    return Exists(qs.alias(_term_id=KT(f"{attr}__id"), _label=KT(f"{attr}__label")).filter(
+        _term_id=OuterRef("term_id"), _label=OuterRef("label")))
+
+
+def autocomplete_terms_used_by(qs: QuerySet) -> QuerySet:
+    """
+    Returns a queryset of the terms of the autocomplete dictionary which are used by objects of a queryset (of one of
+    the models in AUTOCOMPLETE_FIELDS.)
+    """
+    field = _FIELDS_BY_MODEL[qs.model]
+    return pm.AutocompleteTerm.objects.filter(_used_by(field, qs), field=field)
+
+
+def unused_autocomplete_terms():
+    """
+    Returns a queryset of the terms of the autocomplete dictionary which are no longer used by any object, e.g. once
+    the objects were deleted or had their term changed.
+    """
+    unused = pm.AutocompleteTerm.objects.none()
+    for field, (model, _) in AUTOCOMPLETE_FIELDS.items():
+        unused |= pm.AutocompleteTerm.objects.filter(field=field).exclude(_used_by(field, model.objects.all()))
+    return unused
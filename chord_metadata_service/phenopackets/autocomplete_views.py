@@ -1,64 +1,54 @@
+import hashlib
+import json
+
 from dal import autocomplete
-from .models import Disease, PhenotypicFeature, Biosample
+from django.conf import settings
+from django.core.cache import cache
+from .models import AutocompleteTerm
 
 
-class DiseaseTermAutocomplete(autocomplete.Select2QuerySetView):
-    paginate_by = 50
+class TermAutocomplete(autocomplete.Select2QuerySetView):
+    """
+    Autocompletes the terms used in a field, searching the dictionary of distinct terms (AutocompleteTerm) rather than
+    the objects using them. Responses are cached for AUTOCOMPLETE_CACHE_TIME seconds, since the same inputs (prefixes of
+    the words being typed) are requested over and over.
+    """
 
-    # get_result_value return result.pk
+    paginate_by = 50
+    field: str = ""
 
-    def get_result_value(self, item):
-        return item.term["id"]
+    def get_result_value(self, result):
+        # returns the term ontology id
+        return result.term_id
 
-    def get_result_label(self, item):
-        return item.term["label"]
+    def get_result_label(self, result):
+        return result.label
 
     def get_queryset(self):
-        # Don't forget to filter out results depending on the visitor !
-        # if not self.request.user.is_authenticated:
-        #     return Disease.objects.none()
-
-        qs = Disease.objects.all().order_by("term__label")
+        qs = AutocompleteTerm.objects.filter(field=self.field).order_by("label", "term_id")
         if self.q:
-            # looks for a matching string everywhere in term label field
-            qs = qs.filter(term__label__icontains=self.q)
-
+            # looks for a matching string everywhere in the term label
+            qs = qs.filter(label__icontains=self.q)
         return qs
 
+    def get(self, request, *args, **kwargs):
+        params = json.dumps([self.field, self.q, request.GET.get(self.page_kwarg, 1)])
+        key = f"autocomplete:{hashlib.sha256(params.encode('utf-8')).hexdigest()}"
 
-class PhenotypicFeatureTypeAutocomplete(autocomplete.Select2QuerySetView):
-    paginate_by = 50
+        if (response := cache.get(key)) is None:
+            response = super().get(request, *args, **kwargs)
+            cache.set(key, response, timeout=settings.AUTOCOMPLETE_CACHE_TIME)
 
-    def get_result_value(self, result):
-        # returns phenotypic feature type ontology id
-        return str(result.pftype["id"])
+        return response
 
-    def get_result_label(self, item):
-        return item.pftype["label"]
 
-    def get_queryset(self):
-        qs = PhenotypicFeature.objects.all().distinct("pftype__label").order_by("pftype__label")
-        if self.q:
-            # looks for a matching string everywhere in pf type label field
-            qs = qs.filter(pftype__label__icontains=self.q)
-
-        return qs
+class DiseaseTermAutocomplete(TermAutocomplete):
+    field = AutocompleteTerm.DISEASE_TERM
 
 
-class BiosampleSampledTissueAutocomplete(autocomplete.Select2QuerySetView):
-    paginate_by = 50
-
-    def get_result_value(self, result):
-        # returns biosample sample tissue ontology id
-        return str(result.sampled_tissue["id"])
+class PhenotypicFeatureTypeAutocomplete(TermAutocomplete):
+    field = AutocompleteTerm.PHENOTYPIC_FEATURE_TYPE
 
-    def get_result_label(self, item):
-        return item.sampled_tissue["label"]
 
-    def get_queryset(self):
-        qs = Biosample.objects.all().distinct("sampled_tissue__label").order_by("sampled_tissue__label")
-        if self.q:
-            # looks for a matching string everywhere in sampled_tissue label field
-            qs = qs.filter(sampled_tissue__label__icontains=self.q)
-
-        return qs
+class BiosampleSampledTissueAutocomplete(TermAutocomplete):
+    field = AutocompleteTerm.BIOSAMPLE_SAMPLED_TISSUE
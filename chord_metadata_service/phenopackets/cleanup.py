@@ -1,48 +1,45 @@
 import chord_metadata_service.experiments.models as em
 import chord_metadata_service.phenopackets.models as pm
 
-from chord_metadata_service.cleanup.remove import remove_items, remove_not_referenced
-from chord_metadata_service.utils import build_id_set, build_id_set_from_model
+from chord_metadata_service.cleanup.remove import remove_items, remove_not_referenced, restrict_to
+from typing import Iterable
+from .autocomplete_terms import unused_autocomplete_terms
 
 __all__ = [
     "clean_meta_data",
     "clean_biosamples",
     "clean_phenotypic_features",
+    "clean_autocomplete_terms",
 ]
 
 
-async def clean_meta_data() -> int:
+async def clean_meta_data(ids: Iterable | None = None) -> int:
     """
     Deletes orphan MetaData objects where the parent phenopacket has been deleted.
     TODO: This should be handled by a OneToOne relationship rather than this hack.
     """
 
-    # Collect references to meta data
-    meta_data_referenced = await build_id_set_from_model(pm.Phenopacket, "meta_data_id")
+    # Remove metadata not referenced by phenopackets
+    return await remove_not_referenced(pm.MetaData, ((pm.Phenopacket, "meta_data_id"),), "metadata objects", ids)
 
-    # Remove metadata not referenced
-    return await remove_not_referenced(pm.MetaData, meta_data_referenced, "metadata objects")
 
-
-async def clean_biosamples() -> int:
+async def clean_biosamples(ids: Iterable | None = None) -> int:
     """
     Deletes all biosamples which aren't referenced anywhere in the application.
     Phenopackets and Experiments model tables should be deleted in the database
     BEFORE running this. Phenotypic features should be cleaned AFTER.
     """
 
-    biosamples_referenced = set()
-
-    # Collect references to biosamples in other data types
-    biosamples_referenced |= await build_id_set_from_model(pm.Phenopacket, "biosamples__id")
-    biosamples_referenced |= await build_id_set_from_model(em.Experiment, "biosample_id")
+    # References to biosamples in other data types
     # Explicitly don't check for phenotypic features here - they are attached to biosamples/phenopackets,
     #   and we want to delete them if the biosamples are otherwised not referenced elsewhere.
+    return await remove_not_referenced(pm.Biosample, (
+        (pm.Phenopacket, "biosamples__id"),
+        (em.Experiment, "biosample_id"),
+    ), "biosamples", ids)
 
-    return await remove_not_referenced(pm.Biosample, biosamples_referenced, "biosamples")
 
-
-async def clean_phenotypic_features() -> int:
+async def clean_phenotypic_features(ids: Iterable | None = None) -> int:
     """
     Deletes all phenotypic features without a biosample or phenopacket. This could
     happen especially in versions prior to 2.17.0, where on_delete was SET_NULL for both.
@@ -52,26 +49,30 @@ async def clean_phenotypic_features() -> int:
 
     # We can skip some steps and collect only those not used directly here.
 
-    pf_to_remove = await build_id_set(
-        qs=pm.PhenotypicFeature.objects.filter(
-            biosample__isnull=True,
-            phenopacket__isnull=True,
-        ),
-        field="id",
+    pf_to_remove = pm.PhenotypicFeature.objects.filter(
+        biosample__isnull=True,
+        phenopacket__isnull=True,
     )
-    return await remove_items(pm.PhenotypicFeature, pf_to_remove, "phenotypic features")
+    return await remove_items(restrict_to(pf_to_remove, ids), "phenotypic features")
+
 
+async def clean_interpretations(ids: Iterable | None = None) -> int:
+    return await remove_not_referenced(
+        pm.Interpretation, ((pm.Phenopacket, "interpretations__id"),), "interpretations", ids)
 
-async def clean_interpretations() -> int:
-    interpretations_referenced = await build_id_set_from_model(pm.Phenopacket, "interpretations__id")
-    return await remove_not_referenced(pm.Interpretation, interpretations_referenced, "interpretations")
 
+async def clean_diagnoses(ids: Iterable | None = None) -> int:
+    return await remove_not_referenced(pm.Diagnosis, ((pm.Interpretation, "diagnosis__id"),), "diagnosis", ids)
 
-async def clean_diagnoses() -> int:
-    diagnoses_referenced = await build_id_set_from_model(pm.Interpretation, "diagnosis__id")
-    return await remove_not_referenced(pm.Diagnosis, diagnoses_referenced, "diagnosis")
 
+async def clean_genomic_interpretations(ids: Iterable | None = None) -> int:
+    return await remove_not_referenced(
+        pm.GenomicInterpretation, ((pm.Diagnosis, "genomic_interpretations__id"),), "genomic interpretations", ids)
 
-async def clean_genomic_interpretations() -> int:
-    gi_referenced = await build_id_set_from_model(pm.Diagnosis, "genomic_interpretations__id")
-    return await remove_not_referenced(pm.GenomicInterpretation, gi_referenced, "genomic interpretations")
+
+async def clean_autocomplete_terms(ids: Iterable | None = None) -> int:
+    """
+    Deletes autocomplete terms which are no longer used by any disease, phenotypic feature or biosample. Objects
+    should be cleaned BEFORE running this.
+    """
+    return await remove_items(restrict_to(unused_autocomplete_terms(), ids), "autocomplete terms")
@@ -1,5 +1,3 @@
-from django.conf import settings
-from chord_metadata_service.metadata.elastic import es
 from chord_metadata_service.phenopackets.serializers import (
     DiseaseSerializer,
     BiosampleSerializer,
@@ -12,69 +10,42 @@ from chord_metadata_service.phenopackets.models import (
     PhenotypicFeature,
     Phenopacket
 )
+from chord_metadata_service.restapi.fhir_indexing import FHIRIndexSource
 from chord_metadata_service.restapi.fhir_utils import (
     fhir_condition,
     fhir_specimen,
     fhir_observation,
     fhir_composition
 )
+from .api_views import BIOSAMPLE_PREFETCH, PHENOPACKET_PREFETCH, PHENOPACKET_SELECT_REL
 
 
-def build_disease_index(disease: Disease) -> str:
-    if es:
-        disease_json = DiseaseSerializer(disease)
-        fhir_disease_json = fhir_condition(disease_json.data)
-
-        res = es.index(index=settings.FHIR_INDEX_NAME, id=disease.index_id, body=fhir_disease_json)
-        return res['result']
-
-
-def remove_disease_index(disease: Disease) -> str:
-    if es:
-        res = es.delete(index=settings.FHIR_INDEX_NAME, id=disease.index_id)
-        return res['result']
-
-
-def build_biosample_index(biosample: Biosample) -> str:
-    if es:
-        biosample_json = BiosampleSerializer(biosample)
-        fhir_biosample_json = fhir_specimen(biosample_json.data)
-
-        res = es.index(index=settings.FHIR_INDEX_NAME, id=biosample.index_id, body=fhir_biosample_json)
-        return res['result']
-
-
-def remove_biosample_index(biosample: Biosample) -> str:
-    if es:
-        res = es.delete(index=settings.FHIR_INDEX_NAME, id=biosample.index_id)
-        return res['result']
-
-
-def build_phenotypicfeature_index(feature: PhenotypicFeature) -> str:
-    if es:
-        feature_json = PhenotypicFeatureSerializer(feature)
-        fhir_feature_json = fhir_observation(feature_json.data)
-
-        res = es.index(index=settings.FHIR_INDEX_NAME, id=feature.index_id, body=fhir_feature_json)
-        return res['result']
-
-
-def remove_phenotypicfeature_index(feature: PhenotypicFeature) -> str:
-    if es:
-        res = es.delete(index=settings.FHIR_INDEX_NAME, id=feature.index_id)
-        return res['result']
-
-
-def build_phenopacket_index(phenopacket: Phenopacket) -> str:
-    if es:
-        phenopacket_json = PhenopacketSerializer(phenopacket)
-        fhir_phenopacket_json = fhir_composition(phenopacket_json.data)
+# Sources for bulk (re)indexing, in the order the build_index command indexes them
+DISEASE_INDEX_SOURCE = FHIRIndexSource(
+    name="diseases",
+    get_queryset=lambda: Disease.objects.order_by("id"),
+    serializer_class=DiseaseSerializer,
+    to_fhir=fhir_condition,
+)
 
-        res = es.index(index=settings.FHIR_INDEX_NAME, id=phenopacket.index_id, body=fhir_phenopacket_json)
-        return res['result']
+BIOSAMPLE_INDEX_SOURCE = FHIRIndexSource(
+    name="biosamples",
+    get_queryset=lambda: Biosample.objects.prefetch_related(*BIOSAMPLE_PREFETCH).order_by("id"),
+    serializer_class=BiosampleSerializer,
+    to_fhir=fhir_specimen,
+)
 
+PHENOTYPIC_FEATURE_INDEX_SOURCE = FHIRIndexSource(
+    name="phenotypic_features",
+    get_queryset=lambda: PhenotypicFeature.objects.order_by("id"),
+    serializer_class=PhenotypicFeatureSerializer,
+    to_fhir=fhir_observation,
+)
 
-def remove_phenopacket_index(phenopacket: Phenopacket) -> str:
-    if es:
-        res = es.delete(index=settings.FHIR_INDEX_NAME, id=phenopacket.index_id)
-        return res['result']
+PHENOPACKET_INDEX_SOURCE = FHIRIndexSource(
+    name="phenopackets",
+    get_queryset=lambda: Phenopacket.objects.select_related(*PHENOPACKET_SELECT_REL)
+    .prefetch_related(*PHENOPACKET_PREFETCH).order_by("id"),
+    serializer_class=PhenopacketSerializer,
+    to_fhir=fhir_composition,
+)
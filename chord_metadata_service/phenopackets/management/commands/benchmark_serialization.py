@@ -0,0 +1,65 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from humps import decamelize
+from rest_framework.renderers import JSONRenderer
+
+from chord_metadata_service.chord.ingest.phenopackets import ingest_phenopackets_bulk
+from chord_metadata_service.chord.models import Project, Dataset
+from chord_metadata_service.phenopackets.api_views import PHENOPACKET_PREFETCH
+from chord_metadata_service.phenopackets.models import Phenopacket
+from chord_metadata_service.phenopackets.serializers import PhenopacketSerializer
+from chord_metadata_service.restapi.compiled_serializers import compile_serializer
+
+
+class Command(BaseCommand):
+    help = """
+        Benchmarks phenopacket serialization with DRF serializers against the compiled representation, reporting
+        phenopackets serialized per second, and checks that both give the same output. Phenopackets from a JSON file
+        are ingested in a transaction which is rolled back at the end.
+        Arguments: ./path/to/phenopackets.json
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("data", action="store", type=str, help="JSON file containing a list of phenopackets")
+        parser.add_argument("--rounds", action="store", type=int, default=3,
+                            help="Number of times to serialize every phenopacket, per serializer")
+
+    def _time(self, label: str, serialize, phenopackets: list, rounds: int) -> list:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            data = [serialize(p) for p in phenopackets]
+        elapsed = time.perf_counter() - start
+
+        n = len(phenopackets) * rounds
+        self.stdout.write(f"{label:<9} {n} phenopackets in {elapsed:.2f}s: {n / elapsed:.1f} phenopackets/s")
+        return data
+
+    def handle(self, *args, **options):
+        with open(options["data"], "r") as df:
+            phenopackets_data = decamelize(json.load(df))
+
+        if isinstance(phenopackets_data, dict):
+            phenopackets_data = [phenopackets_data]
+
+        with transaction.atomic():
+            project = Project.objects.create(title="benchmark_serialization", description="")
+            dataset = Dataset.objects.create(title="benchmark_serialization", description="", project=project,
+                                             data_use={})
+            ingest_phenopackets_bulk(phenopackets_data, str(dataset.identifier), validate=False)
+
+            # Fetched once, so that both serializers are timed on the same prefetched objects without queries
+            phenopackets = list(
+                Phenopacket.objects.filter(dataset=dataset).prefetch_related(*PHENOPACKET_PREFETCH).order_by("id"))
+
+            drf_data = self._time("drf", lambda p: PhenopacketSerializer(p).data, phenopackets, options["rounds"])
+            compiled_data = self._time(
+                "compiled", compile_serializer(PhenopacketSerializer), phenopackets, options["rounds"])
+
+            transaction.set_rollback(True)
+
+        renderer = JSONRenderer()
+        if renderer.render(drf_data) != renderer.render(compiled_data):
+            self.stderr.write("Compiled representations differ from DRF serializer output")
@@ -0,0 +1,76 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:12
+
+import logging
+
+from django.db import DatabaseError, migrations, models, transaction
+
+logger = logging.getLogger(__name__)
+
+TRIGRAM_INDEX_NAME = "autocomplete_term_label_trgm"
+
+# Fields whose terms are autocompleted: (field, model, JSON field holding the term)
+AUTOCOMPLETE_FIELDS = (
+    ("disease_term", "Disease", "term"),
+    ("phenotypic_feature_type", "PhenotypicFeature", "pftype"),
+    ("biosample_sampled_tissue", "Biosample", "sampled_tissue"),
+)
+
+
+def create_trigram_index(apps, schema_editor):
+    # label__icontains filters on UPPER(label), so that is what is indexed. pg_trgm may not be available (or may
+    # not be installable by the database user); autocomplete then falls back to scanning the (small) term table.
+    table = apps.get_model("phenopackets", "AutocompleteTerm")._meta.db_table
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            schema_editor.execute(
+                f'CREATE INDEX {TRIGRAM_INDEX_NAME} ON "{table}" USING gin ((UPPER("label"::text)) gin_trgm_ops)')
+    except DatabaseError as e:
+        logger.warning(f"Could not create the trigram index on autocomplete terms: {e}")
+
+
+def drop_trigram_index(apps, schema_editor):
+    schema_editor.execute(f"DROP INDEX IF EXISTS {TRIGRAM_INDEX_NAME}")
+
+
+def populate_autocomplete_terms(apps, schema_editor):
+    AutocompleteTerm = apps.get_model("phenopackets", "AutocompleteTerm")
+    for field, model_name, attr in AUTOCOMPLETE_FIELDS:
+        terms = (
+            apps.get_model("phenopackets", model_name).objects
+            .filter(**{f"{attr}__id__isnull": False, f"{attr}__label__isnull": False})
+            .values_list(f"{attr}__id", f"{attr}__label")
+            .distinct()
+        )
+        AutocompleteTerm.objects.bulk_create(
+            [AutocompleteTerm(field=field, term_id=str(term_id), label=str(label))
+             for term_id, label in terms if term_id is not None and label is not None],
+            ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('phenopackets', '0009_v7_0_0'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AutocompleteTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(choices=[('disease_term', 'Disease term'), ('phenotypic_feature_type', 'Phenotypic feature type'), ('biosample_sampled_tissue', 'Biosample sampled tissue')], max_length=50)),
+                ('term_id', models.TextField()),
+                ('label', models.TextField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['field', 'label'], name='autocomplete_term_label_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='autocompleteterm',
+            constraint=models.UniqueConstraint(fields=('field', 'term_id', 'label'), name='autocomplete_term_unique'),
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+        migrations.RunPython(populate_autocomplete_terms, migrations.RunPython.noop),
+    ]
@@ -461,3 +461,45 @@ class Phenopacket(BaseExtraProperties, BaseTimeStamp, IndexableMixin):
 
     def __str__(self):
         return str(self.id)
+
+
+#############################################################
+#                                                           #
+#                      Autocomplete                         #
+#                                                           #
+#############################################################
+
+class AutocompleteTerm(models.Model):
+    """
+    Dictionary of the distinct ontology terms used in a field of phenopacket objects (disease terms, phenotypic feature
+    types, biosample sampled tissues), which autocomplete views search instead of the objects themselves. Terms are
+    added as objects are saved or ingested, and terms no longer used are removed by the cleanup; see
+    phenopackets.autocomplete_terms.
+    """
+
+    DISEASE_TERM = "disease_term"
+    PHENOTYPIC_FEATURE_TYPE = "phenotypic_feature_type"
+    BIOSAMPLE_SAMPLED_TISSUE = "biosample_sampled_tissue"
+
+    FIELD_CHOICES = (
+        (DISEASE_TERM, "Disease term"),
+        (PHENOTYPIC_FEATURE_TYPE, "Phenotypic feature type"),
+        (BIOSAMPLE_SAMPLED_TISSUE, "Biosample sampled tissue"),
+    )
+
+    field = models.CharField(max_length=50, choices=FIELD_CHOICES)
+    term_id = models.TextField()
+    label = models.TextField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["field", "term_id", "label"], name="autocomplete_term_unique"),
+        ]
+        indexes = [
+            # For listing terms by label; label__icontains searches use a trigram index created by the migration,
+            # when pg_trgm is available
+            models.Index(fields=["field", "label"], name="autocomplete_term_label_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.field}: {self.label} ({self.term_id})"
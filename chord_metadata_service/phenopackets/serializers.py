@@ -17,6 +17,7 @@ from .models import (
 from chord_metadata_service.resources.serializers import ResourceSerializer
 from chord_metadata_service.experiments.serializers import ExperimentSerializer
 from chord_metadata_service.restapi import fhir_utils
+from chord_metadata_service.restapi.compiled_serializers import compile_serializer, representation_extension
 from chord_metadata_service.restapi.serializers import GenericSerializer
 
 
@@ -166,11 +167,11 @@ class GenomicInterpretationSerializer(GenericSerializer):
         # This allows us to disambiguate on the client side for links
         extra_properties = response.get("extra_properties", {})
         computed_related_type = computed_property("related_type")
-        if instance.subject:
-            response["subject_or_biosample_id"] = instance.subject.id
+        if instance.subject_id is not None:
+            response["subject_or_biosample_id"] = instance.subject_id
             extra_properties[computed_related_type] = "subject"
-        elif instance.biosample:
-            response["subject_or_biosample_id"] = instance.biosample.id
+        elif instance.biosample_id is not None:
+            response["subject_or_biosample_id"] = instance.biosample_id
             extra_properties[computed_related_type] = "biosample"
 
         response["extra_properties"] = extra_properties
@@ -243,3 +244,78 @@ class PhenopacketSerializer(SimplePhenopacketSerializer):
             exclude_when_nested=["phenopackets", "biosamples"]
         ).data
         return response
+
+
+#############################################################
+#                                                           #
+#              Compiled Representation Extensions           #
+#                                                           #
+#############################################################
+
+# Mirror the to_representation overrides above for compiled (read-only) serialization, see compile_serializer
+
+
+@representation_extension(VariantInterpretationSerializer, related={
+    "variation_descriptor": (VariationDescriptorSerializer, {}),
+})
+def _variant_interpretation_representation(instance, response):
+    response["variation_descriptor"] = compile_serializer(VariationDescriptorSerializer)(instance.variation_descriptor)
+    return response
+
+
+@representation_extension(GenomicInterpretationSerializer, related={
+    "gene_descriptor": (GeneDescriptorSerializer, {}),
+    "variant_interpretation": (VariantInterpretationSerializer, {}),
+})
+def _genomic_interpretation_representation(instance, response):
+    if instance.gene_descriptor_id is not None:
+        response["gene_descriptor"] = compile_serializer(GeneDescriptorSerializer)(instance.gene_descriptor)
+    elif instance.variant_interpretation_id is not None:
+        response["variant_interpretation"] = compile_serializer(VariantInterpretationSerializer)(
+            instance.variant_interpretation)
+
+    extra_properties = dict(response.get("extra_properties", {}))
+    computed_related_type = computed_property("related_type")
+    if instance.subject_id is not None:
+        response["subject_or_biosample_id"] = instance.subject_id
+        extra_properties[computed_related_type] = "subject"
+    elif instance.biosample_id is not None:
+        response["subject_or_biosample_id"] = instance.biosample_id
+        extra_properties[computed_related_type] = "biosample"
+
+    response["extra_properties"] = extra_properties
+    return response
+
+
+@representation_extension(InterpretationSerializer, related={
+    "diagnosis": (DiagnosisSerializer, {}),
+})
+def _interpretation_representation(instance, response):
+    response["diagnosis"] = (
+        compile_serializer(DiagnosisSerializer)(instance.diagnosis) if instance.diagnosis_id is not None
+        else DiagnosisSerializer(None, many=False, required=False).data)
+    return response
+
+
+@representation_extension(SimplePhenopacketSerializer, related={
+    "biosamples": (BiosampleSerializer, {"exclude_when_nested": ["individual"]}),
+    "meta_data": (MetaDataSerializer, {"exclude_when_nested": ["id"]}),
+})
+def _simple_phenopacket_representation(instance, response):
+    biosample_representation = compile_serializer(BiosampleSerializer, exclude_when_nested=["individual"])
+    response["biosamples"] = [biosample_representation(b) for b in instance.biosamples.all()]
+    response["meta_data"] = compile_serializer(MetaDataSerializer, exclude_when_nested=["id"])(instance.meta_data)
+    return response
+
+
+def _phenopacket_related():
+    from chord_metadata_service.patients.serializers import IndividualSerializer
+    return {"subject": (IndividualSerializer, {"exclude_when_nested": ["phenopackets", "biosamples"]})}
+
+
+@representation_extension(PhenopacketSerializer, related=_phenopacket_related)
+def _phenopacket_representation(instance, response):
+    from chord_metadata_service.patients.serializers import IndividualSerializer
+    response["subject"] = compile_serializer(IndividualSerializer, exclude_when_nested=["phenopackets", "biosamples"])(
+        instance.subject)
+    return response
@@ -8,15 +8,13 @@ from chord_metadata_service.phenopackets.models import (
     Phenopacket
 )
 from chord_metadata_service.phenopackets.indices import (
-    build_disease_index,
-    remove_disease_index,
-    build_biosample_index,
-    remove_biosample_index,
-    build_phenotypicfeature_index,
-    remove_phenotypicfeature_index,
-    build_phenopacket_index,
-    remove_phenopacket_index
+    DISEASE_INDEX_SOURCE,
+    BIOSAMPLE_INDEX_SOURCE,
+    PHENOTYPIC_FEATURE_INDEX_SOURCE,
+    PHENOPACKET_INDEX_SOURCE
 )
+from chord_metadata_service.phenopackets.autocomplete_terms import record_autocomplete_terms
+from chord_metadata_service.restapi.fhir_index_sync import record_index_upsert, record_index_delete
 
 
 logger = logging.getLogger(__name__)
@@ -25,47 +23,55 @@ logger.setLevel(logging.INFO)
 
 @receiver(post_save, sender=Disease)
 def index_disease(sender, instance, **kwargs):
-    build_disease_index(instance)
+    record_index_upsert(DISEASE_INDEX_SOURCE, instance)
     logging.info(f'index_disease_signal {instance.id}')
 
 
 @receiver(post_delete, sender=Disease)
 def remove_disease(sender, instance, **kwargs):
-    remove_disease_index(instance)
+    record_index_delete(instance)
     logging.info(f'remove_disease_signal {instance.id}')
 
 
 @receiver(post_save, sender=Biosample)
 def index_biosample(sender, instance, **kwargs):
-    build_biosample_index(instance)
+    record_index_upsert(BIOSAMPLE_INDEX_SOURCE, instance)
     logging.info(f'index_biosample_signal {instance.id}')
 
 
 @receiver(post_delete, sender=Biosample)
 def remove_biosample(sender, instance, **kwargs):
-    remove_biosample_index(instance)
+    record_index_delete(instance)
     logging.info(f'remove_biosample_signal {instance.id}')
 
 
 @receiver(post_save, sender=PhenotypicFeature)
 def index_phenotypicfeature(sender, instance, **kwargs):
-    build_phenotypicfeature_index(instance)
+    record_index_upsert(PHENOTYPIC_FEATURE_INDEX_SOURCE, instance)
     logging.info(f'index_phenotypicfeature_signal {instance.id}')
 
 
 @receiver(post_delete, sender=PhenotypicFeature)
 def remove_phenotypicfeature(sender, instance, **kwargs):
-    remove_phenotypicfeature_index(instance)
+    record_index_delete(instance)
     logging.info(f'remove_phenotypicfeature_signal {instance.id}')
 
 
 @receiver(post_save, sender=Phenopacket)
 def index_phenopacket(sender, instance, **kwargs):
-    build_phenopacket_index(instance)
+    record_index_upsert(PHENOPACKET_INDEX_SOURCE, instance)
     logging.info(f'index_phenopacket_signal {instance.id}')
 
 
 @receiver(post_delete, sender=Phenopacket)
 def remove_phenopacket(sender, instance, **kwargs):
-    remove_phenopacket_index(instance)
+    record_index_delete(instance)
     logging.info(f'remove_phenopacket_signal {instance.id}')
+
+
+@receiver(post_save, sender=Disease)
+@receiver(post_save, sender=PhenotypicFeature)
+@receiver(post_save, sender=Biosample)
+def add_autocomplete_terms(sender, instance, **kwargs):
+    # Terms no longer used are removed by the cleanup (see clean_autocomplete_terms)
+    record_autocomplete_terms(sender, [instance])
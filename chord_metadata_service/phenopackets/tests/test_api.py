@@ -138,6 +138,13 @@ class BatchBiosamplesCSVTest(APITestCase):
                        'created', 'updated', 'individual']:
             self.assertIn(column, [column_name.lower() for column_name in headers])
 
+    def test_post_biosamples_csv_stream(self):
+        data = {'id': [str(self.biosample.id)], 'format': 'csv'}
+        streamed = get_post_response(self.view, {**data, 'stream': True})
+        self.assertEqual(streamed.status_code, status.HTTP_200_OK)
+        self.assertTrue(streamed.streaming)
+        self.assertEqual(b''.join(streamed.streaming_content), get_post_response(self.view, data).content)
+
 
 class CreatePhenotypicFeatureTest(APITestCase):
 
@@ -1,7 +1,16 @@
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from rest_framework.test import APITestCase
+from chord_metadata_service.chord.ingest.phenopackets import ingest_phenopackets_bulk
+from chord_metadata_service.chord.models import Project, Dataset
+from chord_metadata_service.chord.tests.example_ingest import EXAMPLE_INGEST_PHENOPACKET
 from . import constants as c
 from .. import models as m
+from ..cleanup import clean_autocomplete_terms
 
 
 class DiseaseTermAutocompleteTest(APITestCase):
@@ -62,3 +71,63 @@ class BiosapleSampledTissueAutocompleteTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         response_data = response.json()
         self.assertEqual(len(response_data["results"]), 1)
+
+
+@override_settings(CACHES={
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "autocomplete-test"},
+})
+class AutocompleteTermDictionaryTest(APITestCase):
+    """ Test module for the dictionary of terms searched by autocomplete views. """
+
+    def setUp(self):
+        cache.clear()
+        self.individual = m.Individual.objects.create(**c.VALID_INDIVIDUAL_1)
+        self.diseases = [m.Disease.objects.create(**c.VALID_DISEASE_1) for _ in range(3)]
+
+    def tearDown(self):
+        cache.clear()
+
+    def get_terms(self, url: str, q: str) -> list[tuple[str, str]]:
+        response = self.client.get(url, {"q": q})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(r["id"], r["text"]) for r in response.json()["results"]]
+
+    def test_distinct_terms(self):
+        self.assertEqual(m.AutocompleteTerm.objects.filter(field=m.AutocompleteTerm.DISEASE_TERM).count(), 1)
+        self.assertListEqual(
+            self.get_terms("/api/disease_term_autocomplete", "cerebellar"),
+            [(c.VALID_DISEASE_1["term"]["id"], c.VALID_DISEASE_1["term"]["label"])])
+
+    def test_cached(self):
+        self.get_terms("/api/disease_term_autocomplete", "spino")
+        m.Disease.objects.create(**{**c.VALID_DISEASE_1, "term": {"id": "OMIM:000001", "label": "Spinal tremor"}})
+
+        with CaptureQueriesContext(connection) as ctx:
+            terms = self.get_terms("/api/disease_term_autocomplete", "spino")
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(len(terms), 1)
+
+        self.assertEqual(len(self.get_terms("/api/disease_term_autocomplete", "spin")), 2)
+
+    def test_ingest_bulk(self):
+        project = Project.objects.create(title="Project 1", description="")
+        dataset = Dataset.objects.create(title="Dataset 1", description="", data_use={}, project=project)
+        ingest_phenopackets_bulk([EXAMPLE_INGEST_PHENOPACKET], str(dataset.identifier))
+        self.assertIn(
+            ("NCIT:C39853", "Infiltrating Urothelial Carcinoma"),
+            self.get_terms("/api/disease_term_autocomplete", "urothelial"))
+        self.assertTrue(m.AutocompleteTerm.objects.filter(
+            field=m.AutocompleteTerm.BIOSAMPLE_SAMPLED_TISSUE).exists())
+        self.assertTrue(m.AutocompleteTerm.objects.filter(
+            field=m.AutocompleteTerm.PHENOTYPIC_FEATURE_TYPE).exists())
+
+    def test_cleanup(self):
+        for disease in self.diseases[:2]:
+            disease.delete()
+        self.assertEqual(async_to_sync(clean_autocomplete_terms)(), 0)
+
+        self.diseases[2].term = {"id": "OMIM:000001", "label": "Spinal tremor"}
+        self.diseases[2].save()
+        self.assertEqual(async_to_sync(clean_autocomplete_terms)(), 1)
+        self.assertListEqual(
+            list(m.AutocompleteTerm.objects.values_list("term_id", flat=True)), ["OMIM:000001"])
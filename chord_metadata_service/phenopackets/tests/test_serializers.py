@@ -0,0 +1,186 @@
+import inspect
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+
+from chord_metadata_service.chord.ingest import WORKFLOW_INGEST_FUNCTION_MAP
+from chord_metadata_service.chord.tests.example_ingest import (
+    EXAMPLE_INGEST_EXPERIMENT,
+    EXAMPLE_INGEST_PHENOPACKET,
+    EXAMPLE_INGEST_PHENOPACKET_UPDATE,
+)
+from chord_metadata_service.chord.tests.helpers import ProjectTestCase
+from chord_metadata_service.chord.workflows.metadata import WORKFLOW_EXPERIMENTS_JSON, WORKFLOW_PHENOPACKETS_JSON
+from chord_metadata_service.experiments.models import Experiment, ExperimentResult, Instrument
+from chord_metadata_service.experiments.serializers import ExperimentSerializer
+from chord_metadata_service.experiments.tests.constants import (
+    valid_experiment,
+    valid_experiment_result,
+    valid_instrument,
+)
+from chord_metadata_service.patients.models import Individual
+from chord_metadata_service.patients.serializers import IndividualSerializer
+from chord_metadata_service.resources.models import Resource
+from chord_metadata_service.resources.tests.constants import VALID_RESOURCE_1
+from chord_metadata_service.restapi.compiled_serializers import compile_serializer, get_prefetch_plan
+from chord_metadata_service.restapi.serializers import GenericSerializer
+from . import constants as c
+from .. import models as m, serializers as s
+from ..api_views import PHENOPACKET_PREFETCH
+
+
+class CompiledSerializerTest(ProjectTestCase):
+    def setUp(self) -> None:
+        WORKFLOW_INGEST_FUNCTION_MAP[WORKFLOW_PHENOPACKETS_JSON](EXAMPLE_INGEST_PHENOPACKET, self.dataset.identifier)
+        WORKFLOW_INGEST_FUNCTION_MAP[WORKFLOW_PHENOPACKETS_JSON](
+            EXAMPLE_INGEST_PHENOPACKET_UPDATE, self.dataset.identifier)
+        WORKFLOW_INGEST_FUNCTION_MAP[WORKFLOW_EXPERIMENTS_JSON](EXAMPLE_INGEST_EXPERIMENT, self.dataset.identifier)
+
+    def assert_same_representation(self, serializer_class, queryset, **kwargs):
+        # Prefetched, so that both serializers read related objects in the same order
+        objects = list(queryset.prefetch_related(*get_prefetch_plan(serializer_class, **kwargs)))
+        self.assertTrue(objects)
+        representation = compile_serializer(serializer_class, **kwargs)
+        for obj in objects:
+            expected = serializer_class(obj, **kwargs).data
+            compiled = representation(obj)
+            self.assertEqual(compiled, expected)
+            self.assertEqual(JSONRenderer().render(compiled), JSONRenderer().render(expected))
+
+    def test_phenopackets(self):
+        self.assertFalse(inspect.ismethod(compile_serializer(s.PhenopacketSerializer)))
+        self.assert_same_representation(
+            s.PhenopacketSerializer, m.Phenopacket.objects.prefetch_related(*PHENOPACKET_PREFETCH))
+        self.assert_same_representation(s.SimplePhenopacketSerializer, m.Phenopacket.objects.all())
+
+    def test_nested_objects(self):
+        self.assert_same_representation(s.BiosampleSerializer, m.Biosample.objects.all())
+        self.assert_same_representation(s.MetaDataSerializer, m.MetaData.objects.all(), exclude_when_nested=["id"])
+        self.assert_same_representation(s.PhenotypicFeatureSerializer, m.PhenotypicFeature.objects.all())
+        self.assert_same_representation(s.DiseaseSerializer, m.Disease.objects.all())
+        self.assert_same_representation(s.InterpretationSerializer, m.Interpretation.objects.all())
+        self.assert_same_representation(s.GenomicInterpretationSerializer, m.GenomicInterpretation.objects.all())
+        self.assert_same_representation(IndividualSerializer, Individual.objects.all())
+        self.assert_same_representation(ExperimentSerializer, Experiment.objects.all())
+
+    def test_edge_cases(self):
+        # Interpretation without a diagnosis; genomic interpretation of a biosample, with a gene descriptor
+        m.Interpretation.objects.create(id="interpretation:no_diagnosis", progress_status="UNKNOWN_PROGRESS")
+        gene_descriptor = m.GeneDescriptor.objects.create(value_id="HGNC:347", symbol="ETF1")
+        m.GenomicInterpretation.objects.create(
+            biosample=m.Biosample.objects.first(), gene_descriptor=gene_descriptor,
+            interpretation_status="CONTRIBUTORY")
+
+        self.assert_same_representation(s.InterpretationSerializer, m.Interpretation.objects.all())
+        self.assert_same_representation(s.GenomicInterpretationSerializer, m.GenomicInterpretation.objects.all())
+
+    def test_uncompiled_override(self):
+        class OverridingSerializer(GenericSerializer):
+            class Meta:
+                model = m.Disease
+                fields = "__all__"
+
+            def to_representation(self, instance):
+                return {"overridden": True, **super().to_representation(instance)}
+
+        representation = compile_serializer(OverridingSerializer)
+        self.assertTrue(inspect.ismethod(representation))  # Falls back on the serializer's own to_representation
+        disease = m.Disease.objects.first()
+        self.assertEqual(representation(disease), OverridingSerializer(disease).data)
+
+    def test_compiled_once(self):
+        self.assertIs(compile_serializer(s.BiosampleSerializer, exclude_when_nested=["individual"]),
+                      compile_serializer(s.BiosampleSerializer, exclude_when_nested=["individual"]))
+
+
+class PrefetchPlanTest(ProjectTestCase):
+    NUM_PHENOPACKETS = 5
+
+    def setUp(self) -> None:
+        meta_data = m.MetaData.objects.create(**c.VALID_META_DATA_2)
+        meta_data.resources.set([Resource.objects.create(**VALID_RESOURCE_1)])
+        instrument = Instrument.objects.create(**valid_instrument())
+
+        for i in range(self.NUM_PHENOPACKETS):
+            individual = Individual.objects.create(**{**c.VALID_INDIVIDUAL_1, "id": f"patient:{i}"})
+            biosample = m.Biosample.objects.create(
+                **{**c.valid_biosample_1(individual), "id": f"biosample:{i}", "individual_id": individual.id})
+            m.PhenotypicFeature.objects.create(**c.valid_phenotypic_feature(biosample=biosample))
+
+            experiment = Experiment.objects.create(**valid_experiment(
+                biosample, instrument=instrument, dataset=self.dataset, num_experiment=i))
+            experiment.experiment_results.set([ExperimentResult.objects.create(**{
+                **valid_experiment_result(), "identifier": f"experiment_result:{i}"})])
+
+            gene_descriptor = m.GeneDescriptor.objects.create(
+                **{**c.VALID_GENE_DESCRIPTOR_1, "value_id": f"HGNC:{i}"})
+            variation_descriptor = m.VariationDescriptor.objects.create(
+                **{**c.valid_variant_descriptor(gene_descriptor), "id": f"clinvar:{i}"})
+            variant_interpretation = m.VariantInterpretation.objects.create(
+                **c.valid_variant_interpretation(variation_descriptor))
+            diagnosis = m.Diagnosis.objects.create(**c.valid_diagnosis(c.VALID_DISEASE_ONTOLOGY, f"diagnosis:{i}"))
+            diagnosis.genomic_interpretations.set([
+                m.GenomicInterpretation.objects.create(
+                    **c.valid_genomic_interpretation(gene_descriptor=gene_descriptor), subject=individual),
+                m.GenomicInterpretation.objects.create(
+                    **c.valid_genomic_interpretation(variant_interpretation=variant_interpretation),
+                    biosample=biosample),
+            ])
+            interpretation = m.Interpretation.objects.create(
+                **{**c.valid_interpretation(diagnosis), "id": f"interpretation:{i}"})
+
+            phenopacket = m.Phenopacket.objects.create(
+                **{**c.valid_phenopacket(individual, meta_data), "id": f"phenopacket:{i}"}, dataset=self.dataset)
+            phenopacket.biosamples.set([biosample])
+            phenopacket.diseases.set([m.Disease.objects.create(**c.VALID_DISEASE_1)])
+            phenopacket.interpretations.set([interpretation])
+            m.PhenotypicFeature.objects.create(**c.valid_phenotypic_feature(phenopacket=phenopacket))
+
+    def count_queries(self, fn) -> int:
+        with CaptureQueriesContext(connection) as ctx:
+            fn()
+        return len(ctx.captured_queries)
+
+    def test_plan(self):
+        plan = get_prefetch_plan(s.PhenopacketSerializer)
+        self.assertEqual(plan, PHENOPACKET_PREFETCH)
+        self.assertIs(get_prefetch_plan(s.PhenopacketSerializer), plan)  # Cached
+        for lookup in ("phenotypic_features", "diseases", "subject", "meta_data__resources",
+                       "biosamples__experiment_set__experiment_results",
+                       "interpretations__diagnosis__genomic_interpretations__variant_interpretation"
+                       "__variation_descriptor__gene_context"):
+            self.assertIn(lookup, plan)
+        # Only prefixes of nested lookups come before them
+        self.assertLess(plan.index("interpretations"), plan.index("interpretations__diagnosis"))
+
+        # Fields excluded from nested serializers are left out of the plan as well
+        self.assertNotIn("phenopackets__subject", get_prefetch_plan(IndividualSerializer))
+        self.assertNotIn("biosamples__individual", get_prefetch_plan(IndividualSerializer))
+
+    def test_serialization_constant_queries(self):
+        def _serialize(n: int, serialize):
+            def _fn():
+                for p in m.Phenopacket.objects.prefetch_related(*PHENOPACKET_PREFETCH).order_by("id")[:n]:
+                    serialize(p)
+            return _fn
+
+        for serialize in (lambda p: s.PhenopacketSerializer(p).data, compile_serializer(s.PhenopacketSerializer)):
+            self.assertEqual(self.count_queries(_serialize(1, serialize)),
+                             self.count_queries(_serialize(self.NUM_PHENOPACKETS, serialize)))
+
+    def test_api_constant_queries(self):
+        for url in ("phenopackets-list", "individuals-list", "biosamples-list", "interpretations-list",
+                    "diagnoses-list", "genomicinterpretations-list", "experiment-list"):
+            with self.subTest(url=url):
+                def _get(page_size: int):
+                    def _fn():
+                        r = self.client.get(reverse(url), {"page_size": page_size})
+                        self.assertEqual(r.status_code, status.HTTP_200_OK)
+                        self.assertEqual(len(r.json()["results"]), page_size)
+                    return _fn
+
+                # Pages of at least 2 objects, so that both kinds of genomic interpretations are in the smallest one
+                self.assertEqual(self.count_queries(_get(2)), self.count_queries(_get(self.NUM_PHENOPACKETS)))
@@ -1,14 +1,22 @@
+import io
+import itertools
 import json
 import csv
+from datetime import date, datetime
 from uuid import UUID
 from rdflib import Graph
 from rdflib.plugin import register
 from rdflib.serializer import Serializer
-from django.http import HttpResponse
+from django.conf import settings
+from django.contrib.postgres.expressions import ArraySubquery
+from django.db.models import F, OuterRef
+from django.db.models.functions import JSONObject
+from rest_framework import serializers
 from rest_framework.renderers import JSONRenderer
 from djangorestframework_camel_case.render import CamelCaseJSONRenderer
 
 from .jsonld_utils import dataset_to_jsonld
+from .streaming import StreamingResponse
 from .utils import parse_onset
 
 OUTPUT_FORMAT_BENTO_SEARCH_RESULT = "bento_search_result"
@@ -107,16 +115,97 @@ class RDFDatasetRenderer(PhenopacketsRenderer):
         return rdf_data
 
 
-def generate_csv_response(data, filename, columns):
-    headers = {key: key.replace('_', ' ').capitalize() for key in columns}
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f"attachment; filename='{filename}'"
-    dict_writer = csv.DictWriter(response, fieldnames=columns)
-    dict_writer.writerow(headers)
+def csv_headers(columns):
+    # remove underscore and capitalize column names
+    return {key: key.replace('_', ' ').capitalize() for key in columns}
+
+
+def generate_csv(data, columns) -> str:
+    output = io.StringIO()
+    dict_writer = csv.DictWriter(output, fieldnames=columns)
+    dict_writer.writerow(csv_headers(columns))
     dict_writer.writerows(data)
+    return output.getvalue()
+
+
+class _Echo:
+    """ File-like object for csv writers, returning each written line instead of storing it """
+
+    def write(self, value):
+        return value
+
+
+def generate_streaming_csv_response(rows, filename, columns):
+    """
+    Streaming CSV response for an iterable of rows, which is only consumed (one row at a time) as the response is
+    sent.
+    """
+    headers = csv_headers(columns)
+    dict_writer = csv.DictWriter(_Echo(), fieldnames=columns)
+    response = StreamingResponse(
+        (dict_writer.writerow(row) for row in itertools.chain((headers,), rows)), content_type='text/csv')
+    response['Content-Disposition'] = f"attachment; filename='{filename}'"
     return response
 
 
+_datetime_field = serializers.DateTimeField()
+_date_field = serializers.DateField()
+
+
+def _as_serialized(values: dict) -> dict:
+    """
+    Gives a row from values() the form serializers give the same values in: dates and times as strings, and empty
+    values left out (like GenericSerializer does.)
+    """
+    serialized = {}
+    for key, value in values.items():
+        if isinstance(value, datetime):
+            value = _datetime_field.to_representation(value)
+        elif isinstance(value, date):
+            value = _date_field.to_representation(value)
+        if value:
+            serialized[key] = value
+    return serialized
+
+
+class CSVRenderer(JSONRenderer):
+    """
+    Base class for CSV renderers. Besides rendering serialized data, a CSV renderer can stream a whole queryset (see
+    stream), reading only the values it needs (values, plus annotations) from the database with a server-side cursor
+    rather than serializing objects.
+    Subclasses give the columns and the CSV row for a serialized object (csv_row); streamed rows of values are first
+    given the form of serialized objects by from_values.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    filename = 'data.csv'
+    columns: tuple[str, ...] = ()
+    values: tuple[str, ...] = ()
+
+    def csv_row(self, obj: dict) -> dict:
+        raise NotImplementedError
+
+    def annotations(self) -> dict:
+        return {}
+
+    def from_values(self, values: dict) -> dict:
+        return _as_serialized(values)
+
+    def render_rows(self, data, renderer_context=None):
+        if not data:
+            return
+        # The rendered CSV is the content of the view's response; it is sent as a file
+        if (response := (renderer_context or {}).get('response')) is not None:
+            response['Content-Disposition'] = f"attachment; filename='{self.filename}'"
+        return generate_csv([self.csv_row(obj) for obj in data], self.columns).encode('utf-8')
+
+    def stream(self, queryset):
+        rows = queryset.prefetch_related(None).values(*self.values, **self.annotations()) \
+            .iterator(chunk_size=settings.CSV_STREAM_CHUNK_SIZE)
+        return generate_streaming_csv_response(
+            (self.csv_row(self.from_values(row)) for row in rows), self.filename, self.columns)
+
+
 def render_individual_age(individual):
     if "time_at_last_encounter" not in individual:
         return None
@@ -131,104 +220,148 @@ def render_individual_age(individual):
         return time_at_last_encounter["age"]["iso8601duration"]
 
 
-class IndividualCSVRenderer(JSONRenderer):
-    media_type = 'text/csv'
-    format = 'csv'
+class IndividualCSVRenderer(CSVRenderer):
+    columns = ('id', 'sex', 'date_of_birth', 'taxonomy', 'karyotypic_sex', 'age', 'diseases', 'created', 'updated')
+    values = ('id', 'sex', 'date_of_birth', 'taxonomy', 'karyotypic_sex', 'time_at_last_encounter', 'created',
+              'updated')
 
     def render(self, data, media_type=None, renderer_context=None):
         if 'results' not in data or not data['results']:
             return
-
-        individuals = []
-        for individual in data['results']:
-            ind_obj = {
-                'id': individual['id'],
-                'sex': individual.get('sex', None),
-                'date_of_birth': individual.get('date_of_birth', None),
-                'taxonomy': None,
-                'karyotypic_sex': individual['karyotypic_sex'],
-                'age': render_individual_age(individual),
-                'diseases': None,
-                'created': individual['created'],
-                'updated': individual['updated']
-            }
-            if 'taxonomy' in individual:
-                ind_obj['taxonomy'] = individual['taxonomy'].get('label', None)
-            if 'phenopackets' in individual:
-                all_diseases = []
-                for phenopacket in individual['phenopackets']:
-                    if 'diseases' in phenopacket:
-                        # use ; because some disease terms might contain , in their label
-                        single_phenopacket_diseases = '; '.join(
-                            [
-                                f"{d['term']['label']} ({parse_onset(d['onset'])})"
-                                if 'onset' in d else d['term']['label'] for d in phenopacket['diseases']
-                            ]
-                        )
-                        all_diseases.append(single_phenopacket_diseases)
-                if all_diseases:
-                    ind_obj['diseases'] = '; '.join(all_diseases)
-            individuals.append(ind_obj)
-        columns = individuals[0].keys()
-        # remove underscore and capitalize column names
-        return generate_csv_response(individuals, 'data.csv', columns)
-
-
-class BiosamplesCSVRenderer(JSONRenderer):
-    media_type = 'text/csv'
-    format = 'csv'
+        return self.render_rows(data['results'], renderer_context)
+
+    def csv_row(self, individual):
+        ind_obj = {
+            'id': individual['id'],
+            'sex': individual.get('sex', None),
+            'date_of_birth': individual.get('date_of_birth', None),
+            'taxonomy': None,
+            'karyotypic_sex': individual['karyotypic_sex'],
+            'age': render_individual_age(individual),
+            'diseases': None,
+            'created': individual['created'],
+            'updated': individual['updated']
+        }
+        if 'taxonomy' in individual:
+            ind_obj['taxonomy'] = individual['taxonomy'].get('label', None)
+        if 'phenopackets' in individual:
+            all_diseases = []
+            for phenopacket in individual['phenopackets']:
+                if 'diseases' in phenopacket:
+                    # use ; because some disease terms might contain , in their label
+                    single_phenopacket_diseases = '; '.join(
+                        [
+                            f"{d['term']['label']} ({parse_onset(d['onset'])})"
+                            if 'onset' in d else d['term']['label'] for d in phenopacket['diseases']
+                        ]
+                    )
+                    all_diseases.append(single_phenopacket_diseases)
+            if all_diseases:
+                ind_obj['diseases'] = '; '.join(all_diseases)
+        return ind_obj
+
+    def annotations(self):
+        # Diseases of all the individual's phenopackets, in a subquery so that rows are still read one at a time
+        from chord_metadata_service.phenopackets.models import Disease
+        return {
+            'diseases': ArraySubquery(
+                Disease.objects.filter(phenopacket__subject=OuterRef('pk'))
+                .order_by('phenopacket__id', 'id')
+                .values(json=JSONObject(term='term', onset='onset'))
+            ),
+        }
+
+    def from_values(self, values):
+        diseases = values.pop('diseases')
+        individual = super().from_values(values)
+        if diseases:
+            # All in one, since diseases are listed together in the CSV whichever phenopacket they are from
+            individual['phenopackets'] = [{'diseases': [{k: v for k, v in d.items() if v} for d in diseases]}]
+        return individual
+
+
+class BiosamplesCSVRenderer(CSVRenderer):
+    filename = 'biosamples.csv'
+    columns = ('id', 'description', 'sampled_tissue', 'individual_age_at_collection', 'histological_diagnosis',
+               'extra_properties', 'created', 'updated', 'individual')
+    values = ('id', 'description', 'sampled_tissue', 'histological_diagnosis', 'extra_properties', 'created',
+              'updated', 'individual')
 
     def render(self, data, media_type=None, renderer_context=None):
-        if not data:
-            return
-
-        biosamples = []
-        for biosample in data:
-            bio_obj = {
-                'id': biosample['id'],
-                'description': biosample.get('description', 'NA'),
-                'sampled_tissue': biosample.get('sampled_tissue', {}).get('label', 'NA'),
-                'individual_age_at_collection': biosample.get('individual_age_at_collection', {}).get('age', 'NA'),
-                'histological_diagnosis': biosample.get('histological_diagnosis', {}).get('label', 'NA'),
-                'extra_properties': f"Material: {biosample.get('extra_properties', {}).get('material', 'NA')}",
-                'created': biosample['created'],
-                'updated': biosample['updated'],
-                'individual': biosample['individual']
-            }
-            biosamples.append(bio_obj)
-
-        columns = biosamples[0].keys()
-        return generate_csv_response(biosamples, 'biosamples.csv', columns)
-
-
-class ExperimentCSVRenderer(JSONRenderer):
-    media_type = 'text/csv'
-    format = 'csv'
+        return self.render_rows(data, renderer_context)
+
+    def csv_row(self, biosample):
+        return {
+            'id': biosample['id'],
+            'description': biosample.get('description', 'NA'),
+            'sampled_tissue': biosample.get('sampled_tissue', {}).get('label', 'NA'),
+            'individual_age_at_collection': biosample.get('individual_age_at_collection', {}).get('age', 'NA'),
+            'histological_diagnosis': biosample.get('histological_diagnosis', {}).get('label', 'NA'),
+            'extra_properties': f"Material: {biosample.get('extra_properties', {}).get('material', 'NA')}",
+            'created': biosample['created'],
+            'updated': biosample['updated'],
+            'individual': biosample.get('individual')
+        }
+
+
+class ExperimentCSVRenderer(CSVRenderer):
+    filename = 'experiments.csv'
+    columns = ('id', 'study_type', 'experiment_type', 'molecule', 'library_strategy', 'library_source',
+               'library_selection', 'library_layout', 'created', 'updated', 'biosample', 'individual_id')
+    values = ('id', 'study_type', 'experiment_type', 'molecule', 'library_strategy', 'library_source',
+              'library_selection', 'library_layout', 'created', 'updated', 'biosample')
 
     def render(self, data, media_type=None, renderer_context=None):
-        if not data:
-            return
+        return self.render_rows(data, renderer_context)
+
+    def csv_row(self, experiment):
+        return {
+            'id': experiment.get('id'),
+            'study_type': experiment.get('study_type'),
+            'experiment_type': experiment.get('experiment_type', 'NA'),
+            'molecule': experiment.get('molecule'),
+            'library_strategy': experiment.get('library_strategy'),
+            'library_source': experiment.get('library_source', 'NA'),
+            'library_selection': experiment.get('library_selection'),
+            'library_layout': experiment.get('library_layout'),
+            'created': experiment.get('created'),
+            'updated': experiment.get('updated'),
+            'biosample': experiment.get('biosample'),
+            'individual_id': experiment.get('biosample_individual', {}).get('id', 'NA'),
+        }
+
+    def annotations(self):
+        return {'biosample_individual_id': F('biosample__individual_id')}
+
+    def from_values(self, values):
+        individual_id = values.pop('biosample_individual_id')
+        experiment = super().from_values(values)
+        if individual_id:
+            experiment['biosample_individual'] = {'id': individual_id}
+        return experiment
+
+
+class CSVStreamingMixin:
+    """
+    Viewset mixin streaming CSV exports: when CSV is requested along with stream=true (in the query string, or in the
+    body of POST requests), the list action streams every object of the filtered queryset instead of serializing a
+    page of them in memory.
+    """
 
-        experiments = []
-        for experiment in data:
-            exp_obj = {
-                'id': experiment.get('id'),
-                'study_type': experiment.get('study_type'),
-                'experiment_type': experiment.get('experiment_type', 'NA'),
-                'molecule': experiment.get('molecule'),
-                'library_strategy': experiment.get('library_strategy'),
-                'library_source': experiment.get('library_source', 'NA'),
-                'library_selection': experiment.get('library_selection'),
-                'library_layout': experiment.get('library_layout'),
-                'created': experiment.get('created'),
-                'updated': experiment.get('updated'),
-                'biosample': experiment.get('biosample'),
-                'individual_id': experiment.get('biosample_individual', {}).get('id', 'NA'),
-            }
-            experiments.append(exp_obj)
-
-        columns = experiments[0].keys()
-        return generate_csv_response(experiments, 'experiments.csv', columns)
+    def csv_streaming_response(self, request, queryset):
+        """ Returns the streaming CSV response for a queryset if one was requested, otherwise None """
+        if not isinstance(getattr(request, 'accepted_renderer', None), CSVRenderer):
+            return None
+        stream = request.query_params.get('stream', request.data.get('stream', ''))
+        if str(stream).lower() != 'true':
+            return None
+        return request.accepted_renderer.stream(queryset)
+
+    def list(self, request, *args, **kwargs):
+        response = self.csv_streaming_response(request, self.filter_queryset(self.get_queryset()))
+        if response is not None:
+            return response
+        return super().list(request, *args, **kwargs)
 
 
 class IndividualBentoSearchRenderer(JSONRenderer):
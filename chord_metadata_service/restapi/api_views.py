@@ -10,22 +10,28 @@ from chord_metadata_service.restapi.utils import (
     get_field_options,
     stats_for_field,
     queryset_stats_for_field,
+    queryset_stats_for_fields,
     get_categorical_stats,
     get_date_stats,
     get_range_stats
 )
 from chord_metadata_service.chord import data_types as dt, models as chord_models
 from chord_metadata_service.chord.permissions import OverrideOrSuperUserOnly
+from chord_metadata_service.chord.precomputed_statistics import get_precomputed_statistics
 from chord_metadata_service.experiments import models as experiments_models
 from chord_metadata_service.metadata.service_info import get_service_info
 from chord_metadata_service.phenopackets import models as pheno_models
 from chord_metadata_service.patients import models as patients_models
 from chord_metadata_service.restapi.models import SchemaType
+from chord_metadata_service.restapi.public_cache import get_public_cached, public_config_hash
 from rest_framework import serializers
 
 
 OVERVIEW_AGE_BIN_SIZE = 10
 
+OVERVIEW_STATISTICS_KEY = "overview"
+PUBLIC_OVERVIEW_STATISTICS_KEY = "public_overview"
+
 
 @api_view_async()
 @permission_classes([AllowAny])
@@ -38,39 +44,44 @@ async def service_info(_request):
     return Response(await get_service_info())
 
 
-@extend_schema(
-    description="Overview of all Phenopackets in the database",
-    responses={
-        200: inline_serializer(
-            name='overview_response',
-            fields={
-                'phenopackets': serializers.IntegerField(),
-                'data_type_specific': serializers.JSONField(),
-            }
-        )
-    }
+EXPERIMENT_OVERVIEW_FIELDS = (
+    "study_type",
+    "experiment_type",
+    "molecule",
+    "library_strategy",
+    "library_source",
+    "library_selection",
+    "library_layout",
+    "extraction_protocol",
 )
-@api_view(["GET"])
-@permission_classes([OverrideOrSuperUserOnly])
-def overview(_request):
+
+
+def overview_statistics() -> dict:
     """
-    get:
-    Overview of all Phenopackets in the database
+    Computes the overview of all Phenopackets in the database
     """
-    phenopackets_count = pheno_models.Phenopacket.objects.all().count()
-    biosamples_count = pheno_models.Biosample.objects.all().count()
-    individuals_count = patients_models.Individual.objects.all().count()
-    experiments_count = experiments_models.Experiment.objects.all().count()
-    experiment_results_count = experiments_models.ExperimentResult.objects.all().count()
+
+    # Counts and field stats are computed together, with a single aggregation query per model (or relation)
+    phenopackets_count, phenopacket_stats = queryset_stats_for_fields(
+        pheno_models.Phenopacket.objects.all(), ["diseases__term__label"])
+    biosamples_count, biosample_stats = queryset_stats_for_fields(
+        pheno_models.Biosample.objects.all(), ["taxonomy__label", "sampled_tissue__label"])
+    individuals_count, individual_stats = queryset_stats_for_fields(
+        patients_models.Individual.objects.all(), ["sex", "karyotypic_sex", "taxonomy__label"])
+    experiments_count, experiment_stats = queryset_stats_for_fields(
+        experiments_models.Experiment.objects.all(),
+        [*EXPERIMENT_OVERVIEW_FIELDS, "instrument__platform", "instrument__model"])
+    experiment_results_count, experiment_result_stats = queryset_stats_for_fields(
+        experiments_models.ExperimentResult.objects.all(), ["file_format", "data_output_type", "usage"])
     instruments_count = experiments_models.Instrument.objects.all().count()
     phenotypic_features_count = pheno_models.PhenotypicFeature.objects.all().distinct('pftype').count()
 
     # Sex related fields stats are precomputed here and post processed later
     # to include missing values inferred from the schema
-    individuals_sex = stats_for_field(patients_models.Individual, "sex")
-    individuals_k_sex = stats_for_field(patients_models.Individual, "karyotypic_sex")
+    individuals_sex = individual_stats["sex"]
+    individuals_k_sex = individual_stats["karyotypic_sex"]
 
-    diseases_stats = stats_for_field(pheno_models.Phenopacket, "diseases__term__label")
+    diseases_stats = phenopacket_stats["diseases__term__label"]
     diseases_count = len(diseases_stats)
 
     individuals_age = get_age_numeric_binned(patients_models.Individual.objects.all(), OVERVIEW_AGE_BIN_SIZE)
@@ -80,8 +91,8 @@ def overview(_request):
         "data_type_specific": {
             "biosamples": {
                 "count": biosamples_count,
-                "taxonomy": stats_for_field(pheno_models.Biosample, "taxonomy__label"),
-                "sampled_tissue": stats_for_field(pheno_models.Biosample, "sampled_tissue__label"),
+                "taxonomy": biosample_stats["taxonomy__label"],
+                "sampled_tissue": biosample_stats["sampled_tissue__label"],
             },
             "diseases": {
                 # count is a number of unique disease terms (not all diseases in the database)
@@ -94,7 +105,7 @@ def overview(_request):
                 "karyotypic_sex": {
                     k: individuals_k_sex.get(k, 0) for k in (s[0] for s in pheno_models.Individual.KARYOTYPIC_SEX)
                 },
-                "taxonomy": stats_for_field(patients_models.Individual, "taxonomy__label"),
+                "taxonomy": individual_stats["taxonomy__label"],
                 "age": individuals_age,
             },
             "phenotypic_features": {
@@ -104,30 +115,45 @@ def overview(_request):
             },
             "experiments": {
                 "count": experiments_count,
-                "study_type": stats_for_field(experiments_models.Experiment, "study_type"),
-                "experiment_type": stats_for_field(experiments_models.Experiment, "experiment_type"),
-                "molecule": stats_for_field(experiments_models.Experiment, "molecule"),
-                "library_strategy": stats_for_field(experiments_models.Experiment, "library_strategy"),
-                "library_source": stats_for_field(experiments_models.Experiment, "library_source"),
-                "library_selection": stats_for_field(experiments_models.Experiment, "library_selection"),
-                "library_layout": stats_for_field(experiments_models.Experiment, "library_layout"),
-                "extraction_protocol": stats_for_field(experiments_models.Experiment, "extraction_protocol"),
+                **{f: experiment_stats[f] for f in EXPERIMENT_OVERVIEW_FIELDS},
             },
             "experiment_results": {
                 "count": experiment_results_count,
-                "file_format": stats_for_field(experiments_models.ExperimentResult, "file_format"),
-                "data_output_type": stats_for_field(experiments_models.ExperimentResult, "data_output_type"),
-                "usage": stats_for_field(experiments_models.ExperimentResult, "usage")
+                "file_format": experiment_result_stats["file_format"],
+                "data_output_type": experiment_result_stats["data_output_type"],
+                "usage": experiment_result_stats["usage"]
             },
             "instruments": {
                 "count": instruments_count,
-                "platform": stats_for_field(experiments_models.Experiment, "instrument__platform"),
-                "model": stats_for_field(experiments_models.Experiment, "instrument__model")
+                "platform": experiment_stats["instrument__platform"],
+                "model": experiment_stats["instrument__model"]
             },
         }
     }
 
-    return Response(r)
+    return r
+
+
+@extend_schema(
+    description="Overview of all Phenopackets in the database",
+    responses={
+        200: inline_serializer(
+            name='overview_response',
+            fields={
+                'phenopackets': serializers.IntegerField(),
+                'data_type_specific': serializers.JSONField(),
+            }
+        )
+    }
+)
+@api_view(["GET"])
+@permission_classes([OverrideOrSuperUserOnly])
+def overview(_request):
+    """
+    get:
+    Overview of all Phenopackets in the database
+    """
+    return Response(get_precomputed_statistics(OVERVIEW_STATISTICS_KEY, overview_statistics))
 
 
 @api_view(["GET"])
@@ -214,11 +240,19 @@ def public_search_fields(_request):
     if not settings.CONFIG_PUBLIC:
         return Response(settings.NO_PUBLIC_FIELDS_CONFIGURED)
 
+    return Response(get_public_cached("search_fields", public_search_fields_with_options))
+
+
+def public_search_fields_with_options() -> dict:
+    """
+    Returns the public search fields, by section, with their options (which may come from the database)
+    """
+
     search_conf = settings.CONFIG_PUBLIC["search"]
     field_conf = settings.CONFIG_PUBLIC["fields"]
     # Note: the array is wrapped in a dictionary structure to help with JSON
     # processing by some services.
-    r = {
+    return {
         "sections": [
             {
                 **section,
@@ -232,7 +266,6 @@ def public_search_fields(_request):
             } for section in search_conf
         ]
     }
-    return Response(r)
 
 
 @extend_schema(
@@ -257,6 +290,16 @@ def public_overview(_request):
     if not settings.CONFIG_PUBLIC:
         return Response(settings.NO_PUBLIC_DATA_AVAILABLE)
 
+    # Statistics depend on the public config, so they are stored separately for each config
+    return Response(get_public_cached("overview", lambda: get_precomputed_statistics(
+        f"{PUBLIC_OVERVIEW_STATISTICS_KEY}:{public_config_hash()}", public_overview_statistics)))
+
+
+def public_overview_statistics() -> dict:
+    """
+    Computes the overview of all public data in the database, using the public config
+    """
+
     # Predefined counts
     individuals_count = patients_models.Individual.objects.all().count()
     biosamples_count = pheno_models.Biosample.objects.all().count()
@@ -264,7 +307,7 @@ def public_overview(_request):
 
     # Early return when there is not enough data
     if individuals_count < settings.CONFIG_PUBLIC["rules"]["count_threshold"]:
-        return Response(settings.INSUFFICIENT_DATA_AVAILABLE)
+        return settings.INSUFFICIENT_DATA_AVAILABLE
 
     # Get the rules config
     rules_config = settings.CONFIG_PUBLIC["rules"]
@@ -302,7 +345,7 @@ def public_overview(_request):
             "data": stats
         }
 
-    return Response(response)
+    return response
 
 
 @api_view(["GET"])
@@ -316,7 +359,14 @@ def public_dataset(_request):
     if not settings.CONFIG_PUBLIC:
         return Response(settings.NO_PUBLIC_DATA_AVAILABLE)
 
-    # Datasets provenance metadata
+    return Response(get_public_cached("datasets", public_datasets))
+
+
+def public_datasets() -> dict:
+    """
+    Returns the provenance metadata of all datasets
+    """
+
     datasets = chord_models.Dataset.objects.values(
         "title", "description", "contact_info",
         "dates", "stored_in", "spatial_coverage",
@@ -327,9 +377,9 @@ def public_dataset(_request):
         "extra_properties", "identifier"
     )
 
-    return Response({
-        "datasets": datasets
-    })
+    return {
+        "datasets": list(datasets)
+    }
 
 
 DT_QUERYSETS = {
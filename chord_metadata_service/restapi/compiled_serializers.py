@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+import threading
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models.manager import BaseManager
+from rest_framework import fields as drf_fields, relations, serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+from rest_framework.response import Response
+from typing import Any, Callable, Union
+
+from .serializers import GenericSerializer
+
+__all__ = [
+    "representation_extension",
+    "compile_serializer",
+    "get_prefetch_plan",
+    "CompiledRepresentationMixin",
+]
+
+Representation = Callable[[Any], Any]
+
+# Related objects an extension represents: {attribute: (serializer class, serializer kwargs)}, or a function returning
+# them, for serializer classes which cannot be imported when the extension is registered
+ExtensionRelations = Union[dict[str, tuple[type, dict]], Callable[[], dict[str, tuple[type, dict]]]]
+
+# Functions adding to the generic representation what a serializer's own to_representation adds, by serializer class
+_extensions: dict[type, Callable[[Any, dict], dict]] = {}
+_extension_relations: dict[type, ExtensionRelations] = {}
+
+_compiled: dict[tuple, Representation] = {}
+_prefetch_plans: dict[tuple, tuple[str, ...]] = {}
+_compiled_lock = threading.Lock()
+
+
+def representation_extension(serializer_class: type, related: ExtensionRelations | None = None):
+    """
+    Registers a function which mirrors what the to_representation override of a serializer class adds to the
+    representation built by its parent class. The function takes the instance and the parent representation and
+    returns the full representation. Serializers with a to_representation override and no extension are not compiled;
+    their own to_representation is used instead.
+    Related objects the function represents (with other serializers) are given in related, so that they are part of
+    the prefetch plan of the serializer; see get_prefetch_plan.
+    """
+
+    def _register(fn: Callable[[Any, dict], dict]):
+        _extensions[serializer_class] = fn
+        if related:
+            _extension_relations[serializer_class] = related
+        return fn
+
+    return _register
+
+
+def _generic_reader(field: drf_fields.Field, to_representation: Representation) -> Representation:
+    # Same steps as Serializer.to_representation takes for each field; may raise SkipField
+    def _read(instance):
+        attribute = field.get_attribute(instance)
+        if (attribute.pk if isinstance(attribute, PKOnlyObject) else attribute) is None:
+            return None
+        return to_representation(attribute)
+    return _read
+
+
+def _model_attribute(serializer: serializers.BaseSerializer, field: drf_fields.Field) -> str | None:
+    """
+    Returns the name of the model attribute a field reads, if it reads a concrete model field directly (so that
+    reading it cannot fail, or give a callable.)
+    """
+
+    model = getattr(getattr(serializer, "Meta", None), "model", None)
+    if model is None or len(field.source_attrs) != 1:
+        return None
+    try:
+        model_field = model._meta.get_field(field.source_attrs[0])
+    except FieldDoesNotExist:
+        return None
+    return field.source_attrs[0] if model_field.concrete else None
+
+
+def _compile_field(serializer: serializers.BaseSerializer, field: drf_fields.Field) -> Representation:
+    attr = _model_attribute(serializer, field)
+
+    if isinstance(field, serializers.ListSerializer):
+        child = _compile(field.child)
+        if attr is None and len(field.source_attrs) == 1:
+            # Reverse relations are not concrete fields, but read the same way
+            attr = field.source_attrs[0]
+        if attr is not None:
+            def _read_list(instance):
+                related = getattr(instance, attr)
+                return [child(o) for o in (related.all() if isinstance(related, BaseManager) else related)]
+            return _read_list
+        return _generic_reader(field, lambda v: [child(o) for o in (v.all() if isinstance(v, BaseManager) else v)])
+
+    if isinstance(field, serializers.BaseSerializer):
+        return _generic_reader(field, _compile(field))
+
+    if (isinstance(field, relations.PrimaryKeyRelatedField) and field.pk_field is None and attr is not None
+            and field.use_pk_only_optimization()):
+        attname = serializer.Meta.model._meta.get_field(attr).attname
+        return lambda instance: getattr(instance, attname)
+
+    if (isinstance(field, relations.ManyRelatedField) and isinstance(field.child_relation,
+                                                                     relations.PrimaryKeyRelatedField)
+            and field.child_relation.pk_field is None and attr is not None):
+        return lambda instance: [o.pk for o in getattr(instance, attr).all()] if instance.pk is not None else []
+
+    if attr is None:
+        return _generic_reader(field, field.to_representation)
+
+    if isinstance(field, drf_fields.JSONField) and not field.binary:
+        return lambda instance: getattr(instance, attr)
+
+    to_representation = field.to_representation
+
+    if isinstance(field, drf_fields.CharField):
+        def _read_str(instance):
+            value = getattr(instance, attr)
+            return value if value is None or type(value) is str else to_representation(value)
+        return _read_str
+
+    def _read(instance):
+        value = getattr(instance, attr)
+        return None if value is None else to_representation(value)
+    return _read
+
+
+def _compile(serializer: serializers.BaseSerializer) -> Representation:
+    serializer_class = type(serializer)
+
+    # Classes (most derived first) overriding the generic to_representation, whose additions need extensions
+    overriding = [c for c in serializer_class.__mro__[:serializer_class.__mro__.index(GenericSerializer)]
+                  if "to_representation" in c.__dict__] if isinstance(serializer, GenericSerializer) else []
+    if (not isinstance(serializer, GenericSerializer)
+            or any(c not in _extensions for c in overriding)):
+        return serializer.to_representation
+
+    extensions = [_extensions[c] for c in reversed(overriding)]
+    always_include = frozenset(serializer.always_include)
+    readers = [(f.field_name, _compile_field(serializer, f)) for f in serializer._readable_fields]
+
+    def _represent(instance) -> dict:
+        response = {}
+        for name, read in readers:
+            try:
+                value = read(instance)
+            except SkipField:
+                continue
+            # Like GenericSerializer, leave out empty values
+            if value or name in always_include:
+                response[name] = value
+        for extension in extensions:
+            response = extension(instance, response)
+        return response
+
+    return _represent
+
+
+def _cache_key(serializer_class: type, kwargs: dict) -> tuple:
+    return serializer_class, tuple(sorted((k, tuple(v) if isinstance(v, list) else v) for k, v in kwargs.items()))
+
+
+def compile_serializer(serializer_class: type, **kwargs) -> Representation:
+    """
+    Compiles a (read-only) representation function for a serializer class, instantiated with the given keyword
+    arguments (e.g. exclude_when_nested.) The function gives the same representation as serializer.data, but reads
+    model instances with a field list worked out once, rather than instantiating serializers for every object and
+    nested object. Field values are still converted by the serializer fields, so output is identical.
+    """
+
+    key = _cache_key(serializer_class, kwargs)
+    if (representation := _compiled.get(key)) is None:
+        with _compiled_lock:
+            if (representation := _compiled.get(key)) is None:
+                representation = _compiled[key] = _compile(serializer_class(**kwargs))
+    return representation
+
+
+def _relation_lookup(model, source_attrs: list[str]) -> str | None:
+    """
+    Returns the ORM lookup for a chain of attributes, if each of them is a relation (forward, or reverse by its
+    accessor name.)
+    """
+
+    if model is None or not source_attrs:
+        return None
+
+    for attr in source_attrs:
+        relations_by_attr = {
+            (f.get_accessor_name() if f.auto_created and not f.concrete else f.name): f
+            for f in model._meta.get_fields() if f.is_relation and f.related_model is not None}
+        if (relation := relations_by_attr.get(attr)) is None:
+            return None
+        model = relation.related_model
+
+    return "__".join(source_attrs)
+
+
+def _plan_serializer(serializer: serializers.BaseSerializer, prefix: str, plan: dict[str, None]) -> None:
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    if not isinstance(serializer, serializers.Serializer):
+        return
+
+    model = getattr(getattr(serializer, "Meta", None), "model", None)
+
+    for field in serializer._readable_fields:
+        if isinstance(field, serializers.BaseSerializer):
+            nested = field
+        elif isinstance(field, relations.ManyRelatedField):
+            nested = None
+        else:
+            # Single related objects read with their primary key only (the default) need no query
+            continue
+
+        lookup = _relation_lookup(model, field.source_attrs)
+        if lookup is None:
+            continue
+
+        plan[prefix + lookup] = None
+        if nested is not None:
+            _plan_serializer(nested, f"{prefix}{lookup}__", plan)
+
+    # Related objects represented by to_representation overrides, in their extensions
+    for serializer_class in type(serializer).__mro__:
+        if (related := _extension_relations.get(serializer_class)) is None:
+            continue
+        for attr, (related_serializer_class, kwargs) in (related() if callable(related) else related).items():
+            lookup = _relation_lookup(model, [attr])
+            if lookup is not None:
+                plan[prefix + lookup] = None
+                _plan_serializer(related_serializer_class(**kwargs), f"{prefix}{lookup}__", plan)
+
+
+def get_prefetch_plan(serializer_class: type, **kwargs) -> tuple[str, ...]:
+    """
+    Derives the prefetch_related lookups needed to serialize objects with a serializer class (instantiated with the
+    given keyword arguments) from its tree of nested serializers and related fields, including related objects
+    represented by to_representation overrides. With these prefetched, serializing a page of objects takes the same
+    number of queries whatever the size of the page.
+    """
+
+    key = _cache_key(serializer_class, kwargs)
+    if (plan := _prefetch_plans.get(key)) is None:
+        with _compiled_lock:
+            if (plan := _prefetch_plans.get(key)) is None:
+                lookups: dict[str, None] = {}  # Ordered set; parents come before the relations nested in them
+                _plan_serializer(serializer_class(**kwargs), "", lookups)
+                plan = _prefetch_plans[key] = tuple(lookups)
+    return plan
+
+
+class CompiledRepresentationMixin:
+    """
+    Viewset mixin serializing the responses of read-only actions (list, retrieve) with the compiled representation
+    of the serializer class. Writes still go through the serializer.
+    """
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        representation = compile_serializer(self.get_serializer_class())
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response([representation(obj) for obj in page])
+
+        return Response([representation(obj) for obj in queryset])
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(compile_serializer(self.get_serializer_class())(self.get_object()))
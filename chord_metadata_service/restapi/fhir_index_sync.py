@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import atexit
+import threading
+
+from collections import defaultdict
+from django.conf import settings
+from django.db import connection, transaction
+from elasticsearch import helpers
+from functools import partial
+from typing import Any
+
+from chord_metadata_service.logger import logger
+from chord_metadata_service.metadata.elastic import es
+
+from .fhir_indexing import FHIRIndexSource
+
+__all__ = [
+    "record_index_upsert",
+    "record_index_delete",
+    "flush_fhir_index_outbox",
+]
+
+# Outbox of documents to (re)index or delete, by document ID. Deletions have no source. Since entries are keyed by
+# document, an object saved several times before a flush is only indexed once, in its latest state.
+_outbox: dict[str, tuple[FHIRIndexSource | None, Any]] = {}
+_outbox_lock = threading.Lock()
+
+_worker: threading.Thread | None = None
+_worker_lock = threading.Lock()
+_wake_worker = threading.Event()
+
+
+def _enqueue(index_id: str, source: FHIRIndexSource | None, pk: Any) -> None:
+    with _outbox_lock:
+        _outbox[index_id] = (source, pk)
+        full = len(_outbox) >= settings.FHIR_INDEX_BATCH_SIZE
+
+    _start_worker()
+    if full:
+        _wake_worker.set()
+
+
+def _record(index_id: str, source: FHIRIndexSource | None, pk: Any) -> None:
+    if not es:
+        return
+    # Only once the transaction commits, so that rolled back writes never reach the index
+    transaction.on_commit(partial(_enqueue, index_id, source, pk))
+
+
+def record_index_upsert(source: FHIRIndexSource, instance) -> None:
+    """
+    Marks an object (of the model of the given source) as needing to be (re)indexed, once the current transaction
+    commits. Documents are built from the database when the outbox is flushed.
+    """
+    _record(instance.index_id, source, instance.pk)
+
+
+def record_index_delete(instance) -> None:
+    _record(instance.index_id, None, None)
+
+
+def flush_fhir_index_outbox(client=None) -> int:
+    """
+    Sends every pending index update and deletion to Elasticsearch in bulk requests. Returns the number of
+    documents sent. If Elasticsearch cannot be reached, updates are put back in the outbox for the next flush.
+    """
+
+    client = client or es
+
+    with _outbox_lock:
+        pending = dict(_outbox)
+        _outbox.clear()
+
+    if not pending or not client:
+        return 0
+
+    index = settings.FHIR_INDEX_NAME
+    actions = []
+    to_index: dict[FHIRIndexSource, list] = defaultdict(list)
+
+    for index_id, (source, pk) in pending.items():
+        if source is None:
+            actions.append({"_op_type": "delete", "_index": index, "_id": index_id})
+        else:
+            to_index[source].append(pk)
+
+    for source, pks in to_index.items():
+        # Objects deleted since they were saved are not found here; their deletion is in the outbox as well
+        objects = list(source.get_queryset().filter(pk__in=pks))
+        data = source.serializer_class(objects, many=True).data
+        actions.extend(
+            {"_index": index, "_id": obj.index_id, "_source": source.to_fhir(d)} for obj, d in zip(objects, data))
+
+    try:
+        _, errors = helpers.bulk(client, actions, chunk_size=settings.FHIR_INDEX_BATCH_SIZE, raise_on_error=False)
+    except Exception:
+        with _outbox_lock:
+            for index_id, entry in pending.items():
+                _outbox.setdefault(index_id, entry)  # Newer entries take precedence
+        raise
+
+    # Deleting a document which was never indexed is not an error
+    errors = [e for e in errors if e.get("delete", {}).get("status") != 404]
+    if errors:
+        logger.error(f"Failed to index {len(errors)} FHIR documents, e.g. {errors[0]}")
+
+    return len(actions)
+
+
+def _run_worker() -> None:
+    while True:
+        _wake_worker.wait(settings.FHIR_INDEX_SYNC_INTERVAL)
+        _wake_worker.clear()
+        try:
+            flush_fhir_index_outbox()
+        except Exception as e:
+            logger.error(f"Could not sync FHIR index: {e}")
+        finally:
+            connection.close()  # The worker thread has its own connection, which would otherwise stay open
+
+
+def _start_worker() -> None:
+    global _worker
+
+    with _worker_lock:
+        if _worker is not None:
+            return
+        _worker = threading.Thread(target=_run_worker, name="fhir-index-sync", daemon=True)
+        _worker.start()
+        # Daemon threads are killed at exit; send what is left in the outbox before then
+        atexit.register(flush_fhir_index_outbox)
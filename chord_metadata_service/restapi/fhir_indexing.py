@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import itertools
+import os
+
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import QuerySet
+from elasticsearch import helpers
+from typing import Callable, Iterable, Iterator, NamedTuple
+
+from chord_metadata_service.metadata.elastic import es
+
+__all__ = [
+    "FHIRIndexSource",
+    "FHIRIndexProgress",
+    "bulk_index_source",
+    "BuildFHIRIndexCommand",
+]
+
+
+class FHIRIndexSource(NamedTuple):
+    name: str
+    get_queryset: Callable[[], QuerySet]  # Must be ordered, so that indexing can be resumed from an offset
+    serializer_class: type
+    to_fhir: Callable[[dict], dict]
+
+
+class FHIRIndexProgress(NamedTuple):
+    source: str
+    indexed: int  # Rows sent to Elasticsearch so far, including any skipped by the starting offset
+    total: int
+    errors: int
+
+
+def _batched(iterable: Iterable, n: int) -> Iterator[list]:
+    it = iter(iterable)
+    while batch := list(itertools.islice(it, n)):
+        yield batch
+
+
+def _to_fhir_batch(to_fhir: Callable[[dict], dict], data: list[dict]) -> list[dict]:
+    return [to_fhir(d) for d in data]
+
+
+def _converted(docs: list[dict]) -> Future:
+    future = Future()
+    future.set_result(docs)
+    return future
+
+
+def bulk_index_source(
+    client,
+    source: FHIRIndexSource,
+    index: str | None = None,
+    batch_size: int | None = None,
+    workers: int | None = None,
+    offset: int = 0,
+    progress: Callable[[FHIRIndexProgress], None] | None = None,
+) -> FHIRIndexProgress:
+    """
+    Indexes the FHIR conversion of every row of a source in Elasticsearch, starting from a given offset.
+    Rows are streamed from the database and serialized in batches; batches are converted to FHIR in a pool of worker
+    processes (conversion is pure Python, so threads would not help) while earlier batches are sent to Elasticsearch
+    with the bulk API. Batches are sent in order, so progress.indexed is always a valid offset to resume from.
+    """
+
+    index = index or settings.FHIR_INDEX_NAME
+    batch_size = batch_size or settings.FHIR_INDEX_BATCH_SIZE
+    workers = workers or os.cpu_count() or 1
+
+    queryset = source.get_queryset()
+    total = queryset.count()
+
+    indexed = offset
+    errors = 0
+    in_flight: deque[tuple[list[str], Future]] = deque()
+
+    def _send(ids: list[str], converting: Future) -> None:
+        nonlocal indexed, errors
+        actions = ({"_index": index, "_id": id_, "_source": doc} for id_, doc in zip(ids, converting.result()))
+        _, batch_errors = helpers.bulk(client, actions, chunk_size=batch_size, raise_on_error=False)
+        indexed += len(ids)
+        errors += len(batch_errors)
+        if progress:
+            progress(FHIRIndexProgress(source.name, indexed, total, errors))
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for batch in _batched(queryset[offset:].iterator(chunk_size=batch_size), batch_size):
+            ids = [obj.index_id for obj in batch]
+            data = source.serializer_class(batch, many=True).data
+
+            if executor:
+                # Keep every worker busy with a batch, sending the oldest one once all of them are
+                if len(in_flight) >= workers:
+                    _send(*in_flight.popleft())
+                in_flight.append((ids, executor.submit(_to_fhir_batch, source.to_fhir, data)))
+            else:
+                _send(ids, _converted(_to_fhir_batch(source.to_fhir, data)))
+
+        while in_flight:
+            _send(*in_flight.popleft())
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+
+    return FHIRIndexProgress(source.name, indexed, total, errors)
+
+
+class BuildFHIRIndexCommand(BaseCommand):
+    """
+    Base for commands (re)building the FHIR index of some sources. Subclasses list their sources.
+    """
+
+    sources: tuple[FHIRIndexSource, ...] = ()
+
+    def add_arguments(self, parser):
+        source_names = [s.name for s in self.sources]
+        parser.add_argument("--sources", nargs="+", choices=source_names, default=source_names,
+                            help="Sources to index, in order")
+        parser.add_argument("--offset", action="store", type=int, default=0,
+                            help="Number of rows of the first source to skip, to resume an interrupted indexing")
+        parser.add_argument("--batch-size", action="store", type=int, default=settings.FHIR_INDEX_BATCH_SIZE,
+                            help="Number of documents per batch (and per bulk request)")
+        parser.add_argument("--workers", action="store", type=int, default=os.cpu_count() or 1,
+                            help="Number of processes converting documents to FHIR")
+
+    def _progress(self, p: FHIRIndexProgress) -> None:
+        self.stdout.write(f"{p.source}: {p.indexed}/{p.total} indexed ({p.errors} errors)")
+
+    def handle(self, *args, **options):
+        if not es:
+            self.stderr.write("No connection to elasticsearch")
+            return
+
+        es.indices.create(index=settings.FHIR_INDEX_NAME, ignore=400)
+
+        sources = [s for name in options["sources"] for s in self.sources if s.name == name]
+        offset = options["offset"]
+
+        for i, source in enumerate(sources):
+            progress = FHIRIndexProgress(source.name, offset, 0, 0)
+
+            def _record_progress(p: FHIRIndexProgress) -> None:
+                nonlocal progress
+                progress = p
+                self._progress(p)
+
+            try:
+                bulk_index_source(es, source, batch_size=options["batch_size"], workers=options["workers"],
+                                  offset=offset, progress=_record_progress)
+            except BaseException:
+                remaining = " ".join(s.name for s in sources[i:])
+                self.stderr.write(f"Indexing interrupted; resume with --sources {remaining} "
+                                  f"--offset {progress.indexed}")
+                raise
+
+            offset = 0
@@ -1,5 +1,4 @@
 import uuid
-import jsonschema
 import logging
 
 from django.core.exceptions import ValidationError
@@ -12,6 +11,7 @@ from .fhir_utils import (
     condition_to_disease,
     specimen_to_biosample
 )
+from chord_metadata_service.chord.ingest.schema import get_schema_validator
 from chord_metadata_service.chord.models import Dataset
 from chord_metadata_service.patients.models import Individual
 from chord_metadata_service.phenopackets.models import (
@@ -34,11 +34,9 @@ def _parse_reference(ref):
 
 def check_schema(schema, obj, additional_info=None):
     """ Validates schema and catches errors. """
-    try:
-        jsonschema.validate(obj, schema)
-    except jsonschema.exceptions.ValidationError:
-        v = jsonschema.Draft7Validator(schema)
-        errors = [e for e in v.iter_errors(obj)]
+    # Collect all errors in a single validation pass, with a validator compiled once per schema
+    errors = list(get_schema_validator(schema, check_formats=False).iter_errors(obj))
+    if errors:
         error_messages = [
             f"{i} validation error {'.'.join(str(v) for v in error.path)}: {error.message}"
             for i, error in enumerate(errors, 1)
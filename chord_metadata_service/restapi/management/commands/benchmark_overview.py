@@ -0,0 +1,93 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from psycopg2 import sql
+
+from chord_metadata_service.experiments import models as experiments_models
+from chord_metadata_service.patients.models import Individual
+from chord_metadata_service.phenopackets import models as pheno_models
+from chord_metadata_service.restapi.api_views import EXPERIMENT_OVERVIEW_FIELDS, overview_statistics
+from chord_metadata_service.restapi.utils import queryset_stats_for_field, queryset_stats_for_fields
+
+# Fields aggregated by the overview, by model
+OVERVIEW_FIELDS = (
+    (Individual, ("sex", "karyotypic_sex", "taxonomy__label")),
+    (pheno_models.Biosample, ("taxonomy__label", "sampled_tissue__label")),
+    (experiments_models.Experiment, (*EXPERIMENT_OVERVIEW_FIELDS, "instrument__platform", "instrument__model")),
+)
+
+BATCH_SIZE = 10000
+
+SEXES = [s[0] for s in Individual.SEX]
+TISSUES = [{"id": f"UBERON:{i:07d}", "label": f"tissue {i}"} for i in range(20)]
+HOMO_SAPIENS = {"id": "NCBITaxon:9606", "label": "Homo sapiens"}
+
+
+def _create_data(n_individuals: int, experiments_every: int) -> None:
+    instrument = experiments_models.Instrument.objects.create(
+        identifier="benchmark_overview", platform="Illumina", model="Illumina HiSeq 4000")
+
+    for start in range(0, n_individuals, BATCH_SIZE):
+        ids = [f"benchmark_overview_{i}" for i in range(start, min(start + BATCH_SIZE, n_individuals))]
+        Individual.objects.bulk_create([
+            Individual(id=id_, sex=SEXES[i % len(SEXES)], karyotypic_sex="UNKNOWN_KARYOTYPE", taxonomy=HOMO_SAPIENS,
+                       age_numeric=i % 90, extra_properties={})
+            for i, id_ in enumerate(ids, start)
+        ])
+        biosamples = pheno_models.Biosample.objects.bulk_create([
+            pheno_models.Biosample(id=id_, individual_id=id_, sampled_tissue=TISSUES[i % len(TISSUES)],
+                                   taxonomy=HOMO_SAPIENS, extra_properties={})
+            for i, id_ in enumerate(ids, start)
+        ])
+        experiments_models.Experiment.objects.bulk_create([
+            experiments_models.Experiment(
+                id=b.id, biosample=b, instrument=instrument, study_type="Whole genome Sequencing",
+                experiment_type="DNA Methylation", molecule="total RNA", library_strategy="Bisulfite-Seq",
+                library_source="Genomic", library_selection="PCR", library_layout="Single", extraction_protocol="NGS",
+                extra_properties={})
+            for b in biosamples[::experiments_every]
+        ])
+
+    # Rows from an uncommitted transaction are invisible to autovacuum; give the planner up-to-date statistics.
+    with connection.cursor() as cursor:
+        for model in (Individual, pheno_models.Biosample, experiments_models.Experiment):
+            cursor.execute(
+                sql.SQL("ANALYZE {}").format(sql.Identifier(model._meta.db_table)).as_string(cursor.connection))
+
+
+class Command(BaseCommand):
+    help = """
+        Benchmarks overview statistics on a synthetic database: grouped (GROUPING SETS) aggregation of each model's
+        fields against one COUNT/GROUP BY query per field. Synthetic data is created in a transaction which is rolled
+        back at the end.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--individuals", action="store", type=int, default=1000000,
+                            help="Number of synthetic individuals (each with a biosample) to create")
+        parser.add_argument("--experiments-every", action="store", type=int, default=10,
+                            help="Create an experiment for one in every N biosamples")
+
+    def _time(self, fn) -> float:
+        start = time.perf_counter()
+        fn()
+        return time.perf_counter() - start
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.stdout.write(f"Creating {options['individuals']} individuals...")
+            _create_data(options["individuals"], options["experiments_every"])
+
+            for model, fields in OVERVIEW_FIELDS:
+                queryset = model.objects.all()
+                grouped_time = self._time(lambda: queryset_stats_for_fields(queryset, fields))
+                per_field_time = self._time(
+                    lambda: (queryset.count(), [queryset_stats_for_field(queryset, f) for f in fields]))
+                self.stdout.write(
+                    f"{model.__name__:<12} {len(fields):>2} fields  grouped: {grouped_time * 1000:9.1f}ms  "
+                    f"per field: {per_field_time * 1000:9.1f}ms")
+
+            self.stdout.write(f"Full overview: {self._time(overview_statistics) * 1000:.1f}ms")
+
+            transaction.set_rollback(True)
@@ -6,15 +6,15 @@ from urllib.parse import urljoin
 __all__ = [
     "LargeResultsSetPagination",
     "BatchResultsSetPagination",
+    "KeysetResultsSetPagination",
+    "KeysetPaginationMixin",
 ]
 
 
-class LargeResultsSetPagination(pagination.PageNumberPagination):
-    page_size = 25
-    page_size_query_param = 'page_size'
-    max_page_size = 10000
-
-    # Fix next/previous links inside sub-path-mounted reverse proxies in the CHORD context:
+class ChordURLPaginationMixin:
+    """
+    Fixes next/previous links inside sub-path-mounted reverse proxies in the CHORD context.
+    """
 
     def _get_chord_absolute_uri(self):
         full_path = self.request.get_full_path()
@@ -23,22 +23,27 @@ class LargeResultsSetPagination(pagination.PageNumberPagination):
             full_path = full_path[1:]
         return urljoin(settings.CHORD_URL, full_path)
 
-    def get_next_link(self):
+    def _use_chord_absolute_uri(self):
         if settings.CHORD_URL is not None:
             # Monkey-patch rewrite build_absolute_uri
             self.request.build_absolute_uri = self._get_chord_absolute_uri
+
+
+class LargeResultsSetPagination(ChordURLPaginationMixin, pagination.PageNumberPagination):
+    page_size = 25
+    page_size_query_param = 'page_size'
+    max_page_size = 10000
+
+    def get_next_link(self):
+        self._use_chord_absolute_uri()
         return super(LargeResultsSetPagination, self).get_next_link()
 
     def get_previous_link(self):
-        if settings.CHORD_URL is not None:
-            # Monkey-patch rewrite build_absolute_uri
-            self.request.build_absolute_uri = self._get_chord_absolute_uri
+        self._use_chord_absolute_uri()
         return super(LargeResultsSetPagination, self).get_previous_link()
 
     def get_html_context(self):
-        if settings.CHORD_URL is not None:
-            # Monkey-patch rewrite build_absolute_uri
-            self.request.build_absolute_uri = self._get_chord_absolute_uri
+        self._use_chord_absolute_uri()
         super(LargeResultsSetPagination, self).get_html_context()
 
 
@@ -51,3 +56,41 @@ class BatchResultsSetPagination(LargeResultsSetPagination):
 
     def get_page_size(self, request):
         return self.max_page_size
+
+
+class KeysetResultsSetPagination(ChordURLPaginationMixin, pagination.CursorPagination):
+    """
+    Keyset pagination on IDs: pages start after the last ID of the previous page (WHERE id > ...) rather than at an
+    OFFSET, and there is no COUNT query, so that deep pages are as fast as the first one.
+    An empty cursor parameter gives the first page.
+    """
+    page_size = LargeResultsSetPagination.page_size
+    page_size_query_param = LargeResultsSetPagination.page_size_query_param
+    max_page_size = LargeResultsSetPagination.max_page_size
+    ordering = 'id'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # The base URL of next/previous links is taken here, so it must be rewritten first
+        self.request = request
+        self._use_chord_absolute_uri()
+        return super(KeysetResultsSetPagination, self).paginate_queryset(queryset, request, view)
+
+    def decode_cursor(self, request):
+        if not request.query_params.get(self.cursor_query_param):
+            return None
+        return super(KeysetResultsSetPagination, self).decode_cursor(request)
+
+
+class KeysetPaginationMixin:
+    """
+    Viewset mixin paginating list responses with KeysetResultsSetPagination when a cursor parameter is given (empty
+    for the first page), rather than with the viewset's pagination class. The keyset ordering replaces the ordering
+    of the queryset, so it must be on IDs already.
+    """
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator') and self.request is not None and \
+                KeysetResultsSetPagination.cursor_query_param in self.request.query_params:
+            self._paginator = KeysetResultsSetPagination()
+        return super().paginator
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from typing import Any, Callable
+
+__all__ = [
+    "PUBLIC_CACHE_VERSION_KEY",
+    "public_config_hash",
+    "get_public_cache_version",
+    "bump_public_cache_version",
+    "get_public_cached",
+]
+
+PUBLIC_CACHE_VERSION_KEY = "public:version"
+
+
+def public_config_hash() -> str:
+    return hashlib.sha256(json.dumps(settings.CONFIG_PUBLIC, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _new_version() -> int:
+    # Time-based, so that a version set after the previous one was evicted (or cleared) never matches entries cached
+    # under an earlier version.
+    return time.time_ns()
+
+
+def get_public_cache_version() -> int:
+    return cache.get_or_set(PUBLIC_CACHE_VERSION_KEY, _new_version, timeout=None)
+
+
+def bump_public_cache_version() -> None:
+    """
+    Supersedes every cached public response at once, after the data they are computed from has changed (ingests and
+    deletes.) Entries cached under previous versions are left to expire.
+    """
+    try:
+        cache.incr(PUBLIC_CACHE_VERSION_KEY)
+    except ValueError:  # No version set yet (or it was evicted)
+        cache.set(PUBLIC_CACHE_VERSION_KEY, _new_version(), timeout=None)
+
+
+def get_public_cached(name: str, compute: Callable[[], Any], *key_parts) -> Any:
+    """
+    Returns the data for a public endpoint from the cache shared between workers, computing and caching it first if
+    needed. Keys are made from the endpoint name, the public config and any request parameters the data depends on
+    (key_parts, which must be JSON-serializable), and versioned with the public cache version.
+    """
+
+    digest = hashlib.sha256(json.dumps([public_config_hash(), *key_parts], sort_keys=True).encode("utf-8"))
+    key = f"public:{name}:{digest.hexdigest()}"
+    version = get_public_cache_version()
+
+    data = cache.get(key, version=version)
+    if data is None:
+        data = compute()
+        cache.set(key, data, timeout=settings.CACHE_TIME, version=version)
+
+    return data
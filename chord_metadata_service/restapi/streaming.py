@@ -0,0 +1,25 @@
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+from functools import partial
+
+__all__ = [
+    "NDJSON_CONTENT_TYPE",
+    "StreamingResponse",
+]
+
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+
+_END = object()
+
+
+class StreamingResponse(StreamingHttpResponse):
+    """
+    Streaming response for a synchronous iterator (e.g. one reading from the database) which also streams when served
+    over ASGI. Django's StreamingHttpResponse would otherwise consume the whole iterator into a list before sending
+    anything; here, each part is produced in turn in the thread used for synchronous code (and database access.)
+    """
+
+    async def __aiter__(self):
+        next_part = sync_to_async(partial(next, iter(self.streaming_content), _END))
+        while (part := await next_part()) is not _END:
+            yield part
@@ -0,0 +1,85 @@
+import json
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class ElasticsearchStandIn:
+    """
+    Minimal local stand-in for an Elasticsearch node, implementing the endpoints used for indexing (index creation and
+    the bulk API), so that the real client can be tested without a cluster. Documents whose IDs are in fail_ids are
+    rejected.
+    """
+
+    def __init__(self, fail_ids=()):
+        self.indices: dict[str, dict[str, dict]] = {}
+        self.bulk_requests = 0
+        self.fail_ids = set(fail_ids)
+
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _respond(self, status: int, body: dict):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(data)
+
+            def _body(self) -> str:
+                return self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+
+            def do_HEAD(self):
+                self._respond(200, {})
+
+            def do_GET(self):
+                self._respond(200, {"version": {"number": "7.8.1"}})
+
+            def do_PUT(self):
+                index = self.path.strip("/").split("?")[0]
+                if index in stand_in.indices:
+                    self._respond(400, {"error": {"type": "resource_already_exists_exception"}, "status": 400})
+                    return
+                stand_in.indices[index] = {}
+                self._respond(200, {"acknowledged": True, "index": index})
+
+            def do_POST(self):
+                if self.path.split("?")[0] != "/_bulk":
+                    self._respond(404, {"error": "not found"})
+                    return
+
+                stand_in.bulk_requests += 1
+                lines = [line for line in self._body().split("\n") if line]
+                items = []
+                for action_line, source_line in zip(lines[::2], lines[1::2]):
+                    (op, meta), = json.loads(action_line).items()
+                    if meta["_id"] in stand_in.fail_ids:
+                        items.append({op: {**meta, "status": 400, "error": {"type": "mapper_parsing_exception"}}})
+                        continue
+                    docs = stand_in.indices.setdefault(meta["_index"], {})
+                    result = "updated" if meta["_id"] in docs else "created"
+                    docs[meta["_id"]] = json.loads(source_line)
+                    items.append({op: {**meta, "status": 201 if result == "created" else 200, "result": result}})
+
+                errors = any("error" in result for item in items for result in item.values())
+                self._respond(200, {"took": 1, "errors": errors, "items": items})
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._server.shutdown()
+        self._server.server_close()
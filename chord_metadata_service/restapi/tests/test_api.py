@@ -2,13 +2,17 @@ import json
 import os
 from asgiref.sync import async_to_sync
 from copy import deepcopy
+from io import StringIO
 
 from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
 from django.urls import reverse
 from django.test import override_settings
 from rest_framework import status
 from rest_framework.test import APITestCase
 
+from chord_metadata_service.cleanup import run_all_cleanup
 from chord_metadata_service.metadata.service_info import get_service_info
 from chord_metadata_service.chord import models as ch_m
 from chord_metadata_service.chord.tests import constants as ch_c
@@ -17,6 +21,8 @@ from chord_metadata_service.phenopackets.tests import constants as ph_c
 from chord_metadata_service.experiments import models as exp_m
 from chord_metadata_service.experiments.tests import constants as exp_c
 
+from ..api_views import overview_statistics
+from ..utils import queryset_stats_for_field, queryset_stats_for_fields
 from .constants import (
     CONFIG_PUBLIC_TEST,
     CONFIG_PUBLIC_TEST_SEARCH_UNSET_FIELDS,
@@ -121,6 +127,50 @@ class OverviewTest(APITestCase):
         self.assertEqual(response_obj['data_type_specific']['instruments']['platform']['Illumina'], 2)
         self.assertEqual(response_obj['data_type_specific']['instruments']['model']['Illumina HiSeq 4000'], 2)
 
+    def test_overview_statistics_queries(self):
+        # One aggregation query per model or multi-valued relation, rather than one per field: phenopackets (+ their
+        # diseases), biosamples, individuals (+ age bins and the fallback for missing numeric ages), experiments,
+        # experiment results, instruments, phenotypic features (distinct types + type labels)
+        with self.assertNumQueries(11):
+            overview_statistics()
+
+    def test_queryset_stats_for_fields(self):
+        for queryset, fields in (
+            (ph_m.Individual.objects.all(), ["sex", "karyotypic_sex", "taxonomy__label", "age_numeric"]),
+            (exp_m.Experiment.objects.all(), ["study_type", "molecule", "instrument__platform", "biosample__id"]),
+            (ph_m.Phenopacket.objects.filter(id=self.phenopacket_1.id), [
+                "subject__sex",
+                "biosamples__is_control_sample",
+                "biosamples__taxonomy__label",
+                "diseases__term__label",
+                "phenotypic_features__pftype__label",
+                "biosamples__experiment__experiment_type",
+            ]),
+            (ph_m.Phenopacket.objects.all(), []),
+        ):
+            for add_missing in (False, True):
+                count, stats = queryset_stats_for_fields(queryset, fields, add_missing=add_missing)
+                self.assertEqual(count, queryset.count())
+                self.assertDictEqual(
+                    stats, {f: queryset_stats_for_field(queryset, f, add_missing=add_missing) for f in fields})
+
+    def test_overview_precomputed(self):
+        response_obj = self.client.get('/api/overview').json()
+
+        # Read back from the statistics store in a single query
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/api/overview').json(), response_obj)
+
+        # Changes made outside of ingests/cleanup are only seen once the stored statistics expire
+        ph_m.Biosample.objects.create(**{**ph_c.valid_biosample_1(self.individual_1), "id": "biosample_id:3"})
+        self.assertEqual(self.client.get('/api/overview').json()['data_type_specific']['biosamples']['count'], 2)
+        with override_settings(PRECOMPUTED_STATISTICS_MAX_AGE=0):
+            self.assertEqual(self.client.get('/api/overview').json()['data_type_specific']['biosamples']['count'], 3)
+
+        # Cleanup removes the (orphan) biosample and invalidates the stored statistics
+        async_to_sync(run_all_cleanup)()
+        self.assertEqual(self.client.get('/api/overview').json(), response_obj)
+
     def test_search_overview(self):
         payload = json.dumps({'id': [ph_c.VALID_INDIVIDUAL_1['id']]})
         response = self.client.post(reverse('search-overview'), payload, content_type='application/json')
@@ -268,6 +318,61 @@ class PublicOverviewTest2(APITestCase):
         self.assertEqual(response_obj, settings.NO_PUBLIC_DATA_AVAILABLE)
 
 
+LOCMEM_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "public-cache-test",
+    }
+}
+
+PUBLIC_URLS = ("/api/public", "/api/public_search_fields", "/api/public_overview", "/api/public_dataset")
+
+
+@override_settings(CACHES=LOCMEM_CACHES, CONFIG_PUBLIC=CONFIG_PUBLIC_TEST)
+class PublicCacheTest(APITestCase):
+
+    def setUp(self) -> None:
+        cache.clear()
+        for ind in VALID_INDIVIDUALS[:-1]:
+            ph_m.Individual.objects.create(**ind)
+
+    def tearDown(self) -> None:
+        cache.clear()
+
+    def test_public_responses_cached(self):
+        for url in PUBLIC_URLS:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                with self.assertNumQueries(0):
+                    cached_response = self.client.get(url)
+                self.assertEqual(response.json(), cached_response.json())
+
+    def test_public_individuals_cached_by_query(self):
+        ph_m.Individual.objects.create(**VALID_INDIVIDUALS[-1])
+        all_count = self.client.get("/api/public").json()["count"]
+        male_count = self.client.get("/api/public?sex=MALE").json()["count"]
+        self.assertEqual(all_count, ph_m.Individual.objects.count())
+        self.assertEqual(male_count, ph_m.Individual.objects.filter(sex="MALE").count())
+        self.assertLess(male_count, all_count)
+
+    def test_cleanup_invalidates_public_cache(self):
+        response = self.client.get("/api/public_overview").json()
+        ph_m.Individual.objects.create(**VALID_INDIVIDUALS[-1])
+
+        # Cached until the data is changed by an ingest or a delete
+        self.assertEqual(self.client.get("/api/public_overview").json(), response)
+        # Cleanup deletes the individuals, since they are not part of any phenopacket
+        async_to_sync(run_all_cleanup)()
+        self.assertEqual(self.client.get("/api/public_overview").json(), settings.INSUFFICIENT_DATA_AVAILABLE)
+
+    def test_clearcache(self):
+        count = self.client.get("/api/public").json()["count"]
+        ph_m.Individual.objects.create(**VALID_INDIVIDUALS[-1])
+        self.assertEqual(self.client.get("/api/public").json()["count"], count)
+        call_command("clearcache", stdout=StringIO())
+        self.assertEqual(self.client.get("/api/public").json()["count"], count + 1)
+
+
 class PublicOverviewNotSupportedDataTypesListTest(APITestCase):
     # individuals (count 8)
     def setUp(self) -> None:
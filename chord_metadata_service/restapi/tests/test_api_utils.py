@@ -1,5 +1,6 @@
 from unittest import TestCase
 
+from asgiref.sync import async_to_sync
 from django.db.models.base import ModelBase
 from django.test import override_settings
 from rest_framework.test import APITestCase
@@ -9,6 +10,7 @@ from ..utils import (
     get_model_and_field,
     get_date_stats,
     get_month_date_range)
+from ..streaming import NDJSON_CONTENT_TYPE, StreamingResponse
 from .constants import CONFIG_PUBLIC_TEST
 
 
@@ -180,3 +182,19 @@ class TestDateStatsExcept(APITestCase):
         }
         self.assertRaises(NotImplementedError, get_date_stats, fp)
         self.assertRaises(NotImplementedError, get_month_date_range, fp)
+
+
+class TestStreamingResponse(TestCase):
+    def test_async_iteration(self):
+        parts = []
+
+        def gen():
+            for i in range(3):
+                parts.append(i)  # Parts are only produced as they are sent
+                yield f"{i}\n"
+
+        async def collect(response):
+            return [(part, len(parts)) async for part in response]
+
+        r = StreamingResponse(gen(), content_type=NDJSON_CONTENT_TYPE)
+        self.assertListEqual(async_to_sync(collect)(r), [(b"0\n", 1), (b"1\n", 2), (b"2\n", 3)])
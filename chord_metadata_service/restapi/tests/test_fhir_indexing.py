@@ -0,0 +1,168 @@
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from elasticsearch import Elasticsearch
+from io import StringIO
+from unittest.mock import patch
+
+from chord_metadata_service.patients.indices import INDIVIDUAL_INDEX_SOURCE
+from chord_metadata_service.patients.models import Individual
+from chord_metadata_service.phenopackets.models import Biosample, MetaData, Phenopacket, PhenotypicFeature
+from chord_metadata_service.phenopackets.tests.constants import (
+    VALID_META_DATA_2,
+    valid_biosample_1,
+    valid_phenotypic_feature,
+)
+from chord_metadata_service.restapi.fhir_index_sync import flush_fhir_index_outbox
+from chord_metadata_service.restapi.fhir_indexing import FHIRIndexProgress, bulk_index_source
+from chord_metadata_service.restapi.fhir_utils import fhir_patient
+from chord_metadata_service.patients.serializers import IndividualSerializer
+
+from .es_stand_in import ElasticsearchStandIn
+
+INDEX = "fhir_metadata"
+
+
+class FHIRBulkIndexingTest(TestCase):
+    def setUp(self):
+        self.individuals = [
+            Individual.objects.create(id=f"patient:{i}", sex="FEMALE", karyotypic_sex="XX") for i in range(5)]
+        meta_data = MetaData.objects.create(**VALID_META_DATA_2)
+        self.biosample = Biosample.objects.create(**valid_biosample_1(self.individuals[0]))
+        self.phenopacket = Phenopacket.objects.create(
+            id="phenopacket_id:1", subject=self.individuals[0], meta_data=meta_data)
+        self.phenopacket.biosamples.set([self.biosample])
+        PhenotypicFeature.objects.create(**valid_phenotypic_feature(biosample=self.biosample))
+
+    def _index(self, stand_in, **kwargs):
+        progress = []
+        result = bulk_index_source(Elasticsearch([stand_in.url]), INDIVIDUAL_INDEX_SOURCE, index=INDEX,
+                                   progress=progress.append, **kwargs)
+        return result, progress
+
+    def test_bulk_index(self):
+        with ElasticsearchStandIn() as stand_in:
+            result, progress = self._index(stand_in, batch_size=2, workers=1)
+
+        self.assertEqual(result, FHIRIndexProgress("individuals", 5, 5, 0))
+        self.assertEqual([p.indexed for p in progress], [2, 4, 5])
+        self.assertEqual(stand_in.bulk_requests, 3)
+
+        docs = stand_in.indices[INDEX]
+        self.assertEqual(set(docs), {ind.index_id for ind in self.individuals})
+        self.assertEqual(docs[self.individuals[0].index_id],
+                         fhir_patient(IndividualSerializer(self.individuals[0]).data))
+
+    def test_bulk_index_worker_pool(self):
+        with ElasticsearchStandIn() as single, ElasticsearchStandIn() as pooled:
+            self._index(single, batch_size=2, workers=1)
+            result, progress = self._index(pooled, batch_size=2, workers=2)
+
+        self.assertEqual(result.indexed, 5)
+        # Batches are sent in order, whichever worker converts them first
+        self.assertEqual([p.indexed for p in progress], [2, 4, 5])
+        self.assertEqual(pooled.indices, single.indices)
+
+    def test_resume_from_offset(self):
+        with ElasticsearchStandIn() as stand_in:
+            result, _ = self._index(stand_in, batch_size=2, workers=1, offset=3)
+
+        self.assertEqual(result, FHIRIndexProgress("individuals", 5, 5, 0))
+        self.assertEqual(set(stand_in.indices[INDEX]), {ind.index_id for ind in self.individuals[3:]})
+
+    def test_errors(self):
+        with ElasticsearchStandIn(fail_ids={self.individuals[1].index_id}) as stand_in:
+            result, _ = self._index(stand_in, workers=1)
+
+        self.assertEqual(result, FHIRIndexProgress("individuals", 5, 5, 1))
+        self.assertEqual(len(stand_in.indices[INDEX]), 4)
+
+    def test_build_index_commands(self):
+        with ElasticsearchStandIn() as stand_in:
+            with patch("chord_metadata_service.restapi.fhir_indexing.es", Elasticsearch([stand_in.url])):
+                out = StringIO()
+                call_command("phenopackets_build_index", "--workers", "1", stdout=out)
+                call_command("patients_build_index", "--workers", "1", stdout=StringIO())
+
+        self.assertIn("phenopackets: 1/1 indexed (0 errors)", out.getvalue())
+        self.assertEqual(
+            {id_.split("|")[0] for id_ in stand_in.indices[INDEX]},
+            {"Individual", "Biosample", "PhenotypicFeature", "Phenopacket"})
+        self.assertEqual(len(stand_in.indices[INDEX]), 8)
+
+    def test_build_index_without_elasticsearch(self):
+        err = StringIO()
+        call_command("patients_build_index", stderr=err)
+        self.assertIn("No connection to elasticsearch", err.getvalue())
+
+
+# Flushes are only triggered by the tests, not by the background worker
+@override_settings(FHIR_INDEX_SYNC_INTERVAL=3600, FHIR_INDEX_BATCH_SIZE=1000)
+class FHIRIndexSyncTest(TestCase):
+    def setUp(self):
+        self.stand_in = ElasticsearchStandIn().__enter__()
+        self.client = Elasticsearch([self.stand_in.url])
+        es_patch = patch("chord_metadata_service.restapi.fhir_index_sync.es", self.client)
+        es_patch.start()
+        self.addCleanup(es_patch.stop)
+        self.addCleanup(self.stand_in.__exit__)
+        flush_fhir_index_outbox()
+
+    def test_sync_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            individual = Individual.objects.create(id="patient:1", sex="FEMALE")
+            individual.sex = "MALE"
+            individual.save()
+            meta_data = MetaData.objects.create(**VALID_META_DATA_2)
+            biosample = Biosample.objects.create(**valid_biosample_1(individual))
+            PhenotypicFeature.objects.create(**valid_phenotypic_feature(biosample=biosample))
+            phenopacket = Phenopacket.objects.create(id="phenopacket_id:1", subject=individual, meta_data=meta_data)
+            phenopacket.biosamples.set([biosample])
+
+            # Nothing is sent before the transaction commits
+            self.assertEqual(flush_fhir_index_outbox(), 0)
+
+        self.assertEqual(self.stand_in.bulk_requests, 0)
+        self.assertEqual(flush_fhir_index_outbox(), 4)
+        # Saved twice, indexed once in its latest state
+        self.assertEqual(self.stand_in.bulk_requests, 1)
+        docs = self.stand_in.indices[INDEX]
+        self.assertEqual(docs[individual.index_id]["gender"], "MALE")
+        # Documents are built after the commit, so they include related objects saved after the object itself
+        self.assertEqual(len(docs[phenopacket.index_id]["section"][0]["entry"]), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            biosample.delete()
+        self.assertEqual(flush_fhir_index_outbox(), 2)  # Biosample and its phenotypic feature
+        self.assertNotIn(biosample.index_id, docs)
+
+    def test_no_sync_after_rollback(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Individual.objects.create(id="patient:1", sex="FEMALE")
+            try:
+                with transaction.atomic():
+                    Individual.objects.create(id="patient:2", sex="FEMALE")
+                    raise ValueError
+            except ValueError:
+                pass
+
+        self.assertEqual(flush_fhir_index_outbox(), 1)
+        self.assertEqual(set(self.stand_in.indices[INDEX]), {"Individual|patient:1"})
+
+    def test_save_then_delete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            individual = Individual.objects.create(id="patient:1", sex="FEMALE")
+            individual.delete()
+
+        self.assertEqual(flush_fhir_index_outbox(), 1)
+        self.assertEqual(self.stand_in.indices.get(INDEX, {}), {})
+
+    def test_requeue_when_unreachable(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Individual.objects.create(id="patient:1", sex="FEMALE")
+
+        with self.assertRaises(Exception):
+            flush_fhir_index_outbox(Elasticsearch(["http://127.0.0.1:1"], max_retries=0))
+
+        self.assertEqual(flush_fhir_index_outbox(), 1)
+        self.assertIn("Individual|patient:1", self.stand_in.indices[INDEX])
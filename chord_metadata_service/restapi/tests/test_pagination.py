@@ -0,0 +1,73 @@
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from chord_metadata_service.patients.models import Individual
+from chord_metadata_service.phenopackets import models as ph_m
+from chord_metadata_service.phenopackets.tests import constants as ph_c
+
+
+class KeysetPaginationTest(APITestCase):
+    NUM_INDIVIDUALS = 7
+
+    def setUp(self) -> None:
+        meta_data = ph_m.MetaData.objects.create(**ph_c.VALID_META_DATA_1)
+        for i in range(self.NUM_INDIVIDUALS):
+            individual = Individual.objects.create(**{**ph_c.VALID_INDIVIDUAL_1, "id": f"patient:{i}"})
+            ph_m.Biosample.objects.create(
+                **{**ph_c.valid_biosample_1(individual), "id": f"biosample:{i}", "individual_id": individual.id})
+            ph_m.Phenopacket.objects.create(
+                **{**ph_c.valid_phenopacket(individual, meta_data), "id": f"phenopacket:{i}"})
+
+    def get_all_pages(self, url: str) -> list[str]:
+        ids = []
+        while url:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertFalse(any("COUNT(" in q["sql"] for q in ctx.captured_queries))
+
+            data = response.json()
+            self.assertNotIn("count", data)
+            self.assertLessEqual(len(data["results"]), 3)
+            ids.extend(r["id"] for r in data["results"])
+            url = data["next"]
+        return ids
+
+    def test_keyset_pages(self):
+        for endpoint, prefix in (("individuals", "patient"), ("phenopackets", "phenopacket"),
+                                 ("biosamples", "biosample")):
+            with self.subTest(endpoint=endpoint):
+                ids = self.get_all_pages(f"/api/{endpoint}?cursor=&page_size=3")
+                self.assertListEqual(ids, [f"{prefix}:{i}" for i in range(self.NUM_INDIVIDUALS)])
+
+    def test_keyset_previous(self):
+        first = self.client.get("/api/individuals?cursor=&page_size=3").json()
+        self.assertIsNone(first["previous"])
+        second = self.client.get(first["next"]).json()
+        previous = self.client.get(second["previous"]).json()
+        self.assertListEqual(previous["results"], first["results"])
+
+    def test_keyset_filtered(self):
+        ids = self.get_all_pages("/api/individuals?cursor=&page_size=3&id=patient:4")
+        self.assertListEqual(ids, ["patient:4"])
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/individuals?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_page_number_pagination(self):
+        # Without a cursor, pages are still numbered and counted
+        response = self.client.get("/api/individuals?page=2&page_size=3")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data["count"], self.NUM_INDIVIDUALS)
+        self.assertListEqual([r["id"] for r in data["results"]], ["patient:3", "patient:4", "patient:5"])
+
+    @override_settings(CHORD_URL="https://portal.example.org/api/metadata/")
+    def test_chord_url_links(self):
+        data = self.client.get("/api/individuals?cursor=&page_size=3").json()
+        self.assertTrue(data["next"].startswith("https://portal.example.org/api/metadata/api/individuals?"))
+        self.assertIn("cursor=", data["next"])
@@ -6,8 +6,9 @@ import datetime
 from collections import defaultdict, Counter
 from calendar import month_abbr
 from decimal import Decimal, ROUND_HALF_EVEN
-from typing import Any, Type, TypedDict, Mapping, Generator
+from typing import Any, Iterable, Type, TypedDict, Mapping, Generator, Sequence
 
+from django.core.exceptions import FieldDoesNotExist
 from django.db.models import Count, F, Func, IntegerField, CharField, Case, Model, When, Value
 from django.db.models.functions import Cast
 from django.conf import settings
@@ -306,30 +307,20 @@ def stats_for_field(model, field: str, add_missing=False) -> Mapping[str, int]:
     return queryset_stats_for_field(queryset, field, add_missing)
 
 
-def queryset_stats_for_field(queryset, field: str, add_missing=False) -> Mapping[str, int]:
-    """
-    Computes counts of distinct values for a queryset.
-    """
-
-    # values() restrict the table of results to this COLUMN
-    # annotate() creates a `total` column for the aggregation
-    # Count("*") aggregates results including nulls
-
-    annotated_queryset = queryset.values(field).annotate(total=Count("*"))
+def _stats_from_value_counts(value_counts: Iterable[tuple[Any, int]], add_missing=False) -> dict[str, int]:
     num_missing = 0
 
     stats: dict[str, int] = {}
 
-    for item in annotated_queryset:
-        key = item[field]
+    for key, total in value_counts:
         if key is None:
-            num_missing = item["total"]
+            num_missing = total
             continue
 
         key = str(key) if not isinstance(key, str) else key.strip()
         if key == "":
             continue
-        stats[key] = item["total"]
+        stats[key] = total
 
     if add_missing:
         stats["missing"] = num_missing
@@ -337,6 +328,117 @@ def queryset_stats_for_field(queryset, field: str, add_missing=False) -> Mapping
     return stats
 
 
+def queryset_stats_for_field(queryset, field: str, add_missing=False) -> Mapping[str, int]:
+    """
+    Computes counts of distinct values for a queryset.
+    """
+
+    # values() restrict the table of results to this COLUMN
+    # annotate() creates a `total` column for the aggregation
+    # Count("*") aggregates results including nulls
+
+    annotated_queryset = queryset.values(field).annotate(total=Count("*"))
+    return _stats_from_value_counts(((item[field], item["total"]) for item in annotated_queryset), add_missing)
+
+
+def _multi_valued_relation_path(model: Type[Model], field: str) -> str:
+    """
+    Returns the lookup path of the last multi-valued relation (many-to-many or reverse foreign key) traversed by a
+    field lookup, or "" if it only follows single-valued relations; rows of a queryset are repeated once per related
+    object when such a field is selected.
+    """
+
+    opts = model._meta
+    path = []
+    multi_valued_path = ""
+
+    for part in field.split("__"):
+        try:
+            f = opts.get_field(part)
+        except FieldDoesNotExist:  # e.g. a JSON key
+            break
+        if not f.is_relation:
+            break
+        path.append(part)
+        if f.many_to_many or f.one_to_many:
+            multi_valued_path = "__".join(path)
+        opts = f.related_model._meta
+
+    return multi_valued_path
+
+
+def _grouping_sets_value_counts(queryset, fields: Sequence[str]) -> tuple[int, dict[str, list[tuple[Any, int]]]]:
+    """
+    Counts the distinct values of several fields of a queryset in a single query, using one grouping set per field and
+    an empty grouping set for the total number of rows. All fields must go through the same multi-valued relations (if
+    any), since they are selected together.
+    """
+
+    if not fields:
+        return queryset.count(), {}
+
+    aliases = [f"stats_field_{i}" for i in range(len(fields))]
+    values_queryset = queryset.annotate(**{a: F(f) for a, f in zip(aliases, fields)}).values(*aliases).order_by()
+
+    compiler = values_queryset.query.get_compiler(using=queryset.db)
+    subquery, params = compiler.as_sql()
+    converters = compiler.get_converters([values_queryset.query.annotations[a] for a in aliases])
+
+    qn = compiler.connection.ops.quote_name
+    columns = [qn(a) for a in aliases]
+    query = (
+        f"SELECT {', '.join((*columns, *(f'GROUPING({c})' for c in columns)))}, COUNT(*) "
+        f"FROM ({subquery}) AS {qn('stats')} "
+        f"GROUP BY GROUPING SETS ({', '.join((*(f'({c})' for c in columns), '()'))})"
+    )
+
+    total = 0
+    value_counts: dict[str, list[tuple[Any, int]]] = {f: [] for f in fields}
+
+    with compiler.connection.cursor() as cursor:
+        cursor.execute(query, params)
+        for row in cursor.fetchall():
+            values, grouping, count = row[:len(fields)], row[len(fields):-1], row[-1]
+            if all(grouping):  # Empty grouping set, i.e. all rows
+                total = count
+                continue
+
+            i = grouping.index(0)
+            value = values[i]
+            if i in converters:
+                for converter in converters[i][0]:
+                    value = converter(value, converters[i][1], compiler.connection)
+            value_counts[fields[i]].append((value, count))
+
+    return total, value_counts
+
+
+def queryset_stats_for_fields(queryset, fields: Sequence[str], add_missing=False) -> tuple[int, dict[str, dict]]:
+    """
+    Computes counts of distinct values for several fields of a queryset, like queryset_stats_for_field for each field,
+    along with the number of objects in the queryset. Rather than scanning the table once per field, fields are
+    aggregated together with GROUPING SETS: one query for all fields on single-valued relations (which also gives the
+    count), plus one query per multi-valued relation path, since selecting those repeats rows.
+    Returns a tuple of the queryset count and a dictionary of stats by field.
+    """
+
+    fields_by_path: dict[str, list[str]] = {"": []}
+    for field in fields:
+        fields_by_path.setdefault(_multi_valued_relation_path(queryset.model, field), []).append(field)
+
+    count = 0
+    stats: dict[str, dict] = {}
+
+    for path, path_fields in fields_by_path.items():
+        total, value_counts = _grouping_sets_value_counts(queryset, path_fields)
+        if not path:
+            count = total
+        for field, field_value_counts in value_counts.items():
+            stats[field] = _stats_from_value_counts(field_value_counts, add_missing)
+
+    return count, {field: stats[field] for field in fields}
+
+
 def get_field_bins(query_set, field, bin_size):
     # computes a new column "binned" by substracting the modulo by bin size to
     # the value which requires binning (e.g. 28 => 28 - 28 % 10 = 20)